@@ -2,10 +2,10 @@ import { renderHook, act } from '@testing-library/react';
 import { usePreviewSettings } from '../usePreviewSettings';
 
 // Mock useResourceFetcher hook
+const mockFetchResources = jest.fn();
 jest.mock('../useResourceFetcher', () => ({
   useResourceFetcher: () => ({
-    fetchProduct: jest.fn(),
-    fetchCollection: jest.fn(),
+    fetchResources: mockFetchResources,
     error: null,
   }),
 }));
@@ -37,6 +37,21 @@ const liquidWithSchema = `
 
 const liquidNoSchema = '<div>No schema</div>';
 
+const liquidWithPickers = `
+{% schema %}
+{
+  "name": "Featured",
+  "settings": [
+    { "type": "product", "id": "featured_product", "label": "Product" },
+    { "type": "collection", "id": "featured_collection", "label": "Collection" }
+  ]
+}
+{% endschema %}
+`;
+
+const productGid = 'gid://shopify/Product/1';
+const collectionGid = 'gid://shopify/Collection/2';
+
 describe('usePreviewSettings', () => {
   beforeEach(() => {
     jest.useFakeTimers();
@@ -574,4 +589,52 @@ describe('usePreviewSettings', () => {
       });
     });
   });
+
+  describe('resource pickers', () => {
+    beforeEach(() => {
+      mockFetchResources.mockReset();
+    });
+
+    it('resolves picks made in the same tick with one batched request', async () => {
+      mockFetchResources.mockResolvedValueOnce({
+        [productGid]: { id: productGid, title: 'Shirt' },
+        [collectionGid]: { id: collectionGid, title: 'Summer' },
+      });
+      const { result } = renderHook(() => usePreviewSettings(liquidWithPickers));
+
+      await act(async () => {
+        await Promise.all([
+          result.current.handleResourceSelect('featured_product', productGid, null),
+          result.current.handleResourceSelect('featured_collection', '2', null),
+        ]);
+      });
+
+      expect(mockFetchResources).toHaveBeenCalledTimes(1);
+      expect(mockFetchResources).toHaveBeenCalledWith([productGid, collectionGid]);
+      expect(result.current.loadedResources).toEqual({
+        featured_product: { id: productGid, title: 'Shirt' },
+        featured_collection: { id: collectionGid, title: 'Summer' },
+      });
+      expect(result.current.isLoadingResource).toBe(false);
+    });
+
+    it('drops a response for a pick that was cleared before it arrived', async () => {
+      let resolveFetch: (value: unknown) => void = () => {};
+      mockFetchResources.mockReturnValueOnce(new Promise(resolve => { resolveFetch = resolve; }));
+      const { result } = renderHook(() => usePreviewSettings(liquidWithPickers));
+
+      let load: Promise<void> = Promise.resolve();
+      await act(async () => {
+        load = result.current.handleResourceSelect('featured_product', productGid, null);
+        await Promise.resolve();
+      });
+      await act(async () => {
+        await result.current.handleResourceSelect('featured_product', null, null);
+        resolveFetch({ [productGid]: { id: productGid, title: 'Shirt' } });
+        await load;
+      });
+
+      expect(result.current.loadedResources).toEqual({});
+    });
+  });
 });
@@ -16,6 +16,11 @@ export interface UsePreviewSettingsOptions {
   debounceMs?: number;
 }
 
+const RESOURCE_GID_TYPES: Record<string, string> = {
+  product: 'Product',
+  collection: 'Collection'
+};
+
 /**
  * Hook for managing preview settings state
  * Extracts schema from Liquid code and provides settings management
@@ -26,7 +31,7 @@ export function usePreviewSettings(
   options: UsePreviewSettingsOptions = {}
 ) {
   const { onSettingsChange, debounceMs = 2000 } = options;
-  const { fetchProduct, fetchCollection, error: fetchError } = useResourceFetcher();
+  const { fetchResources, error: fetchError } = useResourceFetcher();
 
   // Parse schema from liquid code
   const parsedSchema = useMemo<SchemaDefinition | null>(
@@ -52,6 +57,12 @@ export function usePreviewSettings(
   const [loadedResources, setLoadedResources] = useState<Record<string, MockProduct | MockCollection>>({});
   const [isLoadingResource, setIsLoadingResource] = useState(false);
 
+  // Picks made in the same tick are resolved by one batched request
+  const pendingPicksRef = useRef<Map<string, string> | null>(null);
+  const pendingLoadRef = useRef<Promise<void> | null>(null);
+  // Latest GID picked per setting; responses for superseded picks are dropped
+  const latestPicksRef = useRef<Record<string, string>>({});
+
   // Dirty state tracking
   const [isDirty, setIsDirty] = useState(false);
   const initialStateRef = useRef<SettingsState>(buildInitialState(schemaSettings));
@@ -121,12 +132,37 @@ export function usePreviewSettings(
     []
   );
 
+  const loadPendingPicks = useCallback(async () => {
+    const picks = pendingPicksRef.current;
+    pendingPicksRef.current = null;
+    pendingLoadRef.current = null;
+    if (!picks || picks.size === 0) return;
+
+    setIsLoadingResource(true);
+    try {
+      const byGid = await fetchResources([...new Set(picks.values())]);
+
+      setLoadedResources(prev => {
+        const updated = { ...prev };
+        for (const [settingId, gid] of picks) {
+          const data = byGid[gid];
+          if (data && latestPicksRef.current[settingId] === gid) {
+            updated[settingId] = data as MockProduct | MockCollection;
+          }
+        }
+        return updated;
+      });
+    } finally {
+      setIsLoadingResource(false);
+    }
+  }, [fetchResources]);
+
   // Resource selection handler
-  const handleResourceSelect = useCallback(async (
+  const handleResourceSelect = useCallback((
     settingId: string,
     resourceId: string | null,
     resource: SelectedResource | null
-  ) => {
+  ): Promise<void> => {
     // Update selection UI state
     setResourceSelections(prev => ({
       ...prev,
@@ -134,39 +170,32 @@ export function usePreviewSettings(
     }));
 
     if (!resourceId) {
+      delete latestPicksRef.current[settingId];
+      pendingPicksRef.current?.delete(settingId);
       // Clear the resource data
       setLoadedResources(prev => {
         const updated = { ...prev };
         delete updated[settingId];
         return updated;
       });
-      return;
+      return Promise.resolve();
     }
 
     // Find the setting type to know what kind of resource to fetch
     const setting = schemaSettings.find(s => s.id === settingId);
-    if (!setting) return;
+    const gidType = setting ? RESOURCE_GID_TYPES[setting.type] : undefined;
+    if (!gidType) return Promise.resolve();
 
-    setIsLoadingResource(true);
-    try {
-      let data: MockProduct | MockCollection | null = null;
-
-      if (setting.type === 'product') {
-        data = await fetchProduct(resourceId);
-      } else if (setting.type === 'collection') {
-        data = await fetchCollection(resourceId);
-      }
-
-      if (data) {
-        setLoadedResources(prev => ({
-          ...prev,
-          [settingId]: data
-        }));
-      }
-    } finally {
-      setIsLoadingResource(false);
+    const gid = resourceId.startsWith('gid://') ? resourceId : `gid://shopify/${gidType}/${resourceId}`;
+    latestPicksRef.current[settingId] = gid;
+
+    if (!pendingPicksRef.current) {
+      pendingPicksRef.current = new Map();
+      pendingLoadRef.current = Promise.resolve().then(loadPendingPicks);
     }
-  }, [schemaSettings, fetchProduct, fetchCollection]);
+    pendingPicksRef.current.set(settingId, gid);
+    return pendingLoadRef.current as Promise<void>;
+  }, [schemaSettings, loadPendingPicks]);
 
   // Reset to current schema defaults
   const resetToSchemaDefaults = useCallback(() => {
@@ -7,10 +7,14 @@ import { useCallback, useState } from 'react';
 import type { MockProduct, MockCollection, MockArticle } from '../mockData/types';
 
 export type ResourceType = 'product' | 'collection' | 'article';
+export type FetchedResource = MockProduct | MockCollection | MockArticle;
+
+// Mirrors MAX_BATCH_IDS in app.api.resource
+const MAX_BATCH_IDS = 50;
 
 interface UseResourceFetcherReturn {
   fetchProduct: (productId: string) => Promise<MockProduct | null>;
-  fetchProducts: (productIds: string[]) => Promise<MockProduct[]>;
+  fetchResources: (gids: string[]) => Promise<Record<string, FetchedResource | null>>;
   fetchCollection: (collectionId: string) => Promise<MockCollection | null>;
   fetchArticle: (articleId: string) => Promise<MockArticle | null>;
   loading: boolean;
@@ -55,26 +59,45 @@ export function useResourceFetcher(): UseResourceFetcherReturn {
     return fetchResource<MockProduct>('product', productId);
   }, [fetchResource]);
 
-  const fetchProducts = useCallback(async (productIds: string[]): Promise<MockProduct[]> => {
-    if (productIds.length === 0) return [];
+  /**
+   * Resolve product/collection/article GIDs through the batch endpoint.
+   * Returns data keyed by GID, with null for ids that did not resolve.
+   */
+  const fetchResources = useCallback(async (
+    gids: string[]
+  ): Promise<Record<string, FetchedResource | null>> => {
+    if (gids.length === 0) return {};
 
     setLoading(true);
     setError(null);
 
     try {
-      // Fetch all products in parallel
-      const results = await Promise.all(
-        productIds.map(id => fetchResource<MockProduct>('product', id))
-      );
-      return results.filter((p): p is MockProduct => p !== null);
+      const chunks: string[][] = [];
+      for (let i = 0; i < gids.length; i += MAX_BATCH_IDS) {
+        chunks.push(gids.slice(i, i + MAX_BATCH_IDS));
+      }
+
+      const results = await Promise.all(chunks.map(async (chunk) => {
+        const response = await fetch(`/app/api/resource?type=batch&ids=${encodeURIComponent(chunk.join(','))}`);
+
+        if (!response.ok) {
+          const errorData = await response.json().catch(() => ({}));
+          throw new Error(errorData.error || 'Failed to fetch resources');
+        }
+
+        const result = await response.json();
+        return (result.data || {}) as Record<string, FetchedResource | null>;
+      }));
+
+      return Object.assign({}, ...results);
     } catch (err) {
-      const errorMessage = err instanceof Error ? err.message : 'Failed to fetch products';
+      const errorMessage = err instanceof Error ? err.message : 'Failed to fetch resources';
       setError(errorMessage);
-      return [];
+      return {};
     } finally {
       setLoading(false);
     }
-  }, [fetchResource]);
+  }, []);
 
   const fetchCollection = useCallback(async (collectionId: string): Promise<MockCollection | null> => {
     return fetchResource<MockCollection>('collection', collectionId);
@@ -90,7 +113,7 @@ export function useResourceFetcher(): UseResourceFetcherReturn {
 
   return {
     fetchProduct,
-    fetchProducts,
+    fetchResources,
     fetchCollection,
     fetchArticle,
     loading,
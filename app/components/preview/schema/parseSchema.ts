@@ -1,4 +1,5 @@
 import type { SchemaDefinition, SchemaSetting, SettingsState, SchemaBlock, BlockInstance, SettingType } from './SchemaTypes';
+import { findSchemaBlock } from '../../../utils/liquid-tokenizer';
 
 /**
  * Resource types that don't support default values in Shopify schema
@@ -110,16 +111,21 @@ function resolveSettingLabels(setting: SchemaSetting): SchemaSetting {
  */
 export function parseSchema(liquidCode: string): SchemaDefinition | null {
   // Match {% schema %}...{% endschema %}
-  const schemaMatch = liquidCode.match(
-    /\{%\s*schema\s*%\}([\s\S]*?)\{%\s*endschema\s*%\}/
-  );
+  const block = findSchemaBlock(liquidCode);
 
-  if (!schemaMatch || !schemaMatch[1]) {
+  if (!block?.closed || !block.content) {
     return null;
   }
 
+  return parseSchemaContent(block.content);
+}
+
+/**
+ * Parse the JSON body of a {% schema %} block
+ */
+export function parseSchemaContent(content: string): SchemaDefinition | null {
   try {
-    const schemaJson = schemaMatch[1].trim();
+    const schemaJson = content.trim();
     const schema = JSON.parse(schemaJson) as SchemaDefinition;
 
     // Validate required fields
@@ -0,0 +1,115 @@
+/**
+ * @jest-environment node
+ *
+ * Tests for /api/chat/stream persistence (client disconnects)
+ */
+/* eslint-disable @typescript-eslint/no-explicit-any */
+
+import { action } from "../api.chat.stream";
+import prisma from "../../db.server";
+import * as shopifyAuth from "../../shopify.server";
+import { aiService } from "../../services/ai.server";
+import type { InMemoryPrisma } from "../../services/mocks/in-memory-prisma";
+
+jest.mock("../../db.server", () => {
+  const { createInMemoryPrisma } = jest.requireActual("../../services/mocks/in-memory-prisma");
+  return { __esModule: true, default: createInMemoryPrisma() };
+});
+
+jest.mock("../../shopify.server", () => ({
+  authenticate: {
+    admin: jest.fn(),
+  },
+  unauthenticated: {},
+}));
+
+jest.mock("../../services/ai.server", () => ({
+  aiService: {
+    generateWithContext: jest.fn(),
+  },
+}));
+
+jest.mock("../../services/feature-gate.server", () => ({
+  checkRefinementAccess: jest.fn().mockResolvedValue({ allowed: true }),
+}));
+
+const db = prisma as unknown as InMemoryPrisma;
+const SHOP = "test-shop.myshopify.com";
+const CODE_REPLY = '```liquid\n<div class="hero">{{ section.settings.title }}</div>\n```';
+
+async function startStream() {
+  const conversation = await db.conversation.create({
+    data: { shop: SHOP, sectionId: "507f1f77bcf86cd799439011", refinementCount: 0 },
+  });
+  const formData = new FormData();
+  formData.set("conversationId", conversation.id);
+  formData.set("content", "Add a hero banner");
+  const request = new Request("https://app.test/api/chat/stream", { method: "POST", body: formData });
+  const response = (await action({ request, params: {}, context: {} } as any)) as Response;
+  return response.body!.getReader();
+}
+
+async function readToEnd(reader: ReadableStreamDefaultReader<Uint8Array>) {
+  while (!(await reader.read()).done) {
+    // drain
+  }
+}
+
+// Let the handler finish whatever it does after the stream is cancelled
+async function settle() {
+  for (let i = 0; i < 20; i++) {
+    await new Promise((resolve) => setTimeout(resolve, 0));
+  }
+}
+
+async function countAssistantMessages() {
+  return (await db.message.findMany({ where: { role: "assistant" } })).length;
+}
+
+describe("api.chat.stream route", () => {
+  beforeEach(() => {
+    db.$reset();
+    process.env.CHAT_STREAM_FLUSH_CHARS = "1";
+    (shopifyAuth.authenticate.admin as jest.Mock).mockResolvedValue({ session: { shop: SHOP } });
+  });
+
+  afterEach(() => {
+    delete process.env.CHAT_STREAM_FLUSH_CHARS;
+  });
+
+  it("saves the message and one outbox job for a completed stream", async () => {
+    (aiService.generateWithContext as jest.Mock).mockImplementation(async function* () {
+      yield CODE_REPLY;
+    });
+
+    await readToEnd(await startStream());
+
+    expect(await countAssistantMessages()).toBe(1);
+    expect(await db.outboxJob.findMany()).toHaveLength(1);
+  });
+
+  it("saves nothing when the client disconnects mid-stream", async () => {
+    let resume: () => void = () => {};
+    const disconnected = new Promise<void>((resolve) => { resume = resolve; });
+    (aiService.generateWithContext as jest.Mock).mockImplementation(async function* (
+      _prompt: string,
+      _context: unknown,
+      options: { signal?: AbortSignal }
+    ) {
+      yield CODE_REPLY;
+      await disconnected;
+      if (options.signal?.aborted) return;
+      yield "\nLet me know if you want changes.";
+    });
+
+    const reader = await startStream();
+    await reader.read(); // message_start
+    await reader.read(); // first content_delta
+    await reader.cancel();
+    resume();
+    await settle();
+
+    expect(await countAssistantMessages()).toBe(0);
+    expect(await db.outboxJob.findMany()).toHaveLength(0);
+  });
+});
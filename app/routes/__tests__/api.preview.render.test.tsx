@@ -0,0 +1,95 @@
+/**
+ * @jest-environment node
+ *
+ * Tests for /api/preview/render Server-Timing stages
+ */
+/* eslint-disable @typescript-eslint/no-explicit-any */
+
+import { action } from "../api.preview.render";
+import * as shopifyAuth from "../../shopify.server";
+import { resetPreviewRenderCache } from "../../services/preview-render-cache.server";
+import { parseServerTiming } from "../../utils/server-timing.server";
+
+jest.mock("../../shopify.server", () => ({
+  authenticate: {
+    admin: jest.fn(),
+  },
+}));
+
+jest.mock("../../services/storefront-auth.server", () => ({
+  getAuthenticatedCookiesForShop: jest.fn().mockResolvedValue(null),
+}));
+
+jest.mock("../../services/preview-token-store.server", () => ({
+  storePreviewData: jest.fn(),
+}));
+
+jest.mock("isomorphic-dompurify", () => ({
+  __esModule: true,
+  default: { sanitize: (html: string) => html },
+}));
+
+const mockFetch = jest.fn();
+global.fetch = mockFetch as jest.Mock;
+
+async function render(code: string) {
+  const request = new Request("https://app.test/api/preview/render", {
+    method: "POST",
+    body: JSON.stringify({ code }),
+  });
+  const result = (await action({ request, params: {}, context: {} } as any)) as any;
+  const stages = parseServerTiming(result.init.headers["Server-Timing"]).map((entry) => entry.name);
+  return { body: result.data, stages };
+}
+
+describe("api.preview.render route", () => {
+  beforeEach(() => {
+    resetPreviewRenderCache();
+    mockFetch.mockReset();
+    (shopifyAuth.authenticate.admin as jest.Mock).mockResolvedValue({
+      session: { shop: "test-shop.myshopify.com" },
+    });
+  });
+
+  it("reports the storefront stage for a native render", async () => {
+    mockFetch.mockResolvedValueOnce(new Response("<div>ok</div>", { status: 200 }));
+
+    const { body, stages } = await render("<div>native</div>");
+
+    expect(body.mode).toBe("native");
+    expect(stages).toEqual(expect.arrayContaining(["storefront", "sanitize", "render"]));
+  });
+
+  it("reports the storefront stage when the storefront returns an error", async () => {
+    jest.spyOn(console, "error").mockImplementation(() => {});
+    mockFetch.mockResolvedValueOnce(new Response("boom", { status: 500 }));
+
+    const { body, stages } = await render("<div>error</div>");
+
+    expect(body.mode).toBe("fallback");
+    expect(stages).toContain("storefront");
+    (console.error as jest.Mock).mockRestore();
+  });
+
+  it("reports the storefront stage on a password redirect", async () => {
+    mockFetch.mockResolvedValueOnce(
+      new Response(null, { status: 302, headers: { location: "/password" } })
+    );
+
+    const { body, stages } = await render("<div>password</div>");
+
+    expect(body.error).toMatch(/password-protected/);
+    expect(stages).toContain("storefront");
+  });
+
+  it("reports the storefront stage when the fetch times out", async () => {
+    const abort = new Error("aborted");
+    abort.name = "AbortError";
+    mockFetch.mockRejectedValueOnce(abort);
+
+    const { body, stages } = await render("<div>timeout</div>");
+
+    expect(body.error).toBe("Request timeout");
+    expect(stages).toContain("storefront");
+  });
+});
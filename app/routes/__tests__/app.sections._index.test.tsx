@@ -0,0 +1,57 @@
+/**
+ * @jest-environment node
+ *
+ * Tests for the /app/sections loader (search box)
+ */
+/* eslint-disable @typescript-eslint/no-explicit-any */
+
+import { loader } from '../app.sections._index';
+import prisma from '../../db.server';
+import * as shopifyAuth from '../../shopify.server';
+import type { InMemoryPrisma } from '../../services/mocks/in-memory-prisma';
+
+jest.mock('../../db.server', () => {
+  const { createInMemoryPrisma } = jest.requireActual('../../services/mocks/in-memory-prisma');
+  return { __esModule: true, default: createInMemoryPrisma() };
+});
+
+jest.mock('../../shopify.server', () => ({
+  authenticate: {
+    admin: jest.fn(),
+  },
+}));
+
+const db = prisma as unknown as InMemoryPrisma;
+const SHOP = 'test-shop.myshopify.com';
+
+async function createSection(name: string, prompt: string) {
+  await db.section.create({
+    data: { shop: SHOP, name, prompt, code: '<div></div>', status: 'draft', createdAt: new Date() },
+  });
+}
+
+async function search(query: string) {
+  const request = new Request(`https://app.test/app/sections?search=${encodeURIComponent(query)}`);
+  const result = (await loader({ request, params: {}, context: {} } as any)) as any;
+  return result.data.history.items.map((section: { name: string }) => section.name);
+}
+
+describe('app.sections._index loader', () => {
+  beforeEach(() => {
+    db.$reset();
+    (shopifyAuth.authenticate.admin as jest.Mock).mockResolvedValue({ session: { shop: SHOP } });
+  });
+
+  it('matches partial words while the merchant is typing', async () => {
+    await createSection('Product grid', 'Three column product grid');
+    await createSection('Hero banner', 'Full width hero with image');
+
+    expect(await search('prod')).toEqual(['Product grid']);
+  });
+
+  it('matches case-insensitively across name and prompt', async () => {
+    await createSection('Hero banner', 'Full width hero with image');
+
+    expect(await search('WIDTH')).toEqual(['Hero banner']);
+  });
+});
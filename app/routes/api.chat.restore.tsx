@@ -37,7 +37,7 @@ export async function action({ request }: ActionFunctionArgs) {
   }
 
   // Find the source message to restore from
-  const sourceMessage = conversation.messages.find(m => m.id === fromVersionId);
+  const sourceMessage = await chatService.getMessage(conversationId, fromVersionId);
   if (!sourceMessage || !sourceMessage.codeSnapshot) {
     return new Response(
       JSON.stringify({ error: "Version not found or has no code" }),
@@ -2,13 +2,14 @@ import type { ActionFunctionArgs } from "react-router";
 import { authenticate } from "../shopify.server";
 import { chatService } from "../services/chat.server";
 import { aiService } from "../services/ai.server";
-import { extractCodeFromResponse, validateLiquidCompleteness, mergeResponses } from "../utils/code-extractor";
-import { summarizeOldMessages, buildContinuationPrompt } from "../utils/context-builder";
+import { extractCodeFromResponse } from "../utils/code-extractor";
+import { LiquidStreamValidator } from "../utils/liquid-stream-validator";
+import { createSseStream, SSE_HEADERS } from "../utils/sse-stream.server";
+import { buildContinuationPrompt, estimateTokens } from "../utils/context-builder";
 import { sanitizeUserInput, sanitizeLiquidCode } from "../utils/input-sanitizer";
 import { checkRefinementAccess } from "../services/feature-gate.server";
-import { logGeneration } from "../services/generation-log.server";
-import { trackGeneration } from "../services/usage-tracking.server";
-import { getSubscription } from "../services/billing.server";
+import { outboxWorker, generationJobData } from "../services/outbox.server";
+import { ServerTiming } from "../utils/server-timing.server";
 import type { ConversationContext } from "../types/ai.types";
 
 // Constants for input validation
@@ -24,9 +25,11 @@ const MAX_CONTINUATIONS = 2; // Hard limit to prevent infinite loops
  *
  * Body: FormData with conversationId, content, currentCode (optional)
  * Response: Server-Sent Events stream with real Gemini streaming
+ * Server-Timing covers the stages before the stream opens
  */
 export async function action({ request }: ActionFunctionArgs) {
-  const { session, admin } = await authenticate.admin(request);
+  const timing = new ServerTiming();
+  const { session } = await timing.measure("auth", () => authenticate.admin(request));
   const shop = session.shop;
 
   const formData = await request.formData();
@@ -53,14 +56,19 @@ export async function action({ request }: ActionFunctionArgs) {
   }
 
   // Authorization: verify conversation belongs to this shop BEFORE any data operations
-  const conversation = await chatService.getConversation(conversationId);
+  // (projection only - messages are never loaded here)
+  const conversation = await timing.measure("conversation", () =>
+    chatService.getConversation(conversationId)
+  );
   if (!conversation || conversation.shop !== shop) {
     return new Response("Conversation not found", { status: 404 });
   }
 
   // Feature gate: Check refinement access (skip for initial generation)
   if (!continueGeneration) {
-    const refinementCheck = await checkRefinementAccess(shop, conversationId);
+    const refinementCheck = await timing.measure("gate", () =>
+      checkRefinementAccess(shop, conversationId, conversation.refinementCount)
+    );
     if (!refinementCheck.allowed) {
       return new Response(
         JSON.stringify({
@@ -85,258 +93,168 @@ export async function action({ request }: ActionFunctionArgs) {
 
   // Add user message to conversation (skip if continuing generation for existing message)
   if (!continueGeneration) {
-    await chatService.addUserMessage(conversationId, sanitizedContent);
+    await timing.measure("message", () => chatService.addUserMessage(conversationId, sanitizedContent));
   }
 
-  // Build conversation context for AI
-  const allMessages = await chatService.getContextMessages(conversationId, 50);
+  // Build conversation context for AI: stored rolling summary + cached code +
+  // a bounded window of recent messages (constant cost per turn)
+  const context = await timing.measure("context", () =>
+    chatService.getConversationContext(conversationId, currentCode || undefined)
+  );
 
-  // Split into recent (full) and old (summarized)
-  const recentMessages = allMessages.slice(-10);
-  const oldMessages = allMessages.slice(0, -10);
+  // Create SSE stream with real Gemini streaming
+  // Deltas are coalesced into frames and completeness is tracked as chunks arrive
+  const stream = createSseStream(async (writer) => {
+    try {
+      // Send start event
+      await writer.send('message_start');
+
+      const tracker = new LiquidStreamValidator();
+      let tokenCount = 0;
+      let continuationCount = 0;
+      let lastFinishReason: string | undefined;
+
+      // Stream AI response using real Gemini streaming
+      const generator = aiService.generateWithContext(sanitizedContent, context, {
+        signal: writer.signal,
+        onFinishReason: (reason) => { lastFinishReason = reason; }
+      });
+
+      for await (const token of generator) {
+        tracker.push(token);
+        tokenCount += estimateTokens(token);
+        await writer.delta(token);
+      }
 
-  const context: ConversationContext = {
-    currentCode: currentCode || undefined,
-    recentMessages: recentMessages.map(m => ({
-      role: m.role as 'user' | 'assistant',
-      content: m.content
-    })),
-    summarizedHistory: oldMessages.length > 0
-      ? summarizeOldMessages(oldMessages)
-      : undefined,
-  };
+      // Auto-continuation logic (feature flag controlled)
+      if (process.env.FLAG_AUTO_CONTINUE === 'true') {
+        let validation = tracker.validate();
 
-  // Create SSE stream with real Gemini streaming
-  const encoder = new TextEncoder();
-
-  const stream = new ReadableStream({
-    async start(controller) {
-      try {
-        // Send start event
-        controller.enqueue(
-          encoder.encode(`data: ${JSON.stringify({ type: 'message_start' })}\n\n`)
-        );
-
-        let fullContent = '';
-        let tokenCount = 0;
-        let continuationCount = 0;
-        let lastFinishReason: string | undefined;
-
-        // Stream AI response using real Gemini streaming
-        const generator = aiService.generateWithContext(sanitizedContent, context, {
-          onFinishReason: (reason) => { lastFinishReason = reason; }
-        });
-
-        for await (const token of generator) {
-          fullContent += token;
-          tokenCount += estimateTokens(token);
-
-          controller.enqueue(
-            encoder.encode(
-              `data: ${JSON.stringify({
-                type: 'content_delta',
-                data: { content: token },
-              })}\n\n`
-            )
+        // Continue if truncated (MAX_TOKENS) or validation fails, max 2 attempts
+        while (!validation.isComplete && continuationCount < MAX_CONTINUATIONS && !writer.signal.aborted) {
+          continuationCount++;
+
+          // Notify client of continuation attempt
+          await writer.send('continuation_start', {
+            attempt: continuationCount,
+            reason: lastFinishReason === 'MAX_TOKENS' ? 'token_limit' : 'incomplete_code',
+            errors: validation.errors.map(e => e.message)
+          });
+
+          const partialContent = tracker.content;
+
+          // Build continuation prompt with validation context
+          const continuationPrompt = buildContinuationPrompt(
+            sanitizedContent,
+            partialContent,
+            validation.errors
           );
-        }
 
-        // Auto-continuation logic (feature flag controlled)
-        if (process.env.FLAG_AUTO_CONTINUE === 'true') {
-          let validation = validateLiquidCompleteness(fullContent);
-
-          // Continue if truncated (MAX_TOKENS) or validation fails, max 2 attempts
-          while (!validation.isComplete && continuationCount < MAX_CONTINUATIONS) {
-            continuationCount++;
-
-            // Notify client of continuation attempt
-            controller.enqueue(
-              encoder.encode(
-                `data: ${JSON.stringify({
-                  type: 'continuation_start',
-                  data: {
-                    attempt: continuationCount,
-                    reason: lastFinishReason === 'MAX_TOKENS' ? 'token_limit' : 'incomplete_code',
-                    errors: validation.errors.map(e => e.message)
-                  }
-                })}\n\n`
-              )
-            );
-
-            // Build continuation prompt with validation context
-            const continuationPrompt = buildContinuationPrompt(
-              sanitizedContent,
-              fullContent,
-              validation.errors
-            );
-
-            // Create continuation context with partial response
-            const continuationContext: ConversationContext = {
-              ...context,
-              currentCode: fullContent, // Include partial as context
-            };
-
-            // Stream continuation response
-            let continuationContent = '';
-            const continuationGen = aiService.generateWithContext(
-              continuationPrompt,
-              continuationContext,
-              { onFinishReason: (reason) => { lastFinishReason = reason; } }
-            );
-
-            for await (const token of continuationGen) {
-              continuationContent += token;
-              tokenCount += estimateTokens(token);
-
-              controller.enqueue(
-                encoder.encode(
-                  `data: ${JSON.stringify({
-                    type: 'content_delta',
-                    data: { content: token },
-                  })}\n\n`
-                )
-              );
-            }
-
-            // Merge responses with overlap detection
-            fullContent = mergeResponses(fullContent, continuationContent);
-
-            // Re-validate merged content
-            validation = validateLiquidCompleteness(fullContent);
-
-            // Notify client of continuation result
-            controller.enqueue(
-              encoder.encode(
-                `data: ${JSON.stringify({
-                  type: 'continuation_complete',
-                  data: {
-                    attempt: continuationCount,
-                    isComplete: validation.isComplete,
-                    totalLength: fullContent.length
-                  }
-                })}\n\n`
-              )
-            );
-          }
-        }
+          // Create continuation context with partial response
+          const continuationContext: ConversationContext = {
+            ...context,
+            currentCode: partialContent, // Include partial as context
+          };
+
+          // Stream continuation response; tracker trims overlap with the original as it arrives
+          tracker.beginContinuation();
+          const continuationGen = aiService.generateWithContext(
+            continuationPrompt,
+            continuationContext,
+            { signal: writer.signal, onFinishReason: (reason) => { lastFinishReason = reason; } }
+          );
 
-        // Extract code from completed response
-        const extraction = extractCodeFromResponse(fullContent);
-
-        // Sanitize extracted code to prevent XSS
-        const sanitizedCode = extraction.hasCode && extraction.code
-          ? sanitizeLiquidCode(extraction.code)
-          : undefined;
-
-        // Save assistant message
-        const assistantMessage = await chatService.addAssistantMessage(
-          conversationId,
-          fullContent,
-          sanitizedCode,
-          tokenCount,
-          'gemini-2.5-flash'
-        );
-
-        // Track generation for ALL tiers when code is generated
-        if (extraction.hasCode) {
-          try {
-            const subscription = await getSubscription(shop);
-            const userTier = subscription?.planName ?? "free";
-
-            // Determine if this is an overage charge
-            const isOverage = subscription
-              ? subscription.usageThisCycle >= subscription.includedQuota
-              : false;
-
-            // 1. Create immutable log (all tiers)
-            await logGeneration({
-              shop,
-              sectionId: conversation.sectionId,
-              messageId: assistantMessage.id,
-              prompt: sanitizedContent,
-              tokenCount,
-              userTier: userTier as "free" | "pro" | "agency",
-              wasCharged: isOverage,
-              subscription, // Pass for correct billing cycle calculation
-            });
-
-            // 2. Track usage for PAID users only (BUG FIX)
-            if (subscription) {
-              await trackGeneration(
-                admin,
-                shop,
-                conversation.sectionId,
-                sanitizedContent,
-                subscription // Pass to avoid duplicate DB fetch
-              );
-            }
-          } catch (error) {
-            // Log error but don't block generation
-            console.error("[api.chat.stream] Failed to track generation:", error);
+          for await (const token of continuationGen) {
+            tracker.push(token);
+            tokenCount += estimateTokens(token);
+            await writer.delta(token);
           }
+          tracker.endContinuation();
+
+          // Validation state is already up to date for the merged content
+          validation = tracker.validate();
+
+          // Notify client of continuation result
+          await writer.send('continuation_complete', {
+            attempt: continuationCount,
+            isComplete: validation.isComplete,
+            totalLength: tracker.length
+          });
         }
+      }
 
-        // Determine completion status for Phase 4 UI feedback
-        const validation = process.env.FLAG_AUTO_CONTINUE === 'true'
-          ? validateLiquidCompleteness(fullContent)
-          : { isComplete: true };
-        const wasComplete = validation.isComplete;
-
-        // Send completion event with Phase 4 metadata
-        // NOTE: codeSnapshot is NOT sent via SSE - client extracts locally from
-        // streamed content to avoid SSE chunking issues with large payloads
-        controller.enqueue(
-          encoder.encode(
-            `data: ${JSON.stringify({
-              type: 'message_complete',
-              data: {
-                messageId: assistantMessage.id,
-                hasCode: extraction.hasCode,
-                wasComplete, // Phase 4: true if code complete after all continuations
-                continuationCount, // Phase 4: number of continuation attempts
-              },
-            })}\n\n`
-          )
-        );
-
-        controller.close();
-      } catch (error) {
-        // Log full error details server-side only
-        console.error('[api.chat.stream] Error:', error);
-
-        const internalErrorMsg = error instanceof Error ? error.message : 'Unknown error';
-
-        // Save detailed error to conversation (for admin review)
-        await chatService.addErrorMessage(conversationId, internalErrorMsg);
-
-        // Send sanitized error to client
-        controller.enqueue(
-          encoder.encode(
-            `data: ${JSON.stringify({
-              type: 'error',
-              data: { error: 'Failed to generate response. Please try again.' },
-            })}\n\n`
-          )
-        );
-
-        controller.close();
+      // Client disconnected: generation stopped early, so the response is cut
+      // off. Nothing is saved, logged or charged for it.
+      if (writer.signal.aborted) {
+        return;
       }
-    },
-  });
 
-  return new Response(stream, {
-    headers: {
-      'Content-Type': 'text/event-stream',
-      'Cache-Control': 'no-cache, no-transform',
-      'Connection': 'keep-alive',
-      'X-Accel-Buffering': 'no', // Disable nginx buffering
-    },
+      // Push out the tail of the response before persistence work
+      await writer.flush();
+
+      const fullContent = tracker.content;
+
+      // Extract code from completed response
+      const extraction = extractCodeFromResponse(fullContent);
+
+      // Sanitize extracted code to prevent XSS
+      const sanitizedCode = extraction.hasCode && extraction.code
+        ? sanitizeLiquidCode(extraction.code)
+        : undefined;
+
+      // Save assistant message. Generations are tracked for ALL tiers: the
+      // outbox job (generation log + usage charge) is written in the same
+      // transaction and processed by the outbox worker off the response path.
+      const assistantMessage = await chatService.addAssistantMessage(
+        conversationId,
+        fullContent,
+        sanitizedCode,
+        tokenCount,
+        'gemini-2.5-flash',
+        extraction.hasCode
+          ? (messageId) =>
+              generationJobData(shop, {
+                sectionId: conversation.sectionId,
+                messageId,
+                prompt: sanitizedContent,
+                tokenCount,
+                modelId: 'gemini-2.5-flash',
+              })
+          : undefined
+      );
+      if (extraction.hasCode) outboxWorker.notifyEnqueued();
+
+      // Determine completion status for Phase 4 UI feedback (tracked incrementally)
+      const wasComplete = process.env.FLAG_AUTO_CONTINUE === 'true'
+        ? tracker.validate().isComplete
+        : true;
+
+      // Send completion event with Phase 4 metadata
+      // NOTE: codeSnapshot is NOT sent via SSE - client extracts locally from
+      // streamed content to avoid SSE chunking issues with large payloads
+      await writer.send('message_complete', {
+        messageId: assistantMessage.id,
+        hasCode: extraction.hasCode,
+        wasComplete, // Phase 4: true if code complete after all continuations
+        continuationCount, // Phase 4: number of continuation attempts
+      });
+
+      await writer.close();
+    } catch (error) {
+      // Log full error details server-side only
+      console.error('[api.chat.stream] Error:', error);
+
+      const internalErrorMsg = error instanceof Error ? error.message : 'Unknown error';
+
+      // Save detailed error to conversation (for admin review)
+      await chatService.addErrorMessage(conversationId, internalErrorMsg);
+
+      // Send sanitized error to client
+      await writer.send('error', { error: 'Failed to generate response. Please try again.' });
+
+      await writer.close();
+    }
   });
-}
 
-/**
- * Simple token estimation (roughly 4 chars per token)
- */
-function estimateTokens(text: string): number {
-  return Math.ceil(text.length / 4);
+  return new Response(stream, { headers: { ...SSE_HEADERS, ...timing.headers() } });
 }
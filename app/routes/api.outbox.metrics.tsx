@@ -0,0 +1,24 @@
+/**
+ * Outbox metrics endpoint
+ * GET /api/outbox/metrics
+ *
+ * Queue depth and lag of the post-generation outbox, for monitoring.
+ * Requires `Authorization: Bearer ${METRICS_TOKEN}`; disabled when METRICS_TOKEN is unset.
+ */
+
+import { data, type LoaderFunctionArgs } from "react-router";
+import { outboxWorker } from "../services/outbox.server";
+import { isAuthorizedMetricsRequest } from "../utils/metrics-auth.server";
+
+export async function loader({ request }: LoaderFunctionArgs) {
+  const token = process.env.METRICS_TOKEN;
+  if (!token) {
+    return data({ error: "Not found" }, { status: 404 });
+  }
+  if (!isAuthorizedMetricsRequest(request, token)) {
+    return data({ error: "Unauthorized" }, { status: 401 });
+  }
+
+  const metrics = await outboxWorker.getMetrics();
+  return data(metrics, { headers: { "Cache-Control": "no-store" } });
+}
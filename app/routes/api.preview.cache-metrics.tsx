@@ -0,0 +1,24 @@
+/**
+ * Preview render cache metrics endpoint
+ * GET /api/preview/cache-metrics
+ *
+ * Hit ratio, evictions and memory use of the preview render cache, for sizing
+ * PREVIEW_RENDER_CACHE_MB.
+ * Requires `Authorization: Bearer ${METRICS_TOKEN}`; disabled when METRICS_TOKEN is unset.
+ */
+
+import { data, type LoaderFunctionArgs } from "react-router";
+import { getPreviewRenderCacheStats } from "../services/preview-render-cache.server";
+import { isAuthorizedMetricsRequest } from "../utils/metrics-auth.server";
+
+export async function loader({ request }: LoaderFunctionArgs) {
+  const token = process.env.METRICS_TOKEN;
+  if (!token) {
+    return data({ error: "Not found" }, { status: 404 });
+  }
+  if (!isAuthorizedMetricsRequest(request, token)) {
+    return data({ error: "Unauthorized" }, { status: 401 });
+  }
+
+  return data(getPreviewRenderCacheStats(), { headers: { "Cache-Control": "no-store" } });
+}
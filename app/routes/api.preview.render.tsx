@@ -10,6 +10,9 @@
  * Response:
  * - { html, mode: "native" } - Native rendering succeeded
  * - { html: null, mode: "fallback", error: "..." } - Use client-side fallback
+ *
+ * Native results are cached per shop by payload hash (X-Preview-Cache: HIT|MISS|COALESCED)
+ * Server-Timing reports auth, render and, on a miss, the storefront stages
  */
 
 import type { ActionFunctionArgs } from "react-router";
@@ -18,6 +21,13 @@ import DOMPurify from "isomorphic-dompurify";
 import { authenticate } from "../shopify.server";
 import { getAuthenticatedCookiesForShop } from "../services/storefront-auth.server";
 import { storePreviewData } from "../services/preview-token-store.server";
+import {
+  clearPreviewRenderCache,
+  getOrRenderPreview,
+  type PreviewRenderPayload,
+  type PreviewRenderResult,
+} from "../services/preview-render-cache.server";
+import { ServerTiming } from "../utils/server-timing.server";
 // Note: hasFeature import removed - preview is available for all plans
 
 // Max code length (same as proxy endpoint)
@@ -72,15 +82,18 @@ const DOMPURIFY_CONFIG = {
   ALLOWED_URI_REGEXP: /^(?:(?:https?|mailto|tel|data):|[^a-z]|[a-z+.-]+(?:[^a-z+.-:]|$))/i,
 };
 
-interface ProxyResponse {
-  html: string | null;
-  mode: "native" | "fallback";
-  error?: string;
+type ProxyResponse = PreviewRenderResult;
+
+// Client sends base64 (UTF-8) payloads
+function decodeBase64(value: string): string {
+  return Buffer.from(value, "base64").toString("utf-8");
 }
 
 export async function action({ request }: ActionFunctionArgs) {
+  const timing = new ServerTiming();
+
   // Authenticate the request (ensures user is logged in)
-  const { session } = await authenticate.admin(request);
+  const { session } = await timing.measure("auth", () => authenticate.admin(request));
 
   if (!session) {
     return data({ error: "Unauthorized" }, { status: 401 });
@@ -122,6 +135,42 @@ export async function action({ request }: ActionFunctionArgs) {
     return data({ error: "Code exceeds maximum allowed size" }, { status: 400 });
   }
 
+  const payload: PreviewRenderPayload = {
+    code,
+    settings,
+    blocks,
+    product,
+    collection,
+    section_id: section_id || "preview",
+  };
+
+  // Identical payloads are served from cache; concurrent ones share one fetch
+  timing.start("render");
+  const { result, cacheStatus } = await getOrRenderPreview(shop, payload, () =>
+    renderViaAppProxy(shop, payload, timing)
+  );
+  timing.end("render", cacheStatus);
+
+  return data<ProxyResponse>(result, {
+    headers: {
+      ...SECURITY_HEADERS,
+      "X-Preview-Cache": cacheStatus.toUpperCase(),
+      ...timing.headers(),
+    },
+  });
+}
+
+/**
+ * Fetch rendered HTML from the App Proxy and sanitize it
+ * Never throws - failures are returned as fallback responses
+ */
+async function renderViaAppProxy(
+  shop: string,
+  payload: PreviewRenderPayload,
+  timing: ServerTiming
+): Promise<ProxyResponse> {
+  const { code, settings, blocks, product, collection, section_id } = payload;
+
   // SECURITY: Build URL using session.shop only (prevents SSRF)
   const proxyUrl = new URL(`https://${shop}/apps/blocksmith-preview`);
 
@@ -136,14 +185,24 @@ export async function action({ request }: ActionFunctionArgs) {
 
   // Check if URL exceeds threshold - use token-based storage for large payloads
   if (tempUrl.toString().length > URL_LENGTH_THRESHOLD) {
-    const token = storePreviewData({
-      code,
-      settings,
-      blocks,
-      product,
-      collection,
-      section_id: section_id || "preview",
-    });
+    // Store decoded payload - saves ~33% memory and a decode on the proxy side
+    let token: string;
+    try {
+      token = await timing.measure("token-store", () =>
+        storePreviewData(shop, {
+          code: decodeBase64(code),
+          settings: settings ? decodeBase64(settings) : undefined,
+          blocks: blocks ? decodeBase64(blocks) : undefined,
+          product,
+          collection,
+          section_id: section_id || "preview",
+        })
+      );
+    } catch (err) {
+      const errorMessage = err instanceof Error ? err.message : "Unknown error";
+      console.error("[ProxyRender] Failed to store preview token:", errorMessage);
+      return { html: null, mode: "fallback", error: "Preview storage unavailable" };
+    }
     proxyUrl.searchParams.set("token", token);
   } else {
     // Small payload - use direct URL params
@@ -156,7 +215,7 @@ export async function action({ request }: ActionFunctionArgs) {
   }
 
   // Get authenticated cookies (null if not configured or auth fails)
-  const cookies = await getAuthenticatedCookiesForShop(shop);
+  const cookies = await timing.measure("storefront-auth", () => getAuthenticatedCookiesForShop(shop));
 
   const urlString = proxyUrl.toString();
 
@@ -176,120 +235,104 @@ export async function action({ request }: ActionFunctionArgs) {
       headers.Cookie = cookies;
     }
 
-    // Fetch from App Proxy with redirect: "manual" to detect password redirects
-    const response = await fetch(urlString, {
-      method: "GET",
-      signal: controller.signal,
-      headers,
-      redirect: "manual",
-    });
-
-    clearTimeout(timeoutId);
-
-    // Check for redirect (302/301) - indicates password wall
-    if (response.status === 302 || response.status === 301) {
-      const location = response.headers.get("location") || "";
-
-      // Password redirect detected
-      if (location.includes("/password")) {
-        return data<ProxyResponse>(
-          {
+    // Fetch from App Proxy with redirect: "manual" to detect password redirects.
+    // The storefront stage is closed on every exit, including early returns.
+    timing.start("storefront");
+    let rawHtml: string;
+    try {
+      const response = await fetch(urlString, {
+        method: "GET",
+        signal: controller.signal,
+        headers,
+        redirect: "manual",
+      });
+
+      clearTimeout(timeoutId);
+
+      // Check for redirect (302/301) - indicates password wall
+      if (response.status === 302 || response.status === 301) {
+        const location = response.headers.get("location") || "";
+
+        // Password redirect detected
+        if (location.includes("/password")) {
+          // Renders cached before the wall went up no longer match the storefront
+          clearPreviewRenderCache(shop);
+          return {
             html: null,
             mode: "fallback",
             error: cookies
               ? "Storefront password expired or invalid"
               : "Store is password-protected - configure password in settings",
-          },
-          { headers: SECURITY_HEADERS }
-        );
-      }
+          };
+        }
 
-      // Other redirect - follow manually (with timeout protection)
-      const redirectUrl = new URL(location, proxyUrl.origin);
-      const redirectController = new AbortController();
-      const redirectTimeoutId = setTimeout(
-        () => redirectController.abort(),
-        FETCH_TIMEOUT_MS
-      );
+        // Other redirect - follow manually (with timeout protection)
+        const redirectUrl = new URL(location, proxyUrl.origin);
+        const redirectController = new AbortController();
+        const redirectTimeoutId = setTimeout(
+          () => redirectController.abort(),
+          FETCH_TIMEOUT_MS
+        );
 
-      try {
-        const redirectResponse = await fetch(redirectUrl.toString(), {
-          method: "GET",
-          headers,
-          signal: redirectController.signal,
-        });
-        clearTimeout(redirectTimeoutId);
-
-        if (!redirectResponse.ok) {
-          return data<ProxyResponse>(
-            { html: null, mode: "fallback", error: "Redirect failed" },
-            { headers: SECURITY_HEADERS }
-          );
+        try {
+          const redirectResponse = await fetch(redirectUrl.toString(), {
+            method: "GET",
+            headers,
+            signal: redirectController.signal,
+          });
+          clearTimeout(redirectTimeoutId);
+
+          if (!redirectResponse.ok) {
+            return { html: null, mode: "fallback", error: "Redirect failed" };
+          }
+
+          const redirectHtml = await redirectResponse.text();
+          const sanitizedHtml = DOMPurify.sanitize(redirectHtml, DOMPURIFY_CONFIG);
+          return { html: sanitizedHtml, mode: "native" };
+        } catch {
+          clearTimeout(redirectTimeoutId);
+          return { html: null, mode: "fallback", error: "Redirect timeout" };
         }
+      }
 
-        const rawHtml = await redirectResponse.text();
-        const sanitizedHtml = DOMPurify.sanitize(rawHtml, DOMPURIFY_CONFIG);
-        return data<ProxyResponse>(
-          { html: sanitizedHtml, mode: "native" },
-          { headers: SECURITY_HEADERS }
-        );
-      } catch {
-        clearTimeout(redirectTimeoutId);
-        return data<ProxyResponse>(
-          { html: null, mode: "fallback", error: "Redirect timeout" },
-          { headers: SECURITY_HEADERS }
-        );
+      if (!response.ok) {
+        const statusText = response.statusText || "Unknown error";
+        const errorBody = await response.text().catch(() => "");
+        console.error("[ProxyRender] ========== ERROR DETAILS ==========");
+        console.error("[ProxyRender] Status:", response.status, statusText);
+        console.error("[ProxyRender] URL:", urlString);
+        console.error("[ProxyRender] Response body (first 500 chars):", errorBody.substring(0, 500));
+        console.error("[ProxyRender] ========== END ERROR ==========");
+        return { html: null, mode: "fallback", error: `Proxy error: ${response.status} ${statusText}` };
       }
-    }
 
-    if (!response.ok) {
-      const statusText = response.statusText || "Unknown error";
-      const errorBody = await response.text().catch(() => "");
-      console.error("[ProxyRender] ========== ERROR DETAILS ==========");
-      console.error("[ProxyRender] Status:", response.status, statusText);
-      console.error("[ProxyRender] URL:", urlString);
-      console.error("[ProxyRender] Response body (first 500 chars):", errorBody.substring(0, 500));
-      console.error("[ProxyRender] ========== END ERROR ==========");
-      return data<ProxyResponse>(
-        { html: null, mode: "fallback", error: `Proxy error: ${response.status} ${statusText}` },
-        { headers: SECURITY_HEADERS }
-      );
+      rawHtml = await response.text();
+    } finally {
+      timing.end("storefront");
     }
 
-    // Return the rendered HTML with mode indicator
-    const rawHtml = await response.text();
-
     // Final check: if HTML contains password form, auth failed silently
     if (
       rawHtml.includes('form_type="storefront_password"') ||
       rawHtml.includes('id="password"')
     ) {
-      return data<ProxyResponse>(
-        { html: null, mode: "fallback", error: "Store is password-protected" },
-        { headers: SECURITY_HEADERS }
-      );
+      clearPreviewRenderCache(shop);
+      return { html: null, mode: "fallback", error: "Store is password-protected" };
     }
 
     // Sanitize HTML to prevent XSS attacks
+    timing.start("sanitize");
     const sanitizedHtml = DOMPurify.sanitize(rawHtml, DOMPURIFY_CONFIG);
-    return data<ProxyResponse>(
-      { html: sanitizedHtml, mode: "native" },
-      { headers: SECURITY_HEADERS }
-    );
+    timing.end("sanitize");
+    return { html: sanitizedHtml, mode: "native" };
   } catch (err) {
     if (err instanceof Error && err.name === "AbortError") {
-      return data<ProxyResponse>(
-        { html: null, mode: "fallback", error: "Request timeout" },
-        { headers: SECURITY_HEADERS }
-      );
+      return { html: null, mode: "fallback", error: "Request timeout" };
     }
 
     const errorMessage = err instanceof Error ? err.message : "Unknown error";
     console.error("[ProxyRender] Preview proxy error:", errorMessage, err);
-    return data<ProxyResponse>(
-      { html: null, mode: "fallback", error: `Proxy error: ${errorMessage}` },
-      { headers: SECURITY_HEADERS }
-    );
+    return { html: null, mode: "fallback", error: `Proxy error: ${errorMessage}` };
   }
 }
 
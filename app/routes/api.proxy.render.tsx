@@ -13,14 +13,19 @@
  * - product: Product handle for context injection
  * - collection: Collection handle for context injection
  * - section_id: Optional section ID for CSS scoping
+ *
+ * Rendered responses carry Server-Timing for auth, token lookup, compile and render
  */
 
 import type { LoaderFunctionArgs } from "react-router";
 import { authenticate } from "../shopify.server";
-import { parseProxyParams, wrapLiquidForProxy } from "../utils/liquid-wrapper.server";
-import { getPreviewData, deletePreviewToken } from "../services/preview-token-store.server";
-import { sanitizeLiquidCode } from "../utils/input-sanitizer";
-import { parseSchema } from "../components/preview/schema/parseSchema";
+import {
+  compileLiquidForProxy,
+  parseProxyParams,
+  renderProxyTemplate,
+} from "../utils/liquid-wrapper.server";
+import { getPreviewData } from "../services/preview-token-store.server";
+import { ServerTiming } from "../utils/server-timing.server";
 import type { SettingsState, BlockInstance } from "../components/preview/schema/SchemaTypes";
 
 // Max base64 code length (~75KB decoded) to prevent DoS attacks
@@ -31,8 +36,12 @@ const errorTemplate = (message: string) =>
   `<div class="blocksmith-error" style="color:#d72c0d;padding:20px;background:#fff4f4;border-radius:8px;font-family:system-ui,sans-serif;">${message}</div>`;
 
 export const loader = async ({ request }: LoaderFunctionArgs) => {
+  const timing = new ServerTiming();
+
   // HMAC validation + liquid helper from Shopify app package
-  const { liquid, session } = await authenticate.public.appProxy(request);
+  const { liquid, session } = await timing.measure("auth", () =>
+    authenticate.public.appProxy(request)
+  );
 
   // Check if app is installed
   if (!session) {
@@ -53,22 +62,22 @@ export const loader = async ({ request }: LoaderFunctionArgs) => {
   let sectionId: string | null = null;
 
   if (token) {
-    // Retrieve data from token store
-    const previewData = getPreviewData(token);
+    // Retrieve data from token store (scoped to the requesting shop)
+    const previewData = await timing.measure("token", () => getPreviewData(token, session.shop));
     if (!previewData) {
       return liquid(errorTemplate("Preview token expired or invalid. Please refresh."), {
         layout: false,
       });
     }
 
-    // Decode base64 data from token store
+    // Token store holds decoded payloads; only JSON parsing is needed
     try {
-      code = previewData.code ? Buffer.from(previewData.code, "base64").toString("utf-8") : null;
+      code = previewData.code || null;
       settings = previewData.settings
-        ? (JSON.parse(Buffer.from(previewData.settings, "base64").toString("utf-8")) as SettingsState)
+        ? (JSON.parse(previewData.settings) as SettingsState)
         : null;
       blocks = previewData.blocks
-        ? (JSON.parse(Buffer.from(previewData.blocks, "base64").toString("utf-8")) as BlockInstance[])
+        ? (JSON.parse(previewData.blocks) as BlockInstance[])
         : null;
       productHandle = previewData.product || null;
       collectionHandle = previewData.collection || null;
@@ -77,8 +86,7 @@ export const loader = async ({ request }: LoaderFunctionArgs) => {
       return liquid(errorTemplate("Invalid preview data encoding."), { layout: false });
     }
 
-    // Clean up token after use (optional, auto-expires anyway)
-    deletePreviewToken(token);
+    // Token is left to expire: identical re-previews reuse it (content-hash dedup)
   } else {
     // Fallback to URL params for small payloads
     const codeParam = url.searchParams.get("code");
@@ -108,33 +116,31 @@ export const loader = async ({ request }: LoaderFunctionArgs) => {
     console.warn('[ProxyRender] First 500 chars:', code.substring(0, 500));
   }
 
-  // CRITICAL: Sanitize code to remove invalid Liquid forms (new_comment, etc.)
-  // This is the last line of defense before Shopify renders the Liquid
-  const sanitizedCode = sanitizeLiquidCode(code);
-
-  // DEBUG: Verify sanitization removed new_comment
-  if (sanitizedCode.includes('new_comment')) {
-    console.error('[ProxyRender] CRITICAL: new_comment still present after sanitization!');
-  }
-
   try {
-    // Parse schema for schema-aware resource picker detection
-    // This allows custom setting IDs like 'selected_collection' to work correctly
-    const parsedSchema = parseSchema(sanitizedCode);
+    // CRITICAL: Sanitize code to remove invalid Liquid forms (new_comment, etc.)
+    // This is the last line of defense before Shopify renders the Liquid.
+    // Sanitizing, schema parsing (for schema-aware resource picker detection)
+    // and the section.settings rewrite run in one pass and are memoized by
+    // content, so only the per-request assigns below are rebuilt.
+    timing.start("compile");
+    const compiled = compileLiquidForProxy(code, {
+      sanitize: true,
+      transformSectionSettings: true,
+    });
+    timing.end("compile");
 
     // Wrap code with context injection and CSS isolation
-    const wrappedCode = wrapLiquidForProxy({
-      liquidCode: sanitizedCode,
+    timing.start("render");
+    const wrappedCode = renderProxyTemplate(compiled, {
       sectionId: sectionId ?? undefined,
       productHandle: productHandle ?? undefined,
       collectionHandle: collectionHandle ?? undefined,
       settings: settings ?? undefined,
       blocks: blocks ?? undefined,
-      transformSectionSettings: true,
-      schema: parsedSchema,
     });
+    timing.end("render");
 
-    return liquid(wrappedCode, { layout: false });
+    return liquid(wrappedCode, { layout: false, headers: timing.headers() });
   } catch (error) {
     const message = error instanceof Error ? error.message : "Unknown render error";
     return liquid(errorTemplate(`Render error: ${message}`), { layout: false });
@@ -8,6 +8,7 @@ import { authenticate } from "../shopify.server";
 import { boundary } from "@shopify/shopify-app-react-router/server";
 import prisma from "../db.server";
 import { settingsService } from "../services/settings.server";
+import { sectionService } from "../services/section.server";
 import { newsService } from "../services/news.server";
 import { SetupGuide, Analytics, News } from "../components/home";
 
@@ -37,9 +38,10 @@ export const loader = async ({ request }: LoaderFunctionArgs) => {
   const startOfLastWeek = getStartOfLastWeek();
 
   // Fetch stats, trend data, onboarding state, CTA state, and news in parallel
-  const [historyCount, templateCount, weeklyCount, lastWeekCount, shopSettings, ctaState, newsItems] =
+  // Weekly counts are range scans on the (shop, createdAt, id) index
+  const [statusCounts, templateCount, weeklyCount, lastWeekCount, shopSettings, ctaState, newsItems] =
     await Promise.all([
-      prisma.section.count({ where: { shop } }),
+      sectionService.getStatusCounts(shop),
       prisma.sectionTemplate.count({ where: { shop } }),
       prisma.section.count({
         where: {
@@ -61,6 +63,9 @@ export const loader = async ({ request }: LoaderFunctionArgs) => {
       newsService.getActiveNews(5),
     ]);
 
+  const historyCount =
+    statusCounts.draft + statusCounts.active + statusCounts.inactive + statusCounts.archive;
+
   // Calculate weekly trend
   let weeklyTrend: "up" | "down" | "stable" = "stable";
   let weeklyChange = 0;
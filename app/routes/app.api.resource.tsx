@@ -7,6 +7,9 @@ import type { ActionFunctionArgs, LoaderFunctionArgs } from 'react-router';
 import { authenticate } from '../shopify.server';
 import { shopifyDataAdapter } from '../services/adapters/shopify-data-adapter';
 
+// nodes(ids:) accepts up to 250 ids; keep batches well below query cost limits
+const MAX_BATCH_IDS = 50;
+
 /**
  * POST /app/api/resource
  * Fetch resource data by type and ID
@@ -68,6 +71,7 @@ export async function action({ request }: ActionFunctionArgs) {
 /**
  * GET /app/api/resource?type=product&id=123
  * GET /app/api/resource?type=articles (list mode)
+ * GET /app/api/resource?type=batch&ids=gid1,gid2 (batched nodes lookup)
  * Alternative GET endpoint for resource fetching
  */
 export async function loader({ request }: LoaderFunctionArgs) {
@@ -110,6 +114,21 @@ export async function loader({ request }: LoaderFunctionArgs) {
         // List mode: fetch all articles for dropdown
         data = await shopifyDataAdapter.getArticles(request, 50);
         return Response.json({ data });
+      case 'batch': {
+        // Batch mode: resolve every picker in one nodes(ids:) query
+        const ids = (url.searchParams.get('ids') || '')
+          .split(',')
+          .map(id => id.trim())
+          .filter(Boolean);
+        if (ids.length === 0) {
+          return Response.json({ error: 'Missing ids parameter' }, { status: 400 });
+        }
+        if (ids.length > MAX_BATCH_IDS) {
+          return Response.json({ error: `Too many ids (max ${MAX_BATCH_IDS})` }, { status: 400 });
+        }
+        data = await shopifyDataAdapter.getResources(request, ids);
+        return Response.json({ data });
+      }
       case 'shop':
         data = await shopifyDataAdapter.getShop(request);
         break;
@@ -13,11 +13,11 @@ import {
 import { authenticate } from "../shopify.server";
 import {
   getActivePlans,
-  getSubscription,
   createSubscription,
   cancelSubscription,
   checkQuota,
 } from "../services/billing.server";
+import { getEntitlement } from "../services/entitlement.server";
 import { getUsageStats } from "../services/usage-analytics.server";
 import type { PlanTier } from "../types/billing";
 import {
@@ -33,9 +33,10 @@ export async function loader({ request }: LoaderFunctionArgs) {
   const status = url.searchParams.get("status");
   const charge_id = url.searchParams.get("charge_id");
 
-  const [plans, subscription, quota, stats] = await Promise.all([
+  // Quota and usage stats read the same cached entitlement
+  const [plans, { subscription }, quota, stats] = await Promise.all([
     getActivePlans(),
-    getSubscription(session.shop),
+    getEntitlement(session.shop),
     checkQuota(session.shop),
     getUsageStats(session.shop),
   ]);
@@ -1,6 +1,7 @@
 import { useState, useCallback, useEffect, useRef, useMemo } from "react";
-import type { ActionFunctionArgs, LoaderFunctionArgs } from "react-router";
+import type { ActionFunctionArgs, HeadersFunction, LoaderFunctionArgs } from "react-router";
 import {
+  data,
   useActionData,
   useLoaderData,
   useSearchParams,
@@ -17,8 +18,10 @@ import {
 import type { IndexTableProps, IndexFiltersProps } from "@shopify/polaris";
 
 type IndexTableHeading = IndexTableProps["headings"][number];
+import { boundary } from "@shopify/shopify-app-react-router/server";
 import { authenticate } from "../shopify.server";
 import { sectionService } from "../services/section.server";
+import { ServerTiming } from "../utils/server-timing.server";
 import { SectionsEmptyState } from "../components/sections/SectionsEmptyState";
 import { EmptySearchResult } from "../components/common/EmptySearchResult";
 import { DeleteConfirmModal } from "../components/sections/DeleteConfirmModal";
@@ -57,8 +60,16 @@ const viewToTabIndex: Record<ViewType, number> = {
   archive: 4,
 };
 
+// Back to the first page: drop the page label and both cursors
+function resetPagination(params: URLSearchParams) {
+  params.set("page", "1");
+  params.delete("after");
+  params.delete("before");
+}
+
 export async function loader({ request }: LoaderFunctionArgs) {
-  const { session } = await authenticate.admin(request);
+  const timing = new ServerTiming();
+  const { session } = await timing.measure("auth", () => authenticate.admin(request));
   const shop = session.shop;
 
   const url = new URL(request.url);
@@ -66,25 +77,40 @@ export async function loader({ request }: LoaderFunctionArgs) {
   const view = (url.searchParams.get("view") || "all") as ViewType;
   const search = url.searchParams.get("search") || undefined;
   const sort = url.searchParams.get("sort") || "newest";
+  // Cursors from the previous page; `page` is kept for the label
+  const after = url.searchParams.get("after") || undefined;
+  const before = url.searchParams.get("before") || undefined;
 
   // Status is derived from the selected tab/view
   const status = viewStatusMap[view];
 
-  // Fetch both filtered results and total count (for empty state logic)
+  // Fetch filtered results and total count (for empty state logic);
+  // totals are read from the per-shop status counters
+  timing.start("db");
   const [history, allTotal] = await Promise.all([
     sectionService.getByShop(shop, {
       page,
       limit: 20,
       status,
       search,
+      // Live search-as-you-type: partial words must match, so no text index
+      searchMode: "contains",
       sort: sort as "newest" | "oldest",
+      after,
+      before,
     }),
     sectionService.getTotalCount(shop),
   ]);
+  timing.end("db");
 
-  return { history, shop, currentView: view, allTotal };
+  return data({ history, shop, currentView: view, allTotal }, { headers: timing.headers() });
 }
 
+// Merge the loader's Server-Timing with the parent route headers
+export const headers: HeadersFunction = (headersArgs) => {
+  return boundary.headers(headersArgs);
+};
+
 export async function action({ request }: ActionFunctionArgs) {
   const { session } = await authenticate.admin(request);
   const shop = session.shop;
@@ -336,22 +362,29 @@ export default function SectionsPage() {
     handleSelectionChange,
   ]);
 
-  // Pagination handlers
+  // Pagination handlers - seek from the current page's edge via cursors
   const handleNextPage = useCallback(() => {
-    if (currentPage < history.totalPages) {
+    if (history.nextCursor) {
       const params = new URLSearchParams(searchParams);
       params.set("page", (currentPage + 1).toString());
+      params.set("after", history.nextCursor);
+      params.delete("before");
       setSearchParams(params);
     }
-  }, [currentPage, history.totalPages, searchParams, setSearchParams]);
+  }, [currentPage, history.nextCursor, searchParams, setSearchParams]);
 
   const handlePreviousPage = useCallback(() => {
-    if (currentPage > 1) {
-      const params = new URLSearchParams(searchParams);
+    if (currentPage <= 1 || !history.prevCursor) return;
+    const params = new URLSearchParams(searchParams);
+    if (currentPage === 2) {
+      resetPagination(params);
+    } else {
       params.set("page", (currentPage - 1).toString());
-      setSearchParams(params);
+      params.set("before", history.prevCursor);
+      params.delete("after");
     }
-  }, [currentPage, searchParams, setSearchParams]);
+    setSearchParams(params);
+  }, [currentPage, history.prevCursor, searchParams, setSearchParams]);
 
   // Debounced search handler - updates URL after 300ms delay
   const debouncedSearch = useMemo(
@@ -364,7 +397,7 @@ export default function SectionsPage() {
         } else {
           params.delete("search");
         }
-        params.set("page", "1"); // Reset to page 1
+        resetPagination(params);
         setSearchParams(params);
       }, 300),
     [searchParams, setSearchParams],
@@ -388,7 +421,7 @@ export default function SectionsPage() {
     isUserAction.current = true;
     const params = new URLSearchParams(searchParams);
     params.delete("search");
-    params.set("page", "1");
+    resetPagination(params);
     setSearchParams(params);
   }, [searchParams, setSearchParams]);
 
@@ -403,7 +436,7 @@ export default function SectionsPage() {
       } else {
         params.set("view", view);
       }
-      params.set("page", "1"); // Reset to page 1
+      resetPagination(params);
       setSearchParams(params);
     },
     [searchParams, setSearchParams],
@@ -431,7 +464,7 @@ export default function SectionsPage() {
       params.delete("sort");
     }
 
-    params.set("page", "1"); // Reset pagination
+    resetPagination(params);
     setSearchParams(params);
 
     // Reset flag to prevent double-sync from URL change callback
@@ -471,8 +504,8 @@ export default function SectionsPage() {
 
   // Pagination config
   const paginationProps: IndexTableProps["pagination"] = {
-    hasNext: currentPage < history.totalPages,
-    hasPrevious: currentPage > 1,
+    hasNext: Boolean(history.nextCursor),
+    hasPrevious: currentPage > 1 && Boolean(history.prevCursor),
     onNext: handleNextPage,
     onPrevious: handlePreviousPage,
     label: `Page ${currentPage} of ${history.totalPages}`,
@@ -7,6 +7,7 @@
 import type { ActionFunctionArgs } from "react-router";
 import { authenticate } from "../shopify.server";
 import { updateSubscriptionStatus } from "../services/billing.server";
+import { invalidateEntitlement } from "../services/entitlement.server";
 import type { SubscriptionUpdateWebhook, SubscriptionStatus } from "../types/billing";
 
 export const action = async ({ request }: ActionFunctionArgs) => {
@@ -89,6 +90,7 @@ export const action = async ({ request }: ActionFunctionArgs) => {
               overagesThisCycle: 0,
             }
           });
+          await invalidateEntitlement(pendingSubscription.shop);
 
           console.log("[Webhook] Successfully activated pending subscription");
           return new Response("Webhook processed", { status: 200 });
@@ -128,7 +130,8 @@ export const action = async ({ request }: ActionFunctionArgs) => {
     );
 
     // If status is active and current_period_end changed, it's a new billing cycle
-    // Usage counters are automatically reset in updateSubscriptionStatus
+    // Usage counters are automatically reset in updateSubscriptionStatus,
+    // which also invalidates the shop's cached entitlement
 
     console.log(`[Webhook] Successfully processed for ${shop}`, {
       subscriptionId: app_subscription.admin_graphql_api_id,
@@ -1,5 +1,6 @@
 // @jest-environment node
 import { AIService, SYSTEM_PROMPT } from '../ai.server';
+import { createFakeGemini } from '../mocks/fake-gemini';
 
 // Mock GoogleGenerativeAI
 jest.mock('@google/generative-ai', () => ({
@@ -74,6 +75,41 @@ describe('AIService', () => {
     });
   });
 
+  describe('useClient', () => {
+    it('streams from an injected client and reports MAX_TOKENS', async () => {
+      const service = new AIService();
+      const fake = createFakeGemini({ response: '```liquid\n<div>Hello</div>\n```', chunkChars: 4, maxTokensRate: 1 });
+      service.useClient(fake.client);
+      const chunks: string[] = [];
+      let finishReason: string | undefined;
+
+      for await (const chunk of service.generateWithContext('Make it blue', { recentMessages: [] }, {
+        onFinishReason: (reason) => { finishReason = reason; },
+      })) {
+        chunks.push(chunk);
+      }
+
+      expect(chunks.length).toBeGreaterThan(1);
+      expect(finishReason).toBe('MAX_TOKENS');
+      expect(fake.calls).toMatchObject({ total: 1, truncated: 1 });
+    });
+
+    it('yields the error reply when the client fails', async () => {
+      jest.spyOn(console, 'error').mockImplementation(() => {});
+      const service = new AIService();
+      const fake = createFakeGemini({ errorRate: 1 });
+      service.useClient(fake.client);
+      const chunks: string[] = [];
+
+      for await (const chunk of service.generateWithContext('Make it blue', { recentMessages: [] })) {
+        chunks.push(chunk);
+      }
+
+      expect(chunks[chunks.length - 1]).toContain('I encountered an error');
+      expect(fake.calls.failed).toBe(1);
+    });
+  });
+
   describe('getMockSection', () => {
     it('generates valid Liquid section structure', () => {
       const service = new AIService();
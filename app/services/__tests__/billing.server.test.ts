@@ -29,6 +29,10 @@ jest.mock('../../db.server', () => ({
     failedUsageCharge: {
       create: jest.fn(),
     },
+    entitlementVersion: {
+      findUnique: jest.fn(),
+      upsert: jest.fn(),
+    },
   },
 }));
 
@@ -37,6 +41,7 @@ import {
   getSubscription,
   getPlanConfig,
 } from '../billing.server';
+import { resetEntitlementCache } from '../entitlement.server';
 import prisma from '../../db.server';
 
 // Type alias for convenience
@@ -113,6 +118,7 @@ const FREE_PLAN = createMockPlanConfig({
 describe('BillingService', () => {
   beforeEach(() => {
     jest.clearAllMocks();
+    resetEntitlementCache();
   });
 
   // ============================================================================
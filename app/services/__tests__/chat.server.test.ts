@@ -17,14 +17,30 @@ jest.mock('../../db.server', () => ({
     message: {
       create: jest.fn(),
       findMany: jest.fn(),
+      findFirst: jest.fn(),
+      count: jest.fn(),
     },
+    outboxJob: {
+      create: jest.fn(),
+    },
+    $transaction: jest.fn(),
   },
 }));
 
 // Now import after mocking
-import { ChatService } from '../chat.server';
+import { ChatService, CONTEXT_WINDOW_SIZE } from '../chat.server';
 import prisma from '../../db.server';
 
+// Conversation context state as returned by conversation.update
+const contextState = (overrides: Record<string, unknown> = {}) => ({
+  contextVersion: 1,
+  contextMessageCount: 1,
+  latestCodeSnapshot: null,
+  summaryTopics: [],
+  summarizedRequestCount: 0,
+  ...overrides,
+});
+
 describe('ChatService', () => {
   let chatService: ChatService;
 
@@ -152,7 +168,14 @@ old code here
       const result = await chatService.getOrCreateConversation('section-456', 'test-shop.myshopify.com');
 
       expect(prisma.conversation.create).toHaveBeenCalledWith({
-        data: { sectionId: 'section-456', shop: 'test-shop.myshopify.com' },
+        data: {
+          sectionId: 'section-456',
+          shop: 'test-shop.myshopify.com',
+          contextVersion: 1,
+          contextMessageCount: 0,
+          refinementCount: 0,
+          summarizedRequestCount: 0,
+        },
         include: { messages: true },
       });
       expect(result).toEqual(mockConversation);
@@ -179,7 +202,7 @@ old code here
 
       (prisma.message.create as MockedFunction<typeof prisma.message.create>).mockResolvedValue(mockMessage);
       // eslint-disable-next-line @typescript-eslint/no-explicit-any
-      (prisma.conversation.update as MockedFunction<typeof prisma.conversation.update>).mockResolvedValue({} as any);
+      (prisma.conversation.update as MockedFunction<typeof prisma.conversation.update>).mockResolvedValue(contextState() as any);
 
       const result = await chatService.addUserMessage('conv-456', 'Make the heading larger');
 
@@ -192,7 +215,12 @@ old code here
       });
       expect(prisma.conversation.update).toHaveBeenCalledWith({
         where: { id: 'conv-456' },
-        data: { messageCount: { increment: 1 }, updatedAt: expect.any(Date) },
+        data: {
+          messageCount: { increment: 1 },
+          contextMessageCount: { increment: 1 },
+          updatedAt: expect.any(Date),
+        },
+        select: expect.any(Object),
       });
       expect(result.role).toBe('user');
       expect(result.content).toBe('Make the heading larger');
@@ -217,9 +245,10 @@ old code here
         createdAt: new Date(),
       };
 
+      (prisma.message.findMany as MockedFunction<typeof prisma.message.findMany>).mockResolvedValue([]);
       (prisma.message.create as MockedFunction<typeof prisma.message.create>).mockResolvedValue(mockMessage);
       // eslint-disable-next-line @typescript-eslint/no-explicit-any
-      (prisma.conversation.update as MockedFunction<typeof prisma.conversation.update>).mockResolvedValue({} as any);
+      (prisma.conversation.update as MockedFunction<typeof prisma.conversation.update>).mockResolvedValue(contextState() as any);
 
       const result = await chatService.addAssistantMessage(
         'conv-456',
@@ -257,9 +286,10 @@ old code here
         createdAt: new Date(),
       };
 
+      (prisma.message.findMany as MockedFunction<typeof prisma.message.findMany>).mockResolvedValue([]);
       (prisma.message.create as MockedFunction<typeof prisma.message.create>).mockResolvedValue(mockMessage);
       // eslint-disable-next-line @typescript-eslint/no-explicit-any
-      (prisma.conversation.update as MockedFunction<typeof prisma.conversation.update>).mockResolvedValue({} as any);
+      (prisma.conversation.update as MockedFunction<typeof prisma.conversation.update>).mockResolvedValue(contextState() as any);
 
       await chatService.addAssistantMessage('conv-456', 'Response', undefined, 100);
 
@@ -267,11 +297,221 @@ old code here
         where: { id: 'conv-456' },
         data: {
           messageCount: { increment: 1 },
+          contextMessageCount: { increment: 1 },
+          refinementCount: { increment: 1 },
           totalTokens: { increment: 100 },
           updatedAt: expect.any(Date),
         },
+        select: expect.any(Object),
+      });
+    });
+
+    it('caches the latest code snapshot on the conversation', async () => {
+      (prisma.message.findMany as MockedFunction<typeof prisma.message.findMany>).mockResolvedValue([]);
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      (prisma.message.create as MockedFunction<typeof prisma.message.create>).mockResolvedValue({ id: 'msg-1', role: 'assistant' } as any);
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      (prisma.conversation.update as MockedFunction<typeof prisma.conversation.update>).mockResolvedValue(contextState() as any);
+
+      await chatService.addAssistantMessage('conv-456', 'Here you go', '<div>v2</div>');
+
+      expect(prisma.conversation.update).toHaveBeenCalledWith(
+        expect.objectContaining({
+          data: expect.objectContaining({ latestCodeSnapshot: '<div>v2</div>' }),
+        })
+      );
+    });
+    it('writes the outbox job in the same transaction as the message', async () => {
+      (prisma.message.findMany as MockedFunction<typeof prisma.message.findMany>).mockResolvedValue([]);
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      (prisma.message.create as MockedFunction<typeof prisma.message.create>).mockResolvedValue({ id: 'msg-1', role: 'assistant' } as any);
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      (prisma.conversation.update as MockedFunction<typeof prisma.conversation.update>).mockResolvedValue(contextState() as any);
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      (prisma.$transaction as jest.Mock).mockImplementation(async (fn: any) => fn(prisma));
+
+      await chatService.addAssistantMessage('conv-456', 'Here you go', '<div>v2</div>', 100, 'gemini-2.5-flash', (messageId) => ({
+        shop: 'myshop.myshopify.com',
+        type: 'generation',
+        idempotencyKey: `generation:${messageId}`,
+        payload: { messageId },
+      }));
+
+      expect(prisma.$transaction).toHaveBeenCalledTimes(1);
+      expect(prisma.outboxJob.create).toHaveBeenCalledWith({
+        data: expect.objectContaining({ idempotencyKey: 'generation:msg-1' }),
+      });
+    });
+
+    it('does not save the message when the outbox job cannot be written', async () => {
+      (prisma.message.findMany as MockedFunction<typeof prisma.message.findMany>).mockResolvedValue([]);
+      (prisma.$transaction as jest.Mock).mockRejectedValueOnce(new Error('write conflict'));
+
+      await expect(
+        chatService.addAssistantMessage('conv-456', 'Here you go', '<div>v2</div>', 100, 'gemini-2.5-flash', () => ({
+          shop: 'myshop.myshopify.com',
+          type: 'generation',
+          idempotencyKey: 'generation:msg-1',
+          payload: {},
+        }))
+      ).rejects.toThrow('write conflict');
+      expect(prisma.conversation.update).not.toHaveBeenCalled();
+    });
+  });
+
+  // ============================================================================
+  // Conversation context state (maintained on write)
+  // ============================================================================
+  describe('conversation context state', () => {
+    const mockedFindMany = () => prisma.message.findMany as MockedFunction<typeof prisma.message.findMany>;
+    const mockedUpdate = () => prisma.conversation.update as MockedFunction<typeof prisma.conversation.update>;
+
+    beforeEach(() => {
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      (prisma.message.create as MockedFunction<typeof prisma.message.create>).mockResolvedValue({ id: 'msg-1', role: 'user' } as any);
+    });
+
+    it('folds the message leaving the recent window into the summary', async () => {
+      mockedUpdate()
+        // eslint-disable-next-line @typescript-eslint/no-explicit-any
+        .mockResolvedValueOnce(contextState({ contextMessageCount: CONTEXT_WINDOW_SIZE + 1, summaryTopics: ['font changes'], summarizedRequestCount: 2 }) as any)
+        // eslint-disable-next-line @typescript-eslint/no-explicit-any
+        .mockResolvedValueOnce({} as any);
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      mockedFindMany().mockResolvedValueOnce([{ role: 'user', content: 'Change the button color' }] as any);
+
+      await chatService.addUserMessage('conv-456', 'Make it bigger');
+
+      expect(prisma.message.findMany).toHaveBeenCalledWith({
+        where: { conversationId: 'conv-456', isError: false },
+        orderBy: { createdAt: 'desc' },
+        skip: CONTEXT_WINDOW_SIZE,
+        take: 1,
+        select: { role: true, content: true },
+      });
+      expect(prisma.conversation.update).toHaveBeenLastCalledWith({
+        where: { id: 'conv-456' },
+        data: {
+          summaryTopics: ['font changes', 'color changes', 'button modifications'],
+          summarizedRequestCount: { increment: 1 },
+        },
+      });
+    });
+
+    it('does not touch the summary while the conversation fits in the window', async () => {
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      mockedUpdate().mockResolvedValueOnce(contextState({ contextMessageCount: 3 }) as any);
+
+      await chatService.addUserMessage('conv-456', 'Hello');
+
+      expect(prisma.message.findMany).not.toHaveBeenCalled();
+      expect(prisma.conversation.update).toHaveBeenCalledTimes(1);
+    });
+
+    it('rebuilds context state for conversations created before it existed', async () => {
+      mockedUpdate()
+        // eslint-disable-next-line @typescript-eslint/no-explicit-any
+        .mockResolvedValueOnce(contextState({ contextVersion: null }) as any)
+        // eslint-disable-next-line @typescript-eslint/no-explicit-any
+        .mockResolvedValueOnce({} as any);
+      (prisma.message.count as MockedFunction<typeof prisma.message.count>)
+        .mockResolvedValueOnce(14) // visible messages
+        .mockResolvedValueOnce(7) // assistant
+        .mockResolvedValueOnce(7); // user
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      (prisma.message.findFirst as MockedFunction<typeof prisma.message.findFirst>).mockResolvedValueOnce({ codeSnapshot: '<div>latest</div>' } as any);
+      mockedFindMany()
+        // eslint-disable-next-line @typescript-eslint/no-explicit-any
+        .mockResolvedValueOnce(Array.from({ length: 10 }, (_, i) => ({ role: i % 2 ? 'assistant' : 'user' })) as any)
+        // eslint-disable-next-line @typescript-eslint/no-explicit-any
+        .mockResolvedValueOnce([{ content: 'Add an image' }, { content: 'Done' }] as any);
+
+      await chatService.addUserMessage('conv-456', 'Hi again');
+
+      expect(prisma.conversation.update).toHaveBeenLastCalledWith({
+        where: { id: 'conv-456' },
+        data: {
+          contextVersion: 1,
+          contextMessageCount: 14,
+          refinementCount: 7,
+          latestCodeSnapshot: '<div>latest</div>',
+          summaryTopics: ['image settings'],
+          summarizedRequestCount: 2,
+        },
+      });
+    });
+
+    it('builds turn context from stored state and the recent window', async () => {
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      (prisma.conversation.findUnique as MockedFunction<typeof prisma.conversation.findUnique>).mockResolvedValueOnce(contextState({
+        latestCodeSnapshot: '<div>cached</div>',
+        summaryTopics: ['color changes'],
+        summarizedRequestCount: 4,
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      }) as any);
+      mockedFindMany().mockResolvedValueOnce([
+        { id: '2', role: 'assistant', content: 'Done' },
+        { id: '1', role: 'user', content: 'Make it red' },
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      ] as any);
+
+      const context = await chatService.getConversationContext('conv-456');
+
+      expect(prisma.message.findMany).toHaveBeenCalledWith(
+        expect.objectContaining({ take: CONTEXT_WINDOW_SIZE })
+      );
+      expect(context.currentCode).toBe('<div>cached</div>');
+      expect(context.recentMessages).toEqual([
+        { role: 'user', content: 'Make it red' },
+        { role: 'assistant', content: 'Done' },
+      ]);
+      expect(context.summarizedHistory).toContain('color changes');
+      expect(context.summarizedHistory).toContain('(4 refinement requests made)');
+    });
+
+    it('prefers code sent by the client over the cached snapshot', async () => {
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      (prisma.conversation.findUnique as MockedFunction<typeof prisma.conversation.findUnique>).mockResolvedValueOnce(contextState({ latestCodeSnapshot: '<div>cached</div>' }) as any);
+      mockedFindMany().mockResolvedValueOnce([]);
+
+      const context = await chatService.getConversationContext('conv-456', '<div>editor</div>');
+
+      expect(context.currentCode).toBe('<div>editor</div>');
+      expect(context.summarizedHistory).toBeUndefined();
+    });
+  });
+
+  // ============================================================================
+  // getConversation / getMessage Tests
+  // ============================================================================
+  describe('getConversation', () => {
+    it('loads a projection without messages', async () => {
+      (prisma.conversation.findUnique as MockedFunction<typeof prisma.conversation.findUnique>).mockResolvedValueOnce(null);
+
+      await chatService.getConversation('conv-123');
+
+      const args = (prisma.conversation.findUnique as MockedFunction<typeof prisma.conversation.findUnique>).mock.calls[0][0];
+      expect(args).toMatchObject({ where: { id: 'conv-123' } });
+      expect(args).not.toHaveProperty('include');
+      expect(args.select).toMatchObject({ id: true, shop: true, refinementCount: true });
+    });
+  });
+
+  describe('getMessage', () => {
+    it('scopes the lookup to the conversation', async () => {
+      (prisma.message.findFirst as MockedFunction<typeof prisma.message.findFirst>).mockResolvedValueOnce(null);
+
+      await chatService.getMessage('conv-123', '65a1b2c3d4e5f6a7b8c9d0e1');
+
+      expect(prisma.message.findFirst).toHaveBeenCalledWith({
+        where: { id: '65a1b2c3d4e5f6a7b8c9d0e1', conversationId: 'conv-123' },
       });
     });
+
+    it('returns null for malformed ids without querying', async () => {
+      expect(await chatService.getMessage('conv-123', 'not-an-id')).toBeNull();
+      expect(prisma.message.findFirst).not.toHaveBeenCalled();
+    });
   });
 
   // ============================================================================
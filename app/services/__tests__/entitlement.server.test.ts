@@ -0,0 +1,192 @@
+// @jest-environment node
+
+// In-process Prisma stand-in: invalidation, version bumps and the loads that
+// follow all go through the same store
+jest.mock('../../db.server', () => {
+  const { createInMemoryPrisma } = jest.requireActual('../mocks/in-memory-prisma');
+  return { __esModule: true, default: createInMemoryPrisma() };
+});
+
+import prisma from '../../db.server';
+import {
+  getEntitlement,
+  invalidateEntitlement,
+  getEntitlementCacheStats,
+  resetEntitlementCache,
+} from '../entitlement.server';
+import type { InMemoryPrisma } from '../mocks/in-memory-prisma';
+
+const db = prisma as unknown as InMemoryPrisma;
+const SHOP = 'myshop.myshopify.com';
+
+async function seedPlans() {
+  await db.planConfiguration.create({
+    data: { planName: 'free', includedQuota: 5, featureFlags: [] },
+  });
+  await db.planConfiguration.create({
+    data: { planName: 'pro', includedQuota: 30, featureFlags: ['live_preview', 'publish_theme'] },
+  });
+}
+
+async function createSubscription(overrides: Record<string, unknown> = {}) {
+  return db.subscription.create({
+    data: {
+      shop: SHOP,
+      shopifySubId: 'gid://shopify/AppSubscription/1',
+      planName: 'pro',
+      status: 'ACTIVE',
+      currentPeriodEnd: new Date('2030-01-31'),
+      basePrice: 29,
+      includedQuota: 30,
+      overagePrice: 2,
+      cappedAmount: 50,
+      usageThisCycle: 5,
+      overagesThisCycle: 0,
+      createdAt: new Date(),
+      ...overrides,
+    },
+  });
+}
+
+describe('EntitlementService', () => {
+  let now: number;
+
+  beforeEach(async () => {
+    db.$reset();
+    resetEntitlementCache();
+    now = Date.now();
+    jest.spyOn(Date, 'now').mockImplementation(() => now);
+    await seedPlans();
+  });
+
+  afterEach(() => {
+    jest.restoreAllMocks();
+  });
+
+  describe('loading', () => {
+    it('builds a paid entitlement from the active subscription', async () => {
+      await createSubscription();
+
+      const entitlement = await getEntitlement(SHOP);
+
+      expect(entitlement.planName).toBe('pro');
+      expect(entitlement.featureFlags).toEqual(['live_preview', 'publish_theme']);
+      expect(entitlement.includedQuota).toBe(30);
+      expect(entitlement.usageThisCycle).toBe(5);
+      expect(entitlement.subscription).not.toBeNull();
+    });
+
+    it('counts free tier usage from this month\'s generation logs', async () => {
+      await db.generationLog.create({
+        data: { shop: SHOP, sectionId: 's1', messageId: 'm1', prompt: 'p', tokenCount: 1 },
+      });
+      await db.generationLog.create({
+        data: { shop: SHOP, sectionId: 's1', messageId: 'm2', prompt: 'p', tokenCount: 1 },
+      });
+
+      const entitlement = await getEntitlement(SHOP);
+
+      expect(entitlement.planName).toBe('free');
+      expect(entitlement.subscription).toBeNull();
+      expect(entitlement.usageThisCycle).toBe(2);
+      expect(entitlement.includedQuota).toBe(5);
+      expect(entitlement.cycleStart.getDate()).toBe(1);
+    });
+
+    it('fails closed on features when the plan configuration is missing', async () => {
+      jest.spyOn(console, 'error').mockImplementation(() => {});
+      await createSubscription({ planName: 'agency' });
+
+      const entitlement = await getEntitlement(SHOP);
+
+      expect(entitlement.featureFlags).toEqual([]);
+      expect(entitlement.includedQuota).toBe(30);
+    });
+  });
+
+  describe('caching', () => {
+    it('serves repeat reads without querying', async () => {
+      await createSubscription();
+      const findFirst = jest.spyOn(db.subscription, 'findFirst');
+
+      await getEntitlement(SHOP);
+      await getEntitlement(SHOP);
+      await getEntitlement(SHOP);
+
+      expect(findFirst).toHaveBeenCalledTimes(1);
+      expect(getEntitlementCacheStats()).toMatchObject({ misses: 1, hits: 2, entries: 1 });
+    });
+
+    it('coalesces concurrent misses into one load', async () => {
+      await createSubscription();
+      const findFirst = jest.spyOn(db.subscription, 'findFirst');
+
+      const results = await Promise.all([getEntitlement(SHOP), getEntitlement(SHOP), getEntitlement(SHOP)]);
+
+      expect(findFirst).toHaveBeenCalledTimes(1);
+      expect(results[0]).toBe(results[2]);
+      expect(getEntitlementCacheStats()).toMatchObject({ misses: 1, coalesced: 2 });
+    });
+
+    it('revalidates with a version read once the check interval passes', async () => {
+      await createSubscription();
+      await getEntitlement(SHOP);
+      const findFirst = jest.spyOn(db.subscription, 'findFirst');
+
+      now += 6000;
+      const entitlement = await getEntitlement(SHOP);
+
+      expect(entitlement.usageThisCycle).toBe(5);
+      expect(findFirst).not.toHaveBeenCalled();
+      expect(getEntitlementCacheStats()).toMatchObject({ revalidated: 1 });
+    });
+  });
+
+  describe('invalidation', () => {
+    it('reloads after a local invalidation', async () => {
+      const subscription = await createSubscription();
+      await getEntitlement(SHOP);
+
+      await db.subscription.update({ where: { id: subscription.id }, data: { usageThisCycle: 6 } });
+      await invalidateEntitlement(SHOP);
+
+      expect((await getEntitlement(SHOP)).usageThisCycle).toBe(6);
+      const version = await db.entitlementVersion.findUnique({ where: { shop: SHOP } });
+      expect(version?.version).toBe(1);
+    });
+
+    it('picks up a version bump from another instance after the check interval', async () => {
+      const subscription = await createSubscription();
+      await getEntitlement(SHOP);
+
+      // Another instance writes and bumps the version without touching this cache
+      await db.subscription.update({ where: { id: subscription.id }, data: { usageThisCycle: 9 } });
+      await db.entitlementVersion.create({ data: { shop: SHOP, version: 1 } });
+
+      expect((await getEntitlement(SHOP)).usageThisCycle).toBe(5);
+
+      now += 6000;
+      expect((await getEntitlement(SHOP)).usageThisCycle).toBe(9);
+    });
+
+    it('does not cache a load that was invalidated mid-flight', async () => {
+      const subscription = await createSubscription();
+
+      const stale = getEntitlement(SHOP);
+      await db.subscription.update({ where: { id: subscription.id }, data: { usageThisCycle: 7 } });
+      await invalidateEntitlement(SHOP);
+      await stale;
+
+      expect((await getEntitlement(SHOP)).usageThisCycle).toBe(7);
+    });
+
+    it('is non-fatal when the version bump fails', async () => {
+      const consoleError = jest.spyOn(console, 'error').mockImplementation(() => {});
+      jest.spyOn(db.entitlementVersion, 'upsert').mockRejectedValue(new Error('connection reset'));
+
+      await invalidateEntitlement(SHOP);
+
+      expect(consoleError).toHaveBeenCalledWith('[Entitlement] Failed to bump version:', expect.any(Error));
+    });
+  });
+});
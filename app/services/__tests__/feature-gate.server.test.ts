@@ -19,6 +19,19 @@ jest.mock('../../db.server', () => ({
     message: {
       count: jest.fn(),
     },
+    conversation: {
+      findUnique: jest.fn(),
+    },
+    generationLog: {
+      count: jest.fn(),
+    },
+    section: {
+      count: jest.fn(),
+    },
+    entitlementVersion: {
+      findUnique: jest.fn(),
+      upsert: jest.fn(),
+    },
   },
 }));
 
@@ -32,6 +45,7 @@ import {
   checkRefinementAccess,
   getFeaturesSummary,
 } from '../feature-gate.server';
+import { resetEntitlementCache } from '../entitlement.server';
 import prisma from '../../db.server';
 
 const mockedPrismaSubscription = prisma.subscription as {
@@ -46,6 +60,10 @@ const mockedPrismaMessage = prisma.message as {
   count: MockedFunction<typeof prisma.message.count>;
 };
 
+const mockedPrismaConversation = prisma.conversation as {
+  findUnique: MockedFunction<typeof prisma.conversation.findUnique>;
+};
+
 // ============================================================================
 // Test Data
 // ============================================================================
@@ -113,6 +131,7 @@ const AGENCY_PLAN = createMockPlanConfig({
 describe('FeatureGateService', () => {
   beforeEach(() => {
     jest.clearAllMocks();
+    resetEntitlementCache();
   });
 
   // ============================================================================
@@ -209,6 +228,15 @@ describe('FeatureGateService', () => {
   // getConversationRefinementCount
   // ============================================================================
   describe('getConversationRefinementCount', () => {
+    it('reads the counter stored on the conversation', async () => {
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      mockedPrismaConversation.findUnique.mockResolvedValueOnce({ refinementCount: 4 } as any);
+
+      const result = await getConversationRefinementCount('conv-123');
+      expect(result).toBe(4);
+      expect(mockedPrismaMessage.count).not.toHaveBeenCalled();
+    });
+
     it('returns count of assistant messages', async () => {
       mockedPrismaMessage.count.mockResolvedValue(3);
 
@@ -290,6 +318,15 @@ describe('FeatureGateService', () => {
       expect(result.limit).toBe(5);
     });
 
+    it('uses the refinement count passed by the caller', async () => {
+      mockedPrismaSubscription.findFirst.mockResolvedValue(createMockSubscription({ planName: 'pro' }));
+
+      const result = await checkRefinementAccess('myshop.myshopify.com', 'conv-123', 2);
+      expect(result).toMatchObject({ allowed: true, used: 2, limit: 5 });
+      expect(mockedPrismaConversation.findUnique).not.toHaveBeenCalled();
+      expect(mockedPrismaMessage.count).not.toHaveBeenCalled();
+    });
+
     it('allows agency users unlimited', async () => {
       mockedPrismaSubscription.findFirst.mockResolvedValue(createMockSubscription({ planName: 'agency' }));
       mockedPrismaMessage.count.mockResolvedValue(100);
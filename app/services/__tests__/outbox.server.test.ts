@@ -0,0 +1,323 @@
+// @jest-environment node
+import type { AdminApiContext } from '@shopify/shopify-app-react-router/server';
+
+// In-process Prisma stand-in instead of per-method mocks: the worker,
+// billing and generation-log services all write to the same store
+jest.mock('../../db.server', () => {
+  const { createInMemoryPrisma } = jest.requireActual('../mocks/in-memory-prisma');
+  return { __esModule: true, default: createInMemoryPrisma() };
+});
+
+jest.mock('../../shopify.server', () => ({
+  unauthenticated: { admin: jest.fn() },
+}));
+
+import prisma from '../../db.server';
+import { OutboxWorker, getRetryDelayMs } from '../outbox.server';
+import { resetEntitlementCache } from '../entitlement.server';
+import { createFakeAdminGraphql } from '../mocks/fake-admin-graphql';
+import type { InMemoryPrisma } from '../mocks/in-memory-prisma';
+
+const db = prisma as unknown as InMemoryPrisma;
+const SHOP = 'myshop.myshopify.com';
+
+function createWorker(options: ConstructorParameters<typeof OutboxWorker>[0] = {}) {
+  const fake = createFakeAdminGraphql({ shop: SHOP });
+  const resolveAdmin = jest.fn(async () => ({ graphql: fake.graphql }) as unknown as AdminApiContext);
+  const worker = new OutboxWorker({ resolveAdmin, baseDelayMs: 1000, ...options });
+  return { worker, fake, resolveAdmin };
+}
+
+async function createSubscription(overrides: Record<string, unknown> = {}) {
+  return db.subscription.create({
+    data: {
+      shop: SHOP,
+      shopifySubId: 'gid://shopify/AppSubscription/1',
+      planName: 'pro',
+      status: 'ACTIVE',
+      currentPeriodEnd: new Date('2030-01-31'),
+      basePrice: 29,
+      includedQuota: 30,
+      overagePrice: 2,
+      cappedAmount: 50,
+      usageThisCycle: 5,
+      overagesThisCycle: 0,
+      ...overrides,
+    },
+  });
+}
+
+function generation(messageId: string, sectionId = 'section-1') {
+  return { sectionId, messageId, prompt: 'A hero banner', tokenCount: 120 };
+}
+
+async function makeJobsDue() {
+  await db.outboxJob.updateMany({ where: { status: 'pending' }, data: { nextRunAt: new Date(0) } });
+}
+
+describe('OutboxWorker', () => {
+  beforeEach(() => {
+    db.$reset();
+    resetEntitlementCache();
+    jest.spyOn(console, 'warn').mockImplementation(() => {});
+    jest.spyOn(console, 'error').mockImplementation(() => {});
+  });
+
+  afterEach(() => {
+    jest.restoreAllMocks();
+  });
+
+  describe('enqueue', () => {
+    it('ignores duplicate generations for the same message', async () => {
+      const { worker } = createWorker();
+
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+
+      expect(await db.outboxJob.count()).toBe(1);
+    });
+  });
+
+  describe('free tier', () => {
+    it('writes the generation log without calling the Admin API', async () => {
+      const { worker, fake, resolveAdmin } = createWorker();
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+
+      const result = await worker.runOnce();
+
+      expect(result).toMatchObject({ claimed: 1, completed: 1, retried: 0 });
+      const [log] = await db.generationLog.findMany();
+      expect(log).toMatchObject({ shop: SHOP, messageId: 'msg-1', userTier: 'free', wasCharged: false });
+      expect(resolveAdmin).not.toHaveBeenCalled();
+      expect(fake.totalCalls()).toBe(0);
+      const [job] = await db.outboxJob.findMany();
+      expect(job.status).toBe('done');
+      expect(job.completedAt).toBeInstanceOf(Date);
+    });
+
+    it('batches jobs per shop: one subscription lookup and one log write each', async () => {
+      const { worker } = createWorker();
+      const findSubscription = jest.spyOn(db.subscription, 'findFirst');
+      const createLogs = jest.spyOn(db.generationLog, 'createMany');
+
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+      await worker.enqueueGeneration(SHOP, generation('msg-2'));
+      await worker.enqueueGeneration(SHOP, generation('msg-3'));
+      await worker.enqueueGeneration('other.myshopify.com', generation('msg-4'));
+
+      await worker.runOnce();
+
+      expect(findSubscription).toHaveBeenCalledTimes(2);
+      expect(createLogs).toHaveBeenCalledTimes(2);
+      expect(await db.generationLog.count({ where: { shop: SHOP } })).toBe(3);
+    });
+  });
+
+  describe('paid tier', () => {
+    it('records usage within quota and logs the generation', async () => {
+      await createSubscription();
+      const { worker, resolveAdmin } = createWorker();
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+
+      await worker.runOnce();
+
+      const [record] = await db.usageRecord.findMany();
+      expect(record).toMatchObject({ amount: 0, chargeStatus: 'accepted' });
+      const subscription = await db.subscription.findFirst();
+      expect(subscription?.usageThisCycle).toBe(6);
+      const [log] = await db.generationLog.findMany();
+      expect(log).toMatchObject({ userTier: 'pro', wasCharged: false });
+      expect(resolveAdmin).toHaveBeenCalledTimes(1);
+    });
+
+    it('retries a failed overage charge with backoff without counting it twice', async () => {
+      await createSubscription({ usageThisCycle: 30 });
+      const { worker, fake } = createWorker();
+      fake.failNext('appUsageRecordCreate');
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+
+      const first = await worker.runOnce();
+
+      expect(first).toMatchObject({ completed: 0, retried: 1 });
+      let [job] = await db.outboxJob.findMany();
+      expect(job).toMatchObject({ status: 'pending', attempts: 1, lockId: null });
+      expect(job.nextRunAt.getTime()).toBeGreaterThan(Date.now());
+      expect(await db.generationLog.count()).toBe(0);
+
+      // Not due yet
+      expect((await worker.runOnce()).claimed).toBe(0);
+
+      await makeJobsDue();
+      const second = await worker.runOnce();
+
+      expect(second).toMatchObject({ completed: 1, retried: 0 });
+      [job] = await db.outboxJob.findMany();
+      expect(job.status).toBe('done');
+      expect(await db.usageRecord.count()).toBe(1);
+      const [record] = await db.usageRecord.findMany();
+      expect(record).toMatchObject({ amount: 2, chargeStatus: 'accepted' });
+      expect(fake.usageCharges.size).toBe(1);
+      const subscription = await db.subscription.findFirst();
+      expect(subscription).toMatchObject({ usageThisCycle: 31, overagesThisCycle: 1 });
+      const [log] = await db.generationLog.findMany();
+      expect(log.wasCharged).toBe(true);
+    });
+
+    it('dead-letters after maxAttempts but still logs the generation', async () => {
+      await createSubscription();
+      const { worker, resolveAdmin } = createWorker({ maxAttempts: 2 });
+      resolveAdmin.mockRejectedValue(new Error('No offline session'));
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+
+      await worker.runOnce();
+      await makeJobsDue();
+      const result = await worker.runOnce();
+
+      expect(result.deadLettered).toBe(1);
+      const [job] = await db.outboxJob.findMany();
+      expect(job).toMatchObject({ status: 'failed', attempts: 2, lastError: 'No offline session' });
+      expect(await db.generationLog.count()).toBe(1);
+    });
+  });
+
+  describe('FailedUsageCharge drain', () => {
+    async function createFailedCharge(data: Record<string, unknown> = {}) {
+      return db.failedUsageCharge.create({
+        data: { shop: SHOP, sectionId: 'section-9', errorMessage: 'timeout', ...data },
+      });
+    }
+
+    it('converts failed charges into outbox jobs and records them', async () => {
+      const subscription = await createSubscription();
+      await createFailedCharge({
+        subscriptionId: subscription.id,
+        amount: 0,
+        billingCycle: subscription.currentPeriodEnd,
+      });
+      const { worker } = createWorker();
+
+      const result = await worker.runOnce();
+
+      expect(result).toMatchObject({ drainedFailedCharges: 1, completed: 1 });
+      expect(await db.failedUsageCharge.count()).toBe(0);
+      const [record] = await db.usageRecord.findMany();
+      expect(record).toMatchObject({ sectionId: 'section-9', amount: 0, chargeStatus: 'accepted' });
+      // Charge-only job: the original generation was already logged
+      expect(await db.generationLog.count()).toBe(0);
+    });
+
+    it('charges the amount recorded at generation time, not the current price', async () => {
+      // Generated in overage; counters were reset within the same cycle
+      const subscription = await createSubscription({ usageThisCycle: 5 });
+      await createFailedCharge({
+        subscriptionId: subscription.id,
+        amount: 2,
+        billingCycle: subscription.currentPeriodEnd,
+      });
+      const { worker, fake } = createWorker();
+
+      await worker.runOnce();
+
+      const [record] = await db.usageRecord.findMany();
+      expect(record).toMatchObject({ amount: 2, chargeStatus: 'accepted' });
+      expect(fake.usageCharges.size).toBe(1);
+    });
+
+    it('closes charges from a previous billing cycle without charging', async () => {
+      const subscription = await createSubscription();
+      await createFailedCharge({
+        subscriptionId: subscription.id,
+        amount: 2,
+        billingCycle: new Date('2029-12-31'),
+      });
+      const { worker, resolveAdmin } = createWorker();
+
+      const result = await worker.runOnce();
+
+      expect(result).toMatchObject({ completed: 0, retried: 0, deadLettered: 1 });
+      const [job] = await db.outboxJob.findMany();
+      expect(job).toMatchObject({ status: 'failed', lastError: 'Failed charge belongs to a previous billing cycle' });
+      expect(await db.usageRecord.count()).toBe(0);
+      expect(resolveAdmin).not.toHaveBeenCalled();
+    });
+
+    it('closes charges whose subscription was cancelled', async () => {
+      const subscription = await createSubscription({ status: 'cancelled' });
+      await createFailedCharge({
+        subscriptionId: subscription.id,
+        amount: 0,
+        billingCycle: subscription.currentPeriodEnd,
+      });
+      const { worker } = createWorker();
+
+      await worker.runOnce();
+
+      const [job] = await db.outboxJob.findMany();
+      expect(job).toMatchObject({ status: 'failed', lastError: 'Subscription for failed charge is no longer active' });
+      expect(await db.usageRecord.count()).toBe(0);
+    });
+
+    it('closes legacy rows without an amount snapshot for manual reconciliation', async () => {
+      await createSubscription();
+      await createFailedCharge();
+      const { worker } = createWorker();
+
+      await worker.runOnce();
+
+      const [job] = await db.outboxJob.findMany();
+      expect(job).toMatchObject({ status: 'failed', lastError: 'Failed charge has no amount snapshot; reconcile manually' });
+      expect(await db.usageRecord.count()).toBe(0);
+    });
+  });
+
+  describe('locking', () => {
+    it('reclaims jobs whose lock expired', async () => {
+      const { worker } = createWorker();
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+      await db.outboxJob.updateMany({
+        data: { status: 'processing', lockId: 'crashed-worker', lockedUntil: new Date(Date.now() - 1000) },
+      });
+
+      const result = await worker.runOnce();
+
+      expect(result.completed).toBe(1);
+    });
+
+    it('skips jobs locked by another worker', async () => {
+      const { worker } = createWorker();
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+      await db.outboxJob.updateMany({
+        data: { status: 'processing', lockId: 'other-worker', lockedUntil: new Date(Date.now() + 60_000) },
+      });
+
+      expect((await worker.runOnce()).claimed).toBe(0);
+    });
+  });
+
+  describe('getMetrics', () => {
+    it('reports queue depth and lag', async () => {
+      const { worker } = createWorker();
+      await worker.enqueueGeneration(SHOP, generation('msg-1'));
+      await db.outboxJob.updateMany({ data: { createdAt: new Date(Date.now() - 5000) } });
+
+      const before = await worker.getMetrics();
+      expect(before.pending).toBe(1);
+      expect(before.oldestPendingAgeMs).toBeGreaterThanOrEqual(5000);
+
+      await worker.runOnce();
+
+      const after = await worker.getMetrics();
+      expect(after).toMatchObject({ pending: 0, oldestPendingAgeMs: 0, completed: 1, runs: 1 });
+      expect(after.lastCompletionLagMs).toBeGreaterThanOrEqual(5000);
+    });
+  });
+
+  describe('getRetryDelayMs', () => {
+    it('doubles per attempt and caps at maxDelayMs', () => {
+      expect(getRetryDelayMs(1, 1000, 60_000)).toBeGreaterThanOrEqual(1000);
+      expect(getRetryDelayMs(1, 1000, 60_000)).toBeLessThanOrEqual(1100);
+      expect(getRetryDelayMs(4, 1000, 60_000)).toBeGreaterThanOrEqual(8000);
+      expect(getRetryDelayMs(20, 1000, 60_000)).toBeLessThanOrEqual(66_000);
+    });
+  });
+});
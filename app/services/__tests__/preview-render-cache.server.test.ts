@@ -0,0 +1,116 @@
+// @jest-environment node
+import {
+  getOrRenderPreview,
+  getPreviewRenderKey,
+  getPreviewRenderCacheStats,
+  clearPreviewRenderCache,
+  resetPreviewRenderCache,
+  type PreviewRenderResult,
+} from "../preview-render-cache.server";
+
+describe("PreviewRenderCache", () => {
+  const SHOP = "test-shop.myshopify.com";
+  const payload = { code: "PGRpdj5IaTwvZGl2Pg==", settings: "e30=", section_id: "preview" };
+  const nativeResult: PreviewRenderResult = { html: "<div>Hi</div>", mode: "native" };
+
+  beforeEach(() => {
+    resetPreviewRenderCache();
+  });
+
+  describe("getPreviewRenderKey", () => {
+    it("should be stable for identical payloads", () => {
+      expect(getPreviewRenderKey(SHOP, { ...payload })).toBe(getPreviewRenderKey(SHOP, payload));
+    });
+
+    it("should differ per shop and per field", () => {
+      const base = getPreviewRenderKey(SHOP, payload);
+
+      expect(getPreviewRenderKey("other.myshopify.com", payload)).not.toBe(base);
+      expect(getPreviewRenderKey(SHOP, { ...payload, product: "shirt" })).not.toBe(base);
+    });
+
+    it("should not let adjacent fields collide", () => {
+      const a = getPreviewRenderKey(SHOP, { code: "ab", settings: "c" });
+      const b = getPreviewRenderKey(SHOP, { code: "a", settings: "bc" });
+
+      expect(a).not.toBe(b);
+    });
+
+    it("should treat missing section_id as preview", () => {
+      expect(getPreviewRenderKey(SHOP, { code: "x" })).toBe(
+        getPreviewRenderKey(SHOP, { code: "x", section_id: "preview" })
+      );
+    });
+  });
+
+  describe("getOrRenderPreview", () => {
+    it("should serve repeated payloads without rendering again", async () => {
+      const render = jest.fn().mockResolvedValue(nativeResult);
+
+      const first = await getOrRenderPreview(SHOP, payload, render);
+      const second = await getOrRenderPreview(SHOP, payload, render);
+
+      expect(render).toHaveBeenCalledTimes(1);
+      expect(first.cacheStatus).toBe("miss");
+      expect(second.cacheStatus).toBe("hit");
+      expect(second.result).toEqual(nativeResult);
+    });
+
+    it("should collapse concurrent identical requests into one render", async () => {
+      let resolveRender!: (value: PreviewRenderResult) => void;
+      const render = jest.fn(
+        () => new Promise<PreviewRenderResult>((resolve) => (resolveRender = resolve))
+      );
+
+      const calls = [
+        getOrRenderPreview(SHOP, payload, render),
+        getOrRenderPreview(SHOP, payload, render),
+        getOrRenderPreview(SHOP, payload, render),
+      ];
+      resolveRender(nativeResult);
+      const results = await Promise.all(calls);
+
+      expect(render).toHaveBeenCalledTimes(1);
+      expect(results.map((r) => r.cacheStatus)).toEqual(["miss", "coalesced", "coalesced"]);
+      expect(getPreviewRenderCacheStats()).toMatchObject({ misses: 1, coalesced: 2 });
+    });
+
+    it("should not cache fallback results", async () => {
+      const render = jest
+        .fn()
+        .mockResolvedValueOnce({ html: null, mode: "fallback", error: "Request timeout" })
+        .mockResolvedValueOnce(nativeResult);
+
+      await getOrRenderPreview(SHOP, payload, render);
+      const retry = await getOrRenderPreview(SHOP, payload, render);
+
+      expect(render).toHaveBeenCalledTimes(2);
+      expect(retry.result).toEqual(nativeResult);
+    });
+
+    it("should release in-flight entry when render rejects", async () => {
+      const render = jest
+        .fn()
+        .mockRejectedValueOnce(new Error("boom"))
+        .mockResolvedValueOnce(nativeResult);
+
+      await expect(getOrRenderPreview(SHOP, payload, render)).rejects.toThrow("boom");
+      const retry = await getOrRenderPreview(SHOP, payload, render);
+
+      expect(retry.cacheStatus).toBe("miss");
+    });
+  });
+
+  describe("clearPreviewRenderCache", () => {
+    it("should only clear the given shop", async () => {
+      const render = jest.fn().mockResolvedValue(nativeResult);
+      await getOrRenderPreview(SHOP, payload, render);
+      await getOrRenderPreview("other.myshopify.com", payload, render);
+
+      clearPreviewRenderCache(SHOP);
+
+      expect(getPreviewRenderCacheStats().entries).toBe(1);
+      expect((await getOrRenderPreview(SHOP, payload, render)).cacheStatus).toBe("miss");
+    });
+  });
+});
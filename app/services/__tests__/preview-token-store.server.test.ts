@@ -0,0 +1,129 @@
+// @jest-environment node
+
+jest.mock("../../db.server", () => ({
+  __esModule: true,
+  default: {
+    previewToken: {
+      upsert: jest.fn(),
+      findUnique: jest.fn(),
+      deleteMany: jest.fn(),
+    },
+    $runCommandRaw: jest.fn(),
+  },
+}));
+
+import prisma from "../../db.server";
+import {
+  InMemoryPreviewTokenStore,
+  PrismaPreviewTokenStore,
+  hashPreviewPayload,
+} from "../preview-token-store.server";
+
+const SHOP = "test-shop.myshopify.com";
+const payload = { code: "{% schema %}{}{% endschema %}", settings: '{"title":"Hi"}' };
+
+describe("InMemoryPreviewTokenStore", () => {
+  afterEach(() => {
+    jest.useRealTimers();
+  });
+
+  it("should store raw payloads and return them for the owning shop", async () => {
+    const store = new InMemoryPreviewTokenStore();
+
+    const token = await store.put(SHOP, payload);
+
+    expect(token).toMatch(/^[a-f0-9]{32}$/);
+    expect(await store.get(token, SHOP)).toEqual(payload);
+  });
+
+  it("should not return payloads to another shop", async () => {
+    const store = new InMemoryPreviewTokenStore();
+    const token = await store.put(SHOP, payload);
+
+    expect(await store.get(token, "other.myshopify.com")).toBeNull();
+  });
+
+  it("should reuse the token for identical content", async () => {
+    const store = new InMemoryPreviewTokenStore();
+
+    const first = await store.put(SHOP, payload);
+    const second = await store.put(SHOP, { ...payload });
+
+    expect(second).toBe(first);
+    expect(store.size).toBe(1);
+  });
+
+  it("should expire tokens after ttl and sweep them on write", async () => {
+    jest.useFakeTimers();
+    const store = new InMemoryPreviewTokenStore({ ttlMs: 1000 });
+    const token = await store.put(SHOP, payload);
+
+    jest.advanceTimersByTime(1001);
+    await store.put(SHOP, { code: "other" });
+
+    expect(store.size).toBe(1);
+    expect(await store.get(token, SHOP)).toBeNull();
+  });
+
+  it("should evict soonest-expiring entries when over budget", async () => {
+    const store = new InMemoryPreviewTokenStore({ maxBytes: 40 });
+
+    const first = await store.put(SHOP, { code: "a".repeat(10) });
+    const second = await store.put(SHOP, { code: "b".repeat(10) });
+    await store.put(SHOP, { code: "c".repeat(10) });
+
+    expect(await store.get(first, SHOP)).toBeNull();
+    expect(await store.get(second, SHOP)).not.toBeNull();
+    expect(store.bytes).toBe(40);
+  });
+
+  it("should reject payloads larger than the budget", async () => {
+    const store = new InMemoryPreviewTokenStore({ maxBytes: 10 });
+
+    await expect(store.put(SHOP, { code: "x".repeat(100) })).rejects.toThrow(
+      "exceeds token store budget"
+    );
+  });
+});
+
+describe("PrismaPreviewTokenStore", () => {
+  const mockedPrisma = prisma as unknown as {
+    previewToken: { upsert: jest.Mock; findUnique: jest.Mock; deleteMany: jest.Mock };
+    $runCommandRaw: jest.Mock;
+  };
+
+  beforeEach(() => {
+    jest.clearAllMocks();
+    mockedPrisma.$runCommandRaw.mockResolvedValue({ ok: 1 });
+  });
+
+  it("should upsert on content hash and create the TTL index once", async () => {
+    const store = new PrismaPreviewTokenStore();
+    mockedPrisma.previewToken.upsert.mockResolvedValue({ token: "abc" });
+
+    await store.put(SHOP, payload);
+    const token = await store.put(SHOP, payload);
+
+    expect(token).toBe("abc");
+    expect(mockedPrisma.$runCommandRaw).toHaveBeenCalledTimes(1);
+    expect(mockedPrisma.previewToken.upsert).toHaveBeenCalledWith(
+      expect.objectContaining({
+        where: { contentHash: hashPreviewPayload(SHOP, payload) },
+      })
+    );
+  });
+
+  it("should ignore expired or foreign records", async () => {
+    const store = new PrismaPreviewTokenStore();
+    const base = { shop: SHOP, code: "x", settings: null, blocks: null, product: null, collection: null, sectionId: null };
+
+    mockedPrisma.previewToken.findUnique.mockResolvedValueOnce({ ...base, expiresAt: new Date(Date.now() - 1) });
+    expect(await store.get("t", SHOP)).toBeNull();
+
+    mockedPrisma.previewToken.findUnique.mockResolvedValueOnce({ ...base, expiresAt: new Date(Date.now() + 60_000) });
+    expect(await store.get("t", "other.myshopify.com")).toBeNull();
+
+    mockedPrisma.previewToken.findUnique.mockResolvedValueOnce({ ...base, expiresAt: new Date(Date.now() + 60_000) });
+    expect(await store.get("t", SHOP)).toEqual({ code: "x" });
+  });
+});
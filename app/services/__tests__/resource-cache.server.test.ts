@@ -0,0 +1,107 @@
+// @jest-environment node
+import { ResourceCache } from "../resource-cache.server";
+
+describe("ResourceCache", () => {
+  const makeCache = () =>
+    new ResourceCache({ maxBytes: 1024 * 1024, freshMs: 1000, staleMs: 5000 });
+
+  afterEach(() => {
+    jest.useRealTimers();
+  });
+
+  it("should namespace keys per shop", async () => {
+    const cache = makeCache();
+
+    await cache.get("shop-a", "shop", async () => ({ name: "A" }));
+    const b = await cache.get("shop-b", "shop", async () => ({ name: "B" }));
+
+    expect(b).toEqual({ name: "B" });
+    expect(cache.getStats().misses).toBe(2);
+  });
+
+  it("should coalesce concurrent misses into one load", async () => {
+    const cache = makeCache();
+    const loader = jest.fn(async () => ({ id: 1 }));
+
+    const results = await Promise.all([
+      cache.get("shop", "product:1", loader),
+      cache.get("shop", "product:1", loader),
+      cache.get("shop", "product:1", loader),
+    ]);
+
+    expect(loader).toHaveBeenCalledTimes(1);
+    expect(results).toEqual([{ id: 1 }, { id: 1 }, { id: 1 }]);
+    expect(cache.getStats().coalesced).toBe(2);
+  });
+
+  it("should serve stale values while revalidating in the background", async () => {
+    jest.useFakeTimers();
+    const cache = makeCache();
+    const loader = jest
+      .fn()
+      .mockResolvedValueOnce({ version: 1 })
+      .mockResolvedValueOnce({ version: 2 });
+
+    await cache.get("shop", "key", loader);
+    jest.advanceTimersByTime(1500);
+
+    const stale = await cache.get("shop", "key", loader);
+    expect(stale).toEqual({ version: 1 });
+    expect(loader).toHaveBeenCalledTimes(2);
+
+    // Let the background refresh settle
+    for (let i = 0; i < 5; i++) await Promise.resolve();
+    const fresh = await cache.get("shop", "key", loader);
+    expect(fresh).toEqual({ version: 2 });
+    expect(cache.getStats().staleHits).toBe(1);
+  });
+
+  it("should not cache null results", async () => {
+    const cache = makeCache();
+    const loader = jest.fn(async () => null);
+
+    await cache.get("shop", "missing", loader);
+    await cache.get("shop", "missing", loader);
+
+    expect(loader).toHaveBeenCalledTimes(2);
+  });
+
+  it("should load only uncached keys in one batch", async () => {
+    const cache = makeCache();
+    await cache.get("shop", "product:1", async () => ({ id: 1 }));
+    const batchLoader = jest.fn(async (keys: string[]) =>
+      new Map(keys.map((key) => [key, { id: key }]))
+    );
+
+    const results = await cache.getMany("shop", ["product:1", "product:2", "collection:3"], batchLoader);
+
+    expect(batchLoader).toHaveBeenCalledTimes(1);
+    expect(batchLoader).toHaveBeenCalledWith(["product:2", "collection:3"]);
+    expect(results.get("product:1")).toEqual({ id: 1 });
+    expect(results.get("collection:3")).toEqual({ id: "collection:3" });
+  });
+
+  it("should let single lookups join an in-flight batch", async () => {
+    const cache = makeCache();
+    const loader = jest.fn(async () => ({ id: "single" }));
+
+    const batch = cache.getMany("shop", ["product:2"], async (keys) =>
+      new Map(keys.map((key) => [key, { id: "batch" }]))
+    );
+    const single = cache.get("shop", "product:2", loader);
+
+    await batch;
+    expect(await single).toEqual({ id: "batch" });
+    expect(loader).not.toHaveBeenCalled();
+  });
+
+  it("should clear one shop without touching others", async () => {
+    const cache = makeCache();
+    await cache.get("shop-a", "k", async () => 1);
+    await cache.get("shop-b", "k", async () => 2);
+
+    cache.clear("shop-a");
+
+    expect(cache.getStats().entries).toBe(1);
+  });
+});
@@ -0,0 +1,90 @@
+// @jest-environment node
+
+// In-process Prisma stand-in: the races below need section writes and the
+// counter row to share one store
+jest.mock('../../db.server', () => {
+  const { createInMemoryPrisma } = jest.requireActual('../mocks/in-memory-prisma');
+  return { __esModule: true, default: createInMemoryPrisma() };
+});
+
+import prisma from '../../db.server';
+import { sectionService } from '../section.server';
+import type { InMemoryPrisma } from '../mocks/in-memory-prisma';
+
+const db = prisma as unknown as InMemoryPrisma;
+const SHOP = 'myshop.myshopify.com';
+const HOUR_MS = 60 * 60 * 1000;
+
+function createSection() {
+  return sectionService.create({ shop: SHOP, prompt: 'Hero banner', code: '<div></div>' });
+}
+
+describe('section status counters', () => {
+  beforeEach(() => {
+    db.$reset();
+  });
+
+  afterEach(() => {
+    jest.restoreAllMocks();
+  });
+
+  it('keeps a create that lands between a rebuild count and its write', async () => {
+    await createSection();
+    await sectionService.getStatusCounts(SHOP);
+
+    // Rebuild counts 1 draft, then a create increments the row before the upsert
+    const upsert = db.sectionStatusCount.upsert.bind(db.sectionStatusCount);
+    jest.spyOn(db.sectionStatusCount, 'upsert').mockImplementationOnce(async (args) => {
+      await createSection();
+      return upsert(args);
+    });
+    await sectionService.rebuildStatusCounts(SHOP);
+
+    expect((await sectionService.getStatusCounts(SHOP)).draft).toBe(2);
+  });
+
+  it('recounts a row that missed a create while it was being built', async () => {
+    // The create's adjustment is a no-op: the row does not exist yet
+    const upsert = db.sectionStatusCount.upsert.bind(db.sectionStatusCount);
+    jest.spyOn(db.sectionStatusCount, 'upsert').mockImplementationOnce(async (args) => {
+      await createSection();
+      return upsert(args);
+    });
+    expect((await sectionService.getStatusCounts(SHOP)).draft).toBe(0);
+
+    await db.sectionStatusCount.updateMany({
+      where: { shop: SHOP },
+      data: { countedAt: new Date(Date.now() - HOUR_MS) },
+    });
+
+    expect((await sectionService.getStatusCounts(SHOP)).draft).toBe(1);
+    const [row] = await db.sectionStatusCount.findMany();
+    expect(row.countedAt.getTime()).toBeGreaterThan(Date.now() - HOUR_MS);
+  });
+
+  it('does not write a recount that an adjustment raced', async () => {
+    await createSection();
+    await sectionService.getStatusCounts(SHOP);
+    await db.sectionStatusCount.updateMany({
+      where: { shop: SHOP },
+      data: { countedAt: new Date(Date.now() - HOUR_MS) },
+    });
+
+    // A create lands after the counts were taken but before the guarded write
+    const count = db.section.count.bind(db.section);
+    let raced = false;
+    jest.spyOn(db.section, 'count').mockImplementation(async (args) => {
+      const result = await count(args);
+      if (!raced) {
+        raced = true;
+        await createSection();
+      }
+      return result;
+    });
+    await sectionService.getStatusCounts(SHOP);
+    jest.restoreAllMocks();
+
+    const [row] = await db.sectionStatusCount.findMany();
+    expect(row.draft).toBe(2);
+  });
+});
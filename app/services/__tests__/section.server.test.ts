@@ -17,6 +17,13 @@ jest.mock('../../db.server', () => ({
       count: jest.fn(),
       delete: jest.fn(),
       deleteMany: jest.fn(),
+      findRaw: jest.fn(),
+    },
+    sectionStatusCount: {
+      findUnique: jest.fn(),
+      upsert: jest.fn(),
+      updateMany: jest.fn(),
+      deleteMany: jest.fn(),
     },
     conversation: {
       findUnique: jest.fn(),
@@ -37,6 +44,7 @@ jest.mock('../../db.server', () => ({
       deleteMany: jest.fn(),
     },
     $transaction: jest.fn(),
+    $runCommandRaw: jest.fn().mockResolvedValue({ ok: 1 }),
   },
 }));
 
@@ -52,6 +60,32 @@ const mockedPrismaSection = prisma.section as {
   findMany: MockedFunction<typeof prisma.section.findMany>;
   count: MockedFunction<typeof prisma.section.count>;
   delete: MockedFunction<typeof prisma.section.delete>;
+  findRaw: MockedFunction<typeof prisma.section.findRaw>;
+};
+
+const mockedStatusCount = prisma.sectionStatusCount as {
+  findUnique: MockedFunction<typeof prisma.sectionStatusCount.findUnique>;
+  upsert: MockedFunction<typeof prisma.sectionStatusCount.upsert>;
+  updateMany: MockedFunction<typeof prisma.sectionStatusCount.updateMany>;
+  deleteMany: MockedFunction<typeof prisma.sectionStatusCount.deleteMany>;
+};
+
+// Stored counter row for the shop (next findUnique only)
+const mockStatusCounts = (
+  counts: Partial<Record<'draft' | 'active' | 'inactive' | 'archive', number>> = {}
+) => {
+  mockedStatusCount.findUnique.mockResolvedValueOnce({
+    id: 'counts-1',
+    shop: 'myshop.myshopify.com',
+    draft: 0,
+    active: 0,
+    inactive: 0,
+    archive: 0,
+    revision: 0,
+    countedAt: new Date(),
+    updatedAt: new Date(),
+    ...counts,
+  });
 };
 
 describe('SectionService', () => {
@@ -522,7 +556,7 @@ describe('SectionService', () => {
       ];
 
       mockedPrismaSection.findMany.mockResolvedValueOnce(sections);
-      mockedPrismaSection.count.mockResolvedValueOnce(2);
+      mockStatusCounts({ draft: 1, active: 1, archive: 3 });
 
       const result = await sectionService.getByShop('myshop.myshopify.com');
 
@@ -530,11 +564,14 @@ describe('SectionService', () => {
       expect(result.page).toBe(1);
       expect(result.total).toBe(2);
       expect(result.totalPages).toBe(1);
+      expect(result.nextCursor).toBeNull();
+      expect(result.prevCursor).toBeNull();
+      expect(mockedPrismaSection.count).not.toHaveBeenCalled();
     });
 
     it('should exclude ARCHIVE status by default', async () => {
       mockedPrismaSection.findMany.mockResolvedValueOnce([]);
-      mockedPrismaSection.count.mockResolvedValueOnce(0);
+      mockStatusCounts();
 
       await sectionService.getByShop('myshop.myshopify.com');
 
@@ -544,7 +581,7 @@ describe('SectionService', () => {
 
     it('should include INACTIVE when includeInactive=true', async () => {
       mockedPrismaSection.findMany.mockResolvedValueOnce([]);
-      mockedPrismaSection.count.mockResolvedValueOnce(0);
+      mockStatusCounts();
 
       await sectionService.getByShop('myshop.myshopify.com', { includeInactive: true });
 
@@ -555,7 +592,7 @@ describe('SectionService', () => {
 
     it('should filter by status when provided', async () => {
       mockedPrismaSection.findMany.mockResolvedValueOnce([]);
-      mockedPrismaSection.count.mockResolvedValueOnce(0);
+      mockStatusCounts();
 
       await sectionService.getByShop('myshop.myshopify.com', { status: SECTION_STATUS.DRAFT });
 
@@ -578,43 +615,204 @@ describe('SectionService', () => {
 
     it('should sort by newest by default', async () => {
       mockedPrismaSection.findMany.mockResolvedValueOnce([]);
-      mockedPrismaSection.count.mockResolvedValueOnce(0);
+      mockStatusCounts();
 
       await sectionService.getByShop('myshop.myshopify.com');
 
       const orderBy = mockedPrismaSection.findMany.mock.calls[0]?.[0]?.orderBy;
-      expect(orderBy?.createdAt).toBe('desc');
+      expect(orderBy).toEqual([{ createdAt: 'desc' }, { id: 'desc' }]);
     });
 
     it('should sort by oldest when sort=oldest', async () => {
       mockedPrismaSection.findMany.mockResolvedValueOnce([]);
-      mockedPrismaSection.count.mockResolvedValueOnce(0);
+      mockStatusCounts();
 
       await sectionService.getByShop('myshop.myshopify.com', { sort: 'oldest' });
 
       const orderBy = mockedPrismaSection.findMany.mock.calls[0]?.[0]?.orderBy;
-      expect(orderBy?.createdAt).toBe('asc');
+      expect(orderBy).toEqual([{ createdAt: 'asc' }, { id: 'asc' }]);
     });
 
     it('should handle pagination', async () => {
       mockedPrismaSection.findMany.mockResolvedValueOnce([]);
-      mockedPrismaSection.count.mockResolvedValueOnce(100);
+      mockStatusCounts({ draft: 60, active: 40 });
 
       await sectionService.getByShop('myshop.myshopify.com', { page: 2, limit: 10 });
 
       const findManyCall = mockedPrismaSection.findMany.mock.calls[0]?.[0];
       expect(findManyCall?.skip).toBe(10); // (2-1) * 10
-      expect(findManyCall?.take).toBe(10);
+      expect(findManyCall?.take).toBe(11); // one extra row to detect a next page
     });
 
     it('should calculate totalPages correctly', async () => {
       mockedPrismaSection.findMany.mockResolvedValueOnce([]);
-      mockedPrismaSection.count.mockResolvedValueOnce(100);
+      mockStatusCounts({ draft: 60, active: 40 });
 
       const result = await sectionService.getByShop('myshop.myshopify.com', { limit: 20 });
 
       expect(result.totalPages).toBe(5); // 100/20 = 5
     });
+
+    it('should read the total for a status tab from its counter', async () => {
+      mockedPrismaSection.findMany.mockResolvedValueOnce([]);
+      mockStatusCounts({ draft: 4, active: 7, inactive: 2, archive: 9 });
+
+      const result = await sectionService.getByShop('myshop.myshopify.com', {
+        status: SECTION_STATUS.ACTIVE,
+      });
+
+      expect(result.total).toBe(7);
+      expect(mockedPrismaSection.count).not.toHaveBeenCalled();
+    });
+
+    it('should count all statuses when includeInactive=true', async () => {
+      mockedPrismaSection.findMany.mockResolvedValueOnce([]);
+      mockStatusCounts({ draft: 4, active: 7, inactive: 2, archive: 9 });
+
+      const result = await sectionService.getByShop('myshop.myshopify.com', { includeInactive: true });
+
+      expect(result.total).toBe(22);
+    });
+
+    it('should search via the text index in text mode', async () => {
+      mockedPrismaSection.findRaw.mockResolvedValueOnce([
+        { _id: { $oid: 'aaaaaaaaaaaaaaaaaaaaaaaa' } },
+        { _id: { $oid: 'bbbbbbbbbbbbbbbbbbbbbbbb' } },
+      ]);
+      mockedPrismaSection.findMany.mockResolvedValueOnce([]);
+      mockedPrismaSection.count.mockResolvedValueOnce(2);
+
+      const result = await sectionService.getByShop('myshop.myshopify.com', {
+        search: 'hero banner',
+        searchMode: 'text',
+      });
+
+      expect(mockedPrismaSection.findRaw).toHaveBeenCalledWith(
+        expect.objectContaining({
+          filter: { shop: 'myshop.myshopify.com', $text: { $search: 'hero banner' } },
+        })
+      );
+      const whereClause = mockedPrismaSection.findMany.mock.calls[0]?.[0]?.where;
+      expect(whereClause?.id).toEqual({ in: ['aaaaaaaaaaaaaaaaaaaaaaaa', 'bbbbbbbbbbbbbbbbbbbbbbbb'] });
+      expect(whereClause?.OR).toBeUndefined();
+      expect(result.total).toBe(2);
+    });
+
+    it('should fall back to substring search if the text query fails', async () => {
+      mockedPrismaSection.findRaw.mockRejectedValueOnce(new Error('text index required'));
+      mockedPrismaSection.findMany.mockResolvedValueOnce([]);
+      mockedPrismaSection.count.mockResolvedValueOnce(0);
+      const consoleSpy = jest.spyOn(console, 'error').mockImplementation(() => {});
+
+      await sectionService.getByShop('myshop.myshopify.com', { search: 'hero', searchMode: 'text' });
+
+      const whereClause = mockedPrismaSection.findMany.mock.calls[0]?.[0]?.where;
+      expect(whereClause?.OR).toEqual([
+        { prompt: { contains: 'hero', mode: 'insensitive' } },
+        { name: { contains: 'hero', mode: 'insensitive' } },
+      ]);
+      consoleSpy.mockRestore();
+    });
+
+    it('should fall back to substring search if no whole word matches', async () => {
+      mockedPrismaSection.findRaw.mockResolvedValueOnce([]);
+      mockedPrismaSection.findMany.mockResolvedValueOnce([]);
+      mockedPrismaSection.count.mockResolvedValueOnce(0);
+
+      await sectionService.getByShop('myshop.myshopify.com', { search: 'prod', searchMode: 'text' });
+
+      const whereClause = mockedPrismaSection.findMany.mock.calls[0]?.[0]?.where;
+      expect(whereClause?.id).toBeUndefined();
+      expect(whereClause?.OR).toEqual([
+        { prompt: { contains: 'prod', mode: 'insensitive' } },
+        { name: { contains: 'prod', mode: 'insensitive' } },
+      ]);
+    });
+
+    describe('cursor pagination', () => {
+      const rows = [
+        createMockSection({ id: '000000000000000000000003', createdAt: new Date('2025-01-03T00:00:00Z') }),
+        createMockSection({ id: '000000000000000000000002', createdAt: new Date('2025-01-02T00:00:00Z') }),
+        createMockSection({ id: '000000000000000000000001', createdAt: new Date('2025-01-02T00:00:00Z') }),
+      ];
+
+      it('should return a next cursor when more rows exist', async () => {
+        mockedPrismaSection.findMany.mockResolvedValueOnce(rows);
+        mockStatusCounts({ draft: 3 });
+
+        const result = await sectionService.getByShop('myshop.myshopify.com', { limit: 2 });
+
+        expect(result.items.map((s) => s.id)).toEqual(['000000000000000000000003', '000000000000000000000002']);
+        expect(result.nextCursor).toEqual(expect.any(String));
+        expect(result.prevCursor).toBeNull();
+      });
+
+      it('should seek past the cursor on (createdAt, id) instead of skipping', async () => {
+        mockedPrismaSection.findMany.mockResolvedValueOnce(rows);
+        mockStatusCounts({ draft: 3 });
+        const first = await sectionService.getByShop('myshop.myshopify.com', { limit: 2 });
+
+        mockedPrismaSection.findMany.mockResolvedValueOnce([rows[2]]);
+        mockStatusCounts({ draft: 3 });
+        const second = await sectionService.getByShop('myshop.myshopify.com', {
+          limit: 2,
+          page: 2,
+          after: first.nextCursor!,
+        });
+
+        const findManyCall = mockedPrismaSection.findMany.mock.calls[1]?.[0];
+        expect(findManyCall?.skip).toBeUndefined();
+        expect(findManyCall?.where?.AND).toEqual([
+          {
+            OR: [
+              { createdAt: { lt: rows[1].createdAt } },
+              { createdAt: rows[1].createdAt, id: { lt: '000000000000000000000002' } },
+            ],
+          },
+        ]);
+        expect(second.items).toHaveLength(1);
+        expect(second.nextCursor).toBeNull();
+        expect(second.prevCursor).toEqual(expect.any(String));
+      });
+
+      it('should walk backwards with a before cursor and keep display order', async () => {
+        mockedPrismaSection.findMany.mockResolvedValueOnce([rows[2]]);
+        mockStatusCounts({ draft: 3 });
+        const page = await sectionService.getByShop('myshop.myshopify.com', {
+          limit: 2,
+          after: Buffer.from(`${rows[1].createdAt.getTime()}:${rows[1].id}`).toString('base64url'),
+        });
+
+        // Reverse query returns nearest-first
+        mockedPrismaSection.findMany.mockResolvedValueOnce([rows[1], rows[0]]);
+        mockStatusCounts({ draft: 3 });
+        const previous = await sectionService.getByShop('myshop.myshopify.com', {
+          limit: 2,
+          before: page.prevCursor!,
+        });
+
+        const findManyCall = mockedPrismaSection.findMany.mock.calls[1]?.[0];
+        expect(findManyCall?.orderBy).toEqual([{ createdAt: 'asc' }, { id: 'asc' }]);
+        expect(findManyCall?.where?.AND?.[0]?.OR?.[1]).toEqual({
+          createdAt: rows[2].createdAt,
+          id: { gt: '000000000000000000000001' },
+        });
+        expect(previous.items.map((s) => s.id)).toEqual(['000000000000000000000003', '000000000000000000000002']);
+        expect(previous.prevCursor).toBeNull();
+        expect(previous.nextCursor).toEqual(expect.any(String));
+      });
+
+      it('should ignore a malformed cursor', async () => {
+        mockedPrismaSection.findMany.mockResolvedValueOnce([]);
+        mockStatusCounts();
+
+        await sectionService.getByShop('myshop.myshopify.com', { after: 'not-a-cursor' });
+
+        const findManyCall = mockedPrismaSection.findMany.mock.calls[0]?.[0];
+        expect(findManyCall?.where?.AND).toBeUndefined();
+        expect(findManyCall?.skip).toBe(0);
+      });
+    });
   });
 
   // ============================================================================
@@ -686,25 +884,17 @@ describe('SectionService', () => {
   // GET_TOTAL_COUNT Tests
   // ============================================================================
   describe('getTotalCount', () => {
-    it('should return count of non-archived sections', async () => {
-      mockedPrismaSection.count.mockResolvedValueOnce(5);
+    it('should return count of non-archived sections from the counters', async () => {
+      mockStatusCounts({ draft: 2, active: 2, inactive: 1, archive: 4 });
 
       const result = await sectionService.getTotalCount('myshop.myshopify.com');
 
       expect(result).toBe(5);
-    });
-
-    it('should exclude ARCHIVE sections', async () => {
-      mockedPrismaSection.count.mockResolvedValueOnce(0);
-
-      await sectionService.getTotalCount('myshop.myshopify.com');
-
-      const whereClause = mockedPrismaSection.count.mock.calls[0]?.[0]?.where;
-      expect(whereClause?.status?.not).toBe(SECTION_STATUS.ARCHIVE);
+      expect(mockedPrismaSection.count).not.toHaveBeenCalled();
     });
 
     it('should return 0 if no sections', async () => {
-      mockedPrismaSection.count.mockResolvedValueOnce(0);
+      mockStatusCounts();
 
       const result = await sectionService.getTotalCount('myshop.myshopify.com');
 
@@ -716,29 +906,228 @@ describe('SectionService', () => {
   // GET_ARCHIVED_COUNT Tests
   // ============================================================================
   describe('getArchivedCount', () => {
-    it('should return count of ARCHIVE sections', async () => {
-      mockedPrismaSection.count.mockResolvedValueOnce(3);
+    it('should return count of ARCHIVE sections from the counters', async () => {
+      mockStatusCounts({ draft: 2, archive: 3 });
 
       const result = await sectionService.getArchivedCount('myshop.myshopify.com');
 
       expect(result).toBe(3);
     });
 
-    it('should only count ARCHIVE status', async () => {
-      mockedPrismaSection.count.mockResolvedValueOnce(0);
+    it('should return 0 if no archived sections', async () => {
+      mockStatusCounts({ draft: 2 });
 
-      await sectionService.getArchivedCount('myshop.myshopify.com');
+      const result = await sectionService.getArchivedCount('myshop.myshopify.com');
 
-      const whereClause = mockedPrismaSection.count.mock.calls[0]?.[0]?.where;
-      expect(whereClause?.status).toBe(SECTION_STATUS.ARCHIVE);
+      expect(result).toBe(0);
     });
+  });
 
-    it('should return 0 if no archived sections', async () => {
-      mockedPrismaSection.count.mockResolvedValueOnce(0);
+  // ============================================================================
+  // STATUS COUNTS Tests
+  // ============================================================================
+  describe('getStatusCounts', () => {
+    it('should rebuild missing counters from the sections', async () => {
+      mockedStatusCount.findUnique.mockResolvedValueOnce(null);
+      mockedPrismaSection.count
+        .mockResolvedValueOnce(3) // draft
+        .mockResolvedValueOnce(1) // active
+        .mockResolvedValueOnce(0) // inactive
+        .mockResolvedValueOnce(2); // archive
+
+      const result = await sectionService.getStatusCounts('myshop.myshopify.com');
+
+      expect(result).toEqual({ draft: 3, active: 1, inactive: 0, archive: 2 });
+      expect(mockedPrismaSection.count).toHaveBeenCalledWith({
+        where: { shop: 'myshop.myshopify.com', status: SECTION_STATUS.ARCHIVE },
+      });
+      expect(mockedStatusCount.upsert).toHaveBeenCalledWith({
+        where: { shop: 'myshop.myshopify.com' },
+        create: { shop: 'myshop.myshopify.com', draft: 3, active: 1, inactive: 0, archive: 2 },
+        update: {},
+      });
+    });
 
-      const result = await sectionService.getArchivedCount('myshop.myshopify.com');
+    it('should tolerate a concurrent rebuild', async () => {
+      mockedStatusCount.findUnique.mockResolvedValueOnce(null);
+      mockedPrismaSection.count
+        .mockResolvedValueOnce(1)
+        .mockResolvedValueOnce(1)
+        .mockResolvedValueOnce(1)
+        .mockResolvedValueOnce(1);
+      mockedStatusCount.upsert.mockRejectedValueOnce(Object.assign(new Error('dup'), { code: 'P2002' }));
 
-      expect(result).toBe(0);
+      const result = await sectionService.getStatusCounts('myshop.myshopify.com');
+
+      expect(result).toEqual({ draft: 1, active: 1, inactive: 1, archive: 1 });
+    });
+
+    it('should clamp negative counters to 0', async () => {
+      mockStatusCounts({ draft: -1, active: 2 });
+
+      const result = await sectionService.getStatusCounts('myshop.myshopify.com');
+
+      expect(result).toEqual({ draft: 0, active: 2, inactive: 0, archive: 0 });
+    });
+
+    it('should recount a stale row, guarded by its revision', async () => {
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      mockStatusCounts({ draft: 5, revision: 7, countedAt: new Date(Date.now() - 60 * 60 * 1000) } as any);
+      mockedPrismaSection.count
+        .mockResolvedValueOnce(4)
+        .mockResolvedValueOnce(1)
+        .mockResolvedValueOnce(0)
+        .mockResolvedValueOnce(0);
+      mockedStatusCount.updateMany.mockResolvedValueOnce({ count: 1 });
+
+      const result = await sectionService.getStatusCounts('myshop.myshopify.com');
+
+      expect(result).toEqual({ draft: 4, active: 1, inactive: 0, archive: 0 });
+      expect(mockedStatusCount.updateMany).toHaveBeenCalledWith({
+        where: { shop: 'myshop.myshopify.com', revision: 7 },
+        data: { draft: 4, active: 1, inactive: 0, archive: 0, countedAt: expect.any(Date) },
+      });
+    });
+
+    it('should keep the stored counts if an adjustment raced the recount', async () => {
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      mockStatusCounts({ draft: 5, revision: 7, countedAt: new Date(Date.now() - 60 * 60 * 1000) } as any);
+      mockedPrismaSection.count
+        .mockResolvedValueOnce(0)
+        .mockResolvedValueOnce(0)
+        .mockResolvedValueOnce(0)
+        .mockResolvedValueOnce(0);
+      mockedStatusCount.updateMany.mockResolvedValueOnce({ count: 0 });
+
+      const result = await sectionService.getStatusCounts('myshop.myshopify.com');
+
+      expect(result.draft).toBe(5);
+    });
+  });
+
+  // ============================================================================
+  // STATUS COUNTER MAINTENANCE Tests
+  // ============================================================================
+  describe('status counter maintenance', () => {
+    // eslint-disable-next-line @typescript-eslint/no-explicit-any
+    const mockedTransaction = prisma.$transaction as jest.Mock<any>;
+    const shop = 'myshop.myshopify.com';
+
+    const txMocksFor = (deleted?: Section) => ({
+      conversation: { findUnique: jest.fn().mockResolvedValue(null), findMany: jest.fn().mockResolvedValue([]), delete: jest.fn(), deleteMany: jest.fn() },
+      message: { deleteMany: jest.fn() },
+      usageRecord: { deleteMany: jest.fn() },
+      sectionFeedback: { deleteMany: jest.fn() },
+      failedUsageCharge: { deleteMany: jest.fn() },
+      section: { delete: jest.fn().mockResolvedValue(deleted), deleteMany: jest.fn() },
+    });
+
+    it('should count a created section as draft', async () => {
+      mockedPrismaSection.create.mockResolvedValueOnce(createMockSection());
+
+      await sectionService.create({ shop, prompt: 'Hero', code: '{}' });
+
+      expect(mockedStatusCount.updateMany).toHaveBeenCalledWith({
+        where: { shop },
+        data: { draft: { increment: 1 }, revision: { increment: 1 } },
+      });
+    });
+
+    it('should move the count on archive, conditional on the status read', async () => {
+      mockedPrismaSection.findFirst.mockResolvedValueOnce(createMockSection({ status: SECTION_STATUS.DRAFT }));
+      mockedPrismaSection.update.mockResolvedValueOnce(createMockSection({ status: SECTION_STATUS.ARCHIVE }));
+
+      await sectionService.archive('section-123', shop);
+
+      expect(mockedPrismaSection.update).toHaveBeenCalledWith({
+        where: { id: 'section-123', status: SECTION_STATUS.DRAFT },
+        data: { status: SECTION_STATUS.ARCHIVE },
+      });
+      expect(mockedStatusCount.updateMany).toHaveBeenCalledWith({
+        where: { shop },
+        data: { draft: { increment: -1 }, archive: { increment: 1 }, revision: { increment: 1 } },
+      });
+    });
+
+    it('should re-read and retry once if the status changed concurrently', async () => {
+      mockedPrismaSection.findFirst
+        .mockResolvedValueOnce(createMockSection({ status: SECTION_STATUS.DRAFT }))
+        .mockResolvedValueOnce(createMockSection({ status: SECTION_STATUS.ACTIVE }));
+      mockedPrismaSection.update
+        .mockRejectedValueOnce(Object.assign(new Error('not found'), { code: 'P2025' }))
+        .mockResolvedValueOnce(createMockSection({ status: SECTION_STATUS.ARCHIVE }));
+
+      const result = await sectionService.archive('section-123', shop);
+
+      expect(result?.status).toBe(SECTION_STATUS.ARCHIVE);
+      expect(mockedStatusCount.updateMany).toHaveBeenCalledTimes(1);
+      expect(mockedStatusCount.updateMany).toHaveBeenCalledWith({
+        where: { shop },
+        data: { active: { increment: -1 }, archive: { increment: 1 }, revision: { increment: 1 } },
+      });
+    });
+
+    it('should not touch counters when the status is unchanged', async () => {
+      mockedPrismaSection.findFirst.mockResolvedValueOnce(createMockSection());
+      mockedPrismaSection.update.mockResolvedValueOnce(createMockSection({ name: 'Renamed' }));
+
+      await sectionService.update('section-123', shop, { name: 'Renamed' });
+
+      expect(mockedStatusCount.updateMany).not.toHaveBeenCalled();
+    });
+
+    it('should move the count on restore', async () => {
+      mockedPrismaSection.findFirst.mockResolvedValueOnce(createMockSection({ status: SECTION_STATUS.INACTIVE }));
+      mockedPrismaSection.update.mockResolvedValueOnce(createMockSection({ status: SECTION_STATUS.DRAFT }));
+
+      await sectionService.restore('section-123', shop);
+
+      expect(mockedStatusCount.updateMany).toHaveBeenCalledWith({
+        where: { shop },
+        data: { inactive: { increment: -1 }, draft: { increment: 1 }, revision: { increment: 1 } },
+      });
+    });
+
+    it('should decrement by the deleted section status', async () => {
+      const section = createMockSection({ status: SECTION_STATUS.ARCHIVE });
+      mockedPrismaSection.findFirst.mockResolvedValueOnce(section);
+      mockedTransaction.mockImplementationOnce(async (callback) => callback(txMocksFor(section)));
+
+      await sectionService.delete('section-123', shop);
+
+      expect(mockedStatusCount.updateMany).toHaveBeenCalledWith({
+        where: { shop },
+        data: { archive: { increment: -1 }, revision: { increment: 1 } },
+      });
+    });
+
+    it('should decrement each status on bulk delete', async () => {
+      mockedPrismaSection.findMany.mockResolvedValueOnce([
+        { id: 'section-1', status: SECTION_STATUS.DRAFT },
+        { id: 'section-2', status: SECTION_STATUS.DRAFT },
+        { id: 'section-3', status: SECTION_STATUS.ACTIVE },
+      ]);
+      mockedTransaction.mockImplementationOnce(async (callback) => callback(txMocksFor()));
+
+      await sectionService.bulkDelete(['section-1', 'section-2', 'section-3'], shop);
+
+      expect(mockedStatusCount.updateMany).toHaveBeenCalledWith({
+        where: { shop },
+        data: { draft: { increment: -2 }, active: { increment: -1 }, revision: { increment: 1 } },
+      });
+    });
+
+    it('should drop the counter row if an update fails', async () => {
+      mockedPrismaSection.create.mockResolvedValueOnce(createMockSection());
+      mockedStatusCount.updateMany.mockRejectedValueOnce(new Error('write conflict'));
+      mockedStatusCount.deleteMany.mockResolvedValueOnce({ count: 1 });
+      const consoleSpy = jest.spyOn(console, 'error').mockImplementation(() => {});
+
+      const result = await sectionService.create({ shop, prompt: 'Hero', code: '{}' });
+
+      expect(result.status).toBe(SECTION_STATUS.DRAFT);
+      expect(mockedStatusCount.deleteMany).toHaveBeenCalledWith({ where: { shop } });
+      consoleSpy.mockRestore();
     });
   });
 
@@ -758,7 +1147,7 @@ describe('SectionService', () => {
           usageRecord: { deleteMany: jest.fn() },
           sectionFeedback: { deleteMany: jest.fn() },
           failedUsageCharge: { deleteMany: jest.fn() },
-          section: { delete: jest.fn() },
+          section: { delete: jest.fn().mockResolvedValue(createMockSection()) },
         };
         return callback(tx);
       });
@@ -775,7 +1164,7 @@ describe('SectionService', () => {
         usageRecord: { deleteMany: jest.fn() },
         sectionFeedback: { deleteMany: jest.fn() },
         failedUsageCharge: { deleteMany: jest.fn() },
-        section: { delete: jest.fn() },
+        section: { delete: jest.fn().mockResolvedValue(mockSection) },
       };
       mockedTransaction.mockImplementationOnce(async (callback) => callback(txMocks));
 
@@ -802,7 +1191,7 @@ describe('SectionService', () => {
         usageRecord: { deleteMany: jest.fn() },
         sectionFeedback: { deleteMany: jest.fn() },
         failedUsageCharge: { deleteMany: jest.fn() },
-        section: { delete: jest.fn() },
+        section: { delete: jest.fn().mockResolvedValue(mockSection) },
       };
       mockedTransaction.mockImplementationOnce(async (callback) => callback(txMocks));
 
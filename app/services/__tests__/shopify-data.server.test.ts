@@ -0,0 +1,77 @@
+// @jest-environment node
+import { ShopifyDataService } from "../shopify-data.server";
+import { ResourceCache } from "../resource-cache.server";
+import { createFakeAdminGraphql } from "../mocks/fake-admin-graphql";
+
+jest.mock("../../shopify.server", () => ({
+  authenticate: { admin: jest.fn() },
+}));
+
+describe("ShopifyDataService", () => {
+  const request = new Request("https://app.local/app/api/resource");
+
+  const makeService = (shop = "shop-a.myshopify.com") => {
+    const fake = createFakeAdminGraphql({ shop });
+    const cache = new ResourceCache({ maxBytes: 1024 * 1024, freshMs: 60_000, staleMs: 60_000 });
+    const service = new ShopifyDataService({ cache, resolveAdmin: fake.resolveAdmin });
+    return { fake, cache, service };
+  };
+
+  it("should cache products per shop", async () => {
+    const { fake, service } = makeService();
+
+    const first = await service.getProduct(request, "1");
+    const second = await service.getProduct(request, "gid://shopify/Product/1");
+
+    expect(first?.handle).toBe("product-1");
+    expect(second).toEqual(first);
+    expect(fake.calls.GetProduct).toBe(1);
+  });
+
+  it("should not share entries between shops", async () => {
+    const a = createFakeAdminGraphql({ shop: "shop-a.myshopify.com" });
+    const b = createFakeAdminGraphql({ shop: "shop-b.myshopify.com" });
+    const cache = new ResourceCache({ maxBytes: 1024 * 1024, freshMs: 60_000, staleMs: 60_000 });
+
+    await new ShopifyDataService({ cache, resolveAdmin: a.resolveAdmin }).getShop(request);
+    await new ShopifyDataService({ cache, resolveAdmin: b.resolveAdmin }).getShop(request);
+
+    expect(a.calls.GetShop).toBe(1);
+    expect(b.calls.GetShop).toBe(1);
+  });
+
+  it("should resolve mixed resources in one nodes query", async () => {
+    const { fake, service } = makeService();
+    const ids = [
+      "gid://shopify/Product/1",
+      "gid://shopify/Collection/2",
+      "gid://shopify/Article/3",
+    ];
+
+    const result = await service.getResources(request, ids);
+
+    expect(fake.calls.GetNodes).toBe(1);
+    expect(fake.totalCalls()).toBe(1);
+    expect(result["gid://shopify/Product/1"]).toMatchObject({ handle: "product-1" });
+    expect(result["gid://shopify/Collection/2"]).toMatchObject({ handle: "collection-2" });
+    expect(result["gid://shopify/Article/3"]).toMatchObject({ handle: "article-3" });
+  });
+
+  it("should share cache entries between batched and single lookups", async () => {
+    const { fake, service } = makeService();
+
+    await service.getResources(request, ["gid://shopify/Product/5"]);
+    await service.getProduct(request, "5");
+
+    expect(fake.calls.GetProduct).toBeUndefined();
+  });
+
+  it("should return null for unsupported ids without querying", async () => {
+    const { fake, service } = makeService();
+
+    const result = await service.getResources(request, ["gid://shopify/Page/1"]);
+
+    expect(result["gid://shopify/Page/1"]).toBeNull();
+    expect(fake.totalCalls()).toBe(0);
+  });
+});
@@ -429,4 +429,74 @@ describe("StorefrontAuthService", () => {
       consoleWarnSpy.mockRestore();
     });
   });
+
+  describe("password changes", () => {
+    async function cacheRender(shop: string) {
+      const { getOrRenderPreview } = await import("../preview-render-cache.server");
+      await getOrRenderPreview(shop, { code: "<div></div>" }, async () => ({
+        html: "<div></div>",
+        mode: "native",
+      }));
+    }
+
+    it("should drop the shop's cached preview renders when a password is saved", async () => {
+      const { validateAndSaveStorefrontPassword } = await import(
+        "../storefront-auth.server"
+      );
+      const { getPreviewRenderCacheStats } = await import(
+        "../preview-render-cache.server"
+      );
+      await cacheRender(TEST_SHOP);
+      await cacheRender("other-shop.myshopify.com");
+
+      mockFetch.mockResolvedValueOnce({
+        status: 302,
+        headers: {
+          getSetCookie: () => ["_shopify_essential=saved; Path=/"],
+          get: () => null,
+        },
+      });
+
+      const result = await validateAndSaveStorefrontPassword(TEST_SHOP, TEST_PASSWORD);
+
+      expect(result.success).toBe(true);
+      expect(getPreviewRenderCacheStats().entries).toBe(1);
+    });
+
+    it("should keep cached renders when the password is rejected", async () => {
+      const { validateAndSaveStorefrontPassword } = await import(
+        "../storefront-auth.server"
+      );
+      const { getPreviewRenderCacheStats } = await import(
+        "../preview-render-cache.server"
+      );
+      await cacheRender(TEST_SHOP);
+
+      mockFetch.mockResolvedValueOnce({
+        status: 200,
+        headers: {
+          getSetCookie: () => [],
+          get: () => null,
+        },
+      });
+
+      await validateAndSaveStorefrontPassword(TEST_SHOP, "wrong-password");
+
+      expect(getPreviewRenderCacheStats().entries).toBe(1);
+    });
+
+    it("should drop cached renders when the password is cleared", async () => {
+      const { clearStorefrontPasswordAndCache } = await import(
+        "../storefront-auth.server"
+      );
+      const { getPreviewRenderCacheStats } = await import(
+        "../preview-render-cache.server"
+      );
+      await cacheRender(TEST_SHOP);
+
+      await clearStorefrontPasswordAndCache(TEST_SHOP);
+
+      expect(getPreviewRenderCacheStats().entries).toBe(0);
+    });
+  });
 });
@@ -4,7 +4,11 @@ import type {
   MockArticle,
   MockShop
 } from '../../components/preview/mockData/types';
-import { shopifyDataService, type ArticleListItem } from '../shopify-data.server';
+import {
+  shopifyDataService,
+  type ArticleListItem,
+  type BatchResource
+} from '../shopify-data.server';
 
 /**
  * Adapter interface for Shopify data fetching
@@ -14,8 +18,9 @@ export interface ShopifyDataAdapterInterface {
   getCollection(request: Request, collectionId: string): Promise<MockCollection | null>;
   getArticle(request: Request, articleId: string): Promise<MockArticle | null>;
   getArticles(request: Request, limit?: number): Promise<ArticleListItem[]>;
+  getResources(request: Request, ids: string[]): Promise<Record<string, BatchResource | null>>;
   getShop(request: Request): Promise<MockShop | null>;
-  clearCache(): void;
+  clearCache(shop?: string): void;
 }
 
 /**
@@ -59,6 +64,15 @@ class ShopifyDataAdapter implements ShopifyDataAdapterInterface {
     return shopifyDataService.getArticles(request, limit);
   }
 
+  /**
+   * Fetch several resources in one batched lookup
+   * @param request - The current request for authentication
+   * @param ids - Product/collection/article GIDs
+   */
+  async getResources(request: Request, ids: string[]): Promise<Record<string, BatchResource | null>> {
+    return shopifyDataService.getResources(request, ids);
+  }
+
   /**
    * Fetch shop data
    * @param request - The current request for authentication
@@ -68,10 +82,10 @@ class ShopifyDataAdapter implements ShopifyDataAdapterInterface {
   }
 
   /**
-   * Clear all cached data
+   * Clear cached data for a shop (or all shops)
    */
-  clearCache(): void {
-    shopifyDataService.clearCache();
+  clearCache(shop?: string): void {
+    shopifyDataService.clearCache(shop);
   }
 }
 
@@ -405,6 +405,14 @@ export class AIService implements AIServiceInterface {
     }
   }
 
+  /**
+   * Swap the Gemini client (local stand-ins for benchmarks and tests)
+   * Pass null to fall back to mock mode.
+   */
+  useClient(client: GoogleGenerativeAI | null): void {
+    this.genAI = client;
+  }
+
   async generateSection(prompt: string): Promise<string> {
     if (!this.genAI) {
       return this.getMockSection(prompt);
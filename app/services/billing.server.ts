@@ -7,6 +7,7 @@
 
 import type { AdminApiContext } from "@shopify/shopify-app-react-router/server";
 import prisma from "../db.server";
+import { getEntitlement, invalidateEntitlement } from "./entitlement.server";
 import type {
   CreateSubscriptionInput,
   CreateSubscriptionResult,
@@ -148,6 +149,7 @@ export async function createSubscription(
       overagesThisCycle: 0,
     },
   });
+  await invalidateEntitlement(shop);
 
   return {
     confirmationUrl: result.confirmationUrl,
@@ -201,10 +203,15 @@ export async function cancelSubscription(admin: AdminApiContext, shop: string) {
     },
     data: { status: "cancelled" },
   });
+  await invalidateEntitlement(shop);
 }
 
 /**
  * Record usage charge (for generation overages)
+ *
+ * Pass a stable `idempotencyKey` when the call may be retried (outbox worker):
+ * a repeat call replays the existing usage record instead of counting twice,
+ * and re-sends a failed charge to Shopify under the same key.
  */
 export async function recordUsage(
   admin: AdminApiContext,
@@ -219,13 +226,23 @@ export async function recordUsage(
     throw new Error("No active subscription found");
   }
 
+  if (input.idempotencyKey) {
+    const existing = await prisma.usageRecord.findUnique({
+      where: { idempotencyKey: input.idempotencyKey },
+    });
+
+    if (existing) {
+      return await replayUsageRecord(admin, subscription, existing);
+    }
+  }
+
   // Check if generation is within included quota or overage
   const isOverage = subscription.usageThisCycle >= subscription.includedQuota;
   const amount = customAmount ?? (isOverage ? subscription.overagePrice : 0);
 
   // Generate idempotency key (prevents duplicate charges)
   const timestamp = Date.now();
-  const idempotencyKey = `${shop}-${sectionId}-${timestamp}`;
+  const idempotencyKey = input.idempotencyKey ?? `${shop}-${sectionId}-${timestamp}`;
 
   // Save usage record locally first
   const usageRecord = await prisma.usageRecord.create({
@@ -253,6 +270,7 @@ export async function recordUsage(
       where: { id: subscription.id },
       data: { usageThisCycle: { increment: 1 } },
     });
+    await invalidateEntitlement(shop);
 
     return {
       usageRecordId: usageRecord.id,
@@ -264,112 +282,7 @@ export async function recordUsage(
 
   // Send usage charge to Shopify (for overages)
   try {
-    // Get or fetch usage line item ID
-    let usageLineItemId = subscription.usageLineItemId;
-
-    if (!usageLineItemId) {
-      // Query Shopify to get the correct usage line item ID
-      const query = `
-        query getSubscription($id: ID!) {
-          appSubscription(id: $id) {
-            lineItems {
-              id
-              plan {
-                pricingDetails {
-                  __typename
-                }
-              }
-            }
-          }
-        }
-      `;
-
-      const queryResponse = await admin.graphql(query, {
-        variables: { id: subscription.shopifySubId }
-      });
-
-      const queryData = await queryResponse.json();
-      const lineItems = queryData.data.appSubscription.lineItems;
-
-      // Find usage line item (AppUsagePricing type)
-      interface LineItem {
-        id: string;
-        plan: {
-          pricingDetails: {
-            __typename: string;
-          };
-        };
-      }
-      const usageLineItem = lineItems.find(
-        (item: LineItem) => item.plan.pricingDetails.__typename === "AppUsagePricing"
-      );
-
-      if (!usageLineItem) {
-        throw new Error("Usage line item not found in subscription");
-      }
-
-      usageLineItemId = usageLineItem.id;
-
-      // Cache the line item ID for future use
-      await prisma.subscription.update({
-        where: { id: subscription.id },
-        data: { usageLineItemId }
-      });
-    }
-
-    const mutation = `
-      mutation appUsageRecordCreate($subscriptionLineItemId: ID!, $price: MoneyInput!, $description: String!, $idempotencyKey: String!) {
-        appUsageRecordCreate(
-          subscriptionLineItemId: $subscriptionLineItemId
-          price: $price
-          description: $description
-          idempotencyKey: $idempotencyKey
-        ) {
-          appUsageRecord {
-            id
-          }
-          userErrors {
-            field
-            message
-          }
-        }
-      }
-    `;
-
-    const response = await admin.graphql(mutation, {
-      variables: {
-        subscriptionLineItemId: usageLineItemId,
-        price: { amount, currencyCode: "USD" },
-        description,
-        idempotencyKey,
-      },
-    });
-
-    const data = await response.json();
-    const result = data.data.appUsageRecordCreate;
-
-    if (result.userErrors && result.userErrors.length > 0) {
-      // Update record with error
-      await prisma.usageRecord.update({
-        where: { id: usageRecord.id },
-        data: {
-          chargeStatus: "error",
-          errorMessage: result.userErrors[0].message,
-        },
-      });
-
-      throw new Error(`Failed to record usage: ${result.userErrors[0].message}`);
-    }
-
-    // Update record with Shopify charge ID
-    await prisma.usageRecord.update({
-      where: { id: usageRecord.id },
-      data: {
-        shopifyChargeId: result.appUsageRecord.id,
-        chargeStatus: "accepted",
-        sentAt: new Date(),
-      },
-    });
+    const shopifyChargeId = await sendUsageCharge(admin, subscription, usageRecord);
 
     // Increment usage and overage counters
     await prisma.subscription.update({
@@ -379,10 +292,11 @@ export async function recordUsage(
         overagesThisCycle: { increment: 1 },
       },
     });
+    await invalidateEntitlement(shop);
 
     return {
       usageRecordId: usageRecord.id,
-      shopifyChargeId: result.appUsageRecord.id,
+      shopifyChargeId,
       amount,
       chargeStatus: "accepted",
     };
@@ -406,6 +320,7 @@ export async function recordUsage(
         overagesThisCycle: isOverage ? { increment: 1 } : undefined,
       },
     });
+    await invalidateEntitlement(shop);
 
     return {
       usageRecordId: usageRecord.id,
@@ -416,76 +331,200 @@ export async function recordUsage(
   }
 }
 
+type ActiveSubscription = NonNullable<Awaited<ReturnType<typeof getSubscription>>>;
+type UsageRecordRow = Awaited<ReturnType<typeof prisma.usageRecord.create>>;
+
 /**
- * Check quota before generation
+ * Return an already-recorded usage charge, re-sending it to Shopify if it failed.
+ * Counters were incremented when the record was first created, so they are left alone.
  */
-export async function checkQuota(shop: string): Promise<QuotaCheck> {
-  const subscription = await getSubscription(shop);
+async function replayUsageRecord(
+  admin: AdminApiContext,
+  subscription: ActiveSubscription,
+  usageRecord: UsageRecordRow,
+): Promise<RecordUsageResult> {
+  if (usageRecord.chargeStatus === "accepted" || usageRecord.amount === 0) {
+    return {
+      usageRecordId: usageRecord.id,
+      shopifyChargeId: usageRecord.shopifyChargeId,
+      amount: usageRecord.amount,
+      chargeStatus: "accepted",
+    };
+  }
 
-  // No subscription = free tier with limits from database
-  if (!subscription) {
-    const freePlan = await prisma.planConfiguration.findUnique({
-      where: { planName: "free" },
-    });
-    const freeQuota = freePlan?.includedQuota ?? 5;
-
-    // Count from GenerationLog (immutable, survives section deletion)
-    const startOfMonth = new Date();
-    startOfMonth.setDate(1);
-    startOfMonth.setHours(0, 0, 0, 0);
-
-    // Primary: Count GenerationLog
-    let freeUsageCount = await prisma.generationLog.count({
-      where: {
-        shop,
-        generatedAt: { gte: startOfMonth },
+  try {
+    const shopifyChargeId = await sendUsageCharge(admin, subscription, usageRecord);
+
+    return {
+      usageRecordId: usageRecord.id,
+      shopifyChargeId,
+      amount: usageRecord.amount,
+      chargeStatus: "accepted",
+    };
+  } catch (error) {
+    console.error("Failed to re-send usage charge to Shopify:", error);
+
+    await prisma.usageRecord.update({
+      where: { id: usageRecord.id },
+      data: {
+        chargeStatus: "error",
+        errorMessage: error instanceof Error ? error.message : "Unknown error",
       },
     });
 
-    // Fallback: If no GenerationLog exists yet (migration period),
-    // use Section.count as before
-    if (freeUsageCount === 0) {
-      // Check if shop has ANY GenerationLog records (not just this month)
-      // Only fall back to Section.count if truly in migration mode
-      const hasAnyLogs = await prisma.generationLog.count({
-        where: { shop },
-      });
-      if (hasAnyLogs === 0) {
-        // Legacy shop - no GenerationLog ever, use Section.count
-        const legacyCount = await prisma.section.count({
-          where: {
-            shop,
-            createdAt: { gte: startOfMonth },
-          },
-        });
-        freeUsageCount = legacyCount;
+    return {
+      usageRecordId: usageRecord.id,
+      shopifyChargeId: null,
+      amount: usageRecord.amount,
+      chargeStatus: "error",
+    };
+  }
+}
+
+/**
+ * Create the Shopify usage charge for a local usage record
+ * Shopify deduplicates on the record's idempotency key, so re-sending is safe.
+ * Returns the Shopify charge ID; throws on API or user errors.
+ */
+async function sendUsageCharge(
+  admin: AdminApiContext,
+  subscription: ActiveSubscription,
+  usageRecord: UsageRecordRow,
+): Promise<string> {
+  // Get or fetch usage line item ID
+  let usageLineItemId = subscription.usageLineItemId;
+
+  if (!usageLineItemId) {
+    // Query Shopify to get the correct usage line item ID
+    const query = `
+      query getSubscription($id: ID!) {
+        appSubscription(id: $id) {
+          lineItems {
+            id
+            plan {
+              pricingDetails {
+                __typename
+              }
+            }
+          }
+        }
       }
-      // If hasAnyLogs > 0 but freeUsageCount is 0, shop has history
-      // from previous months but zero this month - don't fall back
+    `;
+
+    const queryResponse = await admin.graphql(query, {
+      variables: { id: subscription.shopifySubId }
+    });
+
+    const queryData = await queryResponse.json();
+    const lineItems = queryData.data.appSubscription.lineItems;
+
+    // Find usage line item (AppUsagePricing type)
+    interface LineItem {
+      id: string;
+      plan: {
+        pricingDetails: {
+          __typename: string;
+        };
+      };
+    }
+    const usageLineItem = lineItems.find(
+      (item: LineItem) => item.plan.pricingDetails.__typename === "AppUsagePricing"
+    );
+
+    if (!usageLineItem) {
+      throw new Error("Usage line item not found in subscription");
     }
 
+    usageLineItemId = usageLineItem.id as string;
+
+    // Cache the line item ID for future use
+    await prisma.subscription.update({
+      where: { id: subscription.id },
+      data: { usageLineItemId }
+    });
+  }
+
+  const mutation = `
+    mutation appUsageRecordCreate($subscriptionLineItemId: ID!, $price: MoneyInput!, $description: String!, $idempotencyKey: String!) {
+      appUsageRecordCreate(
+        subscriptionLineItemId: $subscriptionLineItemId
+        price: $price
+        description: $description
+        idempotencyKey: $idempotencyKey
+      ) {
+        appUsageRecord {
+          id
+        }
+        userErrors {
+          field
+          message
+        }
+      }
+    }
+  `;
+
+  const response = await admin.graphql(mutation, {
+    variables: {
+      subscriptionLineItemId: usageLineItemId,
+      price: { amount: usageRecord.amount, currencyCode: "USD" },
+      description: usageRecord.description,
+      idempotencyKey: usageRecord.idempotencyKey,
+    },
+  });
+
+  const data = await response.json();
+  const result = data.data.appUsageRecordCreate;
+
+  if (result.userErrors && result.userErrors.length > 0) {
+    throw new Error(`Failed to record usage: ${result.userErrors[0].message}`);
+  }
+
+  // Update record with Shopify charge ID
+  await prisma.usageRecord.update({
+    where: { id: usageRecord.id },
+    data: {
+      shopifyChargeId: result.appUsageRecord.id,
+      chargeStatus: "accepted",
+      sentAt: new Date(),
+      errorMessage: null,
+    },
+  });
+
+  return result.appUsageRecord.id;
+}
+
+/**
+ * Check quota before generation
+ * Reads the cached entitlement (free tier usage comes from GenerationLog)
+ */
+export async function checkQuota(shop: string): Promise<QuotaCheck> {
+  const entitlement = await getEntitlement(shop);
+  const { subscription, usageThisCycle, includedQuota, overagesThisCycle } = entitlement;
+
+  // No subscription = free tier with limits from database
+  if (!subscription) {
     return {
-      hasQuota: freeUsageCount < freeQuota,
+      hasQuota: usageThisCycle < includedQuota,
       subscription: null,
-      usageThisCycle: freeUsageCount,
-      includedQuota: freeQuota,
+      usageThisCycle,
+      includedQuota,
       overagesThisCycle: 0,
       overagesRemaining: 0,
-      percentUsed: Math.min((freeUsageCount / freeQuota) * 100, 100),
+      percentUsed: Math.min((usageThisCycle / includedQuota) * 100, 100),
     };
   }
 
   const maxOverages = Math.floor(subscription.cappedAmount / subscription.overagePrice);
-  const overagesRemaining = maxOverages - subscription.overagesThisCycle;
-  const hasQuota = subscription.usageThisCycle < subscription.includedQuota || overagesRemaining > 0;
-  const percentUsed = (subscription.usageThisCycle / (subscription.includedQuota + maxOverages)) * 100;
+  const overagesRemaining = maxOverages - overagesThisCycle;
+  const hasQuota = usageThisCycle < includedQuota || overagesRemaining > 0;
+  const percentUsed = (usageThisCycle / (includedQuota + maxOverages)) * 100;
 
   return {
     hasQuota,
     subscription,
-    usageThisCycle: subscription.usageThisCycle,
-    includedQuota: subscription.includedQuota,
-    overagesThisCycle: subscription.overagesThisCycle,
+    usageThisCycle,
+    includedQuota,
+    overagesThisCycle,
     overagesRemaining,
     percentUsed: Math.min(percentUsed, 100),
   };
@@ -494,6 +533,7 @@ export async function checkQuota(shop: string): Promise<QuotaCheck> {
 /**
  * Get active subscription for shop (filters by status)
  * Note: Shopify sends uppercase status ("ACTIVE"), but our type uses lowercase
+ * Uncached: read paths should use getEntitlement(shop).subscription instead
  */
 export async function getSubscription(shop: string) {
   return await prisma.subscription.findFirst({
@@ -533,10 +573,12 @@ export async function updateSubscriptionStatus(shopifySubId: string, status: Sub
     updateData.overagesThisCycle = 0;
   }
 
-  return await prisma.subscription.update({
+  const subscription = await prisma.subscription.update({
     where: { shopifySubId },
     data: updateData,
   });
+  await invalidateEntitlement(subscription.shop);
+  return subscription;
 }
 
 /**
@@ -1,6 +1,55 @@
 import prisma from "../db.server";
 import type { UIMessage, ModelMessage } from "../types/chat.types";
-import type { Message, Conversation } from "@prisma/client";
+import type { ConversationContext } from "../types/ai.types";
+import type { Message, Conversation, Prisma } from "@prisma/client";
+import { extractSummaryTopics, formatConversationSummary } from "../utils/context-builder";
+
+// Messages sent verbatim with each turn; older ones live in the rolling summary
+export const CONTEXT_WINDOW_SIZE = 10;
+
+// Bump when the derived context fields change meaning (forces a lazy rebuild)
+const CONTEXT_VERSION = 1;
+
+// Older messages scanned for summary topics when rebuilding context state
+const SUMMARY_REBUILD_LIMIT = 40;
+
+/**
+ * Conversation without messages, for authorization and metadata lookups
+ */
+export type ConversationHeader = Pick<
+  Conversation,
+  "id" | "sectionId" | "shop" | "title" | "messageCount" | "isArchived" | "refinementCount"
+>;
+
+const CONVERSATION_HEADER_SELECT = {
+  id: true,
+  sectionId: true,
+  shop: true,
+  title: true,
+  messageCount: true,
+  isArchived: true,
+  refinementCount: true,
+} as const;
+
+interface ContextState {
+  contextVersion: number | null;
+  contextMessageCount: number | null;
+  latestCodeSnapshot: string | null;
+  summaryTopics: string[];
+  summarizedRequestCount: number | null;
+}
+
+const CONTEXT_STATE_SELECT = {
+  contextVersion: true,
+  contextMessageCount: true,
+  latestCodeSnapshot: true,
+  summaryTopics: true,
+  summarizedRequestCount: true,
+} as const;
+
+function isObjectId(id: string): boolean {
+  return /^[a-fA-F0-9]{24}$/.test(id);
+}
 
 /**
  * ChatService handles conversation persistence and message management
@@ -18,7 +67,14 @@ export class ChatService {
 
     if (!conversation) {
       conversation = await prisma.conversation.create({
-        data: { sectionId, shop },
+        data: {
+          sectionId,
+          shop,
+          contextVersion: CONTEXT_VERSION,
+          contextMessageCount: 0,
+          refinementCount: 0,
+          summarizedRequestCount: 0,
+        },
         include: { messages: true }
       });
     }
@@ -27,15 +83,62 @@ export class ChatService {
   }
 
   /**
-   * Get conversation by ID
+   * Get conversation by ID (no messages; use getMessages/getMessage for those)
    */
-  async getConversation(conversationId: string): Promise<(Conversation & { messages: Message[] }) | null> {
+  async getConversation(conversationId: string): Promise<ConversationHeader | null> {
     return prisma.conversation.findUnique({
       where: { id: conversationId },
-      include: { messages: { orderBy: { createdAt: 'asc' } } }
+      select: CONVERSATION_HEADER_SELECT,
     });
   }
 
+  /**
+   * Get a single message, only if it belongs to the conversation
+   */
+  async getMessage(conversationId: string, messageId: string): Promise<Message | null> {
+    if (!isObjectId(messageId)) return null;
+    return prisma.message.findFirst({
+      where: { id: messageId, conversationId },
+    });
+  }
+
+  /**
+   * Build AI context for the next turn from stored state:
+   * rolling summary + cached latest code + the last CONTEXT_WINDOW_SIZE messages.
+   * Cost is independent of conversation length.
+   */
+  async getConversationContext(
+    conversationId: string,
+    currentCode?: string,
+    tokenBudget?: number
+  ): Promise<ConversationContext> {
+    const [stored, recentMessages] = await Promise.all([
+      prisma.conversation.findUnique({
+        where: { id: conversationId },
+        select: CONTEXT_STATE_SELECT,
+      }),
+      this.getContextMessages(conversationId, CONTEXT_WINDOW_SIZE),
+    ]);
+
+    const state = stored && stored.contextVersion !== CONTEXT_VERSION
+      ? await this.rebuildContextState(conversationId)
+      : stored;
+
+    const summaryTopics = state?.summaryTopics ?? [];
+    const summarizedRequests = state?.summarizedRequestCount ?? 0;
+
+    return {
+      currentCode: currentCode || state?.latestCodeSnapshot || undefined,
+      recentMessages: recentMessages
+        .filter(m => m.role === 'user' || m.role === 'assistant')
+        .map(m => ({ role: m.role as 'user' | 'assistant', content: m.content })),
+      summarizedHistory: summaryTopics.length > 0 || summarizedRequests > 0
+        ? formatConversationSummary(summaryTopics, summarizedRequests)
+        : undefined,
+      tokenBudget,
+    };
+  }
+
   /**
    * Add user message to conversation
    */
@@ -48,10 +151,7 @@ export class ChatService {
       }
     });
 
-    await prisma.conversation.update({
-      where: { id: conversationId },
-      data: { messageCount: { increment: 1 }, updatedAt: new Date() }
-    });
+    await this.recordContextMessage(conversationId, 'user');
 
     return this.toUIMessage(message);
   }
@@ -65,7 +165,8 @@ export class ChatService {
     content: string,
     codeSnapshot?: string,
     tokenCount?: number,
-    modelId?: string
+    modelId?: string,
+    outboxJob?: (messageId: string) => Prisma.OutboxJobCreateInput
   ): Promise<UIMessage> {
     // DUPLICATE PREVENTION: Check if assistant already responded to last user message
     const existingAssistant = await this.checkForExistingAssistantResponse(conversationId);
@@ -74,25 +175,26 @@ export class ChatService {
       return existingAssistant;
     }
 
-    const message = await prisma.message.create({
-      data: {
-        conversationId,
-        role: 'assistant',
-        content,
-        codeSnapshot,
-        tokenCount,
-        modelId,
-      }
-    });
+    const data = {
+      conversationId,
+      role: 'assistant',
+      content,
+      codeSnapshot,
+      tokenCount,
+      modelId,
+    };
 
-    await prisma.conversation.update({
-      where: { id: conversationId },
-      data: {
-        messageCount: { increment: 1 },
-        totalTokens: tokenCount ? { increment: tokenCount } : undefined,
-        updatedAt: new Date()
-      }
-    });
+    // With an outbox job (generation log + usage charge), both are written
+    // together so a saved generation is never left untracked
+    const message = outboxJob
+      ? await prisma.$transaction(async (tx) => {
+          const created = await tx.message.create({ data });
+          await tx.outboxJob.create({ data: outboxJob(created.id) });
+          return created;
+        })
+      : await prisma.message.create({ data });
+
+    await this.recordContextMessage(conversationId, 'assistant', codeSnapshot, tokenCount);
 
     return this.toUIMessage(message);
   }
@@ -214,10 +316,7 @@ export class ChatService {
       }
     });
 
-    await prisma.conversation.update({
-      where: { id: conversationId },
-      data: { messageCount: { increment: 1 }, updatedAt: new Date() }
-    });
+    await this.recordContextMessage(conversationId, 'assistant', code);
 
     return {
       ...this.toUIMessage(message),
@@ -246,6 +345,115 @@ export class ChatService {
     return undefined;
   }
 
+  /**
+   * Update counters and context state after a non-error message is written.
+   * Derived state only: failures are logged and repaired by the next rebuild.
+   */
+  private async recordContextMessage(
+    conversationId: string,
+    role: 'user' | 'assistant',
+    codeSnapshot?: string,
+    tokenCount?: number
+  ): Promise<void> {
+    const state = await prisma.conversation.update({
+      where: { id: conversationId },
+      data: {
+        messageCount: { increment: 1 },
+        contextMessageCount: { increment: 1 },
+        refinementCount: role === 'assistant' ? { increment: 1 } : undefined,
+        latestCodeSnapshot: codeSnapshot || undefined,
+        totalTokens: tokenCount ? { increment: tokenCount } : undefined,
+        updatedAt: new Date()
+      },
+      select: CONTEXT_STATE_SELECT,
+    });
+
+    try {
+      if (state?.contextVersion !== CONTEXT_VERSION) {
+        // Conversation predates the context fields: derive them once from messages
+        await this.rebuildContextState(conversationId);
+      } else if ((state.contextMessageCount ?? 0) > CONTEXT_WINDOW_SIZE) {
+        await this.foldIntoSummary(conversationId, state);
+      }
+    } catch (error) {
+      console.error('[ChatService] Failed to update conversation context:', error);
+    }
+  }
+
+  /**
+   * Fold the message that just left the recent window into the rolling summary
+   */
+  private async foldIntoSummary(conversationId: string, state: ContextState): Promise<void> {
+    const [dropped] = await prisma.message.findMany({
+      where: { conversationId, isError: false },
+      orderBy: { createdAt: 'desc' },
+      skip: CONTEXT_WINDOW_SIZE,
+      take: 1,
+      select: { role: true, content: true },
+    });
+    if (!dropped) return;
+
+    const topics = new Set(state.summaryTopics ?? []);
+    const knownTopics = topics.size;
+    for (const topic of extractSummaryTopics(dropped.content)) topics.add(topic);
+
+    const isRequest = dropped.role === 'user';
+    if (topics.size === knownTopics && !isRequest) return;
+
+    await prisma.conversation.update({
+      where: { id: conversationId },
+      data: {
+        summaryTopics: [...topics],
+        summarizedRequestCount: isRequest ? { increment: 1 } : undefined,
+      },
+    });
+  }
+
+  /**
+   * Recompute context state from messages (legacy conversations, version bumps)
+   */
+  private async rebuildContextState(conversationId: string): Promise<ContextState> {
+    const visible = { conversationId, isError: false };
+    const [contextMessageCount, refinementCount, requestCount, latest, window, older] = await Promise.all([
+      prisma.message.count({ where: visible }),
+      prisma.message.count({ where: { ...visible, role: 'assistant' } }),
+      prisma.message.count({ where: { ...visible, role: 'user' } }),
+      prisma.message.findFirst({
+        where: { ...visible, codeSnapshot: { not: null } },
+        orderBy: { createdAt: 'desc' },
+        select: { codeSnapshot: true },
+      }),
+      prisma.message.findMany({
+        where: visible,
+        orderBy: { createdAt: 'desc' },
+        take: CONTEXT_WINDOW_SIZE,
+        select: { role: true },
+      }),
+      prisma.message.findMany({
+        where: visible,
+        orderBy: { createdAt: 'desc' },
+        skip: CONTEXT_WINDOW_SIZE,
+        take: SUMMARY_REBUILD_LIMIT,
+        select: { content: true },
+      }),
+    ]);
+
+    const state: ContextState = {
+      contextVersion: CONTEXT_VERSION,
+      contextMessageCount,
+      latestCodeSnapshot: latest?.codeSnapshot ?? null,
+      summaryTopics: [...new Set(older.flatMap(m => extractSummaryTopics(m.content)))],
+      summarizedRequestCount: requestCount - window.filter(m => m.role === 'user').length,
+    };
+
+    await prisma.conversation.update({
+      where: { id: conversationId },
+      data: { ...state, refinementCount },
+    });
+
+    return state;
+  }
+
   /**
    * Convert Prisma Message to UIMessage
    */
@@ -0,0 +1,268 @@
+/**
+ * Entitlement Service
+ *
+ * One consolidated, cached view of what a shop may do: plan, feature flags,
+ * quota, usage this cycle and cycle start. Feature gates, quota checks and
+ * usage analytics read from it instead of querying Subscription and
+ * PlanConfiguration on every call.
+ *
+ * - In-process, bounded by shop count with LRU eviction
+ * - Local writes (billing, webhooks, outbox) call invalidateEntitlement(),
+ *   which drops the entry and bumps the shop's EntitlementVersion
+ * - Other instances notice the bump: an entry older than VERSION_CHECK_MS is
+ *   revalidated with a single indexed version read before being served
+ * - Concurrent misses for the same shop share one load
+ */
+
+import type { Subscription } from "@prisma/client";
+import prisma from "../db.server";
+import { LruCache } from "../utils/lru-cache.server";
+import type { FeatureFlag, PlanTier } from "../types/billing";
+
+export interface Entitlement {
+  shop: string;
+  planName: PlanTier;
+  /** Active subscription, null on the free tier */
+  subscription: Subscription | null;
+  featureFlags: FeatureFlag[];
+  includedQuota: number;
+  usageThisCycle: number;
+  overagesThisCycle: number;
+  /** Start of the current cycle (calendar month on the free tier) */
+  cycleStart: Date;
+}
+
+export interface EntitlementCacheStats {
+  hits: number;
+  revalidated: number;
+  misses: number;
+  coalesced: number;
+  invalidations: number;
+  evictions: number;
+  entries: number;
+}
+
+interface CachedEntitlement {
+  value: Entitlement;
+  version: number;
+  checkedAt: number;
+}
+
+const MAX_SHOPS = Number(process.env.ENTITLEMENT_CACHE_MAX_SHOPS) || 5000;
+
+// Served without any query for this long after a load or version check
+const VERSION_CHECK_MS = 5 * 1000;
+
+// Hard expiry, so cycle rollovers are picked up even without a write
+const ENTITLEMENT_TTL_MS = 10 * 60 * 1000;
+
+const FREE_TIER_QUOTA = 5;
+const CYCLE_MS = 30 * 24 * 60 * 60 * 1000;
+
+const stats = { hits: 0, revalidated: 0, misses: 0, coalesced: 0, invalidations: 0, evictions: 0 };
+
+// Entries are all roughly the same size, so the cache is bounded by count
+const entitlements = new LruCache<CachedEntitlement>({
+  maxBytes: MAX_SHOPS,
+  ttlMs: ENTITLEMENT_TTL_MS,
+  sizeOf: () => 1,
+  onEvict: () => {
+    stats.evictions++;
+  },
+});
+
+const inFlight = new Map<string, Promise<Entitlement>>();
+
+function isUniqueViolation(error: unknown): boolean {
+  return (error as { code?: string } | null)?.code === "P2002";
+}
+
+function getStartOfMonth(): Date {
+  const start = new Date();
+  start.setDate(1);
+  start.setHours(0, 0, 0, 0);
+  return start;
+}
+
+async function readVersion(shop: string): Promise<number> {
+  const row = await prisma.entitlementVersion.findUnique({
+    where: { shop },
+    select: { version: true },
+  });
+  return row?.version ?? 0;
+}
+
+/**
+ * Free tier usage this month, from GenerationLog (survives section deletion)
+ * Shops that predate GenerationLog fall back to counting sections.
+ */
+async function countFreeUsage(shop: string, startOfMonth: Date): Promise<number> {
+  const usage = await prisma.generationLog.count({
+    where: {
+      shop,
+      generatedAt: { gte: startOfMonth },
+    },
+  });
+  if (usage > 0) return usage;
+
+  // Zero this month: only fall back if the shop has never been logged
+  const hasAnyLogs = await prisma.generationLog.count({
+    where: { shop },
+  });
+  if (hasAnyLogs > 0) return 0;
+
+  return prisma.section.count({
+    where: {
+      shop,
+      createdAt: { gte: startOfMonth },
+    },
+  });
+}
+
+async function loadEntitlement(shop: string): Promise<CachedEntitlement> {
+  // Read the version first: a write racing this load leaves the entry one
+  // version behind, so it is reloaded on the next check
+  const version = await readVersion(shop);
+
+  const subscription = await prisma.subscription.findFirst({
+    where: {
+      shop,
+      status: {
+        mode: "insensitive",
+        equals: "active",
+      },
+    },
+    orderBy: { createdAt: "desc" },
+  });
+  const planName: PlanTier = (subscription?.planName as PlanTier) ?? "free";
+
+  const startOfMonth = getStartOfMonth();
+  const [plan, freeUsage] = await Promise.all([
+    prisma.planConfiguration.findUnique({
+      where: { planName },
+    }),
+    subscription ? Promise.resolve(0) : countFreeUsage(shop, startOfMonth),
+  ]);
+
+  if (!plan) {
+    // Fail closed on features; quota still comes from the subscription
+    console.error(`[Entitlement] Plan configuration not found: ${planName}`);
+  }
+
+  const value: Entitlement = subscription
+    ? {
+        shop,
+        planName,
+        subscription,
+        featureFlags: (plan?.featureFlags ?? []) as FeatureFlag[],
+        includedQuota: subscription.includedQuota,
+        usageThisCycle: subscription.usageThisCycle,
+        overagesThisCycle: subscription.overagesThisCycle,
+        cycleStart: new Date(subscription.currentPeriodEnd.getTime() - CYCLE_MS),
+      }
+    : {
+        shop,
+        planName,
+        subscription: null,
+        featureFlags: (plan?.featureFlags ?? []) as FeatureFlag[],
+        includedQuota: plan?.includedQuota ?? FREE_TIER_QUOTA,
+        usageThisCycle: freeUsage,
+        overagesThisCycle: 0,
+        cycleStart: startOfMonth,
+      };
+
+  return { value, version, checkedAt: Date.now() };
+}
+
+/**
+ * Get the shop's entitlement, from cache when its version is current
+ */
+export async function getEntitlement(shop: string): Promise<Entitlement> {
+  const cached = entitlements.get(shop);
+  if (cached) {
+    if (Date.now() - cached.checkedAt < VERSION_CHECK_MS) {
+      stats.hits++;
+      return cached.value;
+    }
+
+    const version = await readVersion(shop);
+    // Skip if invalidated locally while the version was being read
+    if (version === cached.version && entitlements.get(shop) === cached) {
+      cached.checkedAt = Date.now();
+      stats.revalidated++;
+      return cached.value;
+    }
+  }
+
+  const pending = inFlight.get(shop);
+  if (pending) {
+    stats.coalesced++;
+    return pending;
+  }
+
+  stats.misses++;
+  const promise: Promise<Entitlement> = loadEntitlement(shop)
+    .then((entry) => {
+      // An invalidation during the load detaches it; don't cache stale data
+      if (inFlight.get(shop) === promise) {
+        entitlements.set(shop, entry);
+      }
+      return entry.value;
+    })
+    .finally(() => {
+      if (inFlight.get(shop) === promise) {
+        inFlight.delete(shop);
+      }
+    });
+  inFlight.set(shop, promise);
+
+  return promise;
+}
+
+/**
+ * Drop the shop's cached entitlement here and, via the version bump, on
+ * every other instance. Call after any write to its plan, subscription or usage.
+ */
+export async function invalidateEntitlement(shop: string): Promise<void> {
+  entitlements.delete(shop);
+  inFlight.delete(shop);
+  stats.invalidations++;
+
+  for (let attempt = 0; attempt < 2; attempt++) {
+    try {
+      await prisma.entitlementVersion.upsert({
+        where: { shop },
+        create: { shop, version: 1 },
+        update: { version: { increment: 1 } },
+      });
+      return;
+    } catch (error) {
+      // Two first-time upserts raced on create; the retry increments
+      if (attempt === 0 && isUniqueViolation(error)) continue;
+      // Non-fatal: other instances pick the change up on TTL expiry
+      console.error("[Entitlement] Failed to bump version:", error);
+      return;
+    }
+  }
+}
+
+/**
+ * Counters for sizing the cache
+ */
+export function getEntitlementCacheStats(): EntitlementCacheStats {
+  return { ...stats, entries: entitlements.size };
+}
+
+/**
+ * Reset cache and counters (tests only)
+ */
+export function resetEntitlementCache(): void {
+  entitlements.clear();
+  inFlight.clear();
+  stats.hits = 0;
+  stats.revalidated = 0;
+  stats.misses = 0;
+  stats.coalesced = 0;
+  stats.invalidations = 0;
+  stats.evictions = 0;
+}
@@ -3,9 +3,10 @@
  *
  * Centralized feature gating logic for plan-based access control.
  * Gates features by checking subscription plan's featureFlags array.
+ * Plan and flags come from the shop's cached entitlement.
  */
 
-import { getPlanConfig, getSubscription } from "./billing.server";
+import { getEntitlement, type Entitlement } from "./entitlement.server";
 import prisma from "../db.server";
 import type { FeatureFlag, PlanTier } from "../types/billing";
 
@@ -35,10 +36,19 @@ export interface FeaturesSummary {
  * Check if shop has access to a specific feature
  */
 export async function hasFeature(shop: string, feature: FeatureFlag): Promise<boolean> {
-  const subscription = await getSubscription(shop);
-  const planName: PlanTier = (subscription?.planName as PlanTier) ?? "free";
-  const plan = await getPlanConfig(planName);
-  return plan.featureFlags.includes(feature);
+  const entitlement = await getEntitlement(shop);
+  return entitlement.featureFlags.includes(feature);
+}
+
+function refinementLimitFor(entitlement: Entitlement): number {
+  if (!entitlement.subscription) return 0;
+  if (entitlement.planName === "agency") return Infinity;
+  if (entitlement.planName === "pro") return 5;
+  return 0;
+}
+
+function teamSeatLimitFor(entitlement: Entitlement): number {
+  return entitlement.planName === "agency" ? 3 : 1;
 }
 
 /**
@@ -46,11 +56,7 @@ export async function hasFeature(shop: string, feature: FeatureFlag): Promise<bo
  * Free: 0, Pro: 5, Agency: Infinity
  */
 export async function getRefinementLimit(shop: string): Promise<number> {
-  const subscription = await getSubscription(shop);
-  if (!subscription) return 0;
-  if (subscription.planName === "agency") return Infinity;
-  if (subscription.planName === "pro") return 5;
-  return 0;
+  return refinementLimitFor(await getEntitlement(shop));
 }
 
 /**
@@ -58,16 +64,23 @@ export async function getRefinementLimit(shop: string): Promise<number> {
  * Free/Pro: 1, Agency: 3
  */
 export async function getTeamSeatLimit(shop: string): Promise<number> {
-  const subscription = await getSubscription(shop);
-  if (subscription?.planName === "agency") return 3;
-  return 1;
+  return teamSeatLimitFor(await getEntitlement(shop));
 }
 
 /**
  * Get refinement count for a conversation
- * Counts assistant messages (each = 1 refinement turn)
+ * Counts assistant messages (each = 1 refinement turn). Reads the counter
+ * maintained by ChatService; conversations without it fall back to counting.
  */
 export async function getConversationRefinementCount(conversationId: string): Promise<number> {
+  const conversation = await prisma.conversation.findUnique({
+    where: { id: conversationId },
+    select: { refinementCount: true },
+  });
+  if (conversation?.refinementCount != null) {
+    return conversation.refinementCount;
+  }
+
   const count = await prisma.message.count({
     where: {
       conversationId,
@@ -99,13 +112,15 @@ export async function checkFeatureAccess(
 
 /**
  * Check refinement access with limit tracking
+ * Pass `refinementCount` when the caller already loaded the conversation.
  */
 export async function checkRefinementAccess(
   shop: string,
-  conversationId: string
+  conversationId: string,
+  refinementCount?: number | null
 ): Promise<FeatureGateResult & { used: number; limit: number }> {
-  const subscription = await getSubscription(shop);
-  const planName = (subscription?.planName as PlanTier) ?? "free";
+  const entitlement = await getEntitlement(shop);
+  const planName = entitlement.planName;
 
   // Free tier: no refinement
   if (planName === "free") {
@@ -118,8 +133,8 @@ export async function checkRefinementAccess(
     };
   }
 
-  const limit = await getRefinementLimit(shop);
-  const used = await getConversationRefinementCount(conversationId);
+  const limit = refinementLimitFor(entitlement);
+  const used = refinementCount ?? await getConversationRefinementCount(conversationId);
 
   // Agency: unlimited
   if (limit === Infinity) {
@@ -147,21 +162,20 @@ export async function getFeaturesSummary(
   shop: string,
   conversationId?: string
 ): Promise<FeaturesSummary> {
-  const subscription = await getSubscription(shop);
-  const planName = (subscription?.planName as PlanTier) ?? "free";
-  const plan = await getPlanConfig(planName);
+  const entitlement = await getEntitlement(shop);
+  const planName = entitlement.planName;
 
-  const canPublish = plan.featureFlags.includes("publish_theme");
+  const canPublish = entitlement.featureFlags.includes("publish_theme");
   // Live preview is available for ALL plans to showcase app value
   // The conversion trigger is publishing (gated to Pro+), not previewing
   const canLivePreview = true;
-  const canChatRefine = plan.featureFlags.includes("chat_refinement");
+  const canChatRefine = entitlement.featureFlags.includes("chat_refinement");
 
-  const refinementLimit = await getRefinementLimit(shop);
+  const refinementLimit = refinementLimitFor(entitlement);
   const refinementUsed = conversationId
     ? await getConversationRefinementCount(conversationId)
     : 0;
-  const teamSeatLimit = await getTeamSeatLimit(shop);
+  const teamSeatLimit = teamSeatLimitFor(entitlement);
 
   return {
     canPublish,
@@ -6,7 +6,7 @@
 import prisma from "../db.server";
 import type { Subscription } from "@prisma/client";
 
-interface LogGenerationInput {
+export interface LogGenerationInput {
   shop: string;
   sectionId: string;
   messageId?: string;
@@ -18,25 +18,30 @@ interface LogGenerationInput {
   subscription?: Subscription | null; // Pass to calculate correct billing cycle
 }
 
+/**
+ * Row data for a generation log entry (shared with batched writers)
+ */
+export function buildGenerationLogData(input: LogGenerationInput) {
+  return {
+    shop: input.shop,
+    sectionId: input.sectionId,
+    messageId: input.messageId,
+    prompt: input.prompt.slice(0, 500), // Truncate for DB optimization
+    tokenCount: input.tokenCount,
+    modelId: input.modelId ?? "gemini-2.5-flash",
+    userTier: input.userTier,
+    billingCycle: getBillingCycleStart(input.subscription),
+    wasCharged: input.wasCharged ?? false,
+  };
+}
+
 /**
  * Create immutable generation log entry
  * Called after successful code extraction
  */
 export async function logGeneration(input: LogGenerationInput) {
-  const billingCycle = getBillingCycleStart(input.subscription);
-
   return await prisma.generationLog.create({
-    data: {
-      shop: input.shop,
-      sectionId: input.sectionId,
-      messageId: input.messageId,
-      prompt: input.prompt.slice(0, 500), // Truncate for DB optimization
-      tokenCount: input.tokenCount,
-      modelId: input.modelId ?? "gemini-2.5-flash",
-      userTier: input.userTier,
-      billingCycle,
-      wasCharged: input.wasCharged ?? false,
-    },
+    data: buildGenerationLogData(input),
   });
 }
 
@@ -0,0 +1,232 @@
+/**
+ * Fake Admin GraphQL client
+ *
+ * Local stand-in for `admin.graphql` so ShopifyDataService and billing can be
+ * exercised offline (unit tests, cache hit-ratio and latency benchmarks).
+ * Responses are generated deterministically from the requested GIDs.
+ * Usage charges are deduplicated on idempotencyKey like Shopify does.
+ */
+
+import type { AdminGraphqlFn, AdminResolver } from '../shopify-data.server';
+
+export interface FakeAdminGraphqlOptions {
+  /** Simulated network latency per call */
+  latencyMs?: number;
+  /** Shop domain returned by the resolver */
+  shop?: string;
+}
+
+export interface FakeAdminGraphql {
+  graphql: AdminGraphqlFn;
+  resolveAdmin: AdminResolver;
+  /** Number of calls, keyed by operation name (GetProduct, GetNodes, ...) */
+  calls: Record<string, number>;
+  totalCalls(): number;
+  /** Accepted usage charges, keyed by idempotencyKey */
+  usageCharges: Map<string, { id: string; amount: number; description: string }>;
+  /** Make the next `times` calls of an operation fail (userErrors for mutations, thrown error otherwise) */
+  failNext(operation: string, times?: number): void;
+  reset(): void;
+}
+
+function numericId(gid: string): number {
+  return parseInt(gid.split('/').pop() || '0', 10) || 0;
+}
+
+function fakeProduct(gid: string) {
+  const n = numericId(gid);
+  return {
+    id: gid,
+    title: `Product ${n}`,
+    handle: `product-${n}`,
+    description: `Description for product ${n}`,
+    vendor: 'Fake Vendor',
+    productType: 'Apparel',
+    priceRange: {
+      minVariantPrice: { amount: '19.99', currencyCode: 'USD' },
+      maxVariantPrice: { amount: '29.99', currencyCode: 'USD' }
+    },
+    compareAtPriceRange: { minVariantCompareAtPrice: { amount: '39.99' } },
+    totalInventory: 10,
+    featuredImage: { url: `https://cdn.example.com/p/${n}.jpg`, altText: '', width: 800, height: 800 },
+    images: { edges: [] },
+    tags: ['fake'],
+    options: [{ name: 'Size', values: ['S', 'M'] }],
+    variants: {
+      edges: [
+        {
+          node: {
+            id: `gid://shopify/ProductVariant/${n}1`,
+            title: 'S',
+            price: '19.99',
+            availableForSale: true,
+            inventoryQuantity: 5,
+            sku: `SKU-${n}`,
+            selectedOptions: [{ name: 'Size', value: 'S' }]
+          }
+        }
+      ]
+    }
+  };
+}
+
+function fakeCollection(gid: string) {
+  const n = numericId(gid);
+  return {
+    id: gid,
+    title: `Collection ${n}`,
+    handle: `collection-${n}`,
+    description: '',
+    image: null,
+    productsCount: { count: 3 },
+    products: {
+      edges: [1, 2, 3].map(i => ({ node: fakeProduct(`gid://shopify/Product/${n * 10 + i}`) }))
+    }
+  };
+}
+
+function fakeArticle(gid: string) {
+  const n = numericId(gid);
+  return {
+    id: gid,
+    title: `Article ${n}`,
+    handle: `article-${n}`,
+    body: '<p>Body</p>',
+    summary: 'Summary',
+    author: { name: 'Author' },
+    publishedAt: '2025-01-01T00:00:00Z',
+    image: null,
+    tags: [],
+    blog: { id: 'gid://shopify/Blog/1', title: 'News', handle: 'news' }
+  };
+}
+
+function fakeNode(gid: string) {
+  if (gid.includes('/Product/')) return { __typename: 'Product', ...fakeProduct(gid) };
+  if (gid.includes('/Collection/')) return { __typename: 'Collection', ...fakeCollection(gid) };
+  if (gid.includes('/Article/')) return { __typename: 'Article', ...fakeArticle(gid) };
+  return null;
+}
+
+type UsageCharges = FakeAdminGraphql['usageCharges'];
+
+function respond(
+  query: string,
+  variables: Record<string, unknown> = {},
+  usageCharges: UsageCharges
+): unknown {
+  const id = variables.id as string;
+
+  if (query.includes('query GetNodes')) {
+    return { data: { nodes: (variables.ids as string[]).map(fakeNode) } };
+  }
+  if (query.includes('query GetProduct')) return { data: { product: fakeProduct(id) } };
+  if (query.includes('query GetCollection')) return { data: { collection: fakeCollection(id) } };
+  if (query.includes('query GetArticles')) {
+    const first = (variables.first as number) || 10;
+    return {
+      data: {
+        articles: {
+          edges: Array.from({ length: first }, (_, i) => ({
+            node: fakeArticle(`gid://shopify/Article/${i + 1}`)
+          }))
+        }
+      }
+    };
+  }
+  if (query.includes('query GetArticle')) return { data: { article: fakeArticle(id) } };
+  if (query.includes('query GetShop')) {
+    return {
+      data: {
+        shop: {
+          name: 'Fake Shop',
+          email: 'owner@example.com',
+          primaryDomain: { host: 'fake.example.com', url: 'https://fake.example.com' },
+          currencyCode: 'USD',
+          description: ''
+        }
+      }
+    };
+  }
+  if (query.includes('query getSubscription')) {
+    return {
+      data: {
+        appSubscription: {
+          currentPeriodEnd: '2030-01-01T00:00:00Z',
+          lineItems: [
+            { id: `${id}/LineItem/1`, plan: { pricingDetails: { __typename: 'AppRecurringPricing' } } },
+            { id: `${id}/LineItem/2`, plan: { pricingDetails: { __typename: 'AppUsagePricing' } } }
+          ]
+        }
+      }
+    };
+  }
+  if (query.includes('mutation appUsageRecordCreate')) {
+    const key = variables.idempotencyKey as string;
+    let charge = usageCharges.get(key);
+    if (!charge) {
+      const price = variables.price as { amount: number };
+      charge = {
+        id: `gid://shopify/AppUsageRecord/${usageCharges.size + 1}`,
+        amount: price.amount,
+        description: variables.description as string
+      };
+      usageCharges.set(key, charge);
+    }
+    return { data: { appUsageRecordCreate: { appUsageRecord: { id: charge.id }, userErrors: [] } } };
+  }
+  return { data: null, errors: [{ message: 'Unsupported fake query' }] };
+}
+
+function failure(query: string, name: string): unknown {
+  if (query.trimStart().startsWith('mutation')) {
+    return { data: { [name]: { userErrors: [{ field: null, message: `Fake ${name} failure` }] } } };
+  }
+  throw new Error(`Fake ${name} failure`);
+}
+
+function operationName(query: string): string {
+  return query.match(/\b(?:query|mutation)\s+(\w+)/)?.[1] ?? 'anonymous';
+}
+
+/**
+ * Create a fake admin.graphql with call counters and simulated latency
+ */
+export function createFakeAdminGraphql(options: FakeAdminGraphqlOptions = {}): FakeAdminGraphql {
+  const { latencyMs = 0, shop = 'fake-shop.myshopify.com' } = options;
+  const calls: Record<string, number> = {};
+  const failures: Record<string, number> = {};
+  const usageCharges: UsageCharges = new Map();
+
+  const graphql: AdminGraphqlFn = async (query, opts) => {
+    const name = operationName(query);
+    calls[name] = (calls[name] || 0) + 1;
+    if (latencyMs > 0) {
+      await new Promise(resolve => setTimeout(resolve, latencyMs));
+    }
+    let body: unknown;
+    if (failures[name] > 0) {
+      failures[name]--;
+      body = failure(query, name);
+    } else {
+      body = respond(query, opts?.variables, usageCharges);
+    }
+    return { json: async () => body };
+  };
+
+  return {
+    graphql,
+    resolveAdmin: async () => ({ shop, graphql }),
+    calls,
+    totalCalls: () => Object.values(calls).reduce((sum, n) => sum + n, 0),
+    usageCharges,
+    failNext: (operation, times = 1) => {
+      failures[operation] = (failures[operation] || 0) + times;
+    },
+    reset: () => {
+      for (const key of Object.keys(calls)) delete calls[key];
+      for (const key of Object.keys(failures)) delete failures[key];
+      usageCharges.clear();
+    }
+  };
+}
@@ -0,0 +1,210 @@
+/**
+ * Fake Gemini client
+ *
+ * Local stand-in for `GoogleGenerativeAI` so AIService (and the chat stream
+ * route on top of it) can run offline. Install with `aiService.useClient()`.
+ *
+ * Streams a canned chat reply at a configurable token rate and can simulate
+ * MAX_TOKENS truncation and API errors (before the stream or mid-stream).
+ * Outcomes are drawn from a seeded generator so runs are repeatable.
+ */
+
+import type { GoogleGenerativeAI } from '@google/generative-ai';
+
+export interface FakeGeminiOptions {
+  /** Reply text; defaults to a complete section in a ```liquid fence */
+  response?: string | ((prompt: string) => string);
+  /** Size of the default reply in characters */
+  responseChars?: number;
+  /** Streaming rate (~4 characters per token); 0 streams without delay */
+  tokensPerSecond?: number;
+  /** Characters per streamed chunk */
+  chunkChars?: number;
+  /** Delay before the first chunk */
+  firstChunkMs?: number;
+  /** Fraction of calls cut short with finishReason MAX_TOKENS */
+  maxTokensRate?: number;
+  /** Fraction of calls that fail (half before streaming, half mid-stream) */
+  errorRate?: number;
+  /** Seed for the outcome generator */
+  seed?: number;
+}
+
+export interface FakeGeminiCalls {
+  total: number;
+  completed: number;
+  truncated: number;
+  failed: number;
+}
+
+export interface FakeGemini {
+  client: GoogleGenerativeAI;
+  calls: FakeGeminiCalls;
+  reset(): void;
+}
+
+const CHARS_PER_TOKEN = 4;
+
+const SECTION_HEAD = `{% schema %}
+{
+  "name": "Feature Rows",
+  "settings": [
+    { "type": "text", "id": "heading", "label": "Heading", "default": "Why shop with us" },
+    { "type": "color", "id": "accent", "label": "Accent", "default": "#1a73e8" },
+    { "type": "product", "id": "product", "label": "Product" }
+  ],
+  "presets": [{ "name": "Feature Rows" }]
+}
+{% endschema %}
+
+{% style %}
+#shopify-section-{{ section.id }} .ai-features { padding: 48px 16px; }
+#shopify-section-{{ section.id }} .ai-features__row { display: flex; gap: 16px; }
+{% endstyle %}
+
+<div class="ai-features">
+  <h2 style="color: {{ section.settings.accent }}">{{ section.settings.heading }}</h2>
+`;
+
+const SECTION_ROW = `  <div class="ai-features__row">
+    {% if section.settings.product %}<p>{{ section.settings.product.title }}</p>{% endif %}
+    <p>Fast shipping, easy returns and friendly support.</p>
+  </div>
+`;
+
+const SECTION_TAIL = `</div>`;
+
+function defaultResponse(chars: number): string {
+  const rows: string[] = [];
+  let size = SECTION_HEAD.length + SECTION_TAIL.length;
+  do {
+    rows.push(SECTION_ROW);
+    size += SECTION_ROW.length;
+  } while (size < chars);
+  return `Here is the updated section:\n\n\`\`\`liquid\n${SECTION_HEAD}${rows.join('')}${SECTION_TAIL}\n\`\`\``;
+}
+
+// mulberry32: small, fast, seedable
+function createRandom(seed: number): () => number {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6d2b79f5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+function sleep(ms: number): Promise<void> {
+  return ms > 0 ? new Promise(resolve => setTimeout(resolve, ms)) : Promise.resolve();
+}
+
+function apiError(): Error {
+  return new Error('[GoogleGenerativeAI Error]: [503 Service Unavailable] The model is overloaded (fake)');
+}
+
+type Outcome = 'complete' | 'truncated' | 'fail-before' | 'fail-during';
+
+/**
+ * Create a fake GoogleGenerativeAI client with call counters
+ */
+export function createFakeGemini(options: FakeGeminiOptions = {}): FakeGemini {
+  const {
+    responseChars = 6000,
+    tokensPerSecond = 0,
+    chunkChars = 60,
+    firstChunkMs = 0,
+    maxTokensRate = 0,
+    errorRate = 0,
+    seed = 1,
+  } = options;
+  const random = createRandom(seed);
+  const fallbackResponse = defaultResponse(responseChars);
+  const chunkDelayMs = tokensPerSecond > 0 ? (chunkChars / CHARS_PER_TOKEN / tokensPerSecond) * 1000 : 0;
+  const calls: FakeGeminiCalls = { total: 0, completed: 0, truncated: 0, failed: 0 };
+
+  function replyFor(prompt: string): string {
+    if (typeof options.response === 'function') return options.response(prompt);
+    return options.response ?? fallbackResponse;
+  }
+
+  function nextOutcome(): Outcome {
+    const roll = random();
+    if (roll < errorRate / 2) return 'fail-before';
+    if (roll < errorRate) return 'fail-during';
+    if (roll < errorRate + maxTokensRate) return 'truncated';
+    return 'complete';
+  }
+
+  function generateContentStream(prompt: string) {
+    calls.total++;
+    const outcome = nextOutcome();
+    if (outcome === 'fail-before') {
+      calls.failed++;
+      return Promise.reject(apiError());
+    }
+
+    const reply = replyFor(prompt);
+    // Truncated replies stop partway through, as when the output limit is hit
+    const text = outcome === 'truncated' ? reply.slice(0, Math.floor(reply.length * 0.6)) : reply;
+    const failAt = outcome === 'fail-during' ? Math.floor(text.length / 2) : -1;
+    const finishReason = outcome === 'truncated' ? 'MAX_TOKENS' : 'STOP';
+
+    async function* stream() {
+      await sleep(firstChunkMs);
+      for (let offset = 0; offset < text.length; offset += chunkChars) {
+        if (failAt !== -1 && offset >= failAt) {
+          calls.failed++;
+          throw apiError();
+        }
+        if (offset > 0) await sleep(chunkDelayMs);
+        const chunk = text.slice(offset, offset + chunkChars);
+        yield { text: () => chunk };
+      }
+      if (outcome === 'truncated') calls.truncated++;
+      else calls.completed++;
+    }
+
+    return Promise.resolve({
+      stream: stream(),
+      // Only awaited after the stream finishes, so it never rejects unobserved
+      response: Promise.resolve({ candidates: [{ finishReason }] }),
+    });
+  }
+
+  async function generateContent(prompt: string) {
+    calls.total++;
+    const outcome = nextOutcome();
+    if (outcome === 'fail-before' || outcome === 'fail-during') {
+      calls.failed++;
+      throw apiError();
+    }
+    const reply = replyFor(prompt);
+    await sleep(firstChunkMs + (tokensPerSecond > 0 ? (reply.length / CHARS_PER_TOKEN / tokensPerSecond) * 1000 : 0));
+    if (outcome === 'truncated') calls.truncated++;
+    else calls.completed++;
+    const text = outcome === 'truncated' ? reply.slice(0, Math.floor(reply.length * 0.6)) : reply;
+    return {
+      response: {
+        text: () => text,
+        candidates: [{ finishReason: outcome === 'truncated' ? 'MAX_TOKENS' : 'STOP' }],
+      },
+    };
+  }
+
+  const client = {
+    getGenerativeModel: () => ({ generateContent, generateContentStream }),
+  };
+
+  return {
+    client: client as unknown as GoogleGenerativeAI,
+    calls,
+    reset: () => {
+      calls.total = 0;
+      calls.completed = 0;
+      calls.truncated = 0;
+      calls.failed = 0;
+    },
+  };
+}
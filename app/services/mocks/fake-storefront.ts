@@ -0,0 +1,110 @@
+/**
+ * Fake storefront / App Proxy server
+ *
+ * Local HTTP server standing in for `https://{shop}/apps/blocksmith-preview`
+ * so api.preview.render can be driven offline. `interceptFetch()` routes
+ * fetch() calls for *.myshopify.com to it; the shop domain is passed on in
+ * X-Forwarded-Host.
+ *
+ * By default each page is a small static section; pass `render` to produce
+ * the page from the App Proxy request instead (e.g. by calling the real
+ * api.proxy.render loader).
+ */
+
+import { createServer, type IncomingMessage, type ServerResponse } from 'node:http';
+import type { AddressInfo } from 'node:net';
+
+export interface FakeStorefrontOptions {
+  /** Simulated storefront latency per request */
+  latencyMs?: number;
+  /** Build the page for an App Proxy URL (shop domain as host) */
+  render?: (url: URL) => Promise<string> | string;
+  /** Redirect every request to /password like a locked store */
+  passwordProtected?: boolean;
+}
+
+export interface FakeStorefront {
+  /** http://127.0.0.1:{port} */
+  origin: string;
+  /** Requests served, by path */
+  requests: Record<string, number>;
+  totalRequests(): number;
+  /** Route fetch() for *.myshopify.com here; returns a function that restores fetch */
+  interceptFetch(): () => void;
+  close(): Promise<void>;
+}
+
+const SHOP_HOST_SUFFIX = '.myshopify.com';
+
+function defaultPage(url: URL): string {
+  const sectionId = url.searchParams.get('section_id') || 'preview';
+  return `<div id="shopify-section-${sectionId}" class="blocksmith-preview"><h2>Preview</h2><p>Rendered by fake storefront</p></div>`;
+}
+
+function sleep(ms: number): Promise<void> {
+  return ms > 0 ? new Promise(resolve => setTimeout(resolve, ms)) : Promise.resolve();
+}
+
+/**
+ * Start a fake storefront on an ephemeral localhost port
+ */
+export async function startFakeStorefront(options: FakeStorefrontOptions = {}): Promise<FakeStorefront> {
+  const { latencyMs = 0, render = defaultPage, passwordProtected = false } = options;
+  const requests: Record<string, number> = {};
+
+  async function handle(req: IncomingMessage, res: ServerResponse) {
+    const host = (req.headers['x-forwarded-host'] as string) || req.headers.host || 'localhost';
+    const url = new URL(req.url || '/', `https://${host}`);
+    requests[url.pathname] = (requests[url.pathname] || 0) + 1;
+
+    await sleep(latencyMs);
+
+    if (passwordProtected) {
+      res.writeHead(302, { Location: `https://${host}/password` });
+      res.end();
+      return;
+    }
+
+    try {
+      const html = await render(url);
+      res.writeHead(200, { 'Content-Type': 'text/html; charset=utf-8' });
+      res.end(html);
+    } catch (error) {
+      res.writeHead(500, { 'Content-Type': 'text/plain' });
+      res.end(error instanceof Error ? error.message : 'Render failed');
+    }
+  }
+
+  const server = createServer((req, res) => {
+    void handle(req, res);
+  });
+  await new Promise<void>(resolve => server.listen(0, '127.0.0.1', resolve));
+  const { port } = server.address() as AddressInfo;
+  const origin = `http://127.0.0.1:${port}`;
+
+  return {
+    origin,
+    requests,
+    totalRequests: () => Object.values(requests).reduce((sum, n) => sum + n, 0),
+    interceptFetch: () => {
+      const originalFetch = globalThis.fetch;
+      globalThis.fetch = (input: RequestInfo | URL, init?: RequestInit) => {
+        const url = new URL(input instanceof Request ? input.url : input.toString());
+        if (!url.hostname.endsWith(SHOP_HOST_SUFFIX)) {
+          return originalFetch(input, init);
+        }
+        const headers = new Headers(init?.headers);
+        headers.set('X-Forwarded-Host', url.host);
+        return originalFetch(`${origin}${url.pathname}${url.search}`, { ...init, headers });
+      };
+      return () => {
+        globalThis.fetch = originalFetch;
+      };
+    },
+    close: () =>
+      new Promise<void>((resolve, reject) => {
+        server.close(error => (error ? reject(error) : resolve()));
+        server.closeAllConnections();
+      }),
+  };
+}
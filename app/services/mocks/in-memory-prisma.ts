@@ -0,0 +1,438 @@
+/**
+ * In-memory Prisma stand-in
+ *
+ * Enough of the Prisma client API to run services offline (unit tests,
+ * benchmarks) without MongoDB. Models are created on first access and
+ * support the filters and update operators the services use:
+ * equals/not/in/notIn/lt/lte/gt/gte/contains/startsWith (+ insensitive mode),
+ * AND/OR/NOT, orderBy, take/skip, select, { increment | decrement | set }.
+ * findRaw takes equality filters plus `$text` (any search word matches a
+ * whole word in a string field).
+ *
+ * Unique fields raise a P2002 error like Prisma. $transaction runs operations
+ * sequentially without rollback.
+ */
+
+/* eslint-disable @typescript-eslint/no-explicit-any */
+
+type Row = Record<string, any>;
+type Where = Record<string, any>;
+type OrderBy = Record<string, 'asc' | 'desc'> | Array<Record<string, 'asc' | 'desc'>>;
+
+interface FindArgs {
+  where?: Where;
+  orderBy?: OrderBy;
+  take?: number;
+  skip?: number;
+  select?: Record<string, boolean>;
+}
+
+export interface InMemoryPrismaOptions {
+  /** Unique fields per model (Prisma model name, camelCase) */
+  unique?: Record<string, string[]>;
+  /** Default values per model, applied on create (functions are evaluated per row) */
+  defaults?: Record<string, Record<string, unknown>>;
+}
+
+const DEFAULT_UNIQUE: Record<string, string[]> = {
+  outboxJob: ['idempotencyKey'],
+  usageRecord: ['idempotencyKey'],
+  subscription: ['shopifySubId'],
+  planConfiguration: ['planName'],
+  previewToken: ['token', 'contentHash'],
+  conversation: ['sectionId'],
+  shopSettings: ['shop'],
+  sectionStatusCount: ['shop'],
+  entitlementVersion: ['shop'],
+};
+
+const DEFAULT_VALUES: Record<string, Record<string, unknown>> = {
+  outboxJob: {
+    status: 'pending',
+    attempts: 0,
+    nextRunAt: () => new Date(),
+    lockId: null,
+    lockedUntil: null,
+    lastError: null,
+    completedAt: null,
+  },
+  usageRecord: { chargeStatus: 'pending', shopifyChargeId: null, errorMessage: null, sentAt: null },
+  failedUsageCharge: {
+    retryCount: 0,
+    retriedAt: null,
+    subscriptionId: null,
+    amount: null,
+    billingCycle: null,
+  },
+  generationLog: { modelId: 'gemini-2.5-flash', wasCharged: false, generatedAt: () => new Date() },
+  subscription: { usageThisCycle: 0, overagesThisCycle: 0, usageLineItemId: null },
+  conversation: {
+    title: null,
+    messageCount: 0,
+    totalTokens: 0,
+    isArchived: false,
+    summaryTopics: () => [],
+    updatedAt: () => new Date(),
+  },
+  message: { codeSnapshot: null, tokenCount: null, isError: false, errorMessage: null },
+  sectionStatusCount: {
+    draft: 0,
+    active: 0,
+    inactive: 0,
+    archive: 0,
+    revision: 0,
+    countedAt: () => new Date(),
+    updatedAt: () => new Date(),
+  },
+  entitlementVersion: { version: 0, updatedAt: () => new Date() },
+};
+
+let idCounter = 0;
+
+// 24 hex chars, like a Mongo ObjectId
+function nextId(): string {
+  idCounter++;
+  return (Date.now().toString(16) + idCounter.toString(16).padStart(12, '0')).slice(-24).padStart(24, '0');
+}
+
+function comparable(value: unknown): unknown {
+  return value instanceof Date ? value.getTime() : value;
+}
+
+function isEqual(a: unknown, b: unknown, insensitive = false): boolean {
+  if ((a === null || a === undefined) && (b === null || b === undefined)) return true;
+  if (insensitive && typeof a === 'string' && typeof b === 'string') {
+    return a.toLowerCase() === b.toLowerCase();
+  }
+  return comparable(a) === comparable(b);
+}
+
+function matchesField(value: unknown, condition: unknown): boolean {
+  if (condition === null || condition instanceof Date || typeof condition !== 'object') {
+    return isEqual(value, condition);
+  }
+
+  const filter = condition as Record<string, any>;
+  const insensitive = filter.mode === 'insensitive';
+  const text = typeof value === 'string' && insensitive ? value.toLowerCase() : value;
+  const v = comparable(value) as any;
+
+  for (const [op, operand] of Object.entries(filter)) {
+    if (operand === undefined) continue;
+    const o = comparable(operand) as any;
+    switch (op) {
+      case 'mode':
+        break;
+      case 'equals':
+        if (!isEqual(value, operand, insensitive)) return false;
+        break;
+      case 'not':
+        if (matchesField(value, operand)) return false;
+        break;
+      case 'in':
+        if (!(operand as unknown[]).some((item) => isEqual(value, item, insensitive))) return false;
+        break;
+      case 'notIn':
+        if ((operand as unknown[]).some((item) => isEqual(value, item, insensitive))) return false;
+        break;
+      case 'lt':
+        if (!(v !== null && v !== undefined && v < o)) return false;
+        break;
+      case 'lte':
+        if (!(v !== null && v !== undefined && v <= o)) return false;
+        break;
+      case 'gt':
+        if (!(v !== null && v !== undefined && v > o)) return false;
+        break;
+      case 'gte':
+        if (!(v !== null && v !== undefined && v >= o)) return false;
+        break;
+      case 'contains':
+        if (typeof text !== 'string' || !text.includes(insensitive ? String(operand).toLowerCase() : operand)) return false;
+        break;
+      case 'startsWith':
+        if (typeof text !== 'string' || !text.startsWith(insensitive ? String(operand).toLowerCase() : operand)) return false;
+        break;
+      default:
+        throw new Error(`[InMemoryPrisma] Unsupported filter: ${op}`);
+    }
+  }
+  return true;
+}
+
+export function matchesWhere(row: Row, where: Where | undefined): boolean {
+  if (!where) return true;
+  for (const [key, condition] of Object.entries(where)) {
+    if (condition === undefined) continue;
+    if (key === 'AND') {
+      const all = Array.isArray(condition) ? condition : [condition];
+      if (!all.every((w) => matchesWhere(row, w))) return false;
+    } else if (key === 'OR') {
+      if (!(condition as Where[]).some((w) => matchesWhere(row, w))) return false;
+    } else if (key === 'NOT') {
+      const all = Array.isArray(condition) ? condition : [condition];
+      if (all.some((w) => matchesWhere(row, w))) return false;
+    } else if (!matchesField(row[key], condition)) {
+      return false;
+    }
+  }
+  return true;
+}
+
+function sortRows(rows: Row[], orderBy: OrderBy | undefined): Row[] {
+  if (!orderBy) return rows;
+  const keys = (Array.isArray(orderBy) ? orderBy : [orderBy]).flatMap((o) => Object.entries(o));
+  return [...rows].sort((a, b) => {
+    for (const [field, direction] of keys) {
+      const x = comparable(a[field]) as any;
+      const y = comparable(b[field]) as any;
+      if (x === y) continue;
+      const cmp = x === null || x === undefined ? -1 : y === null || y === undefined ? 1 : x < y ? -1 : 1;
+      return direction === 'desc' ? -cmp : cmp;
+    }
+    return 0;
+  });
+}
+
+function project(row: Row, select: Record<string, boolean> | undefined): Row {
+  const copy = structuredClone(row);
+  if (!select) return copy;
+  const out: Row = {};
+  for (const [key, enabled] of Object.entries(select)) {
+    if (enabled) out[key] = copy[key];
+  }
+  return out;
+}
+
+function applyUpdate(row: Row, data: Row): void {
+  for (const [key, value] of Object.entries(data)) {
+    if (value === undefined) continue;
+    if (value !== null && typeof value === 'object' && !(value instanceof Date) && !Array.isArray(value)) {
+      if ('increment' in value) {
+        row[key] = (row[key] ?? 0) + value.increment;
+        continue;
+      }
+      if ('decrement' in value) {
+        row[key] = (row[key] ?? 0) - value.decrement;
+        continue;
+      }
+      if ('set' in value) {
+        row[key] = value.set;
+        continue;
+      }
+    }
+    row[key] = value;
+  }
+  if ('updatedAt' in row) row.updatedAt = new Date();
+}
+
+function words(text: string): string[] {
+  return text.toLowerCase().match(/[\p{L}\p{N}]+/gu) ?? [];
+}
+
+function matchesText(row: Row, search: string): boolean {
+  const wanted = new Set(words(search));
+  return Object.values(row).some(
+    (value) => typeof value === 'string' && words(value).some((word) => wanted.has(word))
+  );
+}
+
+interface FindRawArgs {
+  filter?: Row;
+  options?: {
+    projection?: Record<string, 0 | 1>;
+    sort?: Record<string, 1 | -1>;
+    limit?: number;
+  };
+}
+
+function duplicateKeyError(model: string, field: string): Error {
+  return Object.assign(new Error(`Unique constraint failed on ${model}.${field}`), {
+    code: 'P2002',
+    meta: { target: [field] },
+  });
+}
+
+export class InMemoryModel {
+  readonly rows: Row[] = [];
+
+  constructor(
+    private readonly name: string,
+    private readonly uniqueFields: string[],
+    private readonly defaults: Record<string, unknown>
+  ) {}
+
+  async create({ data, select }: { data: Row; select?: Record<string, boolean> }): Promise<Row> {
+    return project(this.insert(data), select);
+  }
+
+  async createMany({ data }: { data: Row[] }): Promise<{ count: number }> {
+    for (const row of data) this.insert(row);
+    return { count: data.length };
+  }
+
+  async findUnique(args: FindArgs): Promise<Row | null> {
+    return this.findFirst(args);
+  }
+
+  async findUniqueOrThrow(args: FindArgs): Promise<Row> {
+    const row = await this.findFirst(args);
+    if (!row) throw Object.assign(new Error(`${this.name} not found`), { code: 'P2025' });
+    return row;
+  }
+
+  async findFirst(args: FindArgs = {}): Promise<Row | null> {
+    const [row] = await this.findMany({ ...args, take: 1 });
+    return row ?? null;
+  }
+
+  async findMany(args: FindArgs = {}): Promise<Row[]> {
+    let rows = sortRows(this.rows.filter((row) => matchesWhere(row, args.where)), args.orderBy);
+    if (args.skip) rows = rows.slice(args.skip);
+    if (args.take !== undefined) rows = rows.slice(0, args.take);
+    return rows.map((row) => project(row, args.select));
+  }
+
+  // Documents come back like Mongo extended JSON: { _id: { $oid }, ... }
+  async findRaw({ filter = {}, options = {} }: FindRawArgs = {}): Promise<Row[]> {
+    const { $text, ...fields } = filter;
+    let rows = this.rows.filter(
+      (row) =>
+        Object.entries(fields).every(([key, value]) => isEqual(row[key], value)) &&
+        (!$text || matchesText(row, $text.$search))
+    );
+    if (options.sort) {
+      const orderBy = Object.entries(options.sort).map(([field, dir]) => ({
+        [field]: dir === -1 ? ('desc' as const) : ('asc' as const),
+      }));
+      rows = sortRows(rows, orderBy);
+    }
+    if (options.limit !== undefined) rows = rows.slice(0, options.limit);
+    return rows.map((row) => {
+      const { id, ...rest } = structuredClone(row);
+      const doc: Row = { _id: { $oid: id }, ...rest };
+      if (!options.projection) return doc;
+      const out: Row = {};
+      for (const [key, enabled] of Object.entries(options.projection)) {
+        if (enabled) out[key] = doc[key];
+      }
+      return out;
+    });
+  }
+
+  async count({ where }: { where?: Where } = {}): Promise<number> {
+    return this.rows.filter((row) => matchesWhere(row, where)).length;
+  }
+
+  async update({ where, data, select }: { where: Where; data: Row; select?: Record<string, boolean> }): Promise<Row> {
+    const row = this.rows.find((r) => matchesWhere(r, where));
+    if (!row) throw Object.assign(new Error(`${this.name} to update not found`), { code: 'P2025' });
+    this.checkUnique(data, row);
+    applyUpdate(row, data);
+    return project(row, select);
+  }
+
+  async updateMany({ where, data }: { where?: Where; data: Row }): Promise<{ count: number }> {
+    const matched = this.rows.filter((row) => matchesWhere(row, where));
+    for (const row of matched) applyUpdate(row, data);
+    return { count: matched.length };
+  }
+
+  async upsert({ where, create, update, select }: {
+    where: Where;
+    create: Row;
+    update: Row;
+    select?: Record<string, boolean>;
+  }): Promise<Row> {
+    const row = this.rows.find((r) => matchesWhere(r, where));
+    if (row) {
+      applyUpdate(row, update);
+      return project(row, select);
+    }
+    return project(this.insert(create), select);
+  }
+
+  async delete({ where }: { where: Where }): Promise<Row> {
+    const index = this.rows.findIndex((row) => matchesWhere(row, where));
+    if (index === -1) throw Object.assign(new Error(`${this.name} to delete not found`), { code: 'P2025' });
+    const [row] = this.rows.splice(index, 1);
+    return row;
+  }
+
+  async deleteMany({ where }: { where?: Where } = {}): Promise<{ count: number }> {
+    const before = this.rows.length;
+    const kept = this.rows.filter((row) => !matchesWhere(row, where));
+    this.rows.length = 0;
+    this.rows.push(...kept);
+    return { count: before - kept.length };
+  }
+
+  private insert(data: Row): Row {
+    const row: Row = { id: nextId(), createdAt: new Date() };
+    for (const [key, value] of Object.entries(this.defaults)) {
+      row[key] = typeof value === 'function' ? value() : value;
+    }
+    for (const [key, value] of Object.entries(structuredClone(data))) {
+      if (value !== undefined) row[key] = value;
+    }
+    this.checkUnique(row);
+    this.rows.push(row);
+    return row;
+  }
+
+  private checkUnique(data: Row, self?: Row): void {
+    for (const field of this.uniqueFields) {
+      const value = data[field];
+      if (value === undefined || value === null) continue;
+      if (this.rows.some((row) => row !== self && isEqual(row[field], value))) {
+        throw duplicateKeyError(this.name, field);
+      }
+    }
+  }
+}
+
+export type InMemoryPrisma = Record<string, InMemoryModel> & {
+  $transaction: (operations: any) => Promise<any>;
+  $runCommandRaw: (command: unknown) => Promise<Record<string, unknown>>;
+  $reset: () => void;
+};
+
+/**
+ * Create a fresh in-memory client. Cast to PrismaClient where needed.
+ */
+export function createInMemoryPrisma(options: InMemoryPrismaOptions = {}): InMemoryPrisma {
+  const unique = { ...DEFAULT_UNIQUE, ...options.unique };
+  const defaults = { ...DEFAULT_VALUES, ...options.defaults };
+  const models = new Map<string, InMemoryModel>();
+
+  const client: Row = {
+    async $transaction(operations: any) {
+      if (typeof operations === 'function') return operations(proxy);
+      const results = [];
+      for (const operation of operations) results.push(await operation);
+      return results;
+    },
+    async $runCommandRaw() {
+      return { ok: 1 };
+    },
+    $reset() {
+      models.clear();
+    },
+  };
+
+  const proxy = new Proxy(client, {
+    get(target, name) {
+      if (typeof name !== 'string' || name in target || name === 'then') {
+        return target[name as string];
+      }
+      let model = models.get(name);
+      if (!model) {
+        model = new InMemoryModel(name, unique[name] ?? [], defaults[name] ?? {});
+        models.set(name, model);
+      }
+      return model;
+    },
+  });
+
+  return proxy as InMemoryPrisma;
+}
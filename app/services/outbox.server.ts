@@ -0,0 +1,589 @@
+/**
+ * Post-Generation Outbox
+ *
+ * Keeps billing and audit writes off the chat hot path. The stream handler
+ * only writes one OutboxJob per generation, in the same transaction as the
+ * assistant message; this worker then, per shop:
+ * - reads the subscription and resolves an offline Admin client once
+ * - records usage charges with stable idempotency keys (safe to retry)
+ * - writes all generation logs with a single createMany
+ *
+ * Failed jobs are retried with exponential backoff and dead-lettered
+ * (status "failed") after OUTBOX_MAX_ATTEMPTS. Legacy FailedUsageCharge rows
+ * are converted into usage_charge jobs so they are retried the same way;
+ * those charge exactly the amount recorded at generation time, and are
+ * closed instead when that subscription or billing cycle has ended.
+ *
+ * Set OUTBOX_WORKER=off on instances that should only enqueue.
+ */
+
+import { randomUUID } from "crypto";
+import type { AdminApiContext } from "@shopify/shopify-app-react-router/server";
+import type { OutboxJob, Prisma, Subscription } from "@prisma/client";
+import prisma from "../db.server";
+import { unauthenticated } from "../shopify.server";
+import { recordUsage } from "./billing.server";
+import { getEntitlement, invalidateEntitlement } from "./entitlement.server";
+import { buildGenerationLogData } from "./generation-log.server";
+
+export type OutboxJobType = "generation" | "usage_charge";
+
+export interface GenerationJobPayload {
+  sectionId: string;
+  messageId: string;
+  prompt: string;
+  tokenCount?: number;
+  modelId?: string;
+}
+
+export interface UsageChargeJobPayload {
+  sectionId: string;
+  description: string;
+  /** Charge as decided at generation time */
+  subscriptionId?: string;
+  amount?: number;
+  /** ISO currentPeriodEnd of the generation's billing cycle */
+  billingCycle?: string;
+}
+
+export type AdminClientResolver = (shop: string) => Promise<AdminApiContext>;
+
+export interface OutboxWorkerOptions {
+  /** Offline Admin API client for a shop (defaults to unauthenticated.admin) */
+  resolveAdmin?: AdminClientResolver;
+  /** Jobs claimed per run */
+  batchSize?: number;
+  /** Attempts before a job is dead-lettered */
+  maxAttempts?: number;
+  /** First retry delay; doubles on each attempt */
+  baseDelayMs?: number;
+  /** Upper bound on the retry delay */
+  maxDelayMs?: number;
+  /** How long a claimed job stays locked before another worker may take it */
+  lockMs?: number;
+  /** Idle polling interval */
+  pollIntervalMs?: number;
+  /** Delay between enqueue and the next run, so bursts are batched */
+  kickDelayMs?: number;
+}
+
+export interface OutboxRunResult {
+  claimed: number;
+  completed: number;
+  retried: number;
+  deadLettered: number;
+  drainedFailedCharges: number;
+}
+
+export interface OutboxMetrics {
+  /** Queue depth: jobs waiting to run (including scheduled retries) */
+  pending: number;
+  processing: number;
+  failed: number;
+  /** Lag: age of the oldest job not yet completed, 0 when the queue is empty */
+  oldestPendingAgeMs: number;
+  /** Enqueue-to-completion time of the most recently completed batch */
+  lastCompletionLagMs: number | null;
+  lastRunAt: Date | null;
+  runs: number;
+  completed: number;
+  retried: number;
+  deadLettered: number;
+  drainedFailedCharges: number;
+}
+
+const DEFAULT_OPTIONS = {
+  batchSize: 50,
+  maxAttempts: Number(process.env.OUTBOX_MAX_ATTEMPTS) || 8,
+  baseDelayMs: 2000,
+  maxDelayMs: 15 * 60 * 1000,
+  lockMs: 5 * 60 * 1000,
+  pollIntervalMs: Number(process.env.OUTBOX_POLL_MS) || 5000,
+  kickDelayMs: 250,
+};
+
+// FailedUsageCharge rows converted per run
+const FAILED_CHARGE_BATCH = 20;
+
+// Completed jobs are kept a week for idempotency and auditing
+const DONE_JOB_TTL_SECONDS = 7 * 24 * 60 * 60;
+
+async function resolveOfflineAdmin(shop: string): Promise<AdminApiContext> {
+  const { admin } = await unauthenticated.admin(shop);
+  return admin;
+}
+
+/**
+ * Delay before the next attempt: base * 2^(attempt - 1), capped, plus up to 10% jitter
+ */
+export function getRetryDelayMs(attempt: number, baseDelayMs: number, maxDelayMs: number): number {
+  const delay = Math.min(maxDelayMs, baseDelayMs * 2 ** Math.max(0, attempt - 1));
+  return Math.round(delay + Math.random() * delay * 0.1);
+}
+
+function isDuplicateKeyError(error: unknown): boolean {
+  return (error as { code?: string } | null)?.code === "P2002";
+}
+
+/**
+ * Why a retried charge must not be sent, or null if it can be.
+ * Only the generation's own subscription and cycle may be billed.
+ */
+function closedChargeReason(payload: UsageChargeJobPayload, subscription: Subscription | null): string | null {
+  if (!payload.subscriptionId || payload.amount == null || !payload.billingCycle) {
+    return "Failed charge has no amount snapshot; reconcile manually";
+  }
+  if (!subscription || subscription.id !== payload.subscriptionId) {
+    return "Subscription for failed charge is no longer active";
+  }
+  if (new Date(payload.billingCycle).getTime() !== subscription.currentPeriodEnd.getTime()) {
+    return "Failed charge belongs to a previous billing cycle";
+  }
+  return null;
+}
+
+function usageDescription(prompt: string): string {
+  // Same format as trackGeneration
+  return `Section generation - ${prompt.substring(0, 80)}${prompt.length > 80 ? "..." : ""}`;
+}
+
+/**
+ * OutboxJob create input for a generation, for writing the job in the same
+ * transaction as its assistant message
+ */
+export function generationJobData(shop: string, payload: GenerationJobPayload): Prisma.OutboxJobCreateInput {
+  return {
+    shop,
+    type: "generation",
+    idempotencyKey: `generation:${payload.messageId}`,
+    payload: payload as unknown as Prisma.InputJsonObject,
+  };
+}
+
+export class OutboxWorker {
+  private readonly options: Required<Omit<OutboxWorkerOptions, "resolveAdmin">>;
+  private readonly resolveAdmin: AdminClientResolver;
+  private pollTimer: ReturnType<typeof setInterval> | null = null;
+  private kickTimer: ReturnType<typeof setTimeout> | null = null;
+  private running: Promise<OutboxRunResult> | null = null;
+  private ttlIndexReady: Promise<void> | null = null;
+  private lastRunAt: Date | null = null;
+  private lastCompletionLagMs: number | null = null;
+  private readonly counters = {
+    runs: 0,
+    completed: 0,
+    retried: 0,
+    deadLettered: 0,
+    drainedFailedCharges: 0,
+  };
+
+  constructor(options: OutboxWorkerOptions = {}) {
+    const { resolveAdmin, ...rest } = options;
+    this.resolveAdmin = resolveAdmin ?? resolveOfflineAdmin;
+    this.options = { ...DEFAULT_OPTIONS, ...rest };
+  }
+
+  /**
+   * Queue the generation log and usage charge for one assistant message.
+   * Enqueueing the same message twice is a no-op.
+   */
+  async enqueueGeneration(shop: string, payload: GenerationJobPayload): Promise<void> {
+    const job = generationJobData(shop, payload);
+    await this.enqueue(shop, "generation", job.idempotencyKey, payload);
+  }
+
+  /**
+   * Schedule a run after jobs were written directly (e.g. in a transaction
+   * with generationJobData). No-op on instances that only enqueue.
+   */
+  notifyEnqueued(): void {
+    if (this.pollTimer) this.kick();
+  }
+
+  /**
+   * Insert a job; duplicate idempotency keys are ignored
+   */
+  async enqueue(
+    shop: string,
+    type: OutboxJobType,
+    idempotencyKey: string,
+    payload: GenerationJobPayload | UsageChargeJobPayload,
+  ): Promise<void> {
+    try {
+      await prisma.outboxJob.create({
+        data: { shop, type, idempotencyKey, payload: payload as unknown as Prisma.InputJsonObject },
+      });
+    } catch (error) {
+      if (!isDuplicateKeyError(error)) throw error;
+    }
+
+    this.notifyEnqueued();
+  }
+
+  /**
+   * Start polling (idempotent). Timers are unref'd so they never hold the process open.
+   */
+  start(): void {
+    if (this.pollTimer) return;
+    this.pollTimer = setInterval(() => this.runInBackground(), this.options.pollIntervalMs);
+    this.pollTimer.unref?.();
+    this.kick();
+  }
+
+  stop(): void {
+    if (this.pollTimer) clearInterval(this.pollTimer);
+    if (this.kickTimer) clearTimeout(this.kickTimer);
+    this.pollTimer = null;
+    this.kickTimer = null;
+  }
+
+  /**
+   * Schedule a run shortly; calls within kickDelayMs share one run
+   */
+  kick(): void {
+    if (this.kickTimer) return;
+    this.kickTimer = setTimeout(() => {
+      this.kickTimer = null;
+      this.runInBackground();
+    }, this.options.kickDelayMs);
+    this.kickTimer.unref?.();
+  }
+
+  /**
+   * Claim and process one batch. Concurrent calls share the same run.
+   */
+  runOnce(): Promise<OutboxRunResult> {
+    if (!this.running) {
+      this.running = this.run().finally(() => {
+        this.running = null;
+      });
+    }
+    return this.running;
+  }
+
+  async getMetrics(): Promise<OutboxMetrics> {
+    const [pending, processing, failed, oldest] = await Promise.all([
+      prisma.outboxJob.count({ where: { status: "pending" } }),
+      prisma.outboxJob.count({ where: { status: "processing" } }),
+      prisma.outboxJob.count({ where: { status: "failed" } }),
+      prisma.outboxJob.findFirst({
+        where: { status: { in: ["pending", "processing"] } },
+        orderBy: { createdAt: "asc" },
+        select: { createdAt: true },
+      }),
+    ]);
+
+    return {
+      pending,
+      processing,
+      failed,
+      oldestPendingAgeMs: oldest ? Math.max(0, Date.now() - oldest.createdAt.getTime()) : 0,
+      lastCompletionLagMs: this.lastCompletionLagMs,
+      lastRunAt: this.lastRunAt,
+      ...this.counters,
+    };
+  }
+
+  private runInBackground(): void {
+    this.runOnce().catch((error) => {
+      console.error("[Outbox] Run failed:", error);
+    });
+  }
+
+  private async run(): Promise<OutboxRunResult> {
+    this.counters.runs++;
+    this.lastRunAt = new Date();
+    await this.ensureTtlIndex();
+
+    const drainedFailedCharges = await this.drainFailedCharges();
+    const jobs = await this.claim();
+
+    const byShop = new Map<string, OutboxJob[]>();
+    for (const job of jobs) {
+      const list = byShop.get(job.shop);
+      if (list) list.push(job);
+      else byShop.set(job.shop, [job]);
+    }
+
+    const result: OutboxRunResult = {
+      claimed: jobs.length,
+      completed: 0,
+      retried: 0,
+      deadLettered: 0,
+      drainedFailedCharges,
+    };
+
+    for (const [shop, shopJobs] of byShop) {
+      try {
+        const shopResult = await this.processShop(shop, shopJobs);
+        result.completed += shopResult.completed;
+        result.retried += shopResult.retried;
+        result.deadLettered += shopResult.deadLettered;
+      } catch (error) {
+        // Shop-level failure (subscription lookup, batch write): retry the whole batch
+        console.error(`[Outbox] Batch failed for ${shop}:`, error);
+        for (const job of shopJobs) {
+          if (await this.fail(job, error)) result.deadLettered++;
+          else result.retried++;
+        }
+      }
+    }
+
+    this.counters.completed += result.completed;
+    this.counters.retried += result.retried;
+    this.counters.deadLettered += result.deadLettered;
+    this.counters.drainedFailedCharges += drainedFailedCharges;
+
+    return result;
+  }
+
+  /**
+   * Lock up to batchSize due jobs for this run.
+   * Candidates are re-checked in the update filter, so two workers never own the same job.
+   */
+  private async claim(): Promise<OutboxJob[]> {
+    const now = new Date();
+    const due = {
+      OR: [
+        { status: "pending", nextRunAt: { lte: now } },
+        { status: "processing", lockedUntil: { lt: now } },
+      ],
+    };
+
+    const candidates = await prisma.outboxJob.findMany({
+      where: due,
+      orderBy: { createdAt: "asc" },
+      take: this.options.batchSize,
+      select: { id: true },
+    });
+    if (candidates.length === 0) return [];
+
+    const lockId = randomUUID();
+    await prisma.outboxJob.updateMany({
+      where: { id: { in: candidates.map((job) => job.id) }, ...due },
+      data: {
+        status: "processing",
+        lockId,
+        lockedUntil: new Date(now.getTime() + this.options.lockMs),
+        attempts: { increment: 1 },
+      },
+    });
+
+    return await prisma.outboxJob.findMany({
+      where: { lockId },
+      orderBy: { createdAt: "asc" },
+    });
+  }
+
+  private async processShop(
+    shop: string,
+    jobs: OutboxJob[],
+  ): Promise<{ completed: number; retried: number; deadLettered: number }> {
+    const { subscription } = await getEntitlement(shop);
+    let admin: AdminApiContext | null = null;
+
+    const logs: ReturnType<typeof buildGenerationLogData>[] = [];
+    const done: OutboxJob[] = [];
+    const dead: Array<{ job: OutboxJob; error: unknown }> = [];
+    const closed: Array<{ job: OutboxJob; reason: string }> = [];
+    let retried = 0;
+
+    for (const job of jobs) {
+      const payload = job.payload as unknown as GenerationJobPayload & UsageChargeJobPayload;
+      let wasCharged = false;
+
+      if (job.type === "usage_charge") {
+        const reason = closedChargeReason(payload, subscription);
+        if (reason) {
+          closed.push({ job, reason });
+          continue;
+        }
+      }
+
+      try {
+        if (subscription) {
+          admin ??= await this.resolveAdmin(shop);
+          const charge = await recordUsage(admin, {
+            shop,
+            sectionId: payload.sectionId,
+            description: payload.description ?? usageDescription(payload.prompt),
+            // Retried charges keep their original amount; generations are priced now
+            amount: job.type === "usage_charge" ? payload.amount : undefined,
+            idempotencyKey: `outbox:${job.idempotencyKey}`,
+          });
+          if (charge.chargeStatus === "error") {
+            throw new Error("Usage charge was not accepted by Shopify");
+          }
+          wasCharged = charge.amount > 0;
+        }
+        done.push(job);
+      } catch (error) {
+        if (job.attempts < this.options.maxAttempts) {
+          await this.fail(job, error);
+          retried++;
+          continue;
+        }
+        dead.push({ job, error });
+      }
+
+      // Dead-lettered generations are still logged; the usage record keeps the charge error
+      if (job.type === "generation") {
+        logs.push(this.buildLog(shop, payload, subscription, wasCharged));
+      }
+    }
+
+    if (done.length === 0 && dead.length === 0 && closed.length === 0) {
+      return { completed: 0, retried, deadLettered: 0 };
+    }
+
+    const completedAt = new Date();
+    await prisma.$transaction([
+      ...(logs.length > 0 ? [prisma.generationLog.createMany({ data: logs })] : []),
+      prisma.outboxJob.updateMany({
+        where: { id: { in: done.map((job) => job.id) } },
+        data: { status: "done", completedAt, lockId: null, lockedUntil: null, lastError: null },
+      }),
+      ...dead.map(({ job, error }) =>
+        prisma.outboxJob.update({
+          where: { id: job.id },
+          data: {
+            status: "failed",
+            lockId: null,
+            lockedUntil: null,
+            lastError: error instanceof Error ? error.message : "Unknown error",
+          },
+        }),
+      ),
+      ...closed.map(({ job, reason }) =>
+        prisma.outboxJob.update({
+          where: { id: job.id },
+          data: { status: "failed", lockId: null, lockedUntil: null, lastError: reason },
+        }),
+      ),
+    ]);
+
+    for (const { job, error } of dead) {
+      console.error(`[Outbox] Job ${job.idempotencyKey} dead-lettered after ${job.attempts} attempts:`, error);
+    }
+    for (const { job, reason } of closed) {
+      console.warn(`[Outbox] Job ${job.idempotencyKey} closed without charging: ${reason}`);
+    }
+
+    // Free tier usage is counted from GenerationLog (paid usage is
+    // invalidated by recordUsage)
+    if (!subscription && logs.length > 0) {
+      await invalidateEntitlement(shop);
+    }
+
+    if (done.length > 0) {
+      const oldest = Math.min(...done.map((job) => job.createdAt.getTime()));
+      this.lastCompletionLagMs = completedAt.getTime() - oldest;
+    }
+
+    return { completed: done.length, retried, deadLettered: dead.length + closed.length };
+  }
+
+  private buildLog(
+    shop: string,
+    payload: GenerationJobPayload,
+    subscription: Subscription | null,
+    wasCharged: boolean,
+  ) {
+    return buildGenerationLogData({
+      shop,
+      sectionId: payload.sectionId,
+      messageId: payload.messageId,
+      prompt: payload.prompt,
+      tokenCount: payload.tokenCount,
+      modelId: payload.modelId,
+      userTier: (subscription?.planName ?? "free") as "free" | "pro" | "agency",
+      wasCharged,
+      subscription,
+    });
+  }
+
+  /**
+   * Release a job for retry with backoff, or dead-letter it. Returns true if dead-lettered.
+   */
+  private async fail(job: OutboxJob, error: unknown): Promise<boolean> {
+    const lastError = error instanceof Error ? error.message : "Unknown error";
+    const exhausted = job.attempts >= this.options.maxAttempts;
+    const delay = getRetryDelayMs(job.attempts, this.options.baseDelayMs, this.options.maxDelayMs);
+
+    await prisma.outboxJob.update({
+      where: { id: job.id },
+      data: exhausted
+        ? { status: "failed", lockId: null, lockedUntil: null, lastError }
+        : {
+            status: "pending",
+            lockId: null,
+            lockedUntil: null,
+            lastError,
+            nextRunAt: new Date(Date.now() + delay),
+          },
+    });
+
+    if (exhausted) {
+      console.error(`[Outbox] Job ${job.idempotencyKey} dead-lettered after ${job.attempts} attempts:`, error);
+    } else {
+      console.warn(`[Outbox] Job ${job.idempotencyKey} failed (attempt ${job.attempts}), retrying in ${delay}ms:`, lastError);
+    }
+    return exhausted;
+  }
+
+  /**
+   * Move FailedUsageCharge rows into the outbox as usage_charge jobs
+   */
+  private async drainFailedCharges(): Promise<number> {
+    const rows = await prisma.failedUsageCharge.findMany({
+      orderBy: { createdAt: "asc" },
+      take: FAILED_CHARGE_BATCH,
+    });
+
+    let drained = 0;
+    for (const row of rows) {
+      try {
+        await this.enqueue(row.shop, "usage_charge", `failed-charge:${row.id}`, {
+          sectionId: row.sectionId,
+          description: "Section generation (retried charge)",
+          subscriptionId: row.subscriptionId ?? undefined,
+          amount: row.amount ?? undefined,
+          billingCycle: row.billingCycle?.toISOString(),
+        });
+        await prisma.failedUsageCharge.delete({ where: { id: row.id } });
+        drained++;
+      } catch (error) {
+        console.error(`[Outbox] Failed to drain FailedUsageCharge ${row.id}:`, error);
+      }
+    }
+    return drained;
+  }
+
+  /**
+   * TTL index so done jobs expire (Prisma schema cannot declare TTL indexes).
+   * Documents without completedAt (pending, failed) are never expired.
+   */
+  private ensureTtlIndex(): Promise<void> {
+    if (!this.ttlIndexReady) {
+      this.ttlIndexReady = prisma
+        .$runCommandRaw({
+          createIndexes: "OutboxJob",
+          indexes: [
+            { key: { completedAt: 1 }, name: "completedAt_ttl", expireAfterSeconds: DONE_JOB_TTL_SECONDS },
+          ],
+        })
+        .then(() => undefined)
+        .catch((error) => {
+          // Non-fatal: done jobs just accumulate
+          console.error("[Outbox] Failed to create TTL index:", error);
+        });
+    }
+    return this.ttlIndexReady;
+  }
+}
+
+export const outboxWorker = new OutboxWorker();
+
+if (process.env.NODE_ENV !== "test" && process.env.OUTBOX_WORKER !== "off") {
+  outboxWorker.start();
+}
@@ -0,0 +1,160 @@
+/**
+ * Preview Render Cache
+ *
+ * Content-addressed cache for /api/preview/render results.
+ * Identical payloads (toggling a setting back, reopening a section, two tabs
+ * on the same section) are served from memory without hitting the App Proxy
+ * or re-running DOMPurify.
+ *
+ * - Keyed by shop + SHA-256 of code, settings, blocks, product, collection, section_id
+ * - Bounded by total bytes with LRU eviction
+ * - Concurrent identical requests share one in-flight render (single-flight)
+ * - Only successful native renders are cached; fallbacks are always retried
+ */
+
+import { createHash } from "crypto";
+import { LruCache } from "../utils/lru-cache.server";
+
+export interface PreviewRenderPayload {
+  code: string;
+  settings?: string;
+  blocks?: string;
+  product?: string;
+  collection?: string;
+  section_id?: string;
+}
+
+export interface PreviewRenderResult {
+  html: string | null;
+  mode: "native" | "fallback";
+  error?: string;
+}
+
+export type PreviewCacheStatus = "hit" | "miss" | "coalesced";
+
+export interface PreviewRenderCacheStats {
+  hits: number;
+  misses: number;
+  coalesced: number;
+  evictions: number;
+  entries: number;
+  bytes: number;
+  maxBytes: number;
+}
+
+// Total budget for cached HTML across all shops (default 32 MB)
+const MAX_CACHE_BYTES =
+  (Number(process.env.PREVIEW_RENDER_CACHE_MB) || 32) * 1024 * 1024;
+
+// Storefront data (products, collections) behind a render can change
+const RENDER_TTL_MS = 10 * 60 * 1000;
+
+const stats = { hits: 0, misses: 0, coalesced: 0, evictions: 0 };
+
+const renderCache = new LruCache<string>({
+  maxBytes: MAX_CACHE_BYTES,
+  ttlMs: RENDER_TTL_MS,
+  // JS strings are UTF-16
+  sizeOf: (html) => html.length * 2,
+  onEvict: () => {
+    stats.evictions++;
+  },
+});
+
+const inFlight = new Map<string, Promise<PreviewRenderResult>>();
+
+/**
+ * Build the cache key for a shop + payload
+ * Fields are length-prefixed so values cannot bleed into each other.
+ */
+export function getPreviewRenderKey(shop: string, payload: PreviewRenderPayload): string {
+  const hash = createHash("sha256");
+  for (const value of [
+    payload.code,
+    payload.settings,
+    payload.blocks,
+    payload.product,
+    payload.collection,
+    payload.section_id || "preview",
+  ]) {
+    const part = value ?? "";
+    hash.update(`${part.length}:`);
+    hash.update(part);
+  }
+  return `${shop}:${hash.digest("hex")}`;
+}
+
+/**
+ * Return a cached render or run `render` once for all concurrent callers
+ */
+export async function getOrRenderPreview(
+  shop: string,
+  payload: PreviewRenderPayload,
+  render: () => Promise<PreviewRenderResult>
+): Promise<{ result: PreviewRenderResult; cacheStatus: PreviewCacheStatus }> {
+  const key = getPreviewRenderKey(shop, payload);
+
+  const cachedHtml = renderCache.get(key);
+  if (cachedHtml !== undefined) {
+    stats.hits++;
+    return { result: { html: cachedHtml, mode: "native" }, cacheStatus: "hit" };
+  }
+
+  const pending = inFlight.get(key);
+  if (pending) {
+    stats.coalesced++;
+    return { result: await pending, cacheStatus: "coalesced" };
+  }
+
+  stats.misses++;
+  const promise = render()
+    .then((result) => {
+      if (result.mode === "native" && result.html !== null) {
+        renderCache.set(key, result.html);
+      }
+      return result;
+    })
+    .finally(() => {
+      inFlight.delete(key);
+    });
+  inFlight.set(key, promise);
+
+  return { result: await promise, cacheStatus: "miss" };
+}
+
+/**
+ * Drop cached renders for one shop, or all shops when omitted.
+ * Called when a storefront password is saved or cleared, and when a render
+ * hits the password wall.
+ */
+export function clearPreviewRenderCache(shop?: string): void {
+  if (shop) {
+    renderCache.deletePrefix(`${shop}:`);
+  } else {
+    renderCache.clear();
+  }
+}
+
+/**
+ * Counters for sizing the cache (served by /api/preview/cache-metrics)
+ */
+export function getPreviewRenderCacheStats(): PreviewRenderCacheStats {
+  return {
+    ...stats,
+    entries: renderCache.size,
+    bytes: renderCache.bytes,
+    maxBytes: renderCache.maxBytes,
+  };
+}
+
+/**
+ * Reset cache and counters (tests only)
+ */
+export function resetPreviewRenderCache(): void {
+  renderCache.clear();
+  inFlight.clear();
+  stats.hits = 0;
+  stats.misses = 0;
+  stats.coalesced = 0;
+  stats.evictions = 0;
+}
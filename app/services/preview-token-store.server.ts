@@ -1,97 +1,300 @@
 /**
  * Preview Token Store
  *
- * In-memory store for large preview data to bypass URL length limits.
- * Tokens expire after 5 minutes to prevent memory leaks.
+ * Short-lived store for large preview payloads to bypass URL length limits.
+ * Tokens expire after 5 minutes.
  *
  * Flow:
  * 1. Client sends large Liquid code to internal proxy
  * 2. Internal proxy stores code with short token
  * 3. App Proxy URL uses token: ?token=abc123
  * 4. App Proxy retrieves code using token
+ *
+ * Payloads are stored decoded (raw Liquid / JSON), not base64.
+ * Identical payloads for the same shop reuse one token (content-hash dedup).
+ *
+ * Backends (PREVIEW_TOKEN_STORE):
+ * - "memory" (default): per-process, byte-bounded, expiry-ordered
+ * - "mongo": shared PreviewToken collection with a TTL index, for multi-instance deploys
  */
 
-import { randomBytes } from "crypto";
+import { createHash, randomBytes } from "crypto";
+import prisma from "../db.server";
 
-interface PreviewData {
+export interface PreviewPayload {
+  /** Raw Liquid code */
   code: string;
+  /** Raw settings JSON */
   settings?: string;
+  /** Raw blocks JSON */
   blocks?: string;
   product?: string;
   collection?: string;
   section_id?: string;
-  expiresAt: number;
 }
 
-// In-memory store with auto-cleanup
-const tokenStore = new Map<string, PreviewData>();
+export interface PreviewTokenStore {
+  /** Store payload for a shop and return a token (existing token if content is identical) */
+  put(shop: string, data: PreviewPayload): Promise<string>;
+  /** Payload for token, or null if expired, unknown or owned by another shop */
+  get(token: string, shop: string): Promise<PreviewPayload | null>;
+  delete(token: string): Promise<void>;
+}
 
 // TTL: 5 minutes (enough for preview round-trip)
 const TOKEN_TTL_MS = 5 * 60 * 1000;
 
-// Cleanup interval: every minute
-const CLEANUP_INTERVAL_MS = 60 * 1000;
+// Memory budget for the in-memory backend (default 64 MB)
+const MAX_STORE_BYTES =
+  (Number(process.env.PREVIEW_TOKEN_STORE_MB) || 64) * 1024 * 1024;
 
 // Generate cryptographically secure short token
 function generateToken(): string {
   return randomBytes(16).toString("hex");
 }
 
-// Cleanup expired tokens
-function cleanupExpiredTokens(): void {
-  const now = Date.now();
-  for (const [token, data] of tokenStore.entries()) {
-    if (data.expiresAt < now) {
-      tokenStore.delete(token);
-    }
+/**
+ * Content hash of a payload, scoped to the shop
+ */
+export function hashPreviewPayload(shop: string, data: PreviewPayload): string {
+  const hash = createHash("sha256");
+  for (const value of [
+    shop,
+    data.code,
+    data.settings,
+    data.blocks,
+    data.product,
+    data.collection,
+    data.section_id,
+  ]) {
+    const part = value ?? "";
+    hash.update(`${part.length}:`);
+    hash.update(part);
   }
+  return hash.digest("hex");
 }
 
-// Start cleanup interval (runs on server start)
-let cleanupInterval: ReturnType<typeof setInterval> | null = null;
-if (typeof setInterval !== "undefined" && !cleanupInterval) {
-  cleanupInterval = setInterval(cleanupExpiredTokens, CLEANUP_INTERVAL_MS);
-  // Allow process to exit even with interval running
-  if (cleanupInterval.unref) {
-    cleanupInterval.unref();
+function payloadSize(data: PreviewPayload): number {
+  let chars = 0;
+  for (const value of Object.values(data)) {
+    if (typeof value === "string") chars += value.length;
   }
+  // JS strings are UTF-16
+  return chars * 2;
+}
+
+interface StoredPreview {
+  shop: string;
+  hash: string;
+  data: PreviewPayload;
+  size: number;
+  expiresAt: number;
 }
 
 /**
- * Store preview data and return a short token
+ * In-memory backend
+ *
+ * TTL is constant, so Map insertion order is expiry order: expired entries are
+ * swept from the front on each write (no timers, no full scans) and the same
+ * order is used to evict when the byte budget is exceeded.
  */
-export function storePreviewData(data: Omit<PreviewData, "expiresAt">): string {
-  const token = generateToken();
-  tokenStore.set(token, {
-    ...data,
-    expiresAt: Date.now() + TOKEN_TTL_MS,
-  });
-  return token;
+export class InMemoryPreviewTokenStore implements PreviewTokenStore {
+  private byToken = new Map<string, StoredPreview>();
+  private byHash = new Map<string, string>();
+  private totalBytes = 0;
+  private readonly maxBytes: number;
+  private readonly ttlMs: number;
+
+  constructor({ maxBytes = MAX_STORE_BYTES, ttlMs = TOKEN_TTL_MS } = {}) {
+    this.maxBytes = maxBytes;
+    this.ttlMs = ttlMs;
+  }
+
+  get bytes(): number {
+    return this.totalBytes;
+  }
+
+  get size(): number {
+    return this.byToken.size;
+  }
+
+  async put(shop: string, data: PreviewPayload): Promise<string> {
+    const now = Date.now();
+    this.sweep(now);
+
+    const hash = hashPreviewPayload(shop, data);
+    const existingToken = this.byHash.get(hash);
+    if (existingToken) {
+      const entry = this.byToken.get(existingToken)!;
+      entry.expiresAt = now + this.ttlMs;
+      // Re-insert to keep expiry order
+      this.byToken.delete(existingToken);
+      this.byToken.set(existingToken, entry);
+      return existingToken;
+    }
+
+    const size = payloadSize(data);
+    if (size > this.maxBytes) {
+      throw new Error("Preview payload exceeds token store budget");
+    }
+
+    // Evict soonest-expiring entries until the new payload fits
+    while (this.totalBytes + size > this.maxBytes) {
+      const oldest = this.byToken.keys().next();
+      if (oldest.done) break;
+      this.remove(oldest.value);
+    }
+
+    const token = generateToken();
+    this.byToken.set(token, { shop, hash, data, size, expiresAt: now + this.ttlMs });
+    this.byHash.set(hash, token);
+    this.totalBytes += size;
+    return token;
+  }
+
+  async get(token: string, shop: string): Promise<PreviewPayload | null> {
+    const entry = this.byToken.get(token);
+    if (!entry) return null;
+
+    if (entry.expiresAt <= Date.now()) {
+      this.remove(token);
+      return null;
+    }
+
+    return entry.shop === shop ? entry.data : null;
+  }
+
+  async delete(token: string): Promise<void> {
+    this.remove(token);
+  }
+
+  private sweep(now: number): void {
+    for (const [token, entry] of this.byToken) {
+      if (entry.expiresAt > now) break;
+      this.remove(token);
+    }
+  }
+
+  private remove(token: string): void {
+    const entry = this.byToken.get(token);
+    if (!entry) return;
+    this.byToken.delete(token);
+    this.byHash.delete(entry.hash);
+    this.totalBytes -= entry.size;
+  }
 }
 
 /**
- * Retrieve preview data by token (returns null if expired or not found)
+ * MongoDB backend (PreviewToken collection via the Prisma datasource)
+ *
+ * Shared by all app instances, so the App Proxy request can land on any node.
+ * Expired documents are removed by a TTL index on expiresAt, created on first use
+ * (Prisma schema cannot declare TTL indexes).
  */
-export function getPreviewData(token: string): Omit<PreviewData, "expiresAt"> | null {
-  const data = tokenStore.get(token);
-  if (!data) {
-    return null;
+export class PrismaPreviewTokenStore implements PreviewTokenStore {
+  private ttlIndexReady: Promise<void> | null = null;
+  private readonly ttlMs: number;
+
+  constructor({ ttlMs = TOKEN_TTL_MS } = {}) {
+    this.ttlMs = ttlMs;
+  }
+
+  async put(shop: string, data: PreviewPayload): Promise<string> {
+    await this.ensureTtlIndex();
+
+    const contentHash = hashPreviewPayload(shop, data);
+    const expiresAt = new Date(Date.now() + this.ttlMs);
+
+    // Upsert on content hash: identical payloads refresh the existing token
+    const record = await prisma.previewToken.upsert({
+      where: { contentHash },
+      update: { expiresAt },
+      create: {
+        token: generateToken(),
+        contentHash,
+        shop,
+        code: data.code,
+        settings: data.settings ?? null,
+        blocks: data.blocks ?? null,
+        product: data.product ?? null,
+        collection: data.collection ?? null,
+        sectionId: data.section_id ?? null,
+        expiresAt,
+      },
+      select: { token: true },
+    });
+
+    return record.token;
+  }
+
+  async get(token: string, shop: string): Promise<PreviewPayload | null> {
+    const record = await prisma.previewToken.findUnique({ where: { token } });
+
+    // TTL monitor runs about once a minute, so check expiry explicitly
+    if (!record || record.expiresAt.getTime() <= Date.now() || record.shop !== shop) {
+      return null;
+    }
+
+    return {
+      code: record.code,
+      settings: record.settings ?? undefined,
+      blocks: record.blocks ?? undefined,
+      product: record.product ?? undefined,
+      collection: record.collection ?? undefined,
+      section_id: record.sectionId ?? undefined,
+    };
   }
 
-  // Check expiration
-  if (data.expiresAt < Date.now()) {
-    tokenStore.delete(token);
-    return null;
+  async delete(token: string): Promise<void> {
+    await prisma.previewToken.deleteMany({ where: { token } });
   }
 
-  // Return without expiresAt
-  const { expiresAt: _, ...previewData } = data;
-  return previewData;
+  private ensureTtlIndex(): Promise<void> {
+    if (!this.ttlIndexReady) {
+      this.ttlIndexReady = prisma
+        .$runCommandRaw({
+          createIndexes: "PreviewToken",
+          indexes: [{ key: { expiresAt: 1 }, name: "expiresAt_ttl", expireAfterSeconds: 0 }],
+        })
+        .then(() => undefined)
+        .catch((error) => {
+          // Non-fatal: expiry is still enforced on read
+          console.error("[PreviewTokenStore] Failed to create TTL index:", error);
+        });
+    }
+    return this.ttlIndexReady;
+  }
+}
+
+let store: PreviewTokenStore =
+  process.env.PREVIEW_TOKEN_STORE === "mongo"
+    ? new PrismaPreviewTokenStore()
+    : new InMemoryPreviewTokenStore();
+
+/**
+ * Replace the active backend (tests, custom deployments)
+ */
+export function setPreviewTokenStore(next: PreviewTokenStore): void {
+  store = next;
+}
+
+/**
+ * Store preview data and return a short token
+ */
+export function storePreviewData(shop: string, data: PreviewPayload): Promise<string> {
+  return store.put(shop, data);
+}
+
+/**
+ * Retrieve preview data by token (returns null if expired, not found, or another shop's)
+ */
+export function getPreviewData(token: string, shop: string): Promise<PreviewPayload | null> {
+  return store.get(token, shop);
 }
 
 /**
- * Delete token after use (optional, auto-expires anyway)
+ * Delete token (optional, auto-expires anyway)
  */
-export function deletePreviewToken(token: string): void {
-  tokenStore.delete(token);
+export function deletePreviewToken(token: string): Promise<void> {
+  return store.delete(token);
 }
@@ -0,0 +1,256 @@
+/**
+ * Resource Cache
+ *
+ * Tenant-scoped, memory-bounded cache for Admin API resources.
+ *
+ * - Keys are namespaced per shop (`${shop}|${key}`), so tenants never collide
+ * - Total size is capped with LRU eviction (see LruCache)
+ * - Stale-while-revalidate: expired entries are served immediately while a
+ *   background refresh runs, so callers never wait on an expired entry
+ * - Concurrent misses for the same key share one loader call
+ */
+
+import { LruCache } from "../utils/lru-cache.server";
+
+interface ResourceEntry<T> {
+  value: T;
+  freshUntil: number;
+}
+
+export interface ResourceCacheOptions {
+  /** Memory cap across all shops, in bytes */
+  maxBytes: number;
+  /** How long an entry is served without revalidation */
+  freshMs: number;
+  /** How long past freshMs an entry may still be served while refreshing */
+  staleMs: number;
+}
+
+export interface ResourceCacheStats {
+  hits: number;
+  staleHits: number;
+  misses: number;
+  coalesced: number;
+  refreshes: number;
+  refreshErrors: number;
+  evictions: number;
+  entries: number;
+  bytes: number;
+}
+
+type Loader<T> = () => Promise<T | null>;
+type BatchLoader<T> = (keys: string[]) => Promise<Map<string, T | null>>;
+
+// Rough byte estimate: JSON length in UTF-16 code units
+function estimateSize(entry: ResourceEntry<unknown>): number {
+  try {
+    return JSON.stringify(entry.value).length * 2;
+  } catch {
+    return 1024;
+  }
+}
+
+export class ResourceCache {
+  private readonly options: ResourceCacheOptions;
+  private readonly entries: LruCache<ResourceEntry<unknown>>;
+  private readonly inFlight = new Map<string, Promise<unknown>>();
+  private readonly counters = {
+    hits: 0,
+    staleHits: 0,
+    misses: 0,
+    coalesced: 0,
+    refreshes: 0,
+    refreshErrors: 0,
+    evictions: 0,
+  };
+
+  constructor(options: ResourceCacheOptions) {
+    this.options = options;
+    this.entries = new LruCache<ResourceEntry<unknown>>({
+      maxBytes: options.maxBytes,
+      ttlMs: options.freshMs + options.staleMs,
+      sizeOf: estimateSize,
+      onEvict: () => {
+        this.counters.evictions++;
+      },
+    });
+  }
+
+  /**
+   * Get a value, loading it on miss and revalidating it in the background when stale.
+   * Null results are not cached.
+   */
+  async get<T>(shop: string, key: string, loader: Loader<T>): Promise<T | null> {
+    const scopedKey = this.scope(shop, key);
+    const entry = this.entries.get(scopedKey) as ResourceEntry<T> | undefined;
+
+    if (entry) {
+      if (entry.freshUntil > Date.now()) {
+        this.counters.hits++;
+      } else {
+        this.counters.staleHits++;
+        this.revalidate(scopedKey, loader);
+      }
+      return entry.value;
+    }
+
+    const pending = this.inFlight.get(scopedKey) as Promise<T | null> | undefined;
+    if (pending) {
+      this.counters.coalesced++;
+      return pending;
+    }
+
+    this.counters.misses++;
+    return this.load(scopedKey, loader);
+  }
+
+  /**
+   * Batched variant of get(): all keys that are neither cached nor in flight
+   * are resolved with a single batchLoader call. Stale keys are refreshed
+   * together in one background batch.
+   */
+  async getMany<T>(
+    shop: string,
+    keys: string[],
+    batchLoader: BatchLoader<T>
+  ): Promise<Map<string, T | null>> {
+    const results = new Map<string, T | null>();
+    const waiting: Array<[string, Promise<T | null>]> = [];
+    const missing: string[] = [];
+    const stale: string[] = [];
+    const now = Date.now();
+
+    for (const key of new Set(keys)) {
+      const scopedKey = this.scope(shop, key);
+      const entry = this.entries.get(scopedKey) as ResourceEntry<T> | undefined;
+
+      if (entry) {
+        if (entry.freshUntil > now) {
+          this.counters.hits++;
+        } else {
+          this.counters.staleHits++;
+          if (!this.inFlight.has(scopedKey)) stale.push(key);
+        }
+        results.set(key, entry.value);
+        continue;
+      }
+
+      const pending = this.inFlight.get(scopedKey) as Promise<T | null> | undefined;
+      if (pending) {
+        this.counters.coalesced++;
+        waiting.push([key, pending]);
+        continue;
+      }
+
+      this.counters.misses++;
+      missing.push(key);
+    }
+
+    if (stale.length > 0) {
+      this.counters.refreshes++;
+      this.loadBatch(shop, stale, batchLoader).catch((error) => {
+        this.counters.refreshErrors++;
+        console.error("[ResourceCache] Background batch refresh failed:", error);
+      });
+    }
+
+    if (missing.length > 0) {
+      const loaded = await this.loadBatch(shop, missing, batchLoader);
+      for (const [key, value] of loaded) results.set(key, value);
+    }
+
+    for (const [key, pending] of waiting) {
+      results.set(key, await pending);
+    }
+
+    return results;
+  }
+
+  /**
+   * Remove one key for a shop
+   */
+  invalidate(shop: string, key: string): void {
+    this.entries.delete(this.scope(shop, key));
+  }
+
+  /**
+   * Remove every key for a shop, or everything when shop is omitted
+   */
+  clear(shop?: string): void {
+    if (shop) {
+      this.entries.deletePrefix(this.scope(shop, ""));
+    } else {
+      this.entries.clear();
+    }
+  }
+
+  getStats(): ResourceCacheStats {
+    return {
+      ...this.counters,
+      entries: this.entries.size,
+      bytes: this.entries.bytes,
+    };
+  }
+
+  private scope(shop: string, key: string): string {
+    return `${shop}|${key}`;
+  }
+
+  private store<T>(scopedKey: string, value: T | null): void {
+    if (value === null || value === undefined) return;
+    this.entries.set(scopedKey, {
+      value,
+      freshUntil: Date.now() + this.options.freshMs,
+    });
+  }
+
+  private load<T>(scopedKey: string, loader: Loader<T>): Promise<T | null> {
+    const promise = loader()
+      .then((value) => {
+        this.store(scopedKey, value);
+        return value;
+      })
+      .finally(() => {
+        this.inFlight.delete(scopedKey);
+      });
+    this.inFlight.set(scopedKey, promise);
+    return promise;
+  }
+
+  private revalidate<T>(scopedKey: string, loader: Loader<T>): void {
+    if (this.inFlight.has(scopedKey)) return;
+    this.counters.refreshes++;
+    this.load(scopedKey, loader).catch((error) => {
+      this.counters.refreshErrors++;
+      console.error("[ResourceCache] Background refresh failed:", scopedKey, error);
+    });
+  }
+
+  private loadBatch<T>(
+    shop: string,
+    keys: string[],
+    batchLoader: BatchLoader<T>
+  ): Promise<Map<string, T | null>> {
+    const batch = batchLoader(keys).then((loaded) => {
+      for (const key of keys) {
+        this.store(this.scope(shop, key), loaded.get(key) ?? null);
+      }
+      return loaded;
+    });
+
+    // Register a per-key promise so single-key callers can join this batch
+    for (const key of keys) {
+      const scopedKey = this.scope(shop, key);
+      const perKey = batch
+        .then((loaded) => loaded.get(key) ?? null)
+        .finally(() => {
+          this.inFlight.delete(scopedKey);
+        });
+      // Rejections surface through `batch`; avoid unhandled duplicates here
+      perKey.catch(() => {});
+      this.inFlight.set(scopedKey, perKey);
+    }
+
+    return batch;
+  }
+}
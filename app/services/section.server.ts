@@ -2,11 +2,23 @@ import prisma from "../db.server";
 import type { Section } from "@prisma/client";
 import {
   SECTION_STATUS,
+  VALID_STATUSES,
   type SectionStatus,
+  isValidStatus,
   isValidTransition,
   getTransitionErrorMessage,
 } from "../types/section-status";
 
+// Text search resolves matching ids first; cap how many a query can pull in
+const TEXT_SEARCH_MATCH_LIMIT = 1000;
+
+// Conditional status writes retry once if the status changed underneath them
+const STATUS_UPDATE_ATTEMPTS = 2;
+
+// Counter rows are recounted on read once this old, so drift from a write
+// that raced a rebuild (or a dropped adjustment) does not persist
+const STATUS_RECOUNT_MS = 10 * 60 * 1000;
+
 /**
  * Sanitize Liquid code to fix invalid forms
  * Safety net for AI hallucinations (e.g., new_comment forms, missing product arg)
@@ -100,8 +112,174 @@ export interface GetByShopOptions {
   limit?: number;
   status?: SectionStatus;
   search?: string;
+  // "contains": substring match on prompt/name; "text": Mongo text index
+  // (whole, stemmed words; falls back to "contains" when nothing matches)
+  searchMode?: "contains" | "text";
   sort?: "newest" | "oldest";
   includeInactive?: boolean; // Default false - excludes inactive unless explicitly included
+  // Opaque cursors from a previous page; when set, `page` is only a label
+  after?: string;
+  before?: string;
+}
+
+export interface SectionPage {
+  items: Section[];
+  total: number;
+  page: number;
+  totalPages: number;
+  nextCursor: string | null;
+  prevCursor: string | null;
+}
+
+export type SectionStatusCounts = Record<SectionStatus, number>;
+
+interface SectionCursor {
+  createdAt: Date;
+  id: string;
+}
+
+/**
+ * Encode a list position as an opaque cursor: base64url("<createdAt ms>:<id>")
+ */
+function encodeCursor(section: Pick<Section, "createdAt" | "id">): string {
+  return Buffer.from(`${section.createdAt.getTime()}:${section.id}`).toString("base64url");
+}
+
+/**
+ * Decode a cursor; returns null for anything malformed (treated as first page)
+ */
+function decodeCursor(cursor: string | undefined): SectionCursor | null {
+  if (!cursor) return null;
+  const [ms, id] = Buffer.from(cursor, "base64url").toString("utf8").split(":");
+  const time = Number(ms);
+  if (!id || !/^[a-f0-9]{24}$/i.test(id) || !Number.isFinite(time)) return null;
+  return { createdAt: new Date(time), id };
+}
+
+function isRecordNotFound(error: unknown): boolean {
+  return (error as { code?: string } | null)?.code === "P2025";
+}
+
+function isUniqueViolation(error: unknown): boolean {
+  return (error as { code?: string } | null)?.code === "P2002";
+}
+
+/**
+ * Update a section only if its status is still `status`.
+ * Returns null when the status changed since it was read.
+ */
+async function updateIfStatus(
+  id: string,
+  status: string,
+  data: UpdateSectionInput | { status: SectionStatus }
+): Promise<Section | null> {
+  try {
+    return await prisma.section.update({ where: { id, status }, data });
+  } catch (error) {
+    if (isRecordNotFound(error)) return null;
+    throw error;
+  }
+}
+
+async function countByStatus(shop: string): Promise<SectionStatusCounts> {
+  const [draft, active, inactive, archive] = await Promise.all(
+    VALID_STATUSES.map((status) => prisma.section.count({ where: { shop, status } }))
+  );
+  return { draft, active, inactive, archive };
+}
+
+/**
+ * Recount an existing counter row. Written only if no adjustment landed since
+ * `revision` was read; otherwise left for the next read. Non-fatal.
+ */
+async function recountStatusCounts(
+  shop: string,
+  revision: number
+): Promise<SectionStatusCounts | null> {
+  try {
+    const counts = await countByStatus(shop);
+    const { count } = await prisma.sectionStatusCount.updateMany({
+      where: { shop, revision },
+      data: { ...counts, countedAt: new Date() },
+    });
+    return count > 0 ? counts : null;
+  } catch (error) {
+    console.error("[sectionService] Failed to recount status counts:", error);
+    return null;
+  }
+}
+
+/**
+ * Apply status count deltas for a shop.
+ * Skipped while the shop has no counter row (it is rebuilt on first read).
+ * Non-fatal: on failure the row is dropped so the next read rebuilds it.
+ */
+async function adjustStatusCounts(
+  shop: string,
+  delta: Partial<Record<string, number>>
+): Promise<void> {
+  const data: Record<string, { increment: number }> = {};
+  for (const [status, amount] of Object.entries(delta)) {
+    if (amount && isValidStatus(status)) data[status] = { increment: amount };
+  }
+  if (Object.keys(data).length === 0) return;
+  data.revision = { increment: 1 };
+
+  try {
+    await prisma.sectionStatusCount.updateMany({ where: { shop }, data });
+  } catch (error) {
+    console.error("[sectionService] Failed to update status counts:", error);
+    await prisma.sectionStatusCount.deleteMany({ where: { shop } }).catch(() => undefined);
+  }
+}
+
+let textIndexReady: Promise<void> | null = null;
+
+/**
+ * Create the text index used by searchMode "text" (once per process).
+ * Prefixed by shop, so every text query is scoped to a single shop.
+ */
+function ensureTextIndex(): Promise<void> {
+  if (!textIndexReady) {
+    textIndexReady = prisma
+      .$runCommandRaw({
+        createIndexes: "Section",
+        indexes: [{ key: { shop: 1, name: "text", prompt: "text" }, name: "shop_name_prompt_text" }],
+      })
+      .then(() => undefined)
+      .catch((error) => {
+        // Non-fatal: text search falls back to substring matching
+        console.error("[sectionService] Failed to create text index:", error);
+      });
+  }
+  return textIndexReady;
+}
+
+/**
+ * Ids of a shop's sections whose name or prompt match `search` as words,
+ * newest/oldest first and capped at TEXT_SEARCH_MATCH_LIMIT.
+ * Returns null if the text query fails (e.g. index missing).
+ */
+async function findTextMatchIds(
+  shop: string,
+  search: string,
+  sort: "newest" | "oldest"
+): Promise<string[] | null> {
+  await ensureTextIndex();
+  try {
+    const docs = await prisma.section.findRaw({
+      filter: { shop, $text: { $search: search } },
+      options: {
+        projection: { _id: 1 },
+        sort: { createdAt: sort === "newest" ? -1 : 1 },
+        limit: TEXT_SEARCH_MATCH_LIMIT,
+      },
+    });
+    return (docs as unknown as Array<{ _id: { $oid: string } }>).map((doc) => doc._id.$oid);
+  } catch (error) {
+    console.error("[sectionService] Text search failed, using substring match:", error);
+    return null;
+  }
 }
 
 /**
@@ -120,7 +298,7 @@ export const sectionService = {
     const schemaName = extractSchemaName(sanitizedCode);
     const defaultName = input.name || schemaName || generateDefaultName(input.prompt);
 
-    return prisma.section.create({
+    const section = await prisma.section.create({
       data: {
         shop: input.shop,
         name: defaultName,
@@ -134,37 +312,52 @@ export const sectionService = {
         fileName: input.fileName,
       },
     });
+
+    await adjustStatusCounts(input.shop, { [SECTION_STATUS.DRAFT]: 1 });
+    return section;
   },
 
   /**
    * Update section with status transition validation
+   * Status changes are written conditionally on the status that was read,
+   * so concurrent changes can't double-count in the status counters
    */
   async update(id: string, shop: string, input: UpdateSectionInput): Promise<Section | null> {
-    const existing = await prisma.section.findFirst({
-      where: { id, shop },
-    });
+    // Sanitize code if being updated
+    const updateData = input.code
+      ? { ...input, code: sanitizeLiquidCode(input.code) }
+      : input;
+
+    for (let attempt = 0; attempt < STATUS_UPDATE_ATTEMPTS; attempt++) {
+      const existing = await prisma.section.findFirst({
+        where: { id, shop },
+      });
+
+      if (!existing) return null;
 
-    if (!existing) return null;
+      if (!input.status || input.status === existing.status) {
+        return prisma.section.update({
+          where: { id },
+          data: updateData,
+        });
+      }
 
-    // Validate status transition if status is being changed
-    if (input.status && input.status !== existing.status) {
+      // Validate status transition
       const currentStatus = existing.status as SectionStatus;
       const newStatus = input.status;
 
       if (!isValidTransition(currentStatus, newStatus)) {
         throw new Error(getTransitionErrorMessage(currentStatus, newStatus));
       }
-    }
 
-    // Sanitize code if being updated
-    const updateData = input.code
-      ? { ...input, code: sanitizeLiquidCode(input.code) }
-      : input;
+      const updated = await updateIfStatus(id, existing.status, updateData);
+      if (updated) {
+        await adjustStatusCounts(shop, { [currentStatus]: -1, [newStatus]: 1 });
+        return updated;
+      }
+    }
 
-    return prisma.section.update({
-      where: { id },
-      data: updateData,
-    });
+    throw new Error("Section was modified concurrently, please try again");
   },
 
   /**
@@ -179,21 +372,26 @@ export const sectionService = {
    * Restore an archived or inactive section back to DRAFT
    */
   async restore(id: string, shop: string): Promise<Section | null> {
-    const existing = await prisma.section.findFirst({
-      where: { id, shop },
-    });
+    for (let attempt = 0; attempt < STATUS_UPDATE_ATTEMPTS; attempt++) {
+      const existing = await prisma.section.findFirst({
+        where: { id, shop },
+      });
+
+      if (!existing) return null;
 
-    if (!existing) return null;
+      const currentStatus = existing.status as SectionStatus;
+      if (currentStatus !== SECTION_STATUS.ARCHIVE && currentStatus !== SECTION_STATUS.INACTIVE) {
+        throw new Error(`Cannot restore: section is not archived or inactive (current status: ${currentStatus})`);
+      }
 
-    const currentStatus = existing.status as SectionStatus;
-    if (currentStatus !== SECTION_STATUS.ARCHIVE && currentStatus !== SECTION_STATUS.INACTIVE) {
-      throw new Error(`Cannot restore: section is not archived or inactive (current status: ${currentStatus})`);
+      const restored = await updateIfStatus(id, currentStatus, { status: SECTION_STATUS.DRAFT });
+      if (restored) {
+        await adjustStatusCounts(shop, { [currentStatus]: -1, [SECTION_STATUS.DRAFT]: 1 });
+        return restored;
+      }
     }
 
-    return prisma.section.update({
-      where: { id },
-      data: { status: SECTION_STATUS.DRAFT },
-    });
+    throw new Error("Section was modified concurrently, please try again");
   },
 
   /**
@@ -223,22 +421,23 @@ export const sectionService = {
   },
 
   /**
-   * Get paginated sections for a shop
+   * Get paginated sections for a shop, ordered by (createdAt, id)
    * Excludes INACTIVE by default unless includeInactive=true
+   *
+   * Pass `after`/`before` cursors from a previous page to seek via the
+   * (shop, [status,] createdAt, id) indexes; without a cursor `page` falls back
+   * to offset paging. Totals come from the status counters unless searching.
    */
-  async getByShop(
-    shop: string,
-    options: GetByShopOptions = {}
-  ): Promise<{ items: Section[]; total: number; page: number; totalPages: number }> {
+  async getByShop(shop: string, options: GetByShopOptions = {}): Promise<SectionPage> {
     const {
       page = 1,
       limit = 20,
       status,
       search,
+      searchMode = "contains",
       sort = "newest",
       includeInactive = false,
     } = options;
-    const skip = (page - 1) * limit;
 
     // Build where clause
     const where: Record<string, unknown> = { shop };
@@ -253,27 +452,73 @@ export const sectionService = {
 
     // Search filter - search in both prompt and name
     if (search) {
-      where.OR = [
-        { prompt: { contains: search, mode: "insensitive" } },
-        { name: { contains: search, mode: "insensitive" } },
-      ];
+      const textMatches =
+        searchMode === "text" ? await findTextMatchIds(shop, search, sort) : null;
+
+      // No whole-word match (e.g. a partial word while typing): try substrings
+      if (textMatches && textMatches.length > 0) {
+        where.id = { in: textMatches };
+      } else {
+        where.OR = [
+          { prompt: { contains: search, mode: "insensitive" } },
+          { name: { contains: search, mode: "insensitive" } },
+        ];
+      }
     }
 
-    const [items, total] = await Promise.all([
+    const after = decodeCursor(options.after);
+    const before = after ? null : decodeCursor(options.before);
+    const cursor = after ?? before;
+
+    // Walking backwards reverses the sort, then the page is flipped back
+    const descending = (sort === "newest") !== Boolean(before);
+    const direction = descending ? "desc" : "asc";
+    const pageWhere = cursor
+      ? {
+          ...where,
+          AND: [
+            {
+              OR: [
+                { createdAt: { [descending ? "lt" : "gt"]: cursor.createdAt } },
+                { createdAt: cursor.createdAt, id: { [descending ? "lt" : "gt"]: cursor.id } },
+              ],
+            },
+          ],
+        }
+      : where;
+
+    const [rows, total] = await Promise.all([
       prisma.section.findMany({
-        where,
-        orderBy: { createdAt: sort === "newest" ? "desc" : "asc" },
-        skip,
-        take: limit,
+        where: pageWhere,
+        orderBy: [{ createdAt: direction }, { id: direction }],
+        skip: cursor ? undefined : (page - 1) * limit,
+        take: limit + 1,
       }),
-      prisma.section.count({ where }),
+      search
+        ? prisma.section.count({ where })
+        : this.getStatusCounts(shop).then((counts) =>
+            status
+              ? counts[status]
+              : counts.draft + counts.active + counts.inactive + (includeInactive ? counts.archive : 0)
+          ),
     ]);
 
+    const hasMore = rows.length > limit;
+    const items = rows.slice(0, limit);
+    if (before) items.reverse();
+
+    const first = items[0];
+    const last = items[items.length - 1];
+    const hasNext = before ? items.length > 0 : hasMore;
+    const hasPrevious = before ? hasMore : after ? items.length > 0 : page > 1;
+
     return {
       items,
       total,
       page,
       totalPages: Math.ceil(total / limit),
+      nextCursor: hasNext && last ? encodeCursor(last) : null,
+      prevCursor: hasPrevious && first ? encodeCursor(first) : null,
     };
   },
 
@@ -299,7 +544,7 @@ export const sectionService = {
     if (!existing) return false;
 
     try {
-      await prisma.$transaction(async (tx) => {
+      const deleted = await prisma.$transaction(async (tx) => {
         // Get conversation for this section (1:1 relationship)
         const conversation = await tx.conversation.findUnique({
           where: { sectionId: id },
@@ -328,11 +573,12 @@ export const sectionService = {
         });
 
         // Finally delete the section
-        await tx.section.delete({
+        return tx.section.delete({
           where: { id },
         });
       });
 
+      await adjustStatusCounts(shop, { [deleted.status]: -1 });
       return true;
     } catch (error) {
       console.error(`[sectionService.delete] Failed to delete section ${id}:`, error);
@@ -354,27 +600,70 @@ export const sectionService = {
     });
   },
 
+  /**
+   * Get section counts by status for a shop from the maintained counters
+   * Rebuilds the counter row from the sections if it doesn't exist yet,
+   * and recounts it once older than STATUS_RECOUNT_MS
+   */
+  async getStatusCounts(shop: string): Promise<SectionStatusCounts> {
+    const row = await prisma.sectionStatusCount.findUnique({
+      where: { shop },
+    });
+
+    if (!row) return this.rebuildStatusCounts(shop);
+
+    if (Date.now() - row.countedAt.getTime() >= STATUS_RECOUNT_MS) {
+      const recounted = await recountStatusCounts(shop, row.revision);
+      if (recounted) return recounted;
+    }
+
+    // Clamp in case a missed write left a counter negative
+    return {
+      draft: Math.max(0, row.draft),
+      active: Math.max(0, row.active),
+      inactive: Math.max(0, row.inactive),
+      archive: Math.max(0, row.archive),
+    };
+  },
+
+  /**
+   * Recount a shop's sections by status and create its counter row.
+   * An existing row is left as is: it may already hold adjustments made
+   * after this count (the periodic recount reconciles it safely).
+   */
+  async rebuildStatusCounts(shop: string): Promise<SectionStatusCounts> {
+    const counts = await countByStatus(shop);
+
+    try {
+      await prisma.sectionStatusCount.upsert({
+        where: { shop },
+        create: { shop, ...counts },
+        update: {},
+      });
+    } catch (error) {
+      // A concurrent rebuild created the row first
+      if (!isUniqueViolation(error)) throw error;
+    }
+
+    return counts;
+  },
+
   /**
    * Get total count of non-archived sections for a shop
    * Used to determine if EmptyState vs EmptySearchResult should show
    * Excludes ARCHIVE status (soft-deleted sections)
    */
   async getTotalCount(shop: string): Promise<number> {
-    return prisma.section.count({
-      where: {
-        shop,
-        status: { not: SECTION_STATUS.ARCHIVE },
-      },
-    });
+    const counts = await this.getStatusCounts(shop);
+    return counts.draft + counts.active + counts.inactive;
   },
 
   /**
    * Get count of archived sections for a shop
    */
   async getArchivedCount(shop: string): Promise<number> {
-    return prisma.section.count({
-      where: { shop, status: SECTION_STATUS.ARCHIVE },
-    });
+    const counts = await this.getStatusCounts(shop);
+    return counts.archive;
   },
 
   /**
@@ -391,7 +680,7 @@ export const sectionService = {
     // Validate ownership - only delete sections belonging to this shop
     const existing = await prisma.section.findMany({
       where: { id: { in: ids }, shop },
-      select: { id: true },
+      select: { id: true, status: true },
     });
     const validIds = existing.map((s) => s.id);
 
@@ -421,6 +710,12 @@ export const sectionService = {
         await tx.section.deleteMany({ where: { id: { in: validIds } } });
       });
 
+      const removed: Record<string, number> = {};
+      for (const section of existing) {
+        removed[section.status] = (removed[section.status] ?? 0) - 1;
+      }
+      await adjustStatusCounts(shop, removed);
+
       return validIds.length;
     } catch (error) {
       console.error(`[sectionService.bulkDelete] Failed to bulk delete sections:`, error);
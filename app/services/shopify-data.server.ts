@@ -1,4 +1,5 @@
 import { authenticate } from "../shopify.server";
+import { ResourceCache, type ResourceCacheStats } from "./resource-cache.server";
 import type {
   MockProduct,
   MockProductVariant,
@@ -8,45 +9,57 @@ import type {
   MockImage
 } from "../components/preview/mockData/types";
 
-/**
- * Cache entry with TTL support
- */
-interface CacheEntry<T> {
-  data: T;
-  timestamp: number;
-  ttl: number;
+/** Minimal shape of `admin.graphql` used by this service */
+export type AdminGraphqlFn = (
+  query: string,
+  options?: { variables?: Record<string, unknown> }
+) => Promise<{ json(): Promise<unknown> }>;
+
+/** Authenticated Admin API access for one request */
+export interface AdminContext {
+  shop: string;
+  graphql: AdminGraphqlFn;
 }
 
 /**
- * Simple in-memory cache with TTL
+ * Resolves the shop and GraphQL client for a request.
+ * Swappable so the service can run against a local stand-in (benchmarks, tests).
  */
-class SimpleCache {
-  private cache = new Map<string, CacheEntry<unknown>>();
+export type AdminResolver = (request: Request) => Promise<AdminContext>;
 
-  set<T>(key: string, data: T, ttl: number): void {
-    this.cache.set(key, { data, timestamp: Date.now(), ttl });
-  }
+async function resolveAdminFromSession(request: Request): Promise<AdminContext> {
+  const { admin, session } = await authenticate.admin(request);
+  return { shop: session.shop, graphql: admin.graphql as AdminGraphqlFn };
+}
 
-  get<T>(key: string): T | null {
-    const entry = this.cache.get(key);
-    if (!entry) return null;
+export interface ShopifyDataServiceOptions {
+  resolveAdmin?: AdminResolver;
+  cache?: ResourceCache;
+}
 
-    const age = Date.now() - entry.timestamp;
-    if (age > entry.ttl) {
-      this.cache.delete(key);
-      return null;
-    }
+/** Resource types resolvable through the batched nodes() lookup */
+export type BatchResourceType = 'product' | 'collection' | 'article';
+export type BatchResource = MockProduct | MockCollection | MockArticle;
 
-    return entry.data as T;
-  }
+const GID_TYPE_MAP: Record<string, BatchResourceType> = {
+  Product: 'product',
+  Collection: 'collection',
+  Article: 'article'
+};
 
-  clear(): void {
-    this.cache.clear();
-  }
+function toGid(type: 'Product' | 'Collection' | 'Article', id: string): string {
+  return id.startsWith('gid://') ? id : `gid://shopify/${type}/${id}`;
+}
 
-  delete(key: string): void {
-    this.cache.delete(key);
-  }
+/** Cache key shared by single and batched lookups, e.g. `product:gid://shopify/Product/1` */
+function resourceKeyForGid(gid: string): string | null {
+  const match = gid.match(/^gid:\/\/shopify\/(\w+)\//);
+  const type = match ? GID_TYPE_MAP[match[1]] : undefined;
+  return type ? `${type}:${gid}` : null;
+}
+
+function gidFromResourceKey(key: string): string {
+  return key.slice(key.indexOf(':') + 1);
 }
 
 // GraphQL Queries
@@ -245,6 +258,153 @@ const SHOP_QUERY = `#graphql
   }
 `;
 
+// Batched lookup for sections with several resource pickers
+const NODES_QUERY = `#graphql
+  query GetNodes($ids: [ID!]!) {
+    nodes(ids: $ids) {
+      __typename
+      ... on Product {
+        id
+        title
+        handle
+        description
+        vendor
+        productType
+        priceRange {
+          minVariantPrice { amount currencyCode }
+          maxVariantPrice { amount currencyCode }
+        }
+        compareAtPriceRange {
+          minVariantCompareAtPrice { amount }
+        }
+        totalInventory
+        featuredImage {
+          url
+          altText
+          width
+          height
+        }
+        images(first: 10) {
+          edges {
+            node {
+              url
+              altText
+              width
+              height
+            }
+          }
+        }
+        tags
+        options { name values }
+        variants(first: 100) {
+          edges {
+            node {
+              id
+              title
+              price
+              compareAtPrice
+              availableForSale
+              inventoryQuantity
+              sku
+              selectedOptions { name value }
+            }
+          }
+        }
+      }
+      ... on Collection {
+        id
+        title
+        handle
+        description
+        image {
+          url
+          altText
+          width
+          height
+        }
+        productsCount {
+          count
+        }
+        products(first: 20) {
+          edges {
+            node {
+              id
+              title
+              handle
+              description
+              vendor
+              productType
+              priceRange {
+                minVariantPrice { amount }
+                maxVariantPrice { amount }
+              }
+              compareAtPriceRange {
+                minVariantCompareAtPrice { amount }
+              }
+              totalInventory
+              featuredImage {
+                url
+                altText
+                width
+                height
+              }
+              images(first: 5) {
+                edges {
+                  node {
+                    url
+                    altText
+                    width
+                    height
+                  }
+                }
+              }
+              tags
+              options { name values }
+              variants(first: 10) {
+                edges {
+                  node {
+                    id
+                    title
+                    price
+                    compareAtPrice
+                    availableForSale
+                    inventoryQuantity
+                    sku
+                    selectedOptions { name value }
+                  }
+                }
+              }
+            }
+          }
+        }
+      }
+      ... on Article {
+        id
+        title
+        handle
+        body
+        summary
+        author {
+          name
+        }
+        publishedAt
+        image {
+          url
+          altText
+          width
+          height
+        }
+        tags
+        blog {
+          id
+          title
+          handle
+        }
+      }
+    }
+  }
+`;
+
 // Response type helpers
 interface GraphQLProductResponse {
   data?: {
@@ -363,6 +523,18 @@ interface GraphQLShopResponse {
   };
 }
 
+type GraphQLNode =
+  | ({ __typename: 'Product' } & NonNullable<NonNullable<GraphQLProductResponse['data']>['product']>)
+  | ({ __typename: 'Collection' } & NonNullable<NonNullable<GraphQLCollectionResponse['data']>['collection']>)
+  | ({ __typename: 'Article' } & NonNullable<NonNullable<GraphQLArticleResponse['data']>['article']>)
+  | { __typename: string; id?: string };
+
+interface GraphQLNodesResponse {
+  data?: {
+    nodes?: Array<GraphQLNode | null>;
+  };
+}
+
 interface GraphQLArticlesListResponse {
   data?: {
     articles?: {
@@ -524,41 +696,56 @@ function transformShop(graphqlShop: NonNullable<GraphQLShopResponse['data']>['sh
   };
 }
 
+function transformNode(node: GraphQLNode | null): BatchResource | null {
+  if (!node) return null;
+
+  switch (node.__typename) {
+    case 'Product':
+      return transformProduct(node as NonNullable<NonNullable<GraphQLProductResponse['data']>['product']>);
+    case 'Collection':
+      return transformCollection(node as NonNullable<NonNullable<GraphQLCollectionResponse['data']>['collection']>);
+    case 'Article':
+      return transformArticle(node as NonNullable<NonNullable<GraphQLArticleResponse['data']>['article']>);
+    default:
+      return null;
+  }
+}
+
+// Shared across service instances: 10 min fresh, served stale for up to 1 hour while refreshing
+const sharedResourceCache = new ResourceCache({
+  maxBytes: 64 * 1024 * 1024,
+  freshMs: 10 * 60 * 1000,
+  staleMs: 60 * 60 * 1000
+});
+
 /**
  * Service for fetching Shopify resource data via GraphQL
  */
 export class ShopifyDataService {
-  private cache = new SimpleCache();
-  private readonly CACHE_TTL = 10 * 60 * 1000; // 10 minutes
+  private cache: ResourceCache;
+  private resolveAdmin: AdminResolver;
+
+  constructor(options: ShopifyDataServiceOptions = {}) {
+    this.cache = options.cache ?? sharedResourceCache;
+    this.resolveAdmin = options.resolveAdmin ?? resolveAdminFromSession;
+  }
 
   /**
    * Fetch a product by ID
    */
   async getProduct(request: Request, productId: string): Promise<MockProduct | null> {
     // Normalize product ID to GID format if needed
-    const gid = productId.startsWith('gid://')
-      ? productId
-      : `gid://shopify/Product/${productId}`;
-
-    const cacheKey = `product:${gid}`;
-    const cached = this.cache.get<MockProduct>(cacheKey);
-    if (cached) return cached;
+    const gid = toGid('Product', productId);
 
     try {
-      const { admin } = await authenticate.admin(request);
-      const response = await admin.graphql(PRODUCT_QUERY, {
-        variables: { id: gid }
+      const { shop, graphql } = await this.resolveAdmin(request);
+      return await this.cache.get(shop, `product:${gid}`, async () => {
+        const response = await graphql(PRODUCT_QUERY, {
+          variables: { id: gid }
+        });
+        const data = await response.json() as GraphQLProductResponse;
+        return transformProduct(data.data?.product);
       });
-
-      const data = await response.json() as GraphQLProductResponse;
-      if (!data.data?.product) return null;
-
-      const product = transformProduct(data.data.product);
-      if (product) {
-        this.cache.set(cacheKey, product, this.CACHE_TTL);
-      }
-
-      return product;
     } catch (error) {
       console.error('[ShopifyDataService] Error fetching product:', error);
       return null;
@@ -569,29 +756,17 @@ export class ShopifyDataService {
    * Fetch a collection by ID
    */
   async getCollection(request: Request, collectionId: string): Promise<MockCollection | null> {
-    const gid = collectionId.startsWith('gid://')
-      ? collectionId
-      : `gid://shopify/Collection/${collectionId}`;
-
-    const cacheKey = `collection:${gid}`;
-    const cached = this.cache.get<MockCollection>(cacheKey);
-    if (cached) return cached;
+    const gid = toGid('Collection', collectionId);
 
     try {
-      const { admin } = await authenticate.admin(request);
-      const response = await admin.graphql(COLLECTION_QUERY, {
-        variables: { id: gid }
+      const { shop, graphql } = await this.resolveAdmin(request);
+      return await this.cache.get(shop, `collection:${gid}`, async () => {
+        const response = await graphql(COLLECTION_QUERY, {
+          variables: { id: gid }
+        });
+        const data = await response.json() as GraphQLCollectionResponse;
+        return transformCollection(data.data?.collection);
       });
-
-      const data = await response.json() as GraphQLCollectionResponse;
-      if (!data.data?.collection) return null;
-
-      const collection = transformCollection(data.data.collection);
-      if (collection) {
-        this.cache.set(cacheKey, collection, this.CACHE_TTL);
-      }
-
-      return collection;
     } catch (error) {
       console.error('[ShopifyDataService] Error fetching collection:', error);
       return null;
@@ -602,29 +777,17 @@ export class ShopifyDataService {
    * Fetch an article by ID
    */
   async getArticle(request: Request, articleId: string): Promise<MockArticle | null> {
-    const gid = articleId.startsWith('gid://')
-      ? articleId
-      : `gid://shopify/Article/${articleId}`;
-
-    const cacheKey = `article:${gid}`;
-    const cached = this.cache.get<MockArticle>(cacheKey);
-    if (cached) return cached;
+    const gid = toGid('Article', articleId);
 
     try {
-      const { admin } = await authenticate.admin(request);
-      const response = await admin.graphql(ARTICLE_QUERY, {
-        variables: { id: gid }
+      const { shop, graphql } = await this.resolveAdmin(request);
+      return await this.cache.get(shop, `article:${gid}`, async () => {
+        const response = await graphql(ARTICLE_QUERY, {
+          variables: { id: gid }
+        });
+        const data = await response.json() as GraphQLArticleResponse;
+        return transformArticle(data.data?.article);
       });
-
-      const data = await response.json() as GraphQLArticleResponse;
-      if (!data.data?.article) return null;
-
-      const article = transformArticle(data.data.article);
-      if (article) {
-        this.cache.set(cacheKey, article, this.CACHE_TTL);
-      }
-
-      return article;
     } catch (error) {
       console.error('[ShopifyDataService] Error fetching article:', error);
       return null;
@@ -632,46 +795,93 @@ export class ShopifyDataService {
   }
 
   /**
-   * Fetch list of articles for dropdown selection
+   * Fetch several products/collections/articles in one nodes(ids:) query.
+   * Ids must be GIDs; cached ids are served without a network call.
+   * Unknown or unsupported ids resolve to null.
    */
-  async getArticles(request: Request, limit: number = 50): Promise<ArticleListItem[]> {
-    const cacheKey = `articles:list:${limit}`;
-    const cached = this.cache.get<ArticleListItem[]>(cacheKey);
-    if (cached) return cached;
+  async getResources(request: Request, ids: string[]): Promise<Record<string, BatchResource | null>> {
+    const result: Record<string, BatchResource | null> = {};
+    const keyToGid = new Map<string, string>();
+
+    for (const id of ids) {
+      const key = resourceKeyForGid(id);
+      if (key) {
+        keyToGid.set(key, id);
+      } else {
+        result[id] = null;
+      }
+    }
+
+    if (keyToGid.size === 0) return result;
 
     try {
-      const { admin } = await authenticate.admin(request);
-      const response = await admin.graphql(ARTICLES_LIST_QUERY, {
-        variables: { first: limit }
+      const { shop, graphql } = await this.resolveAdmin(request);
+      const resolved = await this.cache.getMany<BatchResource>(shop, [...keyToGid.keys()], async (keys) => {
+        const response = await graphql(NODES_QUERY, {
+          variables: { ids: keys.map(gidFromResourceKey) }
+        });
+        const data = await response.json() as GraphQLNodesResponse;
+        const nodes = data.data?.nodes ?? [];
+
+        // nodes() preserves input order, with null for ids that do not resolve
+        const loaded = new Map<string, BatchResource | null>();
+        keys.forEach((key, index) => {
+          loaded.set(key, transformNode(nodes[index] ?? null));
+        });
+        return loaded;
       });
 
-      const data = await response.json() as GraphQLArticlesListResponse;
-
-      // Check for GraphQL-level errors (e.g., missing scopes)
-      if (data.errors?.length) {
-        const errorMessages = data.errors.map(e => e.message).join(', ');
-        console.error('[ShopifyDataService] GraphQL errors fetching articles:', errorMessages);
-        throw new Error(`GraphQL error: ${errorMessages}`);
+      for (const [key, gid] of keyToGid) {
+        result[gid] = resolved.get(key) ?? null;
       }
-
-      if (!data.data?.articles?.edges) {
-        console.warn('[ShopifyDataService] No articles data in response');
-        return [];
+    } catch (error) {
+      console.error('[ShopifyDataService] Error fetching resources batch:', error);
+      for (const gid of keyToGid.values()) {
+        result[gid] = null;
       }
+    }
+
+    return result;
+  }
 
-      const articles: ArticleListItem[] = data.data.articles.edges.map(({ node }) => ({
-        id: node.id,
-        title: node.title,
-        handle: node.handle,
-        blogHandle: node.blog?.handle || 'news',
-        blogTitle: node.blog?.title || 'News',
-        excerpt: node.summary || '',
-        image: node.image?.url || null,
-        publishedAt: node.publishedAt
-      }));
-
-      this.cache.set(cacheKey, articles, this.CACHE_TTL);
-      return articles;
+  /**
+   * Fetch list of articles for dropdown selection
+   */
+  async getArticles(request: Request, limit: number = 50): Promise<ArticleListItem[]> {
+    try {
+      const { shop, graphql } = await this.resolveAdmin(request);
+      const articles = await this.cache.get(shop, `articles:list:${limit}`, async () => {
+        const response = await graphql(ARTICLES_LIST_QUERY, {
+          variables: { first: limit }
+        });
+
+        const data = await response.json() as GraphQLArticlesListResponse;
+
+        // Check for GraphQL-level errors (e.g., missing scopes)
+        if (data.errors?.length) {
+          const errorMessages = data.errors.map(e => e.message).join(', ');
+          console.error('[ShopifyDataService] GraphQL errors fetching articles:', errorMessages);
+          throw new Error(`GraphQL error: ${errorMessages}`);
+        }
+
+        if (!data.data?.articles?.edges) {
+          console.warn('[ShopifyDataService] No articles data in response');
+          return null;
+        }
+
+        return data.data.articles.edges.map(({ node }): ArticleListItem => ({
+          id: node.id,
+          title: node.title,
+          handle: node.handle,
+          blogHandle: node.blog?.handle || 'news',
+          blogTitle: node.blog?.title || 'News',
+          excerpt: node.summary || '',
+          image: node.image?.url || null,
+          publishedAt: node.publishedAt
+        }));
+      });
+
+      return articles ?? [];
     } catch (error) {
       console.error('[ShopifyDataService] Error fetching articles:', error);
       throw error; // Re-throw to allow caller to handle
@@ -682,23 +892,13 @@ export class ShopifyDataService {
    * Fetch shop data
    */
   async getShop(request: Request): Promise<MockShop | null> {
-    const cacheKey = 'shop';
-    const cached = this.cache.get<MockShop>(cacheKey);
-    if (cached) return cached;
-
     try {
-      const { admin } = await authenticate.admin(request);
-      const response = await admin.graphql(SHOP_QUERY);
-
-      const data = await response.json() as GraphQLShopResponse;
-      if (!data.data?.shop) return null;
-
-      const shop = transformShop(data.data.shop);
-      if (shop) {
-        this.cache.set(cacheKey, shop, this.CACHE_TTL);
-      }
-
-      return shop;
+      const { shop, graphql } = await this.resolveAdmin(request);
+      return await this.cache.get(shop, 'shop', async () => {
+        const response = await graphql(SHOP_QUERY);
+        const data = await response.json() as GraphQLShopResponse;
+        return transformShop(data.data?.shop);
+      });
     } catch (error) {
       console.error('[ShopifyDataService] Error fetching shop:', error);
       return null;
@@ -706,22 +906,17 @@ export class ShopifyDataService {
   }
 
   /**
-   * Clear all cached data
+   * Clear cached data for one shop, or for all shops when omitted
    */
-  clearCache(): void {
-    this.cache.clear();
+  clearCache(shop?: string): void {
+    this.cache.clear(shop);
   }
 
   /**
-   * Clear specific cache entry
+   * Cache counters for sizing and hit-ratio monitoring
    */
-  invalidateCache(type: 'product' | 'collection' | 'article' | 'shop', id?: string): void {
-    if (type === 'shop') {
-      this.cache.delete('shop');
-    } else if (id) {
-      const gid = id.startsWith('gid://') ? id : `gid://shopify/${type.charAt(0).toUpperCase() + type.slice(1)}/${id}`;
-      this.cache.delete(`${type}:${gid}`);
-    }
+  getCacheStats(): ResourceCacheStats {
+    return this.cache.getStats();
   }
 }
 
@@ -1,4 +1,5 @@
 import { settingsService } from "./settings.server";
+import { clearPreviewRenderCache } from "./preview-render-cache.server";
 
 /**
  * Storefront authentication service for bypassing password-protected stores
@@ -220,6 +221,8 @@ export async function validateAndSaveStorefrontPassword(
     await settingsService.saveStorefrontPassword(shop, password);
     // Mark as verified since we just authenticated
     await settingsService.markPasswordVerified(shop);
+    // Send the next previews through the storefront with the new password
+    clearPreviewRenderCache(shop);
     return { success: true };
   } catch (error) {
     return {
@@ -237,5 +240,6 @@ export async function clearStorefrontPasswordAndCache(
   shop: string
 ): Promise<void> {
   clearCookieCache(shop);
+  clearPreviewRenderCache(shop);
   await settingsService.clearStorefrontPassword(shop);
 }
@@ -1,4 +1,5 @@
 import { authenticate } from "../shopify.server";
+import { findSchemaBlock } from "../utils/liquid-tokenizer";
 import type {
   Theme,
   ThemesQueryResponse,
@@ -25,17 +26,15 @@ function truncateName(name: string, maxLength = 25): string {
 function updateSchemaName(liquidCode: string, newName: string): string {
   const safeName = truncateName(newName.trim());
 
-  const schemaMatch = liquidCode.match(
-    /{% schema %}\s*([\s\S]*?)\s*{% endschema %}/
-  );
+  const block = findSchemaBlock(liquidCode);
 
-  if (!schemaMatch?.[1]) {
+  if (!block?.closed || !block.content.trim()) {
     console.warn('updateSchemaName: No schema block found');
     return liquidCode;
   }
 
   try {
-    const schema = JSON.parse(schemaMatch[1]);
+    const schema = JSON.parse(block.content);
     schema.name = safeName;
 
     // Sync preset names
@@ -46,9 +45,10 @@ function updateSchemaName(liquidCode: string, newName: string): string {
       }));
     }
 
-    return liquidCode.replace(
-      /{% schema %}\s*[\s\S]*?\s*{% endschema %}/,
-      `{% schema %}\n${JSON.stringify(schema, null, 2)}\n{% endschema %}`
+    return (
+      liquidCode.slice(0, block.start) +
+      `{% schema %}\n${JSON.stringify(schema, null, 2)}\n{% endschema %}` +
+      liquidCode.slice(block.end)
     );
   } catch (error) {
     console.error('updateSchemaName: Failed to parse schema JSON', error);
@@ -4,6 +4,7 @@
  */
 
 import prisma from "../db.server";
+import { getEntitlement } from "./entitlement.server";
 
 export interface UsageStats {
   currentCycle: {
@@ -31,16 +32,9 @@ export interface UsageStats {
  * Get comprehensive usage statistics for a shop
  */
 export async function getUsageStats(shop: string): Promise<UsageStats> {
-  // Fetch subscription and calculate cycle start
-  const subscription = await prisma.subscription.findFirst({
-    where: { shop, status: "active" },
-    orderBy: { createdAt: "desc" },
-  });
-
-  // Calculate billing cycle start (30 days before period end)
-  const cycleStart = subscription
-    ? new Date(subscription.currentPeriodEnd.getTime() - 30 * 24 * 60 * 60 * 1000)
-    : new Date(Date.now() - 30 * 24 * 60 * 60 * 1000);
+  // Plan, usage and cycle start (30 days before period end; month start on free)
+  const entitlement = await getEntitlement(shop);
+  const { subscription, cycleStart } = entitlement;
 
   // Get recent generations for this billing cycle
   const recentGenerations = await prisma.section.findMany({
@@ -54,9 +48,7 @@ export async function getUsageStats(shop: string): Promise<UsageStats> {
   });
 
   // Calculate usage metrics
-  const usageThisCycle = subscription?.usageThisCycle ?? recentGenerations.length;
-  const includedQuota = subscription?.includedQuota ?? 5;
-  const overagesThisCycle = subscription?.overagesThisCycle ?? 0;
+  const { usageThisCycle, includedQuota, overagesThisCycle } = entitlement;
   const overagePrice = subscription?.overagePrice ?? 0;
   const basePrice = subscription?.basePrice ?? 0;
 
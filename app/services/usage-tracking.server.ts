@@ -6,6 +6,7 @@
 
 import type { AdminApiContext } from "@shopify/shopify-app-react-router/server";
 import { checkQuota, recordUsage, getSubscription } from "./billing.server";
+import { getEntitlement } from "./entitlement.server";
 import type { QuotaCheck } from "../types/billing";
 
 /**
@@ -44,9 +45,10 @@ export async function trackGeneration(
   prompt: string,
   subscription: Awaited<ReturnType<typeof getSubscription>> | null = null
 ) {
+  let sub = subscription;
   try {
-    // Use passed subscription or fetch (backward compatibility)
-    const sub = subscription ?? await getSubscription(shop);
+    // Use passed subscription or the cached entitlement (backward compatibility)
+    sub ??= (await getEntitlement(shop)).subscription;
 
     if (!sub) {
       // Free tier - no billing
@@ -76,11 +78,18 @@ export async function trackGeneration(
 
     // Save for manual reconciliation
     const prisma = (await import("../db.server")).default;
+    // Snapshot the charge so the retry bills this generation, not the
+    // cycle that is current when it runs
     await prisma.failedUsageCharge.create({
       data: {
         shop,
         sectionId,
         errorMessage: error instanceof Error ? error.message : "Unknown error",
+        ...(sub && {
+          subscriptionId: sub.id,
+          amount: sub.usageThisCycle >= sub.includedQuota ? sub.overagePrice : 0,
+          billingCycle: sub.currentPeriodEnd,
+        }),
       },
     });
 
@@ -95,8 +104,9 @@ export async function trackGeneration(
  * Get usage summary for current billing cycle
  */
 export async function getUsageSummary(shop: string) {
+  // Both read the same cached entitlement
   const quota = await checkQuota(shop);
-  const subscription = await getSubscription(shop);
+  const { subscription } = await getEntitlement(shop);
 
   if (!subscription) {
     return {
@@ -23,6 +23,8 @@ export interface ConversationContext {
     content: string;
   }>;
   summarizedHistory?: string;
+  /** Prompt budget in estimated tokens (defaults to DEFAULT_PROMPT_TOKEN_BUDGET) */
+  tokenBudget?: number;
 }
 
 /**
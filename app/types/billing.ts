@@ -76,6 +76,7 @@ export interface RecordUsageInput {
   sectionId: string;
   description: string; // e.g., "Section generation - Hero banner"
   amount?: number; // If not provided, use plan's overage price
+  idempotencyKey?: string; // Stable key makes retries replay the same charge
 }
 
 /**
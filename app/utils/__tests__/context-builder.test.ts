@@ -3,7 +3,8 @@ import {
   buildConversationPrompt,
   getChatSystemPrompt,
   summarizeOldMessages,
-  buildContinuationPrompt
+  buildContinuationPrompt,
+  estimateTokens
 } from '../context-builder';
 import type { LiquidValidationError } from '../code-extractor';
 import type { ConversationContext } from '../../types/ai.types';
@@ -75,6 +76,42 @@ describe('buildConversationPrompt', () => {
     expect(result).toContain('Make heading larger');
     expect(result.endsWith('Make heading larger')).toBe(true);
   });
+
+  it('should drop the oldest messages when over the token budget', () => {
+    const context: ConversationContext = {
+      currentCode: '<div>' + 'x'.repeat(400) + '</div>',
+      recentMessages: [
+        { role: 'user', content: 'Oldest request ' + 'a'.repeat(300) },
+        { role: 'assistant', content: 'Middle reply ' + 'b'.repeat(300) },
+        { role: 'user', content: 'Newest request' },
+      ],
+      summarizedHistory: 'Previous conversation covered:\n- color changes',
+      tokenBudget: estimateTokens('x'.repeat(400)) + 120,
+    };
+
+    const result = buildConversationPrompt('Make it red', context);
+
+    expect(result).toContain('x'.repeat(400));
+    expect(result).toContain('User: Newest request');
+    expect(result).not.toContain('Oldest request');
+    expect(result.endsWith('Make it red')).toBe(true);
+  });
+
+  it('should always keep the code and request even when they exceed the budget', () => {
+    const context: ConversationContext = {
+      currentCode: '<div>' + 'x'.repeat(1000) + '</div>',
+      recentMessages: [{ role: 'user', content: 'Earlier' }],
+      summarizedHistory: 'Previous conversation covered:\n- font changes',
+      tokenBudget: 10,
+    };
+
+    const result = buildConversationPrompt('Next', context);
+
+    expect(result).toContain('x'.repeat(1000));
+    expect(result).not.toContain('=== RECENT CONVERSATION ===');
+    expect(result).not.toContain('=== EARLIER CONTEXT (SUMMARIZED) ===');
+    expect(result.endsWith('Next')).toBe(true);
+  });
 });
 
 describe('getChatSystemPrompt', () => {
@@ -172,4 +172,48 @@ describe('sanitizeLiquidCode', () => {
     expect(sanitized).not.toContain('onclick');
     expect(sanitized).not.toContain('javascript:');
   });
+
+  it('should remove event handlers whose value contains Liquid output', () => {
+    const code = '<button onclick="addToCart({{ product.id }})">Add</button>';
+    const sanitized = sanitizeLiquidCode(code);
+
+    expect(sanitized).toBe('<button>Add</button>');
+  });
+
+  it('should remove script tags inside Liquid strings', () => {
+    const code = `{{ '<script>alert(1)</script>' }}`;
+
+    expect(sanitizeLiquidCode(code)).toBe(`{{ '<!-- script removed -->' }}`);
+  });
+
+  it('should remove script tags after a <style opener inside an attribute value', () => {
+    const code = `<div title="<style>"><script>alert(1)</script><div title="</style>">`;
+
+    expect(sanitizeLiquidCode(code)).toBe(`<div title="<style>"><!-- script removed --><div title="</style>">`);
+  });
+
+  it('should remove script tags after a style element closed with attributes', () => {
+    const code = `<style>.a {}</style x><script>alert(1)</script><style></style>`;
+
+    expect(sanitizeLiquidCode(code)).toBe(`<style>.a {}</style x><!-- script removed --><style></style>`);
+  });
+
+  it('should remove new_comment forms', () => {
+    const code = `<div>{%- form 'new_comment', article -%}<input name="body">{% endform %}</div>`;
+
+    expect(sanitizeLiquidCode(code)).toBe('<div><!-- new_comment form removed: not supported --></div>');
+  });
+
+  it('should add the product argument to bare product forms when the schema has a product picker', () => {
+    const code = `{% form 'product' %}{% endform %}
+{% schema %}{"settings": [{"type": "product", "id": "product"}]}{% endschema %}`;
+
+    expect(sanitizeLiquidCode(code)).toContain("{% form 'product', section.settings.product %}");
+  });
+
+  it('should leave product forms alone without a product picker', () => {
+    const code = `{% form 'product' %}{% endform %}`;
+
+    expect(sanitizeLiquidCode(code)).toBe(code);
+  });
 });
@@ -0,0 +1,94 @@
+import { LiquidStreamValidator } from '../liquid-stream-validator';
+import { validateLiquidCompleteness, mergeResponses } from '../code-extractor';
+
+const originalEnv = process.env;
+
+beforeEach(() => {
+  process.env = { ...originalEnv, FLAG_VALIDATE_LIQUID: 'true' };
+});
+
+afterAll(() => {
+  process.env = originalEnv;
+});
+
+// Feed text in fixed-size chunks so tags straddle chunk boundaries
+function streamInChunks(text: string, size: number): LiquidStreamValidator {
+  const validator = new LiquidStreamValidator();
+  for (let i = 0; i < text.length; i += size) {
+    validator.push(text.slice(i, i + size));
+  }
+  return validator;
+}
+
+const COMPLETE_RESPONSE = `Here is your section:
+\`\`\`liquid
+{% schema %}
+{"name": "Hero", "settings": []}
+{% endschema %}
+{% style %}.hero { color: red; }{% endstyle %}
+<div class="hero {% if x %}active{% endif %}">
+  {%- for i in (1..3) -%}<span>{{ i }}</span>{%- endfor -%}
+  <img src="a.png" />
+</div>
+\`\`\`
+Done.`;
+
+const TRUNCATED_RESPONSE = `{% schema %}{"name": "x",}{% endschema %}
+<div><section><article>{% if a %}{% for item in items %}{% endif %}
+a < b and c > d {% comment %} 50% off`;
+
+describe('LiquidStreamValidator', () => {
+  it.each([1, 2, 3, 7, 64])('should match validateLiquidCompleteness with %i-char chunks', (size) => {
+    for (const text of [COMPLETE_RESPONSE, TRUNCATED_RESPONSE, 'plain text only']) {
+      const validator = streamInChunks(text, size);
+
+      expect(validator.content).toBe(text);
+      expect(validator.validate()).toEqual(validateLiquidCompleteness(text));
+    }
+  });
+
+  it('should report complete for a well-formed response', () => {
+    const result = streamInChunks(COMPLETE_RESPONSE, 5).validate();
+
+    expect(result.isComplete).toBe(true);
+  });
+
+  it('should skip validation when FLAG_VALIDATE_LIQUID is not true', () => {
+    process.env.FLAG_VALIDATE_LIQUID = 'false';
+
+    expect(streamInChunks('{% if %}', 2).validate().isComplete).toBe(true);
+  });
+
+  it('should track open code fences', () => {
+    const validator = new LiquidStreamValidator();
+    validator.push('text ``');
+    validator.push('`liquid\n<div>');
+    expect(validator.isFenceOpen).toBe(true);
+
+    validator.push('</div>\n``');
+    validator.push('`');
+    expect(validator.isFenceOpen).toBe(false);
+  });
+
+  describe('continuations', () => {
+    const original = 'Intro {% schema %}{"name":"x"}{% endschema %} <div> the last sentence here';
+
+    it.each([
+      ['overlapping', 'the last sentence here</div> and the rest'],
+      ['long overlapping', 'the last sentence here</div>' + ' filler'.repeat(60)],
+      ['non-overlapping', 'completely new text</div>'],
+    ])('should merge %s continuation like mergeResponses', (_label, continuation) => {
+      const validator = new LiquidStreamValidator();
+      validator.push(original);
+      validator.beginContinuation();
+      for (let i = 0; i < continuation.length; i += 4) {
+        validator.push(continuation.slice(i, i + 4));
+      }
+      validator.endContinuation();
+
+      const merged = mergeResponses(original, continuation);
+      expect(validator.content).toBe(merged);
+      expect(validator.validate()).toEqual(validateLiquidCompleteness(merged));
+    });
+  });
+});
@@ -0,0 +1,133 @@
+import {
+  applyLiquidEdits,
+  findSchemaBlock,
+  tagArguments,
+  tokenizeLiquid,
+  tokenMarkup,
+  tokenSource,
+} from "../liquid-tokenizer";
+
+describe("tokenizeLiquid", () => {
+  it("should split text, output and tag tokens", () => {
+    const doc = tokenizeLiquid("<h1>{{ section.settings.title }}</h1>{% if show %}x{% endif %}");
+
+    expect(doc.tokens.map((t) => [t.type, t.name ?? "", tokenSource(doc, t)])).toEqual([
+      ["text", "", "<h1>"],
+      ["output", "", "{{ section.settings.title }}"],
+      ["text", "", "</h1>"],
+      ["tag", "if", "{% if show %}"],
+      ["text", "", "x"],
+      ["tag", "endif", "{% endif %}"],
+    ]);
+  });
+
+  it("should exclude whitespace control dashes from markup", () => {
+    const doc = tokenizeLiquid("{{- title -}}{%- form 'product' -%}");
+
+    expect(tokenMarkup(doc, doc.tokens[0])).toBe(" title ");
+    expect(doc.tokens[1].name).toBe("form");
+    expect(tagArguments(doc, doc.tokens[1])).toBe("'product'");
+  });
+
+  it("should keep raw block bodies as a single token", () => {
+    const code = `{% raw %}{{ not_output }}{% endraw %}{% comment %}{% if %}{% endcomment %}`;
+    const doc = tokenizeLiquid(code);
+
+    expect(doc.tokens.map((t) => t.type)).toEqual(["raw", "raw"]);
+    expect(code.slice(doc.tokens[0].bodyStart, doc.tokens[0].bodyEnd)).toBe("{{ not_output }}");
+  });
+
+  it("should find the schema block, including whitespace control syntax", () => {
+    const doc = tokenizeLiquid(`<div></div>{%- schema -%}{"name":"X"}{%- endschema -%}`);
+
+    expect(doc.schema).not.toBeNull();
+    expect(doc.schema!.closed).toBe(true);
+    expect(doc.source.slice(doc.schema!.bodyStart, doc.schema!.bodyEnd)).toBe('{"name":"X"}');
+  });
+
+  it("should mark unclosed tokens", () => {
+    const doc = tokenizeLiquid("<p>{{ product.title");
+    const last = doc.tokens[doc.tokens.length - 1];
+
+    expect(last.type).toBe("output");
+    expect(last.closed).toBe(false);
+    expect(last.end).toBe(doc.source.length);
+  });
+
+  it("should record script and style elements without hiding Liquid inside them", () => {
+    const doc = tokenizeLiquid(
+      `<style>.a { color: {{ settings_color }}; }</style><SCRIPT>var id = {{ product.id }};</SCRIPT>`
+    );
+
+    expect(doc.elements.map((e) => e.name)).toEqual(["style", "script"]);
+    expect(doc.tokens.filter((t) => t.type === "output")).toHaveLength(2);
+  });
+
+  it("should find script elements that start inside Liquid markup", () => {
+    const doc = tokenizeLiquid(`{{ '<script>alert(1)</script>' }}`);
+
+    expect(doc.elements).toHaveLength(1);
+    expect(doc.elements[0].name).toBe("script");
+  });
+
+  it("should find script elements inside a recorded style span", () => {
+    const doc = tokenizeLiquid(`<div title="<style>"><script>alert(1)</script><div title="</style>">`);
+
+    expect(doc.elements.map((e) => e.name)).toEqual(["style", "script"]);
+    expect(doc.source.slice(doc.elements[1].start, doc.elements[1].end)).toBe("<script>alert(1)</script>");
+  });
+
+  it("should ignore unclosed script elements", () => {
+    expect(tokenizeLiquid("<script>alert(1)").elements).toHaveLength(0);
+  });
+});
+
+describe("findSchemaBlock", () => {
+  it("should return the first schema block content", () => {
+    const block = findSchemaBlock(`<div>{% if a %}{% endif %}</div>{% schema %} {"name":"A"} {% endschema %}`);
+
+    expect(block).toMatchObject({ closed: true, content: ' {"name":"A"} ' });
+  });
+
+  it("should report a schema without end tag as not closed", () => {
+    expect(findSchemaBlock(`{% schema %}{"name":`)).toMatchObject({ closed: false });
+  });
+
+  it("should return null when there is no schema", () => {
+    expect(findSchemaBlock("<div>{{ title }}</div>")).toBeNull();
+  });
+});
+
+describe("applyLiquidEdits", () => {
+  it("should apply edits in position order", () => {
+    const result = applyLiquidEdits("abcdef", [
+      { start: 4, end: 5, text: "E" },
+      { start: 0, end: 1, text: "A" },
+      { start: 2, end: 2, text: "+" },
+    ]);
+
+    expect(result).toBe("Ab+cdEf");
+  });
+
+  it("should drop edits that overlap an earlier one", () => {
+    const result = applyLiquidEdits("abcdef", [
+      { start: 1, end: 4, text: "X" },
+      { start: 2, end: 3, text: "Y" },
+    ]);
+
+    expect(result).toBe("aXef");
+  });
+
+  it("should let protected edits win over edits they overlap", () => {
+    const result = applyLiquidEdits(
+      "0123456789",
+      [
+        { start: 0, end: 3, text: "A" },
+        { start: 8, end: 9, text: "B" },
+      ],
+      [{ start: 2, end: 6, text: "P" }]
+    );
+
+    expect(result).toBe("01P67B9");
+  });
+});
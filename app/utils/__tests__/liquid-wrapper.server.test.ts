@@ -1,4 +1,11 @@
-import { wrapLiquidForProxy, parseProxyParams } from "../liquid-wrapper.server";
+import {
+  wrapLiquidForProxy,
+  parseProxyParams,
+  compileLiquidForProxy,
+  renderProxyTemplate,
+  getProxyTemplateCacheStats,
+  resetProxyTemplateCache,
+} from "../liquid-wrapper.server";
 
 describe("wrapLiquidForProxy", () => {
   describe("basic wrapping", () => {
@@ -203,6 +210,72 @@ describe("wrapLiquidForProxy", () => {
   });
 });
 
+describe("compileLiquidForProxy", () => {
+  const code = `<style>#shopify-section-{{ section.id }} { color: red; }</style>
+<h2 onclick="track({{ section.id }})">{{ section.settings.heading }}</h2>
+<script>console.log(1)</script>
+{% for product in section.settings.picked.products %}{{ product.title }}{% endfor %}
+{% schema %}
+{"name": "Grid", "settings": [{"type": "collection", "id": "picked", "label": "Collection"}]}
+{% endschema %}`;
+
+  beforeEach(() => {
+    resetProxyTemplateCache();
+  });
+
+  it("should sanitize, strip schema and rewrite settings in one compile", () => {
+    const compiled = compileLiquidForProxy(code, { sanitize: true, transformSectionSettings: true });
+    const body = compiled.parts.join("ID");
+
+    expect(body).toContain("<!-- script removed -->");
+    expect(body).not.toContain("onclick");
+    expect(body).not.toContain("{% schema %}");
+    expect(body).toContain("{{ settings_heading }}");
+    // Resource picker detected from the code's own schema
+    expect(body).toContain("{% for product in collection.products %}");
+    expect(compiled.schema?.name).toBe("Grid");
+  });
+
+  it("should split the body at section.id so the id is applied per request", () => {
+    const compiled = compileLiquidForProxy(code, { sanitize: true, transformSectionSettings: true });
+
+    const first = renderProxyTemplate(compiled, { sectionId: "one" });
+    const second = renderProxyTemplate(compiled, { sectionId: "two" });
+
+    expect(first).toContain("#shopify-section-one {");
+    expect(second).toContain("#shopify-section-two {");
+    expect(second).not.toContain("section.id");
+  });
+
+  it("should memoize by content and only regenerate assigns", () => {
+    const compiled = compileLiquidForProxy(code, { sanitize: true, transformSectionSettings: true });
+    const again = compileLiquidForProxy(code, { sanitize: true, transformSectionSettings: true });
+
+    expect(again).toBe(compiled);
+    expect(getProxyTemplateCacheStats()).toMatchObject({ hits: 1, misses: 1, entries: 1 });
+
+    const rendered = renderProxyTemplate(again, { settings: { heading: "Hello" } });
+    expect(rendered).toContain("{% assign settings_heading = 'Hello' %}");
+  });
+
+  it("should key on options and explicit schema", () => {
+    compileLiquidForProxy(code, { sanitize: true });
+    compileLiquidForProxy(code, { sanitize: false });
+    compileLiquidForProxy(code, { transformSectionSettings: true, schema: null });
+    compileLiquidForProxy(code, { transformSectionSettings: true });
+
+    expect(getProxyTemplateCacheStats()).toMatchObject({ hits: 0, misses: 4 });
+  });
+
+  it("should match wrapLiquidForProxy output", () => {
+    const options = { liquidCode: code, sectionId: "abc", transformSectionSettings: true };
+
+    const compiled = compileLiquidForProxy(code, { transformSectionSettings: true, schema: null });
+
+    expect(renderProxyTemplate(compiled, { sectionId: "abc" })).toBe(wrapLiquidForProxy(options));
+  });
+});
+
 describe("parseProxyParams", () => {
   describe("code parsing", () => {
     it("should decode base64 code parameter", () => {
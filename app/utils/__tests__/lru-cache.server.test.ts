@@ -0,0 +1,60 @@
+import { LruCache } from "../lru-cache.server";
+
+describe("LruCache", () => {
+  const makeCache = (maxBytes: number, onEvict?: (key: string) => void) =>
+    new LruCache<string>({ maxBytes, sizeOf: (v) => v.length, onEvict });
+
+  it("should evict least recently used entries when over budget", () => {
+    const evicted: string[] = [];
+    const cache = makeCache(10, (key) => evicted.push(key));
+
+    cache.set("a", "aaaa");
+    cache.set("b", "bbbb");
+    cache.get("a"); // a is now most recently used
+    cache.set("c", "cccc");
+
+    expect(evicted).toEqual(["b"]);
+    expect(cache.get("a")).toBe("aaaa");
+    expect(cache.get("b")).toBeUndefined();
+    expect(cache.bytes).toBe(8);
+  });
+
+  it("should reject values larger than the whole budget", () => {
+    const cache = makeCache(4);
+
+    expect(cache.set("big", "too-large")).toBe(false);
+    expect(cache.size).toBe(0);
+  });
+
+  it("should track bytes when replacing a key", () => {
+    const cache = makeCache(100);
+
+    cache.set("a", "1234");
+    cache.set("a", "12");
+
+    expect(cache.bytes).toBe(2);
+    expect(cache.size).toBe(1);
+  });
+
+  it("should expire entries after ttl", () => {
+    jest.useFakeTimers();
+    const cache = new LruCache<string>({ maxBytes: 100, ttlMs: 1000, sizeOf: (v) => v.length });
+
+    cache.set("a", "value");
+    jest.advanceTimersByTime(1001);
+
+    expect(cache.get("a")).toBeUndefined();
+    expect(cache.bytes).toBe(0);
+    jest.useRealTimers();
+  });
+
+  it("should delete keys by prefix", () => {
+    const cache = makeCache(100);
+    cache.set("shop-a:1", "x");
+    cache.set("shop-a:2", "y");
+    cache.set("shop-b:1", "z");
+
+    expect(cache.deletePrefix("shop-a:")).toBe(2);
+    expect(cache.has("shop-b:1")).toBe(true);
+  });
+});
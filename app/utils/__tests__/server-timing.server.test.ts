@@ -0,0 +1,64 @@
+/**
+ * @jest-environment node
+ */
+import { ServerTiming, parseServerTiming } from '../server-timing.server';
+
+describe('ServerTiming', () => {
+  it('should format recorded stages as a header value', () => {
+    const timing = new ServerTiming();
+    timing.add('auth', 12.345);
+    timing.add('render', 4, 'cache hit');
+
+    expect(timing.toString()).toBe('auth;dur=12.3, render;dur=4.0;desc="cache hit"');
+    expect(timing.headers()).toEqual({ 'Server-Timing': timing.toString() });
+  });
+
+  it('should return no headers when nothing was recorded', () => {
+    expect(new ServerTiming().headers()).toEqual({});
+  });
+
+  it('should record start/end pairs and ignore unmatched ends', () => {
+    const timing = new ServerTiming();
+    timing.start('db');
+    timing.end('db');
+    timing.end('never-started');
+
+    expect(timing.getEntries().map((e) => e.name)).toEqual(['db']);
+  });
+
+  it('should record a measured stage even when it throws', async () => {
+    const timing = new ServerTiming();
+
+    await expect(
+      timing.measure('fetch', async () => {
+        throw new Error('boom');
+      })
+    ).rejects.toThrow('boom');
+
+    expect(timing.getEntries()).toHaveLength(1);
+  });
+
+  it('should replace characters that are not valid in metric names', () => {
+    const timing = new ServerTiming();
+    timing.add('token store', 1, 'say "hi"');
+
+    expect(timing.toString()).toBe('token_store;dur=1.0;desc="say hi"');
+  });
+});
+
+describe('parseServerTiming', () => {
+  it('should round-trip entries', () => {
+    const timing = new ServerTiming();
+    timing.add('auth', 1.5);
+    timing.add('compile', 0.2, 'miss');
+
+    expect(parseServerTiming(timing.toString())).toEqual([
+      { name: 'auth', durationMs: 1.5 },
+      { name: 'compile', durationMs: 0.2, description: 'miss' },
+    ]);
+  });
+
+  it('should return an empty list for a missing header', () => {
+    expect(parseServerTiming(null)).toEqual([]);
+  });
+});
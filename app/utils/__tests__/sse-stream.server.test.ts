@@ -0,0 +1,78 @@
+/**
+ * @jest-environment node
+ */
+import { createSseStream } from '../sse-stream.server';
+
+async function readEvents(stream: ReadableStream<Uint8Array>) {
+  const reader = stream.getReader();
+  const decoder = new TextDecoder();
+  let text = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    text += decoder.decode(value);
+  }
+  return text
+    .split('\n\n')
+    .filter(Boolean)
+    .map((frame) => JSON.parse(frame.replace(/^data: /, '')));
+}
+
+describe('createSseStream', () => {
+  it('should coalesce deltas into frames by size', async () => {
+    const stream = createSseStream(async (writer) => {
+      await writer.send('message_start');
+      for (let i = 0; i < 10; i++) await writer.delta('abcde');
+      await writer.send('message_complete', { ok: true });
+      await writer.close();
+    }, { flushChars: 20, flushIntervalMs: 0, highWaterMarkBytes: 1024 });
+
+    const events = await readEvents(stream);
+    const deltas = events.filter((e) => e.type === 'content_delta');
+
+    expect(events[0]).toEqual({ type: 'message_start' });
+    expect(events[events.length - 1]).toEqual({ type: 'message_complete', data: { ok: true } });
+    expect(deltas).toHaveLength(3);
+    expect(deltas.map((e) => e.data.content).join('')).toBe('abcde'.repeat(10));
+  });
+
+  it('should send one frame per delta when batching is disabled', async () => {
+    const stream = createSseStream(async (writer) => {
+      await writer.delta('a');
+      await writer.delta('b');
+      await writer.close();
+    }, { flushChars: 1, flushIntervalMs: 0, highWaterMarkBytes: 1024 });
+
+    const events = await readEvents(stream);
+
+    expect(events.map((e) => e.data.content)).toEqual(['a', 'b']);
+  });
+
+  it('should flush pending deltas after the time window', async () => {
+    jest.useFakeTimers();
+    const chunks: string[] = [];
+    const stream = createSseStream(async (writer) => {
+      await writer.delta('partial');
+    }, { flushChars: 1000, flushIntervalMs: 50, highWaterMarkBytes: 1024 });
+    const reader = stream.getReader();
+
+    jest.advanceTimersByTime(50);
+    const { value } = await reader.read();
+    chunks.push(new TextDecoder().decode(value));
+    jest.useRealTimers();
+
+    expect(chunks[0]).toContain('"content":"partial"');
+  });
+
+  it('should abort the writer signal when the client cancels', async () => {
+    let signal: AbortSignal | undefined;
+    const stream = createSseStream(async (writer) => {
+      signal = writer.signal;
+      await writer.send('message_start');
+    }, { flushChars: 1, flushIntervalMs: 0, highWaterMarkBytes: 1024 });
+
+    await stream.cancel();
+
+    expect(signal?.aborted).toBe(true);
+  });
+});
@@ -1,4 +1,5 @@
 import type { CodeExtractionResult } from '../types/ai.types';
+import { findSchemaBlock } from './liquid-tokenizer';
 
 // ============================================================================
 // Types for Liquid Validation
@@ -49,6 +50,9 @@ const CHANGES_COMMENT_PATTERN = /<!--\s*CHANGES:\s*(\[.*?\])\s*-->/s;
 // Max changes to return (UX: keep list scannable)
 const MAX_CHANGES = 5;
 
+// First closing HTML tag after the schema (raw, unfenced responses)
+const CLOSING_HTML_TAG_REGEX = /<\/[a-z]+>/gi;
+
 /**
  * Extract Liquid code from AI response
  * Handles multiple formats:
@@ -77,13 +81,16 @@ export function extractCodeFromResponse(content: string): CodeExtractionResult {
 
   // Fallback: look for raw Liquid schema pattern (no fencing)
   if (!code) {
-    const schemaMatch = content.match(/(\{%\s*schema\s*%\}[\s\S]*?\{%\s*endschema\s*%\})/);
-    if (schemaMatch) {
-      // Find the full section including HTML around the schema
-      const sectionMatch = content.match(
-        /((?:<[a-z][^>]*>[\s\S]*?)?\{%\s*schema\s*%\}[\s\S]*?\{%\s*endschema\s*%\}(?:[\s\S]*?<\/[a-z]+>)?)/i
-      );
-      code = sectionMatch ? sectionMatch[1].trim() : schemaMatch[1].trim();
+    const schema = findSchemaBlock(content);
+    if (schema?.closed) {
+      // Widen to the HTML around the schema: first opening tag before it,
+      // first closing tag after it
+      const leading = /<[a-z][^>]*>/i.exec(content.slice(0, schema.start));
+      CLOSING_HTML_TAG_REGEX.lastIndex = schema.end;
+      const trailing = CLOSING_HTML_TAG_REGEX.exec(content);
+      code = content
+        .slice(leading ? leading.index : schema.start, trailing ? CLOSING_HTML_TAG_REGEX.lastIndex : schema.end)
+        .trim();
     }
   }
 
@@ -197,7 +204,7 @@ function stripChangesComment(code: string): string {
  * Validate extracted code is a complete Liquid section
  */
 export function isCompleteLiquidSection(code: string): boolean {
-  const hasSchema = /\{%\s*schema\s*%\}[\s\S]*\{%\s*endschema\s*%\}/.test(code);
+  const hasSchema = findSchemaBlock(code)?.closed === true;
   const hasMarkup = /<[a-z][\s\S]*>/i.test(code);
 
   return hasSchema && hasMarkup;
@@ -208,13 +215,13 @@ export function isCompleteLiquidSection(code: string): boolean {
 // ============================================================================
 
 // Liquid block tags that require explicit closure ({% tag %}...{% endtag %})
-const LIQUID_BLOCK_TAGS = [
+export const LIQUID_BLOCK_TAGS = [
   'if', 'unless', 'for', 'case', 'form', 'capture', 'paginate', 'tablerow',
   'comment', 'raw', 'style', 'javascript', 'stylesheet'
 ];
 
 // HTML self-closing tags (don't require </tag>)
-const SELF_CLOSING_TAGS = [
+export const SELF_CLOSING_TAGS = [
   'br', 'hr', 'img', 'input', 'meta', 'link', 'area', 'base',
   'col', 'embed', 'param', 'source', 'track', 'wbr'
 ];
@@ -329,11 +336,11 @@ function validateSchemaJSON(code: string): LiquidValidationError[] {
   const errors: LiquidValidationError[] = [];
 
   // Check for complete schema block
-  const schemaMatch = code.match(/\{%\s*schema\s*%\}([\s\S]*?)\{%\s*endschema\s*%\}/);
+  const schema = findSchemaBlock(code);
 
-  if (!schemaMatch) {
+  if (!schema?.closed) {
     // Check if schema started but not closed
-    if (/\{%\s*schema\s*%\}/.test(code)) {
+    if (schema) {
       errors.push({
         type: 'unclosed_liquid_tag',
         tag: 'schema',
@@ -349,7 +356,7 @@ function validateSchemaJSON(code: string): LiquidValidationError[] {
   }
 
   // Validate JSON content
-  const jsonContent = schemaMatch[1].trim();
+  const jsonContent = schema.content.trim();
   if (!jsonContent) {
     errors.push({
       type: 'invalid_schema_json',
@@ -371,6 +378,30 @@ function validateSchemaJSON(code: string): LiquidValidationError[] {
   return errors;
 }
 
+/**
+ * Heuristic warnings for likely truncation
+ */
+export function getTruncationWarnings(code: string): string[] {
+  const warnings: string[] = [];
+
+  if (code.length < 200 && !code.includes('{% endschema %}')) {
+    warnings.push('Code is very short and may be truncated');
+  }
+
+  // Check for incomplete JSON/array syntax at end of code
+  const trimmedEnd = code.slice(-50).trim();
+  if (trimmedEnd.endsWith(',') || trimmedEnd.endsWith('[') || trimmedEnd.endsWith('{')) {
+    warnings.push('Code ends with incomplete JSON/array syntax');
+  }
+
+  // Check for truncated mid-tag
+  if (/\{%[^%]*$/.test(code) || /\{\{[^}]*$/.test(code)) {
+    warnings.push('Code ends with incomplete Liquid tag');
+  }
+
+  return warnings;
+}
+
 /**
  * Main validation function: checks Liquid code for completeness
  * Validates: schema block, Liquid tags, HTML tags (heuristic)
@@ -392,21 +423,7 @@ export function validateLiquidCompleteness(code: string): LiquidValidationResult
   errors.push(...validateLiquidTags(code));
   errors.push(...validateHTMLTags(code));
 
-  // Heuristic warnings for likely truncation
-  if (code.length < 200 && !code.includes('{% endschema %}')) {
-    warnings.push('Code is very short and may be truncated');
-  }
-
-  // Check for incomplete JSON/array syntax at end of code
-  const trimmedEnd = code.slice(-50).trim();
-  if (trimmedEnd.endsWith(',') || trimmedEnd.endsWith('[') || trimmedEnd.endsWith('{')) {
-    warnings.push('Code ends with incomplete JSON/array syntax');
-  }
-
-  // Check for truncated mid-tag
-  if (/\{%[^%]*$/.test(code) || /\{\{[^}]*$/.test(code)) {
-    warnings.push('Code ends with incomplete Liquid tag');
-  }
+  warnings.push(...getTruncationWarnings(code));
 
   return {
     isComplete: errors.length === 0,
@@ -419,27 +436,46 @@ export function validateLiquidCompleteness(code: string): LiquidValidationResult
 // Response Merging for Auto-Continuation
 // ============================================================================
 
+// Overlap search window and minimum meaningful overlap
+export const MAX_OVERLAP = 200;
+const MIN_OVERLAP = 10;
+
 /**
  * Find overlap between end of str1 and start of str2
  * Used to deduplicate when merging continuation responses
  *
+ * Runs a KMP automaton for the first MAX_OVERLAP chars of str2 over the last
+ * MAX_OVERLAP chars of str1; the final state is the longest prefix of str2
+ * that is a suffix of str1. Linear time instead of one slice-compare per length.
+ *
  * @param str1 - First string (original response)
  * @param str2 - Second string (continuation response)
  * @returns Length of overlapping characters
  */
 export function findOverlap(str1: string, str2: string): number {
-  const maxOverlap = Math.min(str1.length, str2.length, 200);
-
-  // Search from longest possible overlap down to minimum
-  for (let len = maxOverlap; len >= 10; len--) {
-    const end1 = str1.slice(-len);
-    const start2 = str2.slice(0, len);
-    if (end1 === start2) {
-      return len;
+  const maxOverlap = Math.min(str1.length, str2.length, MAX_OVERLAP);
+  if (maxOverlap < MIN_OVERLAP) return 0;
+
+  const pattern = str2.slice(0, maxOverlap);
+  const text = str1.slice(-maxOverlap);
+
+  // Failure function for pattern
+  const failure = new Array<number>(pattern.length).fill(0);
+  for (let i = 1, k = 0; i < pattern.length; i++) {
+    while (k > 0 && pattern[i] !== pattern[k]) k = failure[k - 1];
+    if (pattern[i] === pattern[k]) k++;
+    failure[i] = k;
+  }
+
+  let state = 0;
+  for (let i = 0; i < text.length; i++) {
+    while (state > 0 && (state === pattern.length || text[i] !== pattern[state])) {
+      state = failure[state - 1];
     }
+    if (text[i] === pattern[state]) state++;
   }
 
-  return 0;
+  return state >= MIN_OVERLAP ? state : 0;
 }
 
 /**
@@ -49,48 +49,81 @@ CONTEXT:
 The user's current section code is provided below. Always base your changes on this code.
 Never start from scratch unless explicitly asked.`;
 
+// Default prompt budget (code + history + request), in estimated tokens
+export const DEFAULT_PROMPT_TOKEN_BUDGET = 32000;
+
+// Recent messages are truncated to this many characters in the prompt
+const MAX_RECENT_MESSAGE_CHARS = 500;
+
+/**
+ * Rough token estimate (about 4 characters per token)
+ */
+export function estimateTokens(text: string): number {
+  return Math.ceil(text.length / 4);
+}
+
 /**
  * Build full prompt with conversation context
+ *
+ * Current code and the user request are always included. The remaining
+ * budget (context.tokenBudget, default DEFAULT_PROMPT_TOKEN_BUDGET) goes to
+ * the summary first, then to recent messages from newest to oldest.
  */
 export function buildConversationPrompt(
   userMessage: string,
   context: ConversationContext
 ): string {
-  const parts: string[] = [];
-
-  // Current code context
+  const codeSection: string[] = [];
   if (context.currentCode) {
-    parts.push('=== CURRENT SECTION CODE ===');
-    parts.push('```liquid');
-    parts.push(context.currentCode);
-    parts.push('```');
-    parts.push('');
+    codeSection.push('=== CURRENT SECTION CODE ===');
+    codeSection.push('```liquid');
+    codeSection.push(context.currentCode);
+    codeSection.push('```');
+    codeSection.push('');
   }
 
-  // Recent conversation history
-  if (context.recentMessages.length > 0) {
-    parts.push('=== RECENT CONVERSATION ===');
-    for (const msg of context.recentMessages) {
-      const role = msg.role === 'user' ? 'User' : 'Assistant';
-      // Truncate long messages for context efficiency
-      const content = msg.content.length > 500
-        ? msg.content.slice(0, 500) + '...[truncated]'
-        : msg.content;
-      parts.push(`${role}: ${content}`);
-    }
-    parts.push('');
-  }
+  const requestSection = ['=== USER REQUEST ===', userMessage];
+
+  let remaining = (context.tokenBudget ?? DEFAULT_PROMPT_TOKEN_BUDGET)
+    - estimateTokens(codeSection.join('\n'))
+    - estimateTokens(requestSection.join('\n'));
 
   // Summarized history (if available)
+  const summarySection: string[] = [];
   if (context.summarizedHistory) {
-    parts.push('=== EARLIER CONTEXT (SUMMARIZED) ===');
-    parts.push(context.summarizedHistory);
-    parts.push('');
+    const lines = ['=== EARLIER CONTEXT (SUMMARIZED) ===', context.summarizedHistory, ''];
+    const cost = estimateTokens(lines.join('\n'));
+    if (cost <= remaining) {
+      summarySection.push(...lines);
+      remaining -= cost;
+    }
+  }
+
+  // Recent conversation history, newest first until the budget runs out
+  const recentLines: string[] = [];
+  remaining -= estimateTokens('=== RECENT CONVERSATION ===\n\n');
+  for (let i = context.recentMessages.length - 1; i >= 0; i--) {
+    const msg = context.recentMessages[i];
+    const role = msg.role === 'user' ? 'User' : 'Assistant';
+    // Truncate long messages for context efficiency
+    const content = msg.content.length > MAX_RECENT_MESSAGE_CHARS
+      ? msg.content.slice(0, MAX_RECENT_MESSAGE_CHARS) + '...[truncated]'
+      : msg.content;
+    const line = `${role}: ${content}`;
+    const cost = estimateTokens(line) + 1;
+    if (cost > remaining) break;
+    recentLines.unshift(line);
+    remaining -= cost;
+  }
+
+  const parts: string[] = [...codeSection];
+  if (recentLines.length > 0) {
+    parts.push('=== RECENT CONVERSATION ===', ...recentLines, '');
   }
+  parts.push(...summarySection);
 
   // Current user request
-  parts.push('=== USER REQUEST ===');
-  parts.push(userMessage);
+  parts.push(...requestSection);
 
   return parts.join('\n');
 }
@@ -102,42 +135,55 @@ export function getChatSystemPrompt(baseSystemPrompt: string): string {
   return baseSystemPrompt + CHAT_SYSTEM_EXTENSION;
 }
 
+// Keyword -> summary topic
+const SUMMARY_TOPICS: Array<[string, string]> = [
+  ['color', 'color changes'],
+  ['button', 'button modifications'],
+  ['heading', 'heading styling'],
+  ['spacing', 'spacing adjustments'],
+  ['image', 'image settings'],
+  ['font', 'font changes'],
+  ['responsive', 'responsive design'],
+  ['background', 'background styling'],
+  ['padding', 'padding adjustments'],
+  ['margin', 'margin changes'],
+];
+
+/**
+ * Summary topics mentioned in one message
+ */
+export function extractSummaryTopics(content: string): string[] {
+  const lower = content.toLowerCase();
+  return SUMMARY_TOPICS.filter(([keyword]) => lower.includes(keyword)).map(([, topic]) => topic);
+}
+
+/**
+ * Render a summary from collected topics and the number of summarized user requests
+ */
+export function formatConversationSummary(topics: Iterable<string>, requestCount: number): string {
+  const summary: string[] = ['Previous conversation covered:'];
+  for (const topic of new Set(topics)) {
+    summary.push(`- ${topic}`);
+  }
+  summary.push(`(${requestCount} refinement requests made)`);
+  return summary.join('\n');
+}
+
 /**
  * Summarize old messages to save tokens
- * Called when conversation exceeds ~20 messages
+ * Conversations keep this summary up to date on write (see ChatService);
+ * this is the equivalent one-shot version for a list of messages.
  */
 export function summarizeOldMessages(messages: ModelMessage[]): string {
   if (messages.length === 0) return '';
 
-  const summary: string[] = [];
-  summary.push('Previous conversation covered:');
-
   // Extract key topics from messages
-  const topics = new Set<string>();
-
-  for (const msg of messages) {
-    // Look for common request patterns
-    if (msg.content.toLowerCase().includes('color')) topics.add('color changes');
-    if (msg.content.toLowerCase().includes('button')) topics.add('button modifications');
-    if (msg.content.toLowerCase().includes('heading')) topics.add('heading styling');
-    if (msg.content.toLowerCase().includes('spacing')) topics.add('spacing adjustments');
-    if (msg.content.toLowerCase().includes('image')) topics.add('image settings');
-    if (msg.content.toLowerCase().includes('font')) topics.add('font changes');
-    if (msg.content.toLowerCase().includes('responsive')) topics.add('responsive design');
-    if (msg.content.toLowerCase().includes('background')) topics.add('background styling');
-    if (msg.content.toLowerCase().includes('padding')) topics.add('padding adjustments');
-    if (msg.content.toLowerCase().includes('margin')) topics.add('margin changes');
-  }
-
-  for (const topic of topics) {
-    summary.push(`- ${topic}`);
-  }
+  const topics = messages.flatMap(msg => extractSummaryTopics(msg.content));
 
   // Count exchanges
   const userMessages = messages.filter(m => m.role === 'user').length;
-  summary.push(`(${userMessages} refinement requests made)`);
 
-  return summary.join('\n');
+  return formatConversationSummary(topics, userMessages);
 }
 
 /**
@@ -3,6 +3,14 @@
  * Protects against prompt injection and XSS attacks
  */
 
+import {
+  applyLiquidEdits,
+  tokenMarkup,
+  tokenizeLiquid,
+  type LiquidDocument,
+  type LiquidEdit,
+} from './liquid-tokenizer';
+
 // Patterns that indicate prompt injection attempts
 const INJECTION_PATTERNS = [
   /ignore\s+(all\s+)?previous\s+instructions?/i,
@@ -82,37 +90,87 @@ export function validateLiquidCode(code: string): { isValid: boolean; issues: st
   return { isValid: issues.length === 0, issues };
 }
 
+// Attribute-level XSS filters. These stay source-wide regexes (not token
+// based) because an attribute value can span Liquid output, e.g.
+// onclick="add({{ product.id }})".
+const JAVASCRIPT_URL_REGEX = /javascript:/gi;
+const EVENT_HANDLER_REGEX = /\s(on\w+)\s*=\s*["'][^"']*["']/gi;
+
+// {% form 'product' %} with no product argument
+const BARE_PRODUCT_FORM_REGEX = /^(\s*form\s+['"]product['"])\s*$/i;
+const NEW_COMMENT_FORM_REGEX = /^\s*form\s+['"]new_comment['"]/i;
+const PRODUCT_PICKER_REGEX = /"type"\s*:\s*"product"/;
+
+const SCRIPT_REMOVED = '<!-- script removed -->';
+const NEW_COMMENT_REMOVED = '<!-- new_comment form removed: not supported -->';
+
 /**
- * Sanitize extracted Liquid code by removing dangerous patterns
- * Also fixes common AI hallucination errors with Liquid forms
+ * Structural sanitizer edits for a tokenized template:
+ * script elements, new_comment forms and product forms missing their product.
+ * Apply them with applyLiquidEdits, then run stripUnsafeAttributes.
  */
-export function sanitizeLiquidCode(code: string): string {
-  let sanitized = code;
+export function collectSanitizeEdits(doc: LiquidDocument): LiquidEdit[] {
+  const edits: LiquidEdit[] = [];
 
   // === XSS SANITIZATION ===
   // Remove script tags entirely
-  sanitized = sanitized.replace(/<script[\s\S]*?<\/script>/gi, '<!-- script removed -->');
+  for (const element of doc.elements) {
+    if (element.name === 'script') {
+      edits.push({ start: element.start, end: element.end, text: SCRIPT_REMOVED });
+    }
+  }
 
-  // Remove javascript: hrefs
-  sanitized = sanitized.replace(/javascript:/gi, '');
+  // === LIQUID FORM SANITIZATION ===
+  const bareProductForms: LiquidEdit[] = [];
+  const { tokens } = doc;
+  for (let i = 0; i < tokens.length; i++) {
+    const token = tokens[i];
+    if (token.type !== 'tag' || token.name !== 'form' || !token.closed) continue;
+
+    const markup = tokenMarkup(doc, token);
+
+    // ALWAYS remove new_comment forms - requires article object, not supported
+    if (NEW_COMMENT_FORM_REGEX.test(markup) && !markup.includes('%')) {
+      let endIndex = i + 1;
+      while (endIndex < tokens.length && !(tokens[endIndex].type === 'tag' && tokens[endIndex].name === 'endform')) {
+        endIndex++;
+      }
+      if (endIndex < tokens.length) {
+        edits.push({ start: token.start, end: tokens[endIndex].end, text: NEW_COMMENT_REMOVED });
+        i = endIndex;
+      }
+      continue;
+    }
 
-  // Remove inline event handlers (but preserve Liquid syntax)
-  sanitized = sanitized.replace(/\s(on\w+)\s*=\s*["'][^"']*["']/gi, '');
+    // Fix product forms missing product argument
+    // {% form 'product' %} -> {% form 'product', section.settings.product %}
+    const bare = BARE_PRODUCT_FORM_REGEX.exec(markup);
+    if (bare && token.innerEnd === token.end - 2) {
+      const at = token.innerStart! + bare[1].length;
+      bareProductForms.push({ start: at, end: at, text: ', section.settings.product' });
+    }
+  }
 
-  // === LIQUID FORM SANITIZATION ===
-  // ALWAYS remove new_comment forms - requires article object, not supported
-  const newCommentFormRegex = /\{%[-\s]*form\s+['"]new_comment['"][^%]*%\}[\s\S]*?\{%[-\s]*endform[-\s]*%\}/gi;
-  sanitized = sanitized.replace(newCommentFormRegex, '<!-- new_comment form removed: not supported -->');
-
-  // Fix product forms missing product argument
-  // {% form 'product' %} -> {% form 'product', section.settings.product %}
-  const hasProductPicker = /"type"\s*:\s*"product"/.test(sanitized);
-  if (hasProductPicker) {
-    sanitized = sanitized.replace(
-      /(\{%[-\s]*form\s+['"]product['"])(\s*%\})/gi,
-      '$1, section.settings.product$2'
-    );
+  // Only when the schema has a product picker to bind the form to
+  if (bareProductForms.length > 0 && PRODUCT_PICKER_REGEX.test(doc.source)) {
+    edits.push(...bareProductForms);
   }
 
-  return sanitized;
+  return edits;
+}
+
+/**
+ * Remove javascript: URLs and inline event handlers (preserves Liquid syntax)
+ */
+export function stripUnsafeAttributes(code: string): string {
+  return code.replace(JAVASCRIPT_URL_REGEX, '').replace(EVENT_HANDLER_REGEX, '');
+}
+
+/**
+ * Sanitize extracted Liquid code by removing dangerous patterns
+ * Also fixes common AI hallucination errors with Liquid forms
+ */
+export function sanitizeLiquidCode(code: string): string {
+  const doc = tokenizeLiquid(code);
+  return stripUnsafeAttributes(applyLiquidEdits(code, collectSanitizeEdits(doc)));
 }
@@ -0,0 +1,323 @@
+/**
+ * Incremental Liquid completeness tracking for streamed AI responses
+ *
+ * Produces the same result as validateLiquidCompleteness(fullContent), but
+ * scans each chunk once as it arrives instead of rescanning the whole
+ * response after the stream ends. Only an unfinished tag at the end of the
+ * received text (e.g. `{% if` waiting for `%}`) is carried over between chunks.
+ *
+ * Also tracks ``` fences and trims auto-continuation overlap on the fly.
+ */
+
+import {
+  LIQUID_BLOCK_TAGS,
+  SELF_CLOSING_TAGS,
+  MAX_OVERLAP,
+  findOverlap,
+  getTruncationWarnings,
+  type LiquidValidationError,
+  type LiquidValidationResult,
+} from './code-extractor';
+
+// Same patterns as validateLiquidTags/validateHTMLTags, anchored with the sticky flag
+const LIQUID_TAG_PATTERN = /\{%[-\s]*(end)?(\w+)(?:[^%]*?)%\}/y;
+const HTML_TAG_PATTERN = /<\/?([a-z][a-z0-9-]*)[^>]*\/?>/iy;
+const SCHEMA_OPEN_PATTERN = /^\{%\s*schema\s*%\}$/;
+const SCHEMA_CLOSE_PATTERN = /^\{%\s*endschema\s*%\}$/;
+const FENCE = '```';
+
+export class LiquidStreamValidator {
+  private parts: string[] = [];
+  private joined: string | null = '';
+  private totalLength = 0;
+
+  // Unscanned tail of the content and its absolute offset
+  private window = '';
+  private windowStart = 0;
+
+  // Absolute scan positions for each independent scanner
+  private liquidPos = 0;
+  private htmlPos = 0;
+  private fencePos = 0;
+
+  private liquidStack: Array<{ tag: string; index: number }> = [];
+  private liquidErrors: LiquidValidationError[] = [];
+  private htmlStack: string[] = [];
+  private fenceCount = 0;
+  private schemaBodyStart = -1;
+  private schemaBodyEnd = -1;
+
+  // Continuation text held back until overlap with the original can be decided
+  private continuationBuffer: string | null = null;
+
+  /** Total characters accepted so far */
+  get length(): number {
+    return this.totalLength;
+  }
+
+  /** Full accepted content (joined once, then cached) */
+  get content(): string {
+    if (this.joined === null) {
+      this.joined = this.parts.join('');
+      this.parts = [this.joined];
+    }
+    return this.joined;
+  }
+
+  /** True while a ``` code fence is open */
+  get isFenceOpen(): boolean {
+    return this.fenceCount % 2 === 1;
+  }
+
+  /**
+   * Feed the next streamed chunk
+   */
+  push(chunk: string): void {
+    if (!chunk) return;
+
+    if (this.continuationBuffer !== null) {
+      this.continuationBuffer += chunk;
+      if (this.continuationBuffer.length >= MAX_OVERLAP) {
+        this.endContinuation();
+      }
+      return;
+    }
+
+    this.append(chunk);
+  }
+
+  /**
+   * Start an auto-continuation: the first MAX_OVERLAP chars are held back and
+   * merged like mergeResponses() (overlap removed, or joined with a newline)
+   */
+  beginContinuation(): void {
+    this.endContinuation();
+    this.continuationBuffer = '';
+  }
+
+  /**
+   * Finish a continuation (call when its stream ends)
+   */
+  endContinuation(): void {
+    const buffer = this.continuationBuffer;
+    if (buffer === null) return;
+    this.continuationBuffer = null;
+
+    const overlap = findOverlap(this.content, buffer);
+    this.append(overlap > 0 ? buffer.slice(overlap) : '\n' + buffer);
+  }
+
+  /**
+   * Completeness result for everything received so far
+   * Equivalent to validateLiquidCompleteness(this.content)
+   */
+  validate(): LiquidValidationResult {
+    // Feature flag check - return valid if disabled
+    if (process.env.FLAG_VALIDATE_LIQUID !== 'true') {
+      return { isComplete: true, errors: [], warnings: [] };
+    }
+
+    const content = this.content;
+    const errors: LiquidValidationError[] = [
+      ...this.schemaErrors(content),
+      ...this.liquidErrors,
+      ...this.liquidStack.map(({ tag }): LiquidValidationError => ({
+        type: 'unclosed_liquid_tag',
+        tag,
+        message: `Unclosed Liquid tag: {% ${tag} %} missing {% end${tag} %}`
+      })),
+    ];
+
+    // Only report if many unclosed tags (likely truncation, not minor HTML issues)
+    if (this.htmlStack.length > 2) {
+      errors.push({
+        type: 'unclosed_html_tag',
+        tag: this.htmlStack[this.htmlStack.length - 1],
+        message: `Multiple unclosed HTML tags: ${this.htmlStack.slice(-3).join(', ')}... (${this.htmlStack.length} total)`
+      });
+    }
+
+    return {
+      isComplete: errors.length === 0,
+      errors,
+      warnings: getTruncationWarnings(content),
+    };
+  }
+
+  private append(chunk: string): void {
+    if (!chunk) return;
+
+    this.parts.push(chunk);
+    this.joined = null;
+    this.totalLength += chunk.length;
+    this.window += chunk;
+
+    this.scanLiquid();
+    this.scanHtml();
+    this.scanFences();
+
+    // Drop text every scanner has moved past
+    const consumed = Math.min(this.liquidPos, this.htmlPos, this.fencePos) - this.windowStart;
+    if (consumed > 0) {
+      this.window = this.window.slice(consumed);
+      this.windowStart += consumed;
+    }
+  }
+
+  private scanLiquid(): void {
+    const text = this.window;
+    let i = this.liquidPos - this.windowStart;
+
+    for (;;) {
+      const start = text.indexOf('{%', i);
+      if (start === -1) {
+        // Keep a trailing '{' that may become '{%'
+        i = Math.max(i, text.endsWith('{') ? text.length - 1 : text.length);
+        break;
+      }
+
+      // The tag pattern cannot cross a '%', so the first '%' after '{%' decides the match
+      const percent = text.indexOf('%', start + 2);
+      if (percent === -1 || percent + 1 >= text.length) {
+        i = start;
+        break;
+      }
+
+      LIQUID_TAG_PATTERN.lastIndex = start;
+      const match = LIQUID_TAG_PATTERN.exec(text);
+      if (!match) {
+        i = start + 1;
+        continue;
+      }
+
+      this.handleLiquidTag(match, this.windowStart + start);
+      i = start + match[0].length;
+    }
+
+    this.liquidPos = this.windowStart + i;
+  }
+
+  private handleLiquidTag(match: RegExpExecArray, absoluteIndex: number): void {
+    // Schema bounds: first {% schema %}, then first {% endschema %} after it
+    if (this.schemaBodyStart === -1) {
+      if (SCHEMA_OPEN_PATTERN.test(match[0])) {
+        this.schemaBodyStart = absoluteIndex + match[0].length;
+      }
+    } else if (this.schemaBodyEnd === -1 && SCHEMA_CLOSE_PATTERN.test(match[0])) {
+      this.schemaBodyEnd = absoluteIndex;
+    }
+
+    const isClosing = !!match[1];
+    const tagName = match[2].toLowerCase();
+    if (!LIQUID_BLOCK_TAGS.includes(tagName)) return;
+
+    if (!isClosing) {
+      this.liquidStack.push({ tag: tagName, index: absoluteIndex });
+      return;
+    }
+
+    const last = this.liquidStack.pop();
+    if (!last) {
+      this.liquidErrors.push({
+        type: 'unclosed_liquid_tag',
+        tag: tagName,
+        message: `Unexpected closing tag: {% end${tagName} %}`
+      });
+    } else if (last.tag !== tagName) {
+      this.liquidErrors.push({
+        type: 'unclosed_liquid_tag',
+        tag: last.tag,
+        message: `Mismatched tag: expected {% end${last.tag} %}, got {% end${tagName} %}`
+      });
+    }
+  }
+
+  private scanHtml(): void {
+    const text = this.window;
+    let i = this.htmlPos - this.windowStart;
+
+    for (;;) {
+      const start = text.indexOf('<', i);
+      if (start === -1) {
+        i = Math.max(i, text.length);
+        break;
+      }
+
+      // The tag pattern ends at the first '>'
+      if (text.indexOf('>', start + 1) === -1) {
+        i = start;
+        break;
+      }
+
+      HTML_TAG_PATTERN.lastIndex = start;
+      const match = HTML_TAG_PATTERN.exec(text);
+      if (!match) {
+        i = start + 1;
+        continue;
+      }
+
+      const fullTag = match[0];
+      const tagName = match[1].toLowerCase();
+      if (!SELF_CLOSING_TAGS.includes(tagName) && !fullTag.endsWith('/>')) {
+        if (fullTag.startsWith('</')) {
+          this.htmlStack.pop();
+        } else {
+          this.htmlStack.push(tagName);
+        }
+      }
+      i = start + fullTag.length;
+    }
+
+    this.htmlPos = this.windowStart + i;
+  }
+
+  private scanFences(): void {
+    const text = this.window;
+    let i = this.fencePos - this.windowStart;
+
+    for (;;) {
+      const start = text.indexOf(FENCE, i);
+      if (start === -1) {
+        // Keep up to two trailing backticks that may become a fence
+        let keep = text.length;
+        while (keep > i && keep > text.length - 2 && text[keep - 1] === '`') keep--;
+        i = Math.max(i, keep);
+        break;
+      }
+      this.fenceCount++;
+      i = start + FENCE.length;
+    }
+
+    this.fencePos = this.windowStart + i;
+  }
+
+  private schemaErrors(content: string): LiquidValidationError[] {
+    if (this.schemaBodyStart === -1) {
+      return [{
+        type: 'missing_schema',
+        message: 'No {% schema %}...{% endschema %} block found'
+      }];
+    }
+
+    if (this.schemaBodyEnd === -1) {
+      return [{
+        type: 'unclosed_liquid_tag',
+        tag: 'schema',
+        message: 'Schema block started but {% endschema %} missing'
+      }];
+    }
+
+    const jsonContent = content.slice(this.schemaBodyStart, this.schemaBodyEnd).trim();
+    if (!jsonContent) {
+      return [{ type: 'invalid_schema_json', message: 'Schema block is empty' }];
+    }
+
+    try {
+      JSON.parse(jsonContent);
+      return [];
+    } catch (e) {
+      const errorMessage = e instanceof Error ? e.message : 'Parse error';
+      return [{ type: 'invalid_schema_json', message: `Invalid JSON in schema: ${errorMessage}` }];
+    }
+  }
+}
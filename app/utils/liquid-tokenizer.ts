@@ -0,0 +1,368 @@
+/**
+ * Liquid tokenizer
+ *
+ * One left-to-right scan of a template into text, output ({{ }}), tag ({% %})
+ * and raw-block tokens ({% schema %}, {% raw %}, {% comment %}, ...), plus the
+ * spans of <script> and <style> elements. Transforms (sanitizer, schema lookup,
+ * App Proxy rewrites) work from this token stream instead of running their own
+ * regex pass over the whole source, and express their changes as edits that
+ * are applied together in a single pass.
+ *
+ * Shared by client and server code: no Node APIs here.
+ */
+
+export type LiquidTokenType = 'text' | 'output' | 'tag' | 'raw';
+
+export interface LiquidToken {
+  type: LiquidTokenType;
+  /** Offset of the first character */
+  start: number;
+  /** Offset after the last character */
+  end: number;
+  /** Tag name for tag and raw tokens ('if', 'form', 'schema', ...) */
+  name?: string;
+  /** Markup between the delimiters, whitespace-control dashes excluded (opening tag for raw blocks) */
+  innerStart?: number;
+  innerEnd?: number;
+  /** Raw blocks: body between the opening and closing tags */
+  bodyStart?: number;
+  bodyEnd?: number;
+  /** False when the closing delimiter or end tag is missing (token runs to end of source) */
+  closed: boolean;
+}
+
+export interface LiquidElementSpan {
+  name: 'script' | 'style';
+  start: number;
+  /** Offset after the closing tag */
+  end: number;
+}
+
+export interface LiquidDocument {
+  source: string;
+  tokens: LiquidToken[];
+  /**
+   * Closed <script>/<style> elements, in source order (may contain Liquid
+   * tokens). Scripts and styles are found independently, so a script may lie
+   * inside a style span.
+   */
+  elements: LiquidElementSpan[];
+  /** First {% schema %} block */
+  schema: LiquidToken | null;
+}
+
+export interface LiquidEdit {
+  start: number;
+  end: number;
+  text: string;
+}
+
+// Blocks whose body is not Liquid markup
+const RAW_BLOCK_TAGS = new Set(['schema', 'raw', 'comment', 'doc', 'javascript', 'stylesheet']);
+
+// Liquid delimiters and HTML elements the sanitizer cares about, in one pattern
+const TOKEN_START_REGEX = /\{\{|\{%|<(script|style)/gi;
+const ELEMENT_START_REGEX = /<(script|style)/gi;
+const ELEMENT_END_REGEX: Record<LiquidElementSpan['name'], RegExp> = {
+  script: /<\/script>/gi,
+  style: /<\/style\s*>/gi,
+};
+
+const endTagRegexCache = new Map<string, RegExp>();
+
+function endTagRegex(name: string): RegExp {
+  let regex = endTagRegexCache.get(name);
+  if (!regex) {
+    regex = new RegExp(`\\{%-?\\s*end${name}\\s*-?%\\}`, 'g');
+    endTagRegexCache.set(name, regex);
+  }
+  return regex;
+}
+
+function isNameChar(code: number): boolean {
+  return (
+    (code >= 97 && code <= 122) || // a-z
+    (code >= 65 && code <= 90) || // A-Z
+    (code >= 48 && code <= 57) || // 0-9
+    code === 95 || // _
+    code === 35 // # (inline comment tag)
+  );
+}
+
+function isWhitespace(code: number): boolean {
+  return code === 32 || code === 9 || code === 10 || code === 13 || code === 12;
+}
+
+/**
+ * Read a {{ }} or {% %} token starting at `start`
+ */
+function readDelimited(source: string, start: number, isOutput: boolean): LiquidToken {
+  const close = source.indexOf(isOutput ? '}}' : '%}', start + 2);
+  const closed = close !== -1;
+  const end = closed ? close + 2 : source.length;
+
+  let innerStart = start + 2;
+  if (source.charCodeAt(innerStart) === 45) innerStart++; // '-'
+  let innerEnd = closed ? close : source.length;
+  if (closed && innerEnd > innerStart && source.charCodeAt(innerEnd - 1) === 45) innerEnd--;
+
+  const token: LiquidToken = {
+    type: isOutput ? 'output' : 'tag',
+    start,
+    end,
+    innerStart,
+    innerEnd,
+    closed,
+  };
+
+  if (!isOutput) {
+    let i = innerStart;
+    while (i < innerEnd && isWhitespace(source.charCodeAt(i))) i++;
+    const nameStart = i;
+    while (i < innerEnd && isNameChar(source.charCodeAt(i))) i++;
+    token.name = source.slice(nameStart, i);
+  }
+
+  return token;
+}
+
+/**
+ * Extend a raw-block opening tag to its end tag
+ */
+function readRawBlock(source: string, open: LiquidToken): LiquidToken {
+  const regex = endTagRegex(open.name!);
+  regex.lastIndex = open.end;
+  const match = regex.exec(source);
+
+  return {
+    ...open,
+    type: 'raw',
+    end: match ? match.index + match[0].length : source.length,
+    bodyStart: open.end,
+    bodyEnd: match ? match.index : source.length,
+    closed: open.closed && match !== null,
+  };
+}
+
+// End of the last recorded element of each kind: openers of that kind before
+// it are inside it. Kept per kind because a style span is only a guess at
+// where the browser closes the element ('<style' can sit in an attribute
+// value, '</style x>' ends it early), so it must never hide a script.
+type ElementFloors = Record<LiquidElementSpan['name'], number>;
+
+/**
+ * Record the element opened at `start` if it is closed and not inside an
+ * element of the same kind
+ */
+function readElement(
+  source: string,
+  start: number,
+  rawName: string,
+  floors: ElementFloors,
+  elements: LiquidElementSpan[]
+): void {
+  const name = rawName.toLowerCase() as LiquidElementSpan['name'];
+  if (start < floors[name]) return;
+
+  const regex = ELEMENT_END_REGEX[name];
+  regex.lastIndex = start;
+  const match = regex.exec(source);
+  if (!match) return;
+
+  const end = match.index + match[0].length;
+  elements.push({ name, start, end });
+  floors[name] = end;
+}
+
+/**
+ * Find elements that open inside a Liquid token (e.g. '<script>' in a string)
+ */
+function scanElementsIn(
+  source: string,
+  from: number,
+  to: number,
+  floors: ElementFloors,
+  elements: LiquidElementSpan[]
+): void {
+  ELEMENT_START_REGEX.lastIndex = from;
+  let match: RegExpExecArray | null;
+  while ((match = ELEMENT_START_REGEX.exec(source)) && match.index < to) {
+    readElement(source, match.index, match[1], floors, elements);
+  }
+}
+
+/**
+ * Tokenize a Liquid template in a single scan
+ */
+export function tokenizeLiquid(source: string): LiquidDocument {
+  const tokens: LiquidToken[] = [];
+  const elements: LiquidElementSpan[] = [];
+  let schema: LiquidToken | null = null;
+
+  let textStart = 0;
+  let scanFrom = 0;
+  const floors: ElementFloors = { script: 0, style: 0 };
+
+  while (scanFrom < source.length) {
+    TOKEN_START_REGEX.lastIndex = scanFrom;
+    const match = TOKEN_START_REGEX.exec(source);
+    if (!match) break;
+
+    if (match[1]) {
+      // <script / <style in text
+      readElement(source, match.index, match[1], floors, elements);
+      scanFrom = match.index + match[0].length;
+      continue;
+    }
+
+    if (match.index > textStart) {
+      tokens.push({ type: 'text', start: textStart, end: match.index, closed: true });
+    }
+
+    let token = readDelimited(source, match.index, match[0] === '{{');
+    if (token.type === 'tag' && RAW_BLOCK_TAGS.has(token.name!)) {
+      token = readRawBlock(source, token);
+      if (token.name === 'schema' && !schema) schema = token;
+    }
+    tokens.push(token);
+
+    // Rare: markup that itself contains '<script' (string literals, raw bodies)
+    const lt = source.indexOf('<', token.start);
+    if (lt !== -1 && lt < token.end) {
+      scanElementsIn(source, lt, token.end, floors, elements);
+    }
+
+    textStart = scanFrom = token.end;
+  }
+
+  if (textStart < source.length) {
+    tokens.push({ type: 'text', start: textStart, end: source.length, closed: true });
+  }
+
+  return { source, tokens, elements, schema };
+}
+
+/**
+ * Full source text of a token
+ */
+export function tokenSource(doc: LiquidDocument, token: LiquidToken): string {
+  return doc.source.slice(token.start, token.end);
+}
+
+/**
+ * Markup between a token's delimiters (tag name included for tags)
+ */
+export function tokenMarkup(doc: LiquidDocument, token: LiquidToken): string {
+  return doc.source.slice(token.innerStart ?? token.start, token.innerEnd ?? token.end);
+}
+
+/**
+ * Tag arguments after the tag name
+ */
+export function tagArguments(doc: LiquidDocument, token: LiquidToken): string {
+  const markup = tokenMarkup(doc, token);
+  const nameAt = markup.indexOf(token.name ?? '');
+  return markup.slice(nameAt + (token.name?.length ?? 0)).trim();
+}
+
+export interface LiquidBlockSpan {
+  start: number;
+  end: number;
+  /** Raw text between the opening and closing tags */
+  content: string;
+  /** False when the end tag is missing (content runs to end of source) */
+  closed: boolean;
+}
+
+/**
+ * Locate the first {% schema %}...{% endschema %} block
+ * Lighter than tokenizeLiquid when only the schema is needed: hops from
+ * tag to tag without building tokens.
+ */
+export function findSchemaBlock(source: string): LiquidBlockSpan | null {
+  let from = 0;
+  for (;;) {
+    const start = source.indexOf('{%', from);
+    if (start === -1) return null;
+
+    const tag = readDelimited(source, start, false);
+    if (tag.name === 'schema') {
+      const block = readRawBlock(source, tag);
+      return {
+        start: block.start,
+        end: block.end,
+        content: source.slice(block.bodyStart, block.bodyEnd),
+        closed: block.closed,
+      };
+    }
+    if (!tag.closed) return null;
+    from = tag.end;
+  }
+}
+
+function sortEdits(edits: LiquidEdit[]): LiquidEdit[] {
+  // By position; for equal starts the wider edit first so it wins
+  return [...edits].sort((a, b) => a.start - b.start || b.end - a.end);
+}
+
+function overlaps(a: LiquidEdit, b: LiquidEdit): boolean {
+  return a.start < b.end && b.start < a.end;
+}
+
+function dropOverlapping(sorted: LiquidEdit[]): LiquidEdit[] {
+  const kept: LiquidEdit[] = [];
+  for (const edit of sorted) {
+    const last = kept[kept.length - 1];
+    if (last && overlaps(last, edit)) continue;
+    kept.push(edit);
+  }
+  return kept;
+}
+
+/**
+ * Apply edits in one pass over the source
+ *
+ * An edit overlapping an earlier one is dropped (the earlier, or wider,
+ * edit wins). `protectedEdits` (e.g. sanitizer removals) always win over
+ * `edits` they overlap.
+ */
+export function applyLiquidEdits(
+  source: string,
+  edits: LiquidEdit[],
+  protectedEdits: LiquidEdit[] = []
+): string {
+  const guarded = dropOverlapping(sortEdits(protectedEdits));
+
+  let merged: LiquidEdit[];
+  if (guarded.length === 0) {
+    merged = dropOverlapping(sortEdits(edits));
+  } else {
+    // Both lists are sorted: one sweep to discard edits under a protected span
+    const candidates = sortEdits(edits);
+    const allowed: LiquidEdit[] = [];
+    let g = 0;
+    for (const edit of candidates) {
+      while (g < guarded.length && guarded[g].end <= edit.start) g++;
+      let blocked = false;
+      for (let k = g; k < guarded.length && guarded[k].start < edit.end; k++) {
+        if (overlaps(guarded[k], edit)) {
+          blocked = true;
+          break;
+        }
+      }
+      if (!blocked) allowed.push(edit);
+    }
+    merged = dropOverlapping(sortEdits([...guarded, ...allowed]));
+  }
+
+  if (merged.length === 0) return source;
+
+  const parts: string[] = [];
+  let cursor = 0;
+  for (const edit of merged) {
+    parts.push(source.slice(cursor, edit.start), edit.text);
+    cursor = edit.end;
+  }
+  parts.push(source.slice(cursor));
+  return parts.join('');
+}
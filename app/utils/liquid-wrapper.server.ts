@@ -4,13 +4,18 @@
  * for native Shopify Liquid rendering via App Proxy.
  */
 
+import { createHash } from "crypto";
 import type { SettingsState, BlockInstance, SchemaDefinition } from '../components/preview/schema/SchemaTypes';
+import { parseSchemaContent } from '../components/preview/schema/parseSchema';
 import {
   generateSettingsAssigns,
   generateBlocksAssigns,
-  rewriteSectionSettings,
+  collectSectionSettingsEdits,
   rewriteBlocksIteration,
 } from './settings-transform.server';
+import { collectSanitizeEdits, stripUnsafeAttributes } from './input-sanitizer';
+import { applyLiquidEdits, tokenizeLiquid, tokenMarkup, type LiquidEdit } from './liquid-tokenizer';
+import { LruCache } from './lru-cache.server';
 
 // Types for wrapper configuration
 export interface WrapperOptions {
@@ -36,8 +41,50 @@ export interface ProxyParams {
   sectionId: string;
 }
 
-// Regex to strip schema blocks (handles whitespace control syntax)
-const SCHEMA_BLOCK_REGEX = /{%-?\s*schema\s*-?%}[\s\S]*?{%-?\s*endschema\s*-?%}/gi;
+// Options for compileLiquidForProxy
+export interface ProxyCompileOptions {
+  /** Apply sanitizeLiquidCode in the same pass */
+  sanitize?: boolean;
+  transformSectionSettings?: boolean;
+  transformBlocksIteration?: boolean;
+  /**
+   * Schema for resource picker detection. Omit to use the code's own
+   * {% schema %} block; null disables schema-aware detection.
+   */
+  schema?: SchemaDefinition | null;
+}
+
+// Request-independent part of a proxy template
+export interface CompiledProxyTemplate {
+  /** Template body split at each {{ section.id }} */
+  parts: string[];
+  /** Schema used for resource picker detection */
+  schema: SchemaDefinition | null;
+}
+
+// Per-request values injected around a compiled template
+export interface ProxyRenderContext {
+  sectionId?: string;
+  productHandle?: string;
+  collectionHandle?: string;
+  settings?: SettingsState;
+  blocks?: BlockInstance[];
+}
+
+export interface ProxyTemplateCacheStats {
+  hits: number;
+  misses: number;
+  entries: number;
+  bytes: number;
+  maxBytes: number;
+}
+
+// Compiled template budget (default 16 MB); entries are content-addressed, so no TTL
+const MAX_COMPILED_BYTES =
+  (Number(process.env.PROXY_TEMPLATE_CACHE_MB) || 16) * 1024 * 1024;
+
+// Stands in for {{ section.id }} until the body is split into parts
+const SECTION_ID_MARKER = "\u0000section.id\u0000";
 
 // Validation regex for Shopify handles (alphanumeric + hyphens)
 const VALID_HANDLE_REGEX = /^[a-z0-9-]+$/i;
@@ -57,24 +104,120 @@ function isValidHandle(handle: string): boolean {
 }
 
 
+const compileStats = { hits: 0, misses: 0 };
+
+const compiledTemplates = new LruCache<CompiledProxyTemplate>({
+  maxBytes: MAX_COMPILED_BYTES,
+  // JS strings are UTF-16; schema objects are small next to the body
+  sizeOf: (compiled) => compiled.parts.reduce((sum, part) => sum + part.length * 2, 1024),
+});
+
+function getCompileKey(code: string, options: ProxyCompileOptions): string {
+  const hash = createHash("sha256");
+  hash.update(
+    [
+      options.sanitize ? 1 : 0,
+      options.transformSectionSettings ? 1 : 0,
+      options.transformBlocksIteration ? 1 : 0,
+    ].join("")
+  );
+  // Schema is part of the key only when it does not come from the code itself
+  const schema = options.schema === undefined ? "" : JSON.stringify(options.schema);
+  hash.update(`${schema.length}:`);
+  hash.update(schema);
+  hash.update(code);
+  return hash.digest("hex");
+}
+
 /**
- * Wraps Liquid code with context injection for App Proxy rendering
+ * Run every source transform in one tokenizer pass:
+ * sanitizer edits, schema stripping, {{ section.id }} split points and
+ * section.settings / image filter rewrites.
+ */
+function compileTemplate(code: string, options: ProxyCompileOptions): CompiledProxyTemplate {
+  const doc = tokenizeLiquid(code);
+
+  let schema: SchemaDefinition | null = null;
+  if (options.schema !== undefined) {
+    schema = options.schema;
+  } else if (doc.schema?.closed) {
+    const content = code.slice(doc.schema.bodyStart, doc.schema.bodyEnd);
+    schema = content.trim() ? parseSchemaContent(content) : null;
+  }
+
+  // Removals that must win over rewrites they overlap
+  const removals: LiquidEdit[] = options.sanitize ? collectSanitizeEdits(doc) : [];
+  const rewrites: LiquidEdit[] = [];
+
+  for (const token of doc.tokens) {
+    if (token.type === "raw" && token.name === "schema" && token.closed) {
+      // Strip schema block from user code (not renderable)
+      removals.push({ start: token.start, end: token.end, text: "" });
+    } else if (token.type === "output" && tokenMarkup(doc, token).trim() === "section.id") {
+      // App Proxy doesn't provide section context, so section.id would be empty
+      rewrites.push({ start: token.start, end: token.end, text: SECTION_ID_MARKER });
+    }
+  }
+
+  // Optionally transform section.settings.X to settings_X for compatibility
+  // Pass schema for schema-aware resource picker detection
+  if (options.transformSectionSettings) {
+    rewrites.push(...collectSectionSettingsEdits(doc, schema));
+  }
+
+  let body = applyLiquidEdits(code, rewrites, removals);
+
+  // Optionally transform for block in section.blocks loops
+  if (options.transformBlocksIteration) {
+    body = rewriteBlocksIteration(body);
+  }
+
+  if (options.sanitize) {
+    body = stripUnsafeAttributes(body);
+  }
+
+  return { parts: body.split(SECTION_ID_MARKER), schema };
+}
+
+/**
+ * Compile Liquid code for App Proxy rendering
+ * Memoized by a hash of code, options and schema: repeat previews of the same
+ * section only pay for the per-request assigns (see renderProxyTemplate).
+ */
+export function compileLiquidForProxy(
+  code: string,
+  options: ProxyCompileOptions = {}
+): CompiledProxyTemplate {
+  const key = getCompileKey(code, options);
+  const cached = compiledTemplates.get(key);
+  if (cached) {
+    compileStats.hits++;
+    return cached;
+  }
+
+  compileStats.misses++;
+  const compiled = compileTemplate(code, options);
+  compiledTemplates.set(key, compiled);
+  return compiled;
+}
+
+/**
+ * Render a compiled template for one request
  * Injects product/collection context, settings, and blocks as Liquid assigns
  *
  * Settings are injected as: settings_title, settings_columns, etc.
  * Blocks are injected as: block_0_type, block_0_title, blocks_count, etc.
  */
-export function wrapLiquidForProxy({
-  liquidCode,
-  sectionId = "preview",
-  productHandle,
-  collectionHandle,
-  settings = {},
-  blocks = [],
-  transformSectionSettings = false,
-  transformBlocksIteration = false,
-  schema,
-}: WrapperOptions): string {
+export function renderProxyTemplate(
+  compiled: CompiledProxyTemplate,
+  {
+    sectionId = "preview",
+    productHandle,
+    collectionHandle,
+    settings = {},
+    blocks = [],
+  }: ProxyRenderContext = {}
+): string {
   const assigns: string[] = [];
 
   // Inject product context if specified and valid
@@ -93,35 +236,68 @@ export function wrapLiquidForProxy({
   // Inject blocks as numbered assigns (block_0_type, block_0_title, blocks_count)
   assigns.push(...generateBlocksAssigns(blocks));
 
-  // Strip schema block from user code (not renderable)
-  let cleanedCode = liquidCode.replace(SCHEMA_BLOCK_REGEX, "");
-
   // Replace {{ section.id }} with actual sectionId in CSS
-  // App Proxy doesn't provide section context, so section.id would be empty
-  cleanedCode = cleanedCode.replace(
-    /\{\{\s*section\.id\s*\}\}/g,
-    sectionId
-  );
-
-  // Optionally transform section.settings.X to settings_X for compatibility
-  // Pass schema for schema-aware resource picker detection
-  if (transformSectionSettings) {
-    cleanedCode = rewriteSectionSettings(cleanedCode, schema);
-  }
-
-  // Optionally transform for block in section.blocks loops
-  if (transformBlocksIteration) {
-    cleanedCode = rewriteBlocksIteration(cleanedCode);
-  }
+  const body = compiled.parts.length === 1 ? compiled.parts[0] : compiled.parts.join(sectionId);
 
   // Build wrapped template with CSS isolation container
   const assignsBlock = assigns.length > 0 ? `${assigns.join("\n")}\n` : "";
 
   return `${assignsBlock}<div class="blocksmith-preview" id="shopify-section-${sectionId}">
-${cleanedCode}
+${body}
 </div>`;
 }
 
+/**
+ * Wraps Liquid code with context injection for App Proxy rendering
+ * Equivalent to compileLiquidForProxy + renderProxyTemplate (no sanitizing).
+ */
+export function wrapLiquidForProxy({
+  liquidCode,
+  sectionId,
+  productHandle,
+  collectionHandle,
+  settings,
+  blocks,
+  transformSectionSettings = false,
+  transformBlocksIteration = false,
+  schema,
+}: WrapperOptions): string {
+  const compiled = compileLiquidForProxy(liquidCode, {
+    transformSectionSettings,
+    transformBlocksIteration,
+    schema: schema ?? null,
+  });
+
+  return renderProxyTemplate(compiled, {
+    sectionId,
+    productHandle,
+    collectionHandle,
+    settings,
+    blocks,
+  });
+}
+
+/**
+ * Compiled template cache counters
+ */
+export function getProxyTemplateCacheStats(): ProxyTemplateCacheStats {
+  return {
+    ...compileStats,
+    entries: compiledTemplates.size,
+    bytes: compiledTemplates.bytes,
+    maxBytes: compiledTemplates.maxBytes,
+  };
+}
+
+/**
+ * Drop all compiled templates and reset counters (tests, benchmarks)
+ */
+export function resetProxyTemplateCache(): void {
+  compiledTemplates.clear();
+  compileStats.hits = 0;
+  compileStats.misses = 0;
+}
+
 /**
  * Decode and validate proxy request parameters
  * Handles base64 decoding for code, settings, and blocks
@@ -0,0 +1,143 @@
+/**
+ * Byte-bounded LRU cache
+ *
+ * In-process cache used by server-side services that need a hard memory cap.
+ * Relies on Map insertion order: the first key is always the least recently
+ * used, so eviction and touch are both O(1).
+ */
+
+interface LruEntry<V> {
+  value: V;
+  size: number;
+  expiresAt: number;
+}
+
+export interface LruCacheOptions<V> {
+  /** Upper bound on the sum of entry sizes */
+  maxBytes: number;
+  /** Optional cap on entry count (defaults to unbounded) */
+  maxEntries?: number;
+  /** Default time-to-live; 0 disables expiry */
+  ttlMs?: number;
+  /** Size estimate for a value, in bytes */
+  sizeOf: (value: V) => number;
+  /** Called when an entry is dropped to make room (not on delete/expiry) */
+  onEvict?: (key: string, value: V) => void;
+}
+
+export class LruCache<V> {
+  private entries = new Map<string, LruEntry<V>>();
+  private totalBytes = 0;
+  private readonly options: LruCacheOptions<V>;
+
+  constructor(options: LruCacheOptions<V>) {
+    this.options = options;
+  }
+
+  /** Current number of entries */
+  get size(): number {
+    return this.entries.size;
+  }
+
+  /** Current sum of entry sizes */
+  get bytes(): number {
+    return this.totalBytes;
+  }
+
+  get maxBytes(): number {
+    return this.options.maxBytes;
+  }
+
+  /**
+   * Get a live value and mark it most recently used
+   */
+  get(key: string): V | undefined {
+    const entry = this.entries.get(key);
+    if (!entry) return undefined;
+
+    if (entry.expiresAt && entry.expiresAt <= Date.now()) {
+      this.remove(key, entry);
+      return undefined;
+    }
+
+    // Re-insert to move the key to the MRU end
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    return entry.value;
+  }
+
+  has(key: string): boolean {
+    const entry = this.entries.get(key);
+    if (!entry) return false;
+    if (entry.expiresAt && entry.expiresAt <= Date.now()) {
+      this.remove(key, entry);
+      return false;
+    }
+    return true;
+  }
+
+  /**
+   * Insert or replace a value. Returns false if the value alone exceeds maxBytes.
+   */
+  set(key: string, value: V, ttlMs: number = this.options.ttlMs ?? 0): boolean {
+    const size = this.options.sizeOf(value);
+    const existing = this.entries.get(key);
+    if (existing) this.remove(key, existing);
+
+    if (size > this.options.maxBytes) return false;
+
+    this.entries.set(key, {
+      value,
+      size,
+      expiresAt: ttlMs > 0 ? Date.now() + ttlMs : 0,
+    });
+    this.totalBytes += size;
+    this.evict();
+    return true;
+  }
+
+  delete(key: string): boolean {
+    const entry = this.entries.get(key);
+    if (!entry) return false;
+    this.remove(key, entry);
+    return true;
+  }
+
+  /**
+   * Delete every key starting with prefix (used for per-shop invalidation)
+   */
+  deletePrefix(prefix: string): number {
+    let removed = 0;
+    for (const [key, entry] of this.entries) {
+      if (key.startsWith(prefix)) {
+        this.remove(key, entry);
+        removed++;
+      }
+    }
+    return removed;
+  }
+
+  clear(): void {
+    this.entries.clear();
+    this.totalBytes = 0;
+  }
+
+  private remove(key: string, entry: LruEntry<V>): void {
+    this.entries.delete(key);
+    this.totalBytes -= entry.size;
+  }
+
+  private evict(): void {
+    const { maxBytes, maxEntries, onEvict } = this.options;
+    while (
+      this.totalBytes > maxBytes ||
+      (maxEntries !== undefined && this.entries.size > maxEntries)
+    ) {
+      const oldest = this.entries.keys().next();
+      if (oldest.done) break;
+      const entry = this.entries.get(oldest.value)!;
+      this.remove(oldest.value, entry);
+      onEvict?.(oldest.value, entry.value);
+    }
+  }
+}
@@ -0,0 +1,15 @@
+/**
+ * Bearer-token check shared by the monitoring endpoints
+ */
+
+import { timingSafeEqual } from "crypto";
+
+/**
+ * True when the request carries `Authorization: Bearer ${token}`
+ */
+export function isAuthorizedMetricsRequest(request: Request, token: string): boolean {
+  const header = request.headers.get("Authorization") ?? "";
+  const expected = Buffer.from(`Bearer ${token}`);
+  const actual = Buffer.from(header);
+  return actual.length === expected.length && timingSafeEqual(actual, expected);
+}
@@ -0,0 +1,96 @@
+/**
+ * Server-Timing header builder
+ *
+ * Routes record how long each stage took (auth, db, compile, fetch, ...)
+ * and return them in a `Server-Timing` header, which browser devtools and
+ * the route load harness (scripts/benchmarks/routes-load.ts) read back.
+ *
+ * Streaming routes can only report the stages that finish before the
+ * response headers are sent.
+ */
+
+export interface ServerTimingEntry {
+  name: string;
+  durationMs: number;
+  description?: string;
+}
+
+// Metric names are HTTP tokens; anything else is replaced
+const INVALID_NAME_CHARS = /[^A-Za-z0-9_.-]/g;
+
+export class ServerTiming {
+  private readonly entries: ServerTimingEntry[] = [];
+  private readonly pending = new Map<string, number>();
+
+  /** Record a stage measured elsewhere */
+  add(name: string, durationMs: number, description?: string): void {
+    this.entries.push({ name, durationMs, description });
+  }
+
+  start(name: string): void {
+    this.pending.set(name, performance.now());
+  }
+
+  /** Close a stage opened with start(); no-op if it was never started */
+  end(name: string, description?: string): void {
+    const startedAt = this.pending.get(name);
+    if (startedAt === undefined) return;
+    this.pending.delete(name);
+    this.add(name, performance.now() - startedAt, description);
+  }
+
+  /** Time an async stage; recorded even when it throws */
+  async measure<T>(name: string, fn: () => Promise<T>, description?: string): Promise<T> {
+    const startedAt = performance.now();
+    try {
+      return await fn();
+    } finally {
+      this.add(name, performance.now() - startedAt, description);
+    }
+  }
+
+  getEntries(): readonly ServerTimingEntry[] {
+    return this.entries;
+  }
+
+  /** Header value, e.g. `auth;dur=12.3, render;dur=4.1;desc="hit"` */
+  toString(): string {
+    return this.entries
+      .map(({ name, durationMs, description }) => {
+        let metric = `${name.replace(INVALID_NAME_CHARS, "_")};dur=${durationMs.toFixed(1)}`;
+        if (description) metric += `;desc="${description.replace(/["\\]/g, "")}"`;
+        return metric;
+      })
+      .join(", ");
+  }
+
+  /** Headers object to spread into a response */
+  headers(): Record<string, string> {
+    return this.entries.length > 0 ? { "Server-Timing": this.toString() } : {};
+  }
+}
+
+/**
+ * Parse a Server-Timing header back into entries (load harness, tests)
+ */
+export function parseServerTiming(header: string | null): ServerTimingEntry[] {
+  if (!header) return [];
+
+  const entries: ServerTimingEntry[] = [];
+  for (const metric of header.split(",")) {
+    const [rawName, ...params] = metric.split(";").map((part) => part.trim());
+    if (!rawName) continue;
+
+    const entry: ServerTimingEntry = { name: rawName, durationMs: 0 };
+    for (const param of params) {
+      const eq = param.indexOf("=");
+      if (eq === -1) continue;
+      const key = param.slice(0, eq).trim();
+      const value = param.slice(eq + 1).trim();
+      if (key === "dur") entry.durationMs = Number(value) || 0;
+      if (key === "desc") entry.description = value.replace(/^"|"$/g, "");
+    }
+    entries.push(entry);
+  }
+  return entries;
+}
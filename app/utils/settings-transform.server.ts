@@ -8,6 +8,13 @@
  */
 
 import type { SettingsState, BlockInstance, SchemaDefinition } from '../components/preview/schema/SchemaTypes';
+import {
+  applyLiquidEdits,
+  tokenMarkup,
+  tokenizeLiquid,
+  type LiquidDocument,
+  type LiquidEdit,
+} from './liquid-tokenizer';
 
 // Max settings payload size (4KB after encoding per plan requirements)
 const MAX_SETTINGS_SIZE = 4096;
@@ -205,6 +212,88 @@ function buildResourcePickerMap(schema?: SchemaDefinition | null): Map<string, s
   return map;
 }
 
+// section.settings.X and section.settings['X'] / section.settings["X"]
+const SETTINGS_DOT_REGEX = /section\.settings\.([a-zA-Z_][a-zA-Z0-9_]*)/g;
+const SETTINGS_BRACKET_REGEX = /section\.settings\[['"]([a-zA-Z_][a-zA-Z0-9_]*)['"]\]/g;
+
+// {{ var | image_url... | image_tag... }} (whole output markup)
+const IMAGE_TAG_CHAIN_REGEX = /^\s*(settings_[a-zA-Z0-9_]+|block_\d+_[a-zA-Z0-9_]+)\s*\|\s*(?:image_url|img_url)(?:\s*:\s*[^|}]+)?\s*\|\s*image_tag(?:\s*:\s*[^|}]+)?\s*$/;
+
+// var | image_url... (no image_tag)
+const IMAGE_URL_ONLY_REGEX = /(settings_[a-zA-Z0-9_]+|block_\d+_[a-zA-Z0-9_]+)\s*\|\s*(?:image_url|img_url)(?:\s*:\s*[^|}]+)?(?!\s*\|\s*image_tag)/g;
+
+export interface SectionSettingsEditOptions {
+  /** Rewrite section.settings references (default true) */
+  rewriteSettings?: boolean;
+  /** Strip image_url/img_url filters from settings variables (default true) */
+  stripImageFilters?: boolean;
+}
+
+/**
+ * Map a setting ID to its App Proxy variable
+ */
+function resolveSettingVariable(settingId: string, resourcePickerMap: Map<string, string>): string {
+  // First, check schema-based detection (preferred)
+  if (resourcePickerMap.has(settingId)) {
+    return resourcePickerMap.get(settingId)!; // Return type name: 'collection', 'product', etc.
+  }
+  // Fallback: legacy ID-based detection for backward compatibility
+  if (RESOURCE_PICKER_IDS.includes(settingId)) {
+    return settingId; // product, collection, etc.
+  }
+  return `settings_${settingId}`;
+}
+
+/**
+ * Token-level edits behind rewriteSectionSettings and stripImageUrlFilters
+ * Only Liquid markup ({{ }} / {% %}) is touched; text and raw blocks
+ * ({% raw %}, {% comment %}, {% schema %}, ...) are left as they are.
+ */
+export function collectSectionSettingsEdits(
+  doc: LiquidDocument,
+  schema?: SchemaDefinition | null,
+  { rewriteSettings = true, stripImageFilters = true }: SectionSettingsEditOptions = {}
+): LiquidEdit[] {
+  const resourcePickerMap = rewriteSettings ? buildResourcePickerMap(schema) : null;
+  const edits: LiquidEdit[] = [];
+
+  for (const token of doc.tokens) {
+    if (token.type !== 'output' && token.type !== 'tag') continue;
+
+    const original = tokenMarkup(doc, token);
+    let markup = original;
+
+    if (resourcePickerMap && markup.includes('section.settings')) {
+      markup = markup
+        .replace(SETTINGS_DOT_REGEX, (_match, settingId: string) =>
+          resolveSettingVariable(settingId, resourcePickerMap))
+        .replace(SETTINGS_BRACKET_REGEX, (_match, settingId: string) =>
+          resolveSettingVariable(settingId, resourcePickerMap));
+    }
+
+    if (stripImageFilters && (markup.includes('image_url') || markup.includes('img_url'))) {
+      // Chains with image_tag become an <img> element
+      const chain = token.type === 'output' ? IMAGE_TAG_CHAIN_REGEX.exec(markup) : null;
+      if (chain) {
+        edits.push({
+          start: token.start,
+          end: token.end,
+          text: `<img src="{{ ${chain[1]} }}" alt="" loading="lazy">`,
+        });
+        continue;
+      }
+      // Otherwise (CSS background-image, etc.) just output the URL
+      markup = markup.replace(IMAGE_URL_ONLY_REGEX, '$1');
+    }
+
+    if (markup !== original) {
+      edits.push({ start: token.innerStart!, end: token.innerEnd!, text: markup });
+    }
+  }
+
+  return edits;
+}
+
 /**
  * Rewrite section.settings.X to settings_X for App Proxy compatibility
  * Now schema-aware: detects resource pickers by type, not hardcoded IDs
@@ -220,51 +309,15 @@ function buildResourcePickerMap(schema?: SchemaDefinition | null): Map<string, s
  * - section.settings.selected_collection → collection (if type: "collection")
  * - section.settings.featured_product → product (if type: "product")
  *
+ * Image filters on the rewritten variables are stripped as well
+ * (see stripImageUrlFilters).
+ *
  * @param code - Liquid template code
  * @param schema - Optional parsed schema for type-aware detection
  * @returns Transformed code
  */
 export function rewriteSectionSettings(code: string, schema?: SchemaDefinition | null): string {
-  // Build schema-aware resource picker map
-  const resourcePickerMap = buildResourcePickerMap(schema);
-
-  // Handle dot notation: section.settings.property_name
-  let result = code.replace(
-    /section\.settings\.([a-zA-Z_][a-zA-Z0-9_]*)/g,
-    (match, settingId) => {
-      // First, check schema-based detection (preferred)
-      if (resourcePickerMap.has(settingId)) {
-        return resourcePickerMap.get(settingId)!; // Return type name: 'collection', 'product', etc.
-      }
-      // Fallback: legacy ID-based detection for backward compatibility
-      if (RESOURCE_PICKER_IDS.includes(settingId)) {
-        return settingId; // product, collection, etc.
-      }
-      return `settings_${settingId}`;
-    }
-  );
-
-  // Handle bracket notation: section.settings['property'] or section.settings["property"]
-  result = result.replace(
-    /section\.settings\[['"]([a-zA-Z_][a-zA-Z0-9_]*)['"]\]/g,
-    (match, settingId) => {
-      if (resourcePickerMap.has(settingId)) {
-        return resourcePickerMap.get(settingId)!;
-      }
-      if (RESOURCE_PICKER_IDS.includes(settingId)) {
-        return settingId;
-      }
-      return `settings_${settingId}`;
-    }
-  );
-
-  // Strip image_url/img_url filters from settings variables
-  // Our image picker stores raw CDN URLs, but Shopify's image_url filter
-  // expects image objects (MediaImage). This causes "invalid url input" errors.
-  // Solution: Remove the filter since settings values are already URLs.
-  result = stripImageUrlFilters(result);
-
-  return result;
+  return applyLiquidEdits(code, collectSectionSettingsEdits(tokenizeLiquid(code), schema));
 }
 
 /**
@@ -280,21 +333,8 @@ export function rewriteSectionSettings(code: string, schema?: SchemaDefinition |
  *    {{ settings_X | image_url: width: 1920 }} → {{ settings_X }}
  */
 export function stripImageUrlFilters(code: string): string {
-  // First pass: Handle chains with image_tag - convert to <img> element
-  // Match: {{ var | image_url... | image_tag... }}
-  // Output: <img src="{{ var }}" alt="" loading="lazy">
-  const imageTagChainRegex = /\{\{\s*(settings_[a-zA-Z0-9_]+|block_\d+_[a-zA-Z0-9_]+)\s*\|\s*(?:image_url|img_url)(?:\s*:\s*[^|}]+)?\s*\|\s*image_tag(?:\s*:\s*[^|}]+)?\s*\}\}/g;
-
-  let result = code.replace(imageTagChainRegex, '<img src="{{ $1 }}" alt="" loading="lazy">');
-
-  // Second pass: Handle chains without image_tag (used in CSS background-image, etc.)
-  // Match: {{ var | image_url... }} (no image_tag)
-  // Output: {{ var }}
-  const imageUrlOnlyRegex = /(settings_[a-zA-Z0-9_]+|block_\d+_[a-zA-Z0-9_]+)\s*\|\s*(?:image_url|img_url)(?:\s*:\s*[^|}]+)?(?!\s*\|\s*image_tag)/g;
-
-  result = result.replace(imageUrlOnlyRegex, '$1');
-
-  return result;
+  const doc = tokenizeLiquid(code);
+  return applyLiquidEdits(code, collectSectionSettingsEdits(doc, null, { rewriteSettings: false }));
 }
 
 // Re-export block iteration from separate module for backwards compatibility
@@ -0,0 +1,185 @@
+/**
+ * Server-Sent Events stream with delta coalescing and backpressure
+ *
+ * - content deltas are batched into one frame per CHAT_STREAM_FLUSH_CHARS
+ *   characters or CHAT_STREAM_FLUSH_MS milliseconds, whichever comes first
+ * - writes wait for the ReadableStream queue to drain when the client is slow
+ * - client disconnects abort `writer.signal` so generation can stop early
+ */
+
+export interface SseStreamOptions {
+  /** Flush pending deltas once this many characters are buffered (<= 1 disables batching) */
+  flushChars: number;
+  /** Flush pending deltas this long after the first buffered delta (0 disables the timer) */
+  flushIntervalMs: number;
+  /** Queued bytes before writes wait for the client */
+  highWaterMarkBytes: number;
+}
+
+const DEFAULT_OPTIONS: SseStreamOptions = {
+  flushChars: 256,
+  flushIntervalMs: 40,
+  highWaterMarkBytes: 64 * 1024,
+};
+
+function readNumber(value: string | undefined, fallback: number): number {
+  if (value === undefined || value.trim() === '') return fallback;
+  const parsed = Number(value);
+  return Number.isFinite(parsed) && parsed >= 0 ? parsed : fallback;
+}
+
+/**
+ * Per-deployment options from environment
+ */
+export function getSseStreamOptions(): SseStreamOptions {
+  return {
+    flushChars: readNumber(process.env.CHAT_STREAM_FLUSH_CHARS, DEFAULT_OPTIONS.flushChars),
+    flushIntervalMs: readNumber(process.env.CHAT_STREAM_FLUSH_MS, DEFAULT_OPTIONS.flushIntervalMs),
+    highWaterMarkBytes: DEFAULT_OPTIONS.highWaterMarkBytes,
+  };
+}
+
+export class SseWriter {
+  private readonly encoder = new TextEncoder();
+  private readonly abortController = new AbortController();
+  private pending: string[] = [];
+  private pendingChars = 0;
+  private flushTimer: ReturnType<typeof setTimeout> | null = null;
+  private drainWaiters: Array<() => void> = [];
+  private closed = false;
+
+  constructor(
+    private readonly controller: ReadableStreamDefaultController<Uint8Array>,
+    private readonly options: SseStreamOptions
+  ) {}
+
+  /** Aborted when the client disconnects */
+  get signal(): AbortSignal {
+    return this.abortController.signal;
+  }
+
+  /**
+   * Send a typed event; pending deltas are flushed first to keep ordering
+   */
+  async send(type: string, data?: unknown): Promise<void> {
+    await this.flush();
+    await this.write({ type, data });
+  }
+
+  /**
+   * Queue a content delta for the next coalesced content_delta frame
+   */
+  async delta(content: string): Promise<void> {
+    if (!content) return;
+    this.pending.push(content);
+    this.pendingChars += content.length;
+
+    if (this.pendingChars >= this.options.flushChars) {
+      await this.flush();
+    } else if (this.options.flushIntervalMs > 0 && !this.flushTimer) {
+      this.flushTimer = setTimeout(() => {
+        this.flushTimer = null;
+        this.flush().catch(() => {});
+      }, this.options.flushIntervalMs);
+    }
+  }
+
+  /**
+   * Emit buffered deltas as a single content_delta frame
+   */
+  async flush(): Promise<void> {
+    if (this.flushTimer) {
+      clearTimeout(this.flushTimer);
+      this.flushTimer = null;
+    }
+    if (this.pending.length === 0) return;
+
+    const content = this.pending.length === 1 ? this.pending[0] : this.pending.join('');
+    this.pending = [];
+    this.pendingChars = 0;
+    await this.write({ type: 'content_delta', data: { content } });
+  }
+
+  /**
+   * Flush and close the stream
+   */
+  async close(): Promise<void> {
+    await this.flush();
+    if (this.closed) return;
+    this.closed = true;
+    this.controller.close();
+  }
+
+  /** Called from the stream's pull(): queue has room again */
+  drained(): void {
+    const waiters = this.drainWaiters;
+    this.drainWaiters = [];
+    for (const resolve of waiters) resolve();
+  }
+
+  /** Called from the stream's cancel(): client went away */
+  cancelled(): void {
+    this.closed = true;
+    if (this.flushTimer) {
+      clearTimeout(this.flushTimer);
+      this.flushTimer = null;
+    }
+    this.pending = [];
+    this.abortController.abort();
+    this.drained();
+  }
+
+  private async write(payload: { type: string; data?: unknown }): Promise<void> {
+    if (this.closed) return;
+
+    this.controller.enqueue(this.encoder.encode(`data: ${JSON.stringify(payload)}\n\n`));
+
+    // Backpressure: wait for the consumer when the queue is full
+    const desired = this.controller.desiredSize;
+    if (desired !== null && desired <= 0) {
+      await new Promise<void>((resolve) => this.drainWaiters.push(resolve));
+    }
+  }
+}
+
+/**
+ * Create an SSE body stream driven by `run`
+ * `run` is started without blocking start(), so pull() can signal drain.
+ * Uncaught errors from `run` error the stream.
+ */
+export function createSseStream(
+  run: (writer: SseWriter) => Promise<void>,
+  options: SseStreamOptions = getSseStreamOptions()
+): ReadableStream<Uint8Array> {
+  let writer: SseWriter;
+
+  return new ReadableStream<Uint8Array>(
+    {
+      start(controller) {
+        writer = new SseWriter(controller, options);
+        run(writer).catch((error) => {
+          if (!writer.signal.aborted) {
+            controller.error(error);
+          }
+        });
+      },
+      pull() {
+        writer.drained();
+      },
+      cancel() {
+        writer.cancelled();
+      },
+    },
+    {
+      highWaterMark: options.highWaterMarkBytes,
+      size: (chunk) => chunk.byteLength,
+    }
+  );
+}
+
+export const SSE_HEADERS = {
+  'Content-Type': 'text/event-stream',
+  'Cache-Control': 'no-cache, no-transform',
+  'Connection': 'keep-alive',
+  'X-Accel-Buffering': 'no', // Disable nginx buffering
+};
@@ -0,0 +1,115 @@
+/**
+ * Liquid Transform Benchmark
+ *
+ * Measures the App Proxy transform pipeline (sanitize, schema strip, settings
+ * rewrite, blocks iteration) over the default templates and a large synthetic
+ * section. Reports per-request cost with a cold compile every time (what every
+ * proxy request paid before the compiled-template cache) against memoized
+ * compile + render.
+ *
+ * Usage:
+ *   npx tsx scripts/benchmarks/liquid-transform.ts [--iterations=2000] [--large-kb=100]
+ */
+
+import { DEFAULT_TEMPLATES } from "../../app/data/default-templates";
+import {
+  compileLiquidForProxy,
+  getProxyTemplateCacheStats,
+  renderProxyTemplate,
+  resetProxyTemplateCache,
+} from "../../app/utils/liquid-wrapper.server";
+import { tokenizeLiquid } from "../../app/utils/liquid-tokenizer";
+import { sanitizeLiquidCode } from "../../app/utils/input-sanitizer";
+
+function arg(name: string, fallback: number): number {
+  const match = process.argv.find((a) => a.startsWith(`--${name}=`));
+  return match ? Number(match.split("=")[1]) : fallback;
+}
+
+const ITERATIONS = arg("iterations", 2000);
+const LARGE_KB = arg("large-kb", 100);
+
+const PROXY_OPTIONS = { sanitize: true, transformSectionSettings: true };
+
+/**
+ * Section of roughly `kb` kilobytes built from repeated realistic markup
+ */
+function buildLargeSection(kb: number): string {
+  const chunk = `
+<div class="item-{{ section.id }}" style="color: {{ section.settings.text_color }}">
+  {% if section.settings.show_heading %}<h2>{{ section.settings.heading | escape }}</h2>{% endif %}
+  {{ section.settings.image | image_url: width: 800 | image_tag }}
+  {% form 'product', product %}<button onclick="track()">{{ 'add' | t }}</button>{% endform %}
+  <a href="{{ section.settings.link }}">{{ section.settings['button label'] }}</a>
+</div>`;
+  const schema = `{% schema %}{"name":"Large","settings":[{"type":"text","id":"heading","default":"Hi"},{"type":"product","id":"product"}]}{% endschema %}`;
+  const body: string[] = [`<style>.item-{{ section.id }} { padding: 8px; }</style>`];
+  let size = 0;
+  while (size < kb * 1024) {
+    body.push(chunk);
+    size += chunk.length;
+  }
+  body.push(`{% for block in section.blocks %}<p>{{ block.settings.text }}</p>{% endfor %}`);
+  return body.join("") + schema;
+}
+
+function percentile(sorted: number[], p: number): number {
+  if (sorted.length === 0) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+function measure(label: string, iterations: number, fn: (i: number) => void) {
+  // Warm up the JIT before timing
+  for (let i = 0; i < Math.min(50, iterations); i++) fn(i);
+
+  const samples: number[] = [];
+  const started = performance.now();
+  for (let i = 0; i < iterations; i++) {
+    const t0 = performance.now();
+    fn(i);
+    samples.push(performance.now() - t0);
+  }
+  const elapsed = performance.now() - started;
+  samples.sort((a, b) => a - b);
+
+  const opsPerSec = Math.round((iterations / elapsed) * 1000);
+  const p50 = (percentile(samples, 50) * 1000).toFixed(1);
+  const p99 = (percentile(samples, 99) * 1000).toFixed(1);
+  console.log(
+    `  ${label.padEnd(28)} ${String(opsPerSec).padStart(9)} ops/s   p50 ${p50.padStart(8)} µs   p99 ${p99.padStart(8)} µs`
+  );
+}
+
+const sources = [
+  ...DEFAULT_TEMPLATES.filter((t) => t.code).map((t) => ({ title: t.title, code: t.code! })),
+  { title: `Synthetic ~${LARGE_KB}KB section`, code: buildLargeSection(LARGE_KB) },
+];
+
+console.log(`Liquid transform benchmark: ${ITERATIONS} iterations per case\n`);
+
+for (const { title, code } of sources) {
+  const iterations = code.length > 20_000 ? Math.max(50, Math.floor(ITERATIONS / 20)) : ITERATIONS;
+  console.log(`${title} (${(code.length / 1024).toFixed(1)} KB, ${iterations} iterations)`);
+
+  measure("tokenize", iterations, () => {
+    tokenizeLiquid(code);
+  });
+  measure("sanitize only", iterations, () => {
+    sanitizeLiquidCode(code);
+  });
+  measure("cold compile + render", iterations, (i) => {
+    resetProxyTemplateCache();
+    const compiled = compileLiquidForProxy(code, PROXY_OPTIONS);
+    renderProxyTemplate(compiled, { sectionId: `s-${i}`, productHandle: "shirt" });
+  });
+
+  resetProxyTemplateCache();
+  measure("memoized compile + render", iterations, (i) => {
+    const compiled = compileLiquidForProxy(code, PROXY_OPTIONS);
+    renderProxyTemplate(compiled, { sectionId: `s-${i}`, productHandle: "shirt" });
+  });
+  console.log("");
+}
+
+const stats = getProxyTemplateCacheStats();
+console.log(`Compiled cache: ${stats.entries} entries, ${(stats.bytes / 1024).toFixed(1)} KB, hits ${stats.hits}, misses ${stats.misses}`);
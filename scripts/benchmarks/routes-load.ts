@@ -0,0 +1,487 @@
+/**
+ * Route Load Harness
+ *
+ * Drives the real route handlers at a fixed concurrency against local
+ * stand-ins, with no network or API keys:
+ * - in-memory Prisma instead of MongoDB
+ * - fake streaming Gemini behind AIService.generateWithContext (token rate,
+ *   MAX_TOKENS truncation, errors)
+ * - fake storefront server for api.preview.render; it renders pages through
+ *   the real api.proxy.render loader
+ * - fake Admin GraphQL per shop (billing charges via the outbox worker)
+ *
+ * Reports TTFB, p50/p99 latency, throughput, memory and the routes'
+ * Server-Timing stages for chat streaming, preview render, App Proxy render
+ * and section listing.
+ *
+ * Usage:
+ *   npx tsx scripts/benchmarks/routes-load.ts [--scenario=all|chat|preview|proxy|sections]
+ *     [--requests=400] [--concurrency=20] [--warmup=20] [--shops=4] [--sections=300]
+ *     [--token-rate=400] [--chunk-chars=60] [--first-chunk=300] [--max-tokens=0.05] [--errors=0.01]
+ *     [--storefront-latency=120] [--admin-latency=80] [--variants=20] [--verbose]
+ *
+ * Run with NODE_OPTIONS=--expose-gc for retained-heap numbers.
+ */
+
+import type { LoaderFunctionArgs } from "react-router";
+
+// shopify.server reads these at import time; values are never used offline
+process.env.SHOPIFY_API_KEY ||= "bench";
+process.env.SHOPIFY_API_SECRET ||= "bench";
+process.env.SHOPIFY_APP_URL ||= "https://bench.local";
+// The outbox is drained explicitly after the chat scenario
+process.env.OUTBOX_WORKER = "off";
+
+function arg(name: string, fallback: number): number {
+  const match = process.argv.find((a) => a.startsWith(`--${name}=`));
+  return match ? Number(match.split("=")[1]) : fallback;
+}
+
+function option(name: string, fallback: string): string {
+  const match = process.argv.find((a) => a.startsWith(`--${name}=`));
+  return match ? match.split("=")[1] : fallback;
+}
+
+const SCENARIO = option("scenario", "all");
+const REQUESTS = arg("requests", 400);
+const CONCURRENCY = arg("concurrency", 20);
+const WARMUP = arg("warmup", 20);
+const SHOPS = arg("shops", 4);
+const SECTIONS_PER_SHOP = arg("sections", 300);
+const TOKEN_RATE = arg("token-rate", 400);
+const CHUNK_CHARS = arg("chunk-chars", 60);
+const FIRST_CHUNK_MS = arg("first-chunk", 300);
+const MAX_TOKENS_RATE = arg("max-tokens", 0.05);
+const ERROR_RATE = arg("errors", 0.01);
+const STOREFRONT_LATENCY_MS = arg("storefront-latency", 120);
+const ADMIN_LATENCY_MS = arg("admin-latency", 80);
+const VARIANTS = arg("variants", 20);
+const VERBOSE = process.argv.includes("--verbose");
+
+// Routes log per request; keep the report readable unless asked
+const print = console.log.bind(console);
+if (!VERBOSE) {
+  console.log = () => {};
+  console.info = () => {};
+  console.warn = () => {};
+  console.error = () => {};
+}
+
+const { createInMemoryPrisma } = await import("../../app/services/mocks/in-memory-prisma");
+const db = createInMemoryPrisma();
+// db.server reuses the global client instead of connecting to MongoDB
+(globalThis as { prismaGlobal?: unknown }).prismaGlobal = db;
+
+const { authenticate, unauthenticated } = await import("../../app/shopify.server");
+const { aiService } = await import("../../app/services/ai.server");
+const { outboxWorker } = await import("../../app/services/outbox.server");
+const { chatService } = await import("../../app/services/chat.server");
+const { createFakeGemini } = await import("../../app/services/mocks/fake-gemini");
+const { createFakeAdminGraphql } = await import("../../app/services/mocks/fake-admin-graphql");
+const { startFakeStorefront } = await import("../../app/services/mocks/fake-storefront");
+const { parseServerTiming } = await import("../../app/utils/server-timing.server");
+const { DEFAULT_TEMPLATES } = await import("../../app/data/default-templates");
+const chatRoute = await import("../../app/routes/api.chat.stream");
+const previewRoute = await import("../../app/routes/api.preview.render");
+const proxyRoute = await import("../../app/routes/api.proxy.render");
+const sectionsRoute = await import("../../app/routes/app.sections._index");
+
+type ServerTimingEntry = ReturnType<typeof parseServerTiming>[number];
+
+// ---------------------------------------------------------------------------
+// Stand-ins
+// ---------------------------------------------------------------------------
+
+const shops = Array.from({ length: SHOPS }, (_, i) => `bench-${i}.myshopify.com`);
+const adminFakes = new Map(
+  shops.map((shop) => [shop, createFakeAdminGraphql({ shop, latencyMs: ADMIN_LATENCY_MS })])
+);
+const SHOP_HEADER = "X-Bench-Shop";
+
+function fakeSession(shop: string) {
+  return { id: `offline_${shop}`, shop, isOnline: false, accessToken: "bench", scope: "" };
+}
+
+function adminFor(shop: string) {
+  return { graphql: adminFakes.get(shop)!.graphql };
+}
+
+// Replace Shopify auth with sessions for the seeded shops; the handlers
+// themselves are untouched
+const auth = authenticate as unknown as {
+  admin: unknown;
+  public: { appProxy: unknown };
+};
+auth.admin = async (request: Request) => {
+  const shop = request.headers.get(SHOP_HEADER) || shops[0];
+  return { session: fakeSession(shop), admin: adminFor(shop) };
+};
+auth.public.appProxy = async (request: Request) => {
+  const shop = new URL(request.url).searchParams.get("shop");
+  return {
+    session: shop ? fakeSession(shop) : undefined,
+    admin: shop ? adminFor(shop) : undefined,
+    liquid: (body: string, init: { layout?: boolean; headers?: HeadersInit } = {}) => {
+      const headers = new Headers(init.headers);
+      headers.set("Content-Type", "application/liquid");
+      return new Response(body, { headers });
+    },
+  };
+};
+(unauthenticated as unknown as { admin: unknown }).admin = async (shop: string) => ({
+  session: fakeSession(shop),
+  admin: adminFor(shop),
+});
+
+const gemini = createFakeGemini({
+  tokensPerSecond: TOKEN_RATE,
+  chunkChars: CHUNK_CHARS,
+  firstChunkMs: FIRST_CHUNK_MS,
+  maxTokensRate: MAX_TOKENS_RATE,
+  errorRate: ERROR_RATE,
+});
+aiService.useClient(gemini.client);
+
+// Crude stand-in for Shopify's Liquid renderer: drop tags and outputs
+const LIQUID_MARKUP_REGEX = /\{%[\s\S]*?%\}|\{\{[\s\S]*?\}\}/g;
+
+const storefront = await startFakeStorefront({
+  latencyMs: STOREFRONT_LATENCY_MS,
+  render: async (url) => {
+    url.searchParams.set("shop", url.hostname);
+    const response = (await proxyRoute.loader(loaderArgs(new Request(url)))) as Response;
+    const liquid = await response.text();
+    return `<html><body>${liquid.replace(LIQUID_MARKUP_REGEX, "")}</body></html>`;
+  },
+});
+const restoreFetch = storefront.interceptFetch();
+
+// ---------------------------------------------------------------------------
+// Seed data
+// ---------------------------------------------------------------------------
+
+const templates = DEFAULT_TEMPLATES.filter((t) => t.code).map((t) => t.code!);
+const STATUSES = ["draft", "active", "inactive", "archive"];
+const PROMPTS = ["Hero banner with image", "Testimonial slider", "FAQ accordion", "Feature grid"];
+const CONVERSATIONS_PER_SHOP = 10;
+const conversations: Array<{ shop: string; id: string }> = [];
+
+for (const shop of shops) {
+  await db.subscription.create({
+    data: {
+      shop,
+      shopifySubId: `gid://shopify/AppSubscription/${shop}`,
+      planName: "agency",
+      status: "ACTIVE",
+      currentPeriodEnd: new Date(Date.now() + 30 * 86_400_000),
+      basePrice: 99,
+      includedQuota: 50,
+      overagePrice: 1.5,
+      cappedAmount: 500,
+    },
+  });
+
+  for (let i = 0; i < SECTIONS_PER_SHOP; i++) {
+    const section = await db.section.create({
+      data: {
+        shop,
+        name: `${PROMPTS[i % PROMPTS.length]} ${i}`,
+        prompt: PROMPTS[i % PROMPTS.length],
+        code: templates[i % templates.length],
+        status: STATUSES[i % STATUSES.length],
+        createdAt: new Date(Date.now() - i * 60_000),
+      },
+    });
+    if (i < CONVERSATIONS_PER_SHOP) {
+      const conversation = await chatService.getOrCreateConversation(section.id, shop);
+      conversations.push({ shop, id: conversation.id });
+    }
+  }
+}
+
+// ---------------------------------------------------------------------------
+// Measurement
+// ---------------------------------------------------------------------------
+
+interface Sample {
+  ttfbMs: number;
+  firstTokenMs: number | null;
+  totalMs: number;
+  bytes: number;
+  failed: boolean;
+  stages: ServerTimingEntry[];
+}
+
+interface ReadOptions {
+  /** Body text marking the first model token (streaming routes) */
+  firstTokenMarker?: string;
+  /** Body text marking an in-stream failure */
+  errorMarker?: string;
+}
+
+function loaderArgs(request: Request): LoaderFunctionArgs {
+  return { request, params: {}, context: {} } as unknown as LoaderFunctionArgs;
+}
+
+// Routes return either a Response or a data() result
+function toResponse(result: unknown): Response {
+  if (result instanceof Response) return result;
+  const value = result as { type?: string; data?: unknown; init?: ResponseInit | null };
+  if (value?.type === "DataWithResponseInit") {
+    return new Response(JSON.stringify(value.data), value.init ?? undefined);
+  }
+  return Response.json(result);
+}
+
+async function readResponse(response: Response, startedAt: number, options: ReadOptions): Promise<Sample> {
+  const decoder = new TextDecoder();
+  let ttfbMs = -1;
+  let firstTokenMs: number | null = null;
+  let bytes = 0;
+  let failed = response.status >= 400;
+
+  const reader = response.body?.getReader();
+  if (reader) {
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      const now = performance.now();
+      if (ttfbMs < 0) ttfbMs = now - startedAt;
+      bytes += value.byteLength;
+      if (options.firstTokenMarker || options.errorMarker) {
+        const text = decoder.decode(value, { stream: true });
+        if (firstTokenMs === null && options.firstTokenMarker && text.includes(options.firstTokenMarker)) {
+          firstTokenMs = now - startedAt;
+        }
+        if (options.errorMarker && text.includes(options.errorMarker)) failed = true;
+      }
+    }
+  }
+
+  const totalMs = performance.now() - startedAt;
+  return {
+    ttfbMs: ttfbMs < 0 ? totalMs : ttfbMs,
+    firstTokenMs,
+    totalMs,
+    bytes,
+    failed,
+    stages: parseServerTiming(response.headers.get("Server-Timing")),
+  };
+}
+
+function percentile(sorted: number[], p: number): number {
+  if (sorted.length === 0) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+function latency(values: number[]): string {
+  const sorted = [...values].sort((a, b) => a - b);
+  return `p50 ${percentile(sorted, 50).toFixed(1)}ms / p99 ${percentile(sorted, 99).toFixed(1)}ms`;
+}
+
+const MB = 1024 * 1024;
+
+function trackMemory() {
+  const gc = (globalThis as { gc?: () => void }).gc;
+  gc?.();
+  const baseline = process.memoryUsage();
+  let peakHeap = baseline.heapUsed;
+  let peakRss = baseline.rss;
+  const timer = setInterval(() => {
+    const usage = process.memoryUsage();
+    peakHeap = Math.max(peakHeap, usage.heapUsed);
+    peakRss = Math.max(peakRss, usage.rss);
+  }, 25);
+
+  return () => {
+    clearInterval(timer);
+    gc?.();
+    const after = process.memoryUsage();
+    return {
+      peakHeapMb: peakHeap / MB,
+      peakRssMb: Math.max(peakRss, after.rss) / MB,
+      retainedHeapMb: gc ? (after.heapUsed - baseline.heapUsed) / MB : null,
+    };
+  };
+}
+
+async function runScenario(
+  label: string,
+  makeRequest: (i: number) => Promise<unknown>,
+  options: ReadOptions = {}
+): Promise<void> {
+  for (let i = 0; i < WARMUP; i++) {
+    await readResponse(toResponse(await makeRequest(REQUESTS + i)), performance.now(), options);
+  }
+
+  const samples: Sample[] = [];
+  let thrown = 0;
+  let next = 0;
+  const stopMemory = trackMemory();
+  const started = performance.now();
+
+  await Promise.all(
+    Array.from({ length: CONCURRENCY }, async () => {
+      while (next < REQUESTS) {
+        const i = next++;
+        const t0 = performance.now();
+        try {
+          samples.push(await readResponse(toResponse(await makeRequest(i)), t0, options));
+        } catch {
+          thrown++;
+        }
+      }
+    })
+  );
+
+  const elapsed = performance.now() - started;
+  const memory = stopMemory();
+  const failed = samples.filter((s) => s.failed).length + thrown;
+
+  print(`\n${label}`);
+  print(`  requests:       ${REQUESTS} at concurrency ${CONCURRENCY} (${failed} failed)`);
+  print(`  throughput:     ${((REQUESTS / elapsed) * 1000).toFixed(1)} req/s`);
+  print(`  ttfb:           ${latency(samples.map((s) => s.ttfbMs))}`);
+  const firstTokens = samples.flatMap((s) => (s.firstTokenMs === null ? [] : [s.firstTokenMs]));
+  if (firstTokens.length > 0) {
+    print(`  first token:    ${latency(firstTokens)}`);
+  }
+  print(`  total:          ${latency(samples.map((s) => s.totalMs))}`);
+  const avgBytes = samples.reduce((sum, s) => sum + s.bytes, 0) / Math.max(1, samples.length);
+  print(`  body:           ${(avgBytes / 1024).toFixed(1)} KB avg`);
+  print(
+    `  memory:         peak heap ${memory.peakHeapMb.toFixed(1)} MB, peak rss ${memory.peakRssMb.toFixed(1)} MB` +
+      (memory.retainedHeapMb === null ? "" : `, retained ${memory.retainedHeapMb.toFixed(1)} MB`)
+  );
+
+  const stages = new Map<string, number[]>();
+  for (const sample of samples) {
+    for (const stage of sample.stages) {
+      const durations = stages.get(stage.name) ?? [];
+      durations.push(stage.durationMs);
+      stages.set(stage.name, durations);
+    }
+  }
+  for (const [name, durations] of stages) {
+    print(`  server-timing:  ${name.padEnd(16)} ${latency(durations)} (${durations.length})`);
+  }
+}
+
+// ---------------------------------------------------------------------------
+// Scenarios
+// ---------------------------------------------------------------------------
+
+function base64(value: string): string {
+  return Buffer.from(value, "utf-8").toString("base64");
+}
+
+function settingsFor(i: number): string {
+  return base64(JSON.stringify({ heading: `Heading ${i % VARIANTS}` }));
+}
+
+async function chatScenario() {
+  gemini.reset();
+  await runScenario(
+    `Chat stream (api.chat.stream, ${TOKEN_RATE} tok/s, ${FIRST_CHUNK_MS}ms to first chunk)`,
+    (i) => {
+      const { shop, id } = conversations[i % conversations.length];
+      const form = new FormData();
+      form.set("conversationId", id);
+      form.set("content", "Make the heading larger and add a call to action button");
+      form.set("currentCode", templates[i % templates.length]);
+      const request = new Request("https://bench.local/api/chat/stream", {
+        method: "POST",
+        body: form,
+        headers: { [SHOP_HEADER]: shop },
+      });
+      return chatRoute.action(loaderArgs(request));
+    },
+    { firstTokenMarker: '"content_delta"', errorMarker: '"type":"error"' }
+  );
+  print(
+    `  model calls:    ${gemini.calls.total} (${gemini.calls.truncated} MAX_TOKENS, ${gemini.calls.failed} errors)`
+  );
+
+  // Generation logs and usage charges are written off the response path
+  const drainStarted = performance.now();
+  let drained = 0;
+  for (;;) {
+    const run = await outboxWorker.runOnce();
+    drained += run.completed;
+    if (run.claimed === 0) break;
+  }
+  const adminCalls = [...adminFakes.values()].reduce((sum, fake) => sum + fake.totalCalls(), 0);
+  print(
+    `  outbox drain:   ${drained} jobs in ${(performance.now() - drainStarted).toFixed(0)}ms, ${adminCalls} Admin API calls`
+  );
+}
+
+async function previewScenario() {
+  await runScenario(
+    `Preview render (api.preview.render → fake storefront, ${STOREFRONT_LATENCY_MS}ms, ${VARIANTS} variants)`,
+    (i) => {
+      const shop = shops[i % shops.length];
+      const request = new Request("https://bench.local/api/preview/render", {
+        method: "POST",
+        body: JSON.stringify({
+          code: base64(templates[i % templates.length]),
+          settings: settingsFor(i),
+          section_id: "preview",
+        }),
+        headers: { "Content-Type": "application/json", [SHOP_HEADER]: shop },
+      });
+      return previewRoute.action(loaderArgs(request));
+    }
+  );
+  print(`  storefront:     ${storefront.totalRequests()} requests`);
+}
+
+async function proxyScenario() {
+  await runScenario(`App Proxy render (api.proxy.render, ${VARIANTS} variants)`, (i) => {
+    const url = new URL("https://bench.local/apps/blocksmith-preview");
+    url.searchParams.set("shop", shops[i % shops.length]);
+    url.searchParams.set("code", base64(templates[i % templates.length]));
+    url.searchParams.set("settings", settingsFor(i));
+    url.searchParams.set("section_id", `section-${i % VARIANTS}`);
+    return proxyRoute.loader(loaderArgs(new Request(url)));
+  });
+}
+
+async function sectionsScenario() {
+  const views = ["all", "draft", "active", "inactive", "archive"];
+  await runScenario(
+    `Section listing (app.sections._index, ${SECTIONS_PER_SHOP} sections/shop)`,
+    (i) => {
+      const url = new URL("https://bench.local/app/sections");
+      url.searchParams.set("view", views[i % views.length]);
+      url.searchParams.set("page", String((i % 3) + 1));
+      if (i % 4 === 0) url.searchParams.set("search", "hero");
+      const request = new Request(url, { headers: { [SHOP_HEADER]: shops[i % shops.length] } });
+      return sectionsRoute.loader(loaderArgs(request));
+    }
+  );
+}
+
+const scenarios: Record<string, () => Promise<void>> = {
+  chat: chatScenario,
+  preview: previewScenario,
+  proxy: proxyScenario,
+  sections: sectionsScenario,
+};
+
+print(
+  `Route load harness: ${SHOPS} shops, ${SECTIONS_PER_SHOP} sections/shop, ` +
+    `admin latency ${ADMIN_LATENCY_MS}ms`
+);
+
+try {
+  for (const [name, run] of Object.entries(scenarios)) {
+    if (SCENARIO === "all" || SCENARIO === name) await run();
+  }
+} finally {
+  restoreFetch();
+  await storefront.close();
+}
+
+// Timers in imported services (caches, token store) would keep the process alive
+process.exit(0);
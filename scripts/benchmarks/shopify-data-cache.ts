@@ -0,0 +1,85 @@
+/**
+ * ShopifyDataService Cache Benchmark
+ *
+ * Drives ShopifyDataService against the fake Admin GraphQL client and reports
+ * hit ratio, GraphQL call counts and latency for single vs batched lookups.
+ *
+ * Usage:
+ *   npx tsx scripts/benchmarks/shopify-data-cache.ts [--requests=2000] [--latency=80] [--shops=5] [--resources=40]
+ */
+
+// shopify.server reads these at import time; values are never used offline
+process.env.SHOPIFY_API_KEY ||= "bench";
+process.env.SHOPIFY_API_SECRET ||= "bench";
+process.env.SHOPIFY_APP_URL ||= "https://bench.local";
+
+const { ShopifyDataService } = await import("../../app/services/shopify-data.server");
+const { ResourceCache } = await import("../../app/services/resource-cache.server");
+const { createFakeAdminGraphql } = await import("../../app/services/mocks/fake-admin-graphql");
+
+function arg(name: string, fallback: number): number {
+  const match = process.argv.find((a) => a.startsWith(`--${name}=`));
+  return match ? Number(match.split("=")[1]) : fallback;
+}
+
+const REQUESTS = arg("requests", 2000);
+const LATENCY_MS = arg("latency", 80);
+const SHOPS = arg("shops", 5);
+const RESOURCES = arg("resources", 40);
+
+function percentile(sorted: number[], p: number): number {
+  if (sorted.length === 0) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+async function run(label: string, batched: boolean) {
+  const fakes = Array.from({ length: SHOPS }, (_, i) =>
+    createFakeAdminGraphql({ latencyMs: LATENCY_MS, shop: `shop-${i}.myshopify.com` })
+  );
+  const cache = new ResourceCache({ maxBytes: 8 * 1024 * 1024, freshMs: 60_000, staleMs: 600_000 });
+  const services = fakes.map((fake) => new ShopifyDataService({ cache, resolveAdmin: fake.resolveAdmin }));
+  const request = new Request("https://bench.local/app/api/resource");
+  const latencies: number[] = [];
+
+  const started = performance.now();
+  await Promise.all(
+    Array.from({ length: REQUESTS }, async (_, i) => {
+      const service = services[i % SHOPS];
+      // A section with three pickers: two products and a collection
+      const base = (i * 7) % RESOURCES;
+      const ids = [
+        `gid://shopify/Product/${base + 1}`,
+        `gid://shopify/Product/${((base + 3) % RESOURCES) + 1}`,
+        `gid://shopify/Collection/${(base % 10) + 1}`,
+      ];
+      const t0 = performance.now();
+      if (batched) {
+        await service.getResources(request, ids);
+      } else {
+        await Promise.all([
+          service.getProduct(request, ids[0]),
+          service.getProduct(request, ids[1]),
+          service.getCollection(request, ids[2]),
+        ]);
+      }
+      latencies.push(performance.now() - t0);
+    })
+  );
+  const elapsed = performance.now() - started;
+
+  latencies.sort((a, b) => a - b);
+  const stats = cache.getStats();
+  const lookups = stats.hits + stats.staleHits + stats.misses + stats.coalesced;
+
+  console.log(`\n${label}`);
+  console.log(`  requests:       ${REQUESTS} across ${SHOPS} shops`);
+  console.log(`  graphql calls:  ${fakes.reduce((sum, f) => sum + f.totalCalls(), 0)}`);
+  console.log(`  hit ratio:      ${((1 - stats.misses / lookups) * 100).toFixed(1)}%`);
+  console.log(`  coalesced:      ${stats.coalesced}`);
+  console.log(`  cache bytes:    ${stats.bytes} (${stats.entries} entries, ${stats.evictions} evictions)`);
+  console.log(`  p50 / p99:      ${percentile(latencies, 50).toFixed(2)}ms / ${percentile(latencies, 99).toFixed(2)}ms`);
+  console.log(`  throughput:     ${((REQUESTS / elapsed) * 1000).toFixed(0)} req/s`);
+}
+
+await run("Single lookups (getProduct/getCollection)", false);
+await run("Batched lookups (getResources → nodes)", true);